@@ -0,0 +1,9 @@
+"""
+ComfyUI nodes used by the LTX-2 RunPod handler.
+
+Installed to /comfyui/custom_nodes/ltx2_handler_nodes by the Dockerfile.
+Handler modules (latent_cache.py, ...) are imported from /workspace/handler.
+"""
+from .nodes import NODE_CLASS_MAPPINGS, NODE_DISPLAY_NAME_MAPPINGS
+
+__all__ = ["NODE_CLASS_MAPPINGS", "NODE_DISPLAY_NAME_MAPPINGS"]
@@ -0,0 +1,357 @@
+"""
+LTX-2 handler nodes.
+
+Latent cache (v61):
+- LTX2LatentCacheLoad / LTX2LatentCacheSave: read/write latents in latent_cache.py
+- LTX2ImageVAEEncode + LTX2ImgToVideoInplaceLatent: LTXVImgToVideoInplace split
+  into its VAE encode and its latent injection, so the encoded first frame
+  can be cached between the two
+
+Job latents (v61):
+- LTX2JobLatentSave: persist the final video/audio latents of a job
+- LTX2JobLatentLoad: start a refine job from them
+
+Streaming output (v61):
+- LTX2StreamingVideoOutput: VAEDecodeTiled + VHS_VideoCombine in one node,
+  decoding temporal chunks straight into ffmpeg (video_postprocess.py)
+
+Batched variants (v61):
+- LTX2VariantNoise: RandomNoise with seed + i for batch element i
+"""
+import os
+import sys
+
+import torch
+
+import comfy.utils
+import folder_paths
+
+sys.path.insert(0, '/workspace/handler')
+sys.path.insert(0, '/')
+
+from latent_cache import JOB_LATENT_DIR, JOB_LATENT_MAX_BYTES, LatentCache
+from video_postprocess import stream_latent_to_video
+
+CATEGORY = "LTX2 Handler"
+
+
+class LTX2LatentCacheLoad:
+    """Load a cached LATENT by key."""
+
+    @classmethod
+    def INPUT_TYPES(cls):
+        return {
+            "required": {
+                "cache_key": ("STRING", {"default": ""}),
+            }
+        }
+
+    RETURN_TYPES = ("LATENT",)
+    FUNCTION = "load"
+    CATEGORY = CATEGORY
+
+    def load(self, cache_key):
+        latent = LatentCache().load(cache_key)
+        if latent is None:
+            raise RuntimeError(f"Latent cache entry not found: {cache_key}")
+        return (latent,)
+
+
+class LTX2LatentCacheSave:
+    """Store a LATENT under a key and pass it through unchanged."""
+
+    @classmethod
+    def INPUT_TYPES(cls):
+        return {
+            "required": {
+                "latent": ("LATENT",),
+                "cache_key": ("STRING", {"default": ""}),
+            }
+        }
+
+    RETURN_TYPES = ("LATENT",)
+    FUNCTION = "save"
+    CATEGORY = CATEGORY
+
+    def save(self, latent, cache_key):
+        try:
+            LatentCache().save(cache_key, latent)
+        except Exception as e:
+            # A failed cache write must not fail the job
+            print(f"[latent_cache] Save failed for {cache_key}: {e}")
+        return (latent,)
+
+
+class LTX2ImageVAEEncode:
+    """
+    VAE-encode a conditioning image at the latent grid of a video latent.
+
+    Same pixels and encode as LTXVImgToVideoInplace: the image is resized
+    (bilinear, center) to the latent size times the VAE downscale factor.
+    """
+
+    @classmethod
+    def INPUT_TYPES(cls):
+        return {
+            "required": {
+                "vae": ("VAE",),
+                "image": ("IMAGE",),
+                "latent": ("LATENT",),
+            }
+        }
+
+    RETURN_TYPES = ("LATENT",)
+    FUNCTION = "encode"
+    CATEGORY = CATEGORY
+
+    def encode(self, vae, image, latent):
+        samples = latent["samples"]
+        _, height_scale_factor, width_scale_factor = vae.downscale_index_formula
+        latent_height, latent_width = samples.shape[3], samples.shape[4]
+        width = latent_width * width_scale_factor
+        height = latent_height * height_scale_factor
+
+        if image.shape[1] != height or image.shape[2] != width:
+            image = comfy.utils.common_upscale(
+                image.movedim(-1, 1), width, height, "bilinear", "center"
+            ).movedim(1, -1)
+
+        return ({"samples": vae.encode(image[:, :, :, :3])},)
+
+
+class LTX2ImgToVideoInplaceLatent:
+    """
+    Write an encoded image into the first latent frames of a video latent.
+
+    Equivalent to LTXVImgToVideoInplace given the output of LTX2ImageVAEEncode
+    (or a cached copy of it).
+    """
+
+    @classmethod
+    def INPUT_TYPES(cls):
+        return {
+            "required": {
+                "latent": ("LATENT",),
+                "image_latent": ("LATENT",),
+                "strength": ("FLOAT", {"default": 1.0, "min": 0.0, "max": 1.0, "step": 0.01}),
+            }
+        }
+
+    RETURN_TYPES = ("LATENT",)
+    FUNCTION = "apply"
+    CATEGORY = CATEGORY
+
+    def apply(self, latent, image_latent, strength):
+        samples = latent["samples"].clone()
+        encoded = image_latent["samples"].to(device=samples.device, dtype=samples.dtype)
+        batch, _, latent_frames = samples.shape[:3]
+        encoded_frames = encoded.shape[2]
+
+        samples[:, :, :encoded_frames] = encoded
+        noise_mask = torch.ones(
+            (batch, 1, latent_frames, 1, 1), dtype=torch.float32, device=samples.device
+        )
+        noise_mask[:, :, :encoded_frames] = 1.0 - strength
+        return ({"samples": samples, "noise_mask": noise_mask},)
+
+
+class LTX2JobLatentSave:
+    """Persist the separated video/audio latents of a finished sampling run."""
+
+    @classmethod
+    def INPUT_TYPES(cls):
+        return {
+            "required": {
+                "video_latent": ("LATENT",),
+                "audio_latent": ("LATENT",),
+                "cache_key": ("STRING", {"default": ""}),
+            }
+        }
+
+    RETURN_TYPES = ()
+    FUNCTION = "save"
+    OUTPUT_NODE = True
+    CATEGORY = CATEGORY
+
+    def save(self, video_latent, audio_latent, cache_key):
+        cache = LatentCache(JOB_LATENT_DIR, JOB_LATENT_MAX_BYTES)
+        try:
+            cache.save(cache_key, {"video": video_latent, "audio": audio_latent})
+        except Exception as e:
+            print(f"[latent_cache] Job latent save failed for {cache_key}: {e}")
+        return {}
+
+
+class LTX2JobLatentLoad:
+    """
+    Load persisted job latents as the starting point of a refine run.
+
+    The video latent gets a noise mask that holds the first latent frame
+    (the conditioning image) at 1 - first_frame_strength, like
+    LTXVImgToVideoInplace did in the original run.
+    """
+
+    @classmethod
+    def INPUT_TYPES(cls):
+        return {
+            "required": {
+                "cache_key": ("STRING", {"default": ""}),
+                "first_frame_strength": ("FLOAT", {"default": 1.0, "min": 0.0, "max": 1.0, "step": 0.01}),
+            }
+        }
+
+    RETURN_TYPES = ("LATENT", "LATENT")
+    RETURN_NAMES = ("video_latent", "audio_latent")
+    FUNCTION = "load"
+    CATEGORY = CATEGORY
+
+    def load(self, cache_key, first_frame_strength):
+        entry = LatentCache(JOB_LATENT_DIR, JOB_LATENT_MAX_BYTES).load(cache_key)
+        if entry is None:
+            raise RuntimeError(f"Job latent not found: {cache_key}")
+
+        video = {k: v for k, v in entry["video"].items() if k != "noise_mask"}
+        samples = video["samples"]
+        batch, _, latent_frames = samples.shape[:3]
+        noise_mask = torch.ones((batch, 1, latent_frames, 1, 1), dtype=torch.float32)
+        noise_mask[:, :, :1] = 1.0 - first_frame_strength
+        video["noise_mask"] = noise_mask
+
+        audio = {k: v for k, v in entry["audio"].items() if k != "noise_mask"}
+        return (video, audio)
+
+
+class LTX2StreamingVideoOutput:
+    """
+    Decode a video latent in temporal chunks and encode each chunk to H.264
+    as it completes.
+
+    Replaces VAEDecodeTiled -> VHS_VideoCombine: host memory holds one chunk
+    of uint8 frames instead of the full float video, and encoding overlaps
+    decoding. Reports its output under "gifs" like VHS_VideoCombine.
+    """
+
+    @classmethod
+    def INPUT_TYPES(cls):
+        return {
+            "required": {
+                "samples": ("LATENT",),
+                "vae": ("VAE",),
+                "frame_rate": ("FLOAT", {"default": 30.0, "min": 1.0, "max": 120.0, "step": 1.0}),
+                "filename_prefix": ("STRING", {"default": "ltx2_output"}),
+                "crf": ("INT", {"default": 19, "min": 0, "max": 51}),
+                "trim_to_audio": ("BOOLEAN", {"default": False}),
+                "tile_size": ("INT", {"default": 640, "min": 64, "max": 4096, "step": 32}),
+                "overlap": ("INT", {"default": 80, "min": 0, "max": 4096, "step": 32}),
+                "temporal_size": ("INT", {"default": 64, "min": 8, "max": 4096, "step": 8}),
+                "temporal_overlap": ("INT", {"default": 8, "min": 8, "max": 4096, "step": 8}),
+            },
+            "optional": {
+                "audio": ("AUDIO",),
+            }
+        }
+
+    RETURN_TYPES = ()
+    FUNCTION = "encode"
+    OUTPUT_NODE = True
+    CATEGORY = CATEGORY
+
+    def encode(self, samples, vae, frame_rate, filename_prefix, crf, trim_to_audio, tile_size, overlap,
+               temporal_size, temporal_overlap, audio=None):
+        latent = samples["samples"]
+        output_dir = folder_paths.get_output_directory()
+        full_output_folder, filename, counter, subfolder, _ = folder_paths.get_save_image_path(
+            filename_prefix, output_dir, latent.shape[-1], latent.shape[-2]
+        )
+        video_filename = f"{filename}_{counter:05}.mp4"
+        output_path = os.path.join(full_output_folder, video_filename)
+
+        # Per-chunk progress (websocket "progress" messages; the handler's decode ETA)
+        pbar = comfy.utils.ProgressBar(latent.shape[2])
+        stream_latent_to_video(
+            vae, latent, output_path, frame_rate,
+            audio=audio, crf=crf, trim_to_audio=trim_to_audio, tile_size=tile_size, overlap=overlap,
+            temporal_size=temporal_size, temporal_overlap=temporal_overlap,
+            on_progress=lambda done, total: pbar.update_absolute(done, total),
+        )
+        return {"ui": {"gifs": [{
+            "filename": video_filename,
+            "subfolder": subfolder,
+            "type": "output",
+            "format": "video/h264-mp4",
+            "frame_rate": frame_rate,
+            "fullpath": output_path,
+        }]}}
+
+
+class VariantNoise:
+    """
+    NOISE object for LTX2VariantNoise.
+
+    Same draws as comfy.sample.prepare_noise (one CPU generator, nested
+    video/audio tensors in order), but with a generator per batch element
+    seeded seed + i, so element i matches a batch-1 run with seed + i.
+    """
+
+    def __init__(self, seed):
+        self.seed = seed
+
+    def generate_noise(self, input_latent):
+        samples = input_latent["samples"]
+        nested = getattr(samples, "is_nested", False)
+        tensors = samples.unbind() if nested else [samples]
+        noises = [[] for _ in tensors]
+        for index in range(tensors[0].shape[0]):
+            generator = torch.manual_seed(self.seed + index)
+            for noise, tensor in zip(noises, tensors):
+                noise.append(torch.randn(
+                    [1] + list(tensor.shape[1:]), dtype=torch.float32, layout=tensor.layout,
+                    generator=generator, device="cpu"
+                ))
+        noises = [torch.cat(noise) for noise in noises]
+        if nested:
+            import comfy.nested_tensor
+            return comfy.nested_tensor.NestedTensor(noises)
+        return noises[0]
+
+
+class LTX2VariantNoise:
+    """RandomNoise for batched variants: batch element i is noised from noise_seed + i."""
+
+    @classmethod
+    def INPUT_TYPES(cls):
+        return {
+            "required": {
+                "noise_seed": ("INT", {"default": 0, "min": 0, "max": 0xffffffffffffffff}),
+            }
+        }
+
+    RETURN_TYPES = ("NOISE",)
+    FUNCTION = "get_noise"
+    CATEGORY = CATEGORY
+
+    def get_noise(self, noise_seed):
+        return (VariantNoise(noise_seed),)
+
+
+NODE_CLASS_MAPPINGS = {
+    "LTX2LatentCacheLoad": LTX2LatentCacheLoad,
+    "LTX2LatentCacheSave": LTX2LatentCacheSave,
+    "LTX2ImageVAEEncode": LTX2ImageVAEEncode,
+    "LTX2ImgToVideoInplaceLatent": LTX2ImgToVideoInplaceLatent,
+    "LTX2JobLatentSave": LTX2JobLatentSave,
+    "LTX2JobLatentLoad": LTX2JobLatentLoad,
+    "LTX2StreamingVideoOutput": LTX2StreamingVideoOutput,
+    "LTX2VariantNoise": LTX2VariantNoise,
+}
+
+NODE_DISPLAY_NAME_MAPPINGS = {
+    "LTX2LatentCacheLoad": "LTX2 Latent Cache Load",
+    "LTX2LatentCacheSave": "LTX2 Latent Cache Save",
+    "LTX2ImageVAEEncode": "LTX2 Image VAE Encode",
+    "LTX2ImgToVideoInplaceLatent": "LTX2 Img To Video Inplace (Latent)",
+    "LTX2JobLatentSave": "LTX2 Job Latent Save",
+    "LTX2JobLatentLoad": "LTX2 Job Latent Load",
+    "LTX2StreamingVideoOutput": "LTX2 Streaming Video Output",
+    "LTX2VariantNoise": "LTX2 Variant Noise",
+}
@@ -0,0 +1,336 @@
+#!/usr/bin/env python3
+"""
+Pool of ComfyUI instances for multi-GPU workers.
+
+start_wrapper.sh launches COMFYUI_INSTANCES ComfyUI processes from the same
+install, instance i on GPU i and port COMFYUI_BASE_PORT + i. They share the
+model, input and output directories, so inputs can be staged through any
+ready instance and every output lands on the same disk.
+
+Each instance runs one prompt at a time. Jobs entering their GPU stage
+wait in one queue for the whole pool, served by priority (0 = most urgent),
+then arrival. Each LANE_AGING_SECONDS a job waits makes it one priority
+more urgent, ahead of jobs that arrived at that priority, so a steady
+stream of interactive jobs cannot starve a batch job. The job at the head takes whichever ready instance is free
+first, so a job never waits behind a long prompt while another GPU idles.
+Among several free instances it prefers the one whose last prompt used the
+same LoRA config (ComfyUI keeps the LoRA-patched weights, so a matching
+instance skips re-patching the 19B model), then the one used least
+recently, so a new config lands on an idle instance rather than evicting
+the config of the one just used.
+
+A job arriving while no instance is free may preempt the least urgent
+preemptible holder that is less urgent than itself: the pool interrupts the
+holder's prompt (the one it reported with prompt_started, checked against
+/queue so the next job's prompt is never hit), and the holder, when its
+prompt ends interrupted, records the preemption and goes back to waiting.
+A holder that finishes first is not preempted; the request is dropped on
+release.
+
+An instance a job failed on is probed again (/system_stats) before it is
+handed out, so a crashed ComfyUI stops receiving jobs; instances not ready
+are re-probed at most every READY_RECHECK_SECONDS as jobs arrive.
+
+Stdlib only (urllib), so the offline checks can import it without the
+handler's dependencies.
+"""
+import contextlib
+import itertools
+import json
+import os
+import threading
+import time
+import urllib.error
+import urllib.request
+from typing import List, Optional
+
+COMFYUI_HOST = os.environ.get("COMFYUI_HOST", "127.0.0.1")
+COMFYUI_BASE_PORT = int(os.environ.get("COMFYUI_BASE_PORT", "8188"))
+# start_wrapper.sh resolves COMFYUI_INSTANCES=auto to the GPU count before the handler starts
+COMFYUI_INSTANCES = max(1, int(os.environ.get("COMFYUI_INSTANCES", "1")))
+# Instances not ready yet (still loading) are re-checked at most this often
+READY_RECHECK_SECONDS = 10.0
+# A waiting job counts one priority more urgent per this many seconds waited (also the POD_MODE job queue)
+LANE_AGING_SECONDS = float(os.environ.get("LANE_AGING_SECONDS", "60"))
+
+
+class ComfyUIInstance:
+    """One ComfyUI server and its routing state."""
+
+    def __init__(self, index: int, url: str):
+        self.index = index
+        self.url = url
+        self.ready = False
+        self.lora_config = None     # LoRA config of the last prompt (patched weights)
+        self.jobs_done = 0
+        self.jobs_failed = 0
+        self.last_used = 0.0
+        self.busy = False
+        self.holder_priority = None
+        self.holder_preemptible = False
+        self.prompt_id = None       # Holder's running prompt (prompt_started)
+        self.preempt_requested = False
+        self.preempted = False      # Holder's prompt ended interrupted by a preemption
+        self.preemptions = 0
+
+    def check_ready(self, timeout: float = 5) -> bool:
+        """Probe /system_stats and update ready."""
+        try:
+            with urllib.request.urlopen(f"{self.url}/system_stats", timeout=timeout) as response:
+                self.ready = response.status == 200
+        except (urllib.error.URLError, OSError, ValueError):
+            self.ready = False
+        return self.ready
+
+    def interrupt(self, prompt_id: str, timeout: float = 5) -> bool:
+        """
+        Interrupt prompt_id if it is the running prompt; ComfyUI stops it at the next node / step.
+
+        /queue is checked first (a prompt still pending is waited for, up to
+        timeout) and prompt_id is sent with /interrupt, which ComfyUI
+        versions that support it also check, so a prompt that has already
+        finished never takes the next prompt down with it.
+
+        Returns:
+            True if /interrupt was sent while prompt_id was running
+        """
+        deadline = time.time() + timeout
+        try:
+            while True:
+                with urllib.request.urlopen(f"{self.url}/queue", timeout=timeout) as response:
+                    queue = json.loads(response.read())
+                if any(item[1] == prompt_id for item in queue.get("queue_running", [])):
+                    break
+                if not any(item[1] == prompt_id for item in queue.get("queue_pending", [])) \
+                        or time.time() >= deadline:
+                    return False
+                time.sleep(0.1)
+            request = urllib.request.Request(
+                f"{self.url}/interrupt", data=json.dumps({"prompt_id": prompt_id}).encode(),
+                headers={"Content-Type": "application/json"}, method="POST",
+            )
+            with urllib.request.urlopen(request, timeout=timeout) as response:
+                return response.status == 200
+        except (urllib.error.URLError, OSError, ValueError, IndexError, TypeError):
+            return False
+
+    def to_dict(self) -> dict:
+        return {
+            "index": self.index,
+            "url": self.url,
+            "ready": self.ready,
+            "busy": self.busy,
+            "lora_config": self.lora_config,
+            "jobs_done": self.jobs_done,
+            "jobs_failed": self.jobs_failed,
+            "preemptions": self.preemptions,
+        }
+
+
+class ComfyUIPool:
+    """Route jobs across ComfyUI instances; one prompt per instance at a time."""
+
+    def __init__(self, urls: List[str], aging_seconds: float = LANE_AGING_SECONDS):
+        self.instances = [ComfyUIInstance(index, url) for index, url in enumerate(urls)]
+        self.aging_seconds = aging_seconds
+        self._lock = threading.Lock()
+        self._released = threading.Condition(self._lock)
+        self._waiters = []          # (priority, ticket, wait start) waiting for any instance
+        self._tickets = itertools.count()
+        self._local = threading.local()
+        self._last_check = 0.0
+
+    @classmethod
+    def from_env(cls) -> "ComfyUIPool":
+        return cls([f"http://{COMFYUI_HOST}:{COMFYUI_BASE_PORT + index}" for index in range(COMFYUI_INSTANCES)])
+
+    def check_ready(self) -> int:
+        """Probe every instance; returns the number ready."""
+        self._last_check = time.time()
+        return sum(instance.check_ready() for instance in self.instances)
+
+    def wait_until_ready(self, timeout: float = 300, interval: float = 2) -> bool:
+        """Wait until at least one instance answers."""
+        start = time.time()
+        while True:
+            if self.check_ready():
+                return True
+            if time.time() - start >= timeout:
+                return False
+            time.sleep(interval)
+
+    def _choose(self, affinity) -> Optional[ComfyUIInstance]:
+        """Free ready instance, LoRA config match first, then least recently used (caller holds _lock)."""
+        free = [instance for instance in self.instances if instance.ready and not instance.busy]
+        if not free:
+            return None
+        return min(free, key=lambda instance: (affinity is None or instance.lora_config != affinity,
+                                               instance.last_used, instance.index))
+
+    def _preempt_target(self, priority: int) -> Optional[ComfyUIInstance]:
+        """Least urgent preemptible holder less urgent than priority, not already asked (caller holds _lock)."""
+        holders = [instance for instance in self.instances
+                   if instance.busy and instance.holder_preemptible and not instance.preempt_requested
+                   and priority < instance.holder_priority]
+        # Among equals, the most recently started prompt loses the least work
+        return max(holders, key=lambda instance: (instance.holder_priority, instance.last_used), default=None)
+
+    def _urgency(self, waiter, now: float) -> int:
+        """Priority of a waiter after aging: one more urgent per aging_seconds waited."""
+        priority, _ticket, since = waiter
+        return max(0, priority - int((now - since) // self.aging_seconds))
+
+    def _head(self):
+        """Next waiter to serve: most urgent after aging, promoted before native, then arrival (caller holds _lock)."""
+        now = time.time()
+
+        def rank(waiter):
+            urgency = self._urgency(waiter, now)
+            return urgency, urgency == waiter[0], waiter[1]
+
+        return min(self._waiters, key=rank)
+
+    def _drop_waiter(self, waiter) -> None:
+        """Remove a waiter that gives up (caller holds _lock)."""
+        self._waiters.remove(waiter)
+        self._released.notify_all()
+
+    @contextlib.contextmanager
+    def slot(self, affinity=None, priority: int = 0, preemptible: bool = False):
+        """
+        Wait for a free instance and hold it for the block.
+
+        While held, url() in this thread returns the instance's URL. If the
+        block raises, the instance is probed before it is released and is
+        skipped while it does not answer.
+
+        Args:
+            affinity: LoRA config of the job's workflow (any hashable), or None
+            priority: Lower is served first among waiting jobs; rises by one
+                per aging_seconds waited
+            preemptible: Allow more urgent waiters to interrupt this job's prompt
+
+        Yields:
+            Tuple of (instance, seconds waited for it)
+
+        Raises:
+            RuntimeError: If no instance is ready
+        """
+        if not all(instance.ready for instance in self.instances) and \
+                time.time() - self._last_check > READY_RECHECK_SECONDS:
+            self.check_ready()
+        wait_start = time.time()
+        preempt = prompt_id = None
+        with self._released:
+            if not any(instance.ready for instance in self.instances):
+                raise RuntimeError("No ComfyUI instance is ready")
+            waiter = (priority, next(self._tickets), wait_start)
+            self._waiters.append(waiter)
+            if self._choose(affinity) is None:
+                preempt = self._preempt_target(priority)
+                if preempt is not None:
+                    # Before the holder has submitted, prompt_started interrupts its prompt
+                    preempt.preempt_requested = True
+                    prompt_id = preempt.prompt_id
+        if preempt is not None:
+            print(f"  Preempting ComfyUI instance {preempt.index} (priority {preempt.holder_priority} -> {priority})")
+            if prompt_id is not None:
+                preempt.interrupt(prompt_id)
+
+        with self._released:
+            try:
+                while True:
+                    instance = self._choose(affinity) if self._head() is waiter else None
+                    if instance is not None:
+                        break
+                    if not any(other.ready for other in self.instances):
+                        raise RuntimeError("No ComfyUI instance is ready")
+                    self._released.wait()
+            except BaseException:
+                self._drop_waiter(waiter)
+                raise
+            self._waiters.remove(waiter)
+            instance.busy = True
+            # An aged job holds the slot at its aged priority: waiters it has caught up with cannot preempt it
+            instance.holder_priority = self._urgency(waiter, time.time())
+            instance.holder_preemptible = preemptible
+            instance.lora_config = affinity
+            instance.last_used = time.time()
+            # The next waiter may take another free instance
+            self._released.notify_all()
+        waited = time.time() - wait_start
+        self._local.instance = instance
+        failed = False
+        try:
+            yield instance, waited
+        except BaseException:
+            failed = True
+            raise
+        finally:
+            self._local.instance = None
+            if failed and not instance.check_ready():
+                print(f"  ComfyUI instance {instance.index} stopped answering after a failed job, "
+                      f"skipping it until it is ready again")
+            with self._released:
+                instance.busy = False
+                instance.holder_priority = None
+                instance.holder_preemptible = False
+                instance.prompt_id = None
+                instance.preempt_requested = False
+                instance.preempted = False
+                instance.jobs_done += 1
+                instance.jobs_failed += failed
+                self._released.notify_all()
+
+    def prompt_started(self, prompt_id: str) -> None:
+        """Record the prompt the calling thread's instance runs; interrupt it if a waiter already asked."""
+        instance = self.current()
+        if instance is None:
+            return
+        with self._lock:
+            instance.prompt_id = prompt_id
+            requested = instance.preempt_requested
+        if requested:
+            instance.interrupt(prompt_id)
+
+    def record_preemption(self) -> bool:
+        """
+        The calling thread's prompt ended interrupted: count it as a
+        preemption if a waiter asked for one (else it was interrupted by
+        someone else and is an error).
+        """
+        instance = self.current()
+        if instance is None:
+            return False
+        with self._lock:
+            if not instance.preempt_requested:
+                return False
+            instance.preempted = True
+            instance.preemptions += 1
+            return True
+
+    def current(self) -> Optional[ComfyUIInstance]:
+        """Instance held by the calling thread, if any."""
+        return getattr(self._local, "instance", None)
+
+    def url(self) -> str:
+        """URL of the instance held by this thread, else of the first ready instance."""
+        instance = self.current()
+        if instance is not None:
+            return instance.url
+        for instance in self.instances:
+            if instance.ready:
+                return instance.url
+        return self.instances[0].url
+
+    def stats(self) -> List[dict]:
+        with self._lock:
+            return [instance.to_dict() for instance in self.instances]
+
+
+POOL = ComfyUIPool.from_env()
+
+
+def comfyui_url() -> str:
+    """ComfyUI base URL for the calling job (see ComfyUIPool.url)."""
+    return POOL.url()
@@ -7,6 +7,7 @@ Uploads generated videos to Google Cloud Storage and returns public URLs.
 import os
 import json
 from datetime import datetime
+from typing import Callable, Optional
 from google.cloud import storage
 from google.oauth2 import service_account
 
@@ -15,6 +16,9 @@ GCS_BUCKET = "dramaland-public"
 GCS_BASE_PATH = "ugc_media"
 SERVICE_ACCOUNT_PATH = "/workspace/gcs-credentials.json"
 
+# Resumable upload chunk when reporting progress (multiple of 256 KB)
+UPLOAD_CHUNK_BYTES = 8 * 1024 * 1024
+
 # Fallback paths for service account
 SERVICE_ACCOUNT_PATHS = [
     "/workspace/gcs-credentials.json",
@@ -55,10 +59,28 @@ def get_gcs_client():
     return storage.Client(credentials=credentials, project=credentials.project_id)
 
 
+class ProgressReader:
+    """File wrapper calling on_progress(bytes read, total) on each read."""
+
+    def __init__(self, file, total: int, on_progress: Callable[[int, int], None]):
+        self._file = file
+        self._total = total
+        self._on_progress = on_progress
+
+    def read(self, size: int = -1) -> bytes:
+        data = self._file.read(size)
+        self._on_progress(min(self._file.tell(), self._total), self._total)
+        return data
+
+    def __getattr__(self, name):
+        return getattr(self._file, name)
+
+
 def upload_video_to_gcs(
     video_path: str,
     job_id: str = None,
-    subfolder: str = "videos"
+    subfolder: str = "videos",
+    on_progress: Optional[Callable[[int, int], None]] = None
 ) -> dict:
     """
     Upload video to GCS and return URLs.
@@ -67,6 +89,8 @@ def upload_video_to_gcs(
         video_path: Local path to video file
         job_id: Optional job ID for organizing files (uses date path if not provided)
         subfolder: Subfolder name (default: "videos")
+        on_progress: Optional callback(bytes sent, total bytes); files over
+            UPLOAD_CHUNK_BYTES are then sent in chunks of that size
 
     Returns:
         dict with:
@@ -117,7 +141,12 @@ def upload_video_to_gcs(
 
         # Upload with progress logging
         print(f"Uploading to GCS: {gcs_path} ({file_size / 1024 / 1024:.1f} MB)")
-        blob.upload_from_filename(video_path)
+        if on_progress:
+            blob.chunk_size = UPLOAD_CHUNK_BYTES
+            with open(video_path, "rb") as f:
+                blob.upload_from_file(ProgressReader(f, file_size, on_progress), size=file_size)
+        else:
+            blob.upload_from_filename(video_path)
 
         # Build URLs
         gcs_url = f"gs://{GCS_BUCKET}/{gcs_path}"
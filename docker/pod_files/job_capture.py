@@ -0,0 +1,289 @@
+#!/usr/bin/env python3
+"""
+Opt-in capture of production jobs for replay (scripts/replay_jobs.py).
+
+With JOB_CAPTURE=1, unified_handler writes one JSON line per job (a
+JOB_CAPTURE_SAMPLE share of them) to JOB_CAPTURE_DIR/captures-YYYYMMDD.jsonl:
+
+    {"version": 1, "job_id": ..., "arrival": 1760000000.0, "seconds": 84.2,
+     "mode": "lipsync", "status": "success", "error": null,
+     "input": {...scrubbed...}, "media": [...], "workflow": {...scrubbed...},
+     "stages": {"download": 1.2, ...}, "nodes": {"161": {"class_type": ..., "seconds": 41.0}},
+     "output": {"resolution": ..., "frames": ..., "attempts": [...]}}
+
+Records are scrubbed of anything identifying the user's content: media
+URLs become "media:<kind>:<n>" (the n-th source image / audio of the job,
+see "media"; in the workflow, the n-th staged one), prompt texts become
+"[scrubbed N words]", tenants are hashed, and only the values of known job
+parameters (SAFE_INPUT_KEYS) are kept; any other value, any string holding
+a URL and long strings are dropped, as are URLs in error messages. A
+legacy "workflow" input is scrubbed like the submitted workflow. Media are
+recorded as kind, role (source download or file staged to ComfyUI),
+sha256, size, image size and audio duration, so a replay can synthesize
+stand-ins of the same shape. Seeds are kept: a replay samples the same
+noise.
+
+Code deep in the handler records through current_capture(), the capture of
+the job running in the calling thread (a disabled one outside a job, or
+when capture is off).
+"""
+import contextlib
+import hashlib
+import json
+import os
+import random
+import re
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Optional
+
+JOB_CAPTURE = os.environ.get("JOB_CAPTURE", "0").lower() in ("1", "true", "yes")
+JOB_CAPTURE_DIR = os.environ.get("JOB_CAPTURE_DIR", "/comfyui/job_captures")
+# Share of jobs captured (0-1)
+JOB_CAPTURE_SAMPLE = float(os.environ.get("JOB_CAPTURE_SAMPLE", "1"))
+CAPTURE_VERSION = 1
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".webp")
+# Input keys recorded as given (the job parameters of API.md); other values are dropped
+SAFE_INPUT_KEYS = frozenset((
+    "quality_preset", "seed", "width", "height", "resolution_tier", "exact_resolution", "fps", "generation_fps",
+    "duration", "steps", "img_strength", "img_compression", "strength", "frame_position", "buffer_seconds",
+    "auto_buffer_guide", "frame_alignment", "lora_distilled", "lora_detailer", "lora_camera", "two_stage",
+    "two_stage_steps", "two_stage_denoise", "refine_denoise", "trim_to_audio", "trim_silence", "normalize_image",
+    "normalize_audio", "audio_sample_rate", "audio_mono", "interpolation", "streaming_output", "num_variants",
+    "num_frames", "auto_decode_tiling", "oom_retry", "oom_retry_temporal_size", "use_latent_cache",
+    "persist_latent", "priority", "preemptible",
+))
+# Strings longer than this (inline media, pre-built workflow texts) are dropped
+MAX_STRING_LENGTH = 512
+# Workflow node inputs holding prompt text
+TEXT_INPUT_NAMES = ("text", "prompt", "positive", "negative")
+URL_PATTERN = re.compile(r"https?://\S+")
+# Result output fields kept in the record
+OUTPUT_FIELDS = ("resolution", "duration", "frames", "fps", "quality_preset", "generation_time",
+                 "memory_profile", "attempts", "two_stage", "frame_plan", "num_variants")
+
+_write_lock = threading.Lock()
+_local = threading.local()
+
+
+def scrub_text(text: str) -> str:
+    """Prompt text -> its word count (replays fill in as many words)."""
+    return f"[scrubbed {len(text.split())} words]"
+
+
+def job_mode(input_data: dict) -> str:
+    """Mode name of a job input, in rp_handler.dispatch_job's order."""
+    if input_data.get("refine_from_job_id"):
+        return "refine"
+    if input_data.get("keyframes"):
+        return "keyframes_lipsync" if input_data.get("audio_url") else "keyframes"
+    if input_data.get("image_url") and input_data.get("audio_url"):
+        return "lipsync"
+    if input_data.get("image_url") and input_data.get("duration"):
+        return "audio_gen"
+    if input_data.get("workflow"):
+        return "legacy"
+    return "invalid"
+
+
+def scrub_input(input_data: dict) -> dict:
+    """
+    Job input with media URLs and prompts replaced, tenants hashed, and every
+    value not under SAFE_INPUT_KEYS (or holding a URL) dropped.
+    """
+    counters = {"image": 0, "audio": 0}
+
+    def scrub(key, value):
+        if key == "workflow" and isinstance(value, dict):
+            return scrub_workflow(value)
+        if isinstance(value, dict):
+            return {k: scrub(k, v) for k, v in value.items()}
+        if isinstance(value, list):
+            return [scrub(key, item) for item in value]
+        if key in ("image_url", "audio_url") and isinstance(value, str):
+            kind = key[:-len("_url")]
+            counters[kind] += 1
+            return f"media:{kind}:{counters[kind] - 1}"
+        if key.startswith("prompt_") and isinstance(value, str):
+            return scrub_text(value)
+        if key == "tenant":
+            return hashlib.sha256(str(value).encode()).hexdigest()[:12]
+        if key not in SAFE_INPUT_KEYS:
+            return "[scrubbed]"
+        if isinstance(value, str) and URL_PATTERN.search(value):
+            return "[scrubbed url]"
+        if isinstance(value, str) and len(value) > MAX_STRING_LENGTH:
+            return f"[scrubbed {len(value)} chars]"
+        return value
+
+    return {key: scrub(key, value) for key, value in input_data.items()}
+
+
+def scrub_workflow(workflow: dict, staged_names: Optional[dict] = None) -> dict:
+    """
+    Workflow with prompt texts replaced by their word counts, the names of
+    staged media (staged_names: name -> "media:<kind>:<n>") by their refs,
+    and strings holding a URL dropped.
+    """
+    staged_names = staged_names or {}
+    scrubbed = {}
+    for node_id, node in workflow.items():
+        if not isinstance(node, dict):
+            continue
+        inputs = {}
+        for name, value in (node.get("inputs") or {}).items():
+            if isinstance(value, str) and value in staged_names:
+                value = staged_names[value]
+            elif isinstance(value, str) and (name in TEXT_INPUT_NAMES or len(value) > MAX_STRING_LENGTH):
+                value = scrub_text(value)
+            elif isinstance(value, str) and URL_PATTERN.search(value):
+                value = "[scrubbed url]"
+            inputs[name] = value
+        scrubbed[node_id] = {**node, "inputs": inputs}
+    return scrubbed
+
+
+def media_kind(filename: str) -> str:
+    return "image" if os.path.splitext(filename.lower())[1] in IMAGE_EXTENSIONS else "audio"
+
+
+def image_size(data: bytes) -> Optional[list]:
+    """[width, height] of an image, or None if it cannot be read here."""
+    try:
+        from media_preprocessor import MediaPreprocessor
+        return list(MediaPreprocessor.get_image_size(data))
+    except Exception:
+        return None
+
+
+class JobCapture:
+    """
+    Capture record of one job; all methods are no-ops when disabled.
+
+    Args:
+        event: RunPod job event
+        enabled: Record this job
+    """
+
+    def __init__(self, event: Optional[dict] = None, enabled: bool = False):
+        self.enabled = enabled
+        self.start = time.time()
+        self._lock = threading.Lock()
+        self._staged_names = {}
+        if not enabled:
+            return
+        input_data = (event or {}).get("input") or {}
+        self.record = {
+            "version": CAPTURE_VERSION,
+            "job_id": (event or {}).get("id"),
+            "arrival": round(self.start, 3),
+            "mode": job_mode(input_data),
+            "input": scrub_input(input_data),
+            "media": [],
+            "workflow": None,
+            "nodes": {},
+        }
+
+    def add_media(self, data: bytes, filename: str, role: str = "source", name: Optional[str] = None,
+                  **info) -> None:
+        """
+        Record a media file: role "source" (downloaded input) or "staged"
+        (uploaded to ComfyUI as name; the workflow refers to it as
+        "media:<kind>:<n>"); info adds e.g. duration.
+        """
+        if not self.enabled:
+            return
+        kind = media_kind(filename)
+        entry = {"kind": kind, "role": role, "sha256": hashlib.sha256(data).hexdigest(), "bytes": len(data),
+                 "extension": os.path.splitext(filename)[1].lower()}
+        if kind == "image":
+            entry["size"] = image_size(data)
+        entry.update({key: value for key, value in info.items() if value is not None})
+        with self._lock:
+            sources = [media for media in self.record["media"] if media["kind"] == kind and media["role"] == role]
+            entry["index"] = len(sources)
+            if role == "staged" and kind == "audio" and "duration" not in entry:
+                # Staged audio is the normalized (possibly silence-trimmed) source
+                durations = [media.get("voiced_duration", media.get("duration")) for media in self.record["media"]
+                             if media["kind"] == "audio" and media["role"] == "source"]
+                if durations and durations[-1] is not None:
+                    entry["duration"] = durations[-1]
+            if name:
+                self._staged_names[name] = f"media:{kind}:{entry['index']}"
+            self.record["media"].append(entry)
+
+    def set_workflow(self, workflow: dict) -> None:
+        """Record the submitted workflow (the last attempt's)."""
+        if self.enabled:
+            with self._lock:
+                self.record["workflow"] = scrub_workflow(workflow, self._staged_names)
+
+    def add_node_timings(self, node_seconds: dict, workflow: dict) -> None:
+        """Add ComfyUI node execution seconds (ComfyUIProgressListener.node_seconds)."""
+        if not self.enabled:
+            return
+        with self._lock:
+            for node_id, seconds in node_seconds.items():
+                node = self.record["nodes"].setdefault(
+                    node_id, {"class_type": workflow.get(node_id, {}).get("class_type"), "seconds": 0.0})
+                node["seconds"] = round(node["seconds"] + seconds, 3)
+
+    def finish(self, result: dict, stages: Optional[dict] = None) -> None:
+        """Complete the record with the job's result and stage seconds, and write it."""
+        if not self.enabled:
+            return
+        result = result if isinstance(result, dict) else {"status": "error", "error": repr(result)}
+        output = result.get("output") if isinstance(result.get("output"), dict) else {}
+        error = result.get("error")
+        with self._lock:
+            self.record.update(
+                seconds=round(time.time() - self.start, 2),
+                status=result.get("status"),
+                error=URL_PATTERN.sub("<url>", str(error))[:MAX_STRING_LENGTH] if error else None,
+                stages=stages or {},
+                output={key: output[key] for key in OUTPUT_FIELDS if key in output},
+            )
+            line = json.dumps(self.record, default=str)
+        write_record(line, self.start)
+
+
+def write_record(line: str, when: float) -> None:
+    """Append one record to the day's capture file."""
+    day = datetime.fromtimestamp(when, tz=timezone.utc).strftime("%Y%m%d")
+    path = os.path.join(JOB_CAPTURE_DIR, f"captures-{day}.jsonl")
+    try:
+        with _write_lock:
+            os.makedirs(JOB_CAPTURE_DIR, exist_ok=True)
+            with open(path, "a") as f:
+                f.write(line + "\n")
+    except OSError as e:
+        print(f"  Warning: job capture not written: {e}")
+
+
+@contextlib.contextmanager
+def capture_job(event: dict):
+    """
+    Capture the job run in this block (if JOB_CAPTURE and sampled) and make
+    it the current_capture() of this thread. A job that raises is recorded
+    with the exception.
+    """
+    capture = JobCapture(event, enabled=JOB_CAPTURE and random.random() < JOB_CAPTURE_SAMPLE)
+    previous = getattr(_local, "capture", None)
+    _local.capture = capture
+    try:
+        yield capture
+    except Exception as e:
+        capture.finish({"status": "error", "error": f"{type(e).__name__}: {e}"})
+        raise
+    finally:
+        _local.capture = previous
+
+
+def current_capture() -> JobCapture:
+    """Capture of the job running in this thread (a disabled one outside a job)."""
+    capture = getattr(_local, "capture", None)
+    if capture is None:
+        capture = _local.capture = JobCapture()
+    return capture
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Crash-safe journal of in-flight jobs (SQLite).
+
+A ComfyUI prompt keeps running when the handler process restarts, but its
+result used to be lost and the client's retry recomputed the video. The
+journal records, per job (input hash and job id), the seed, the prompt_id
+and ComfyUI instance it was submitted to, the stage and the output video. A
+retry of the same input (or RunPod re-delivering the job) in a new handler
+process reattaches to the prompt through /history and only redoes the
+upload.
+
+Stages: started -> submitted -> generated -> done / failed. Concurrent jobs
+of the same input each keep their own entry. An entry left by an earlier
+process is claimed by one job (claim_unfinished, which records it in
+reattached_by); entries written by the current process are never claimed.
+Entries older than JOB_JOURNAL_RETENTION_HOURS are deleted.
+
+The journal lives on the container disk, next to ComfyUI: a prompt can
+only be reattached on the pod that ran it.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Optional
+
+JOB_JOURNAL_PATH = os.environ.get("JOB_JOURNAL_PATH", "/comfyui/job_journal.sqlite3")
+JOB_JOURNAL_RETENTION_HOURS = float(os.environ.get("JOB_JOURNAL_RETENTION_HOURS", "24"))
+CLEANUP_INTERVAL_SECONDS = 3600
+
+UNFINISHED_STAGES = ("started", "submitted", "generated")
+# Input keys that only affect scheduling, not the video
+SCHEDULING_KEYS = ("priority", "tenant", "preemptible")
+
+_COLUMNS = ("seed", "prompt_id", "comfyui_url", "stage", "output", "owner", "reattached_by", "created", "updated")
+_UNFINISHED = f"stage IN ({', '.join(repr(stage) for stage in UNFINISHED_STAGES)})"
+# Handler process owning an entry (PIDs repeat across container restarts)
+PROCESS_TOKEN = f"{os.getpid()}-{uuid.uuid4().hex[:12]}"
+
+
+def job_input_hash(input_data: dict) -> str:
+    """Hash of a job input, ignoring scheduling keys."""
+    content = {key: value for key, value in input_data.items() if key not in SCHEDULING_KEYS}
+    return hashlib.sha256(json.dumps(content, sort_keys=True, default=str).encode()).hexdigest()
+
+
+class JobJournal:
+    """SQLite job journal; safe to share between handler threads."""
+
+    def __init__(self, path: str = JOB_JOURNAL_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._last_cleanup = 0.0
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute("PRAGMA journal_mode=WAL")
+        columns = [row["name"] for row in self._db.execute("PRAGMA table_info(jobs)")]
+        if columns and "reattached_by" not in columns:
+            # One entry per input (older handler): only in-flight jobs are lost
+            self._db.execute("DROP TABLE jobs")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            " input_hash TEXT NOT NULL, job_id TEXT NOT NULL, seed INTEGER, prompt_id TEXT, comfyui_url TEXT,"
+            " stage TEXT NOT NULL, output TEXT, owner TEXT, reattached_by TEXT,"
+            " created REAL NOT NULL, updated REAL NOT NULL, PRIMARY KEY (input_hash, job_id))"
+        )
+
+    def start(self, input_hash: str, job_id: Optional[str], seed) -> None:
+        """
+        Begin a job's run of an input, replacing the job's earlier entry, unless
+        that entry is unfinished from an earlier process (RunPod re-delivered
+        the job; claim_unfinished picks it up).
+        """
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO jobs (input_hash, job_id, seed, stage, owner, created, updated)"
+                " SELECT ?, ?, ?, 'started', ?, ?, ?"
+                f" WHERE NOT EXISTS (SELECT 1 FROM jobs WHERE input_hash = ? AND job_id = ? AND {_UNFINISHED}"
+                " AND owner != ?)",
+                (input_hash, job_id or "", seed, PROCESS_TOKEN, now, now, input_hash, job_id or "", PROCESS_TOKEN),
+            )
+
+    def update(self, input_hash: str, job_id: Optional[str], **fields) -> None:
+        """Set columns of a job's entry (output is stored as JSON); claims it for this process."""
+        if "output" in fields:
+            fields["output"] = json.dumps(fields["output"])
+        fields.update(owner=PROCESS_TOKEN, updated=time.time())
+        assignments = ", ".join(f"{name} = ?" for name in fields if name in _COLUMNS)
+        with self._lock:
+            self._db.execute(f"UPDATE jobs SET {assignments} WHERE input_hash = ? AND job_id = ?",
+                             [value for name, value in fields.items() if name in _COLUMNS]
+                             + [input_hash, job_id or ""])
+
+    def find_unfinished(self, input_hash: str) -> Optional[dict]:
+        """Latest unfinished entry of this input left by an earlier process (claimed or not), if any."""
+        with self._lock:
+            row = self._db.execute(
+                f"SELECT * FROM jobs WHERE input_hash = ? AND {_UNFINISHED}"
+                " AND (owner != ? OR reattached_by IS NOT NULL) ORDER BY updated DESC LIMIT 1",
+                (input_hash, PROCESS_TOKEN),
+            ).fetchone()
+        return _entry(row)
+
+    def claim_unfinished(self, input_hash: str, job_id: Optional[str]) -> Optional[dict]:
+        """
+        Claim an unclaimed, submitted entry of this input left by an earlier
+        process for job_id to reattach (the job's own entry first, then the
+        latest). No other job can claim it afterwards.
+        """
+        with self._lock:
+            claimed = self._db.execute(
+                "UPDATE jobs SET owner = ?, reattached_by = ?, updated = ? WHERE rowid = ("
+                f" SELECT rowid FROM jobs WHERE input_hash = ? AND {_UNFINISHED} AND prompt_id IS NOT NULL"
+                " AND owner != ? ORDER BY job_id = ? DESC, updated DESC LIMIT 1)",
+                (PROCESS_TOKEN, job_id or "", time.time(), input_hash, PROCESS_TOKEN, job_id or ""),
+            ).rowcount
+            if not claimed:
+                return None
+            row = self._db.execute(
+                "SELECT * FROM jobs WHERE input_hash = ? AND reattached_by = ? ORDER BY updated DESC LIMIT 1",
+                (input_hash, job_id or ""),
+            ).fetchone()
+        return _entry(row)
+
+    def finish(self, input_hash: str, job_id: Optional[str], stage: str) -> None:
+        """Close a job's entry, and the unfinished entries it reattached, as done / failed."""
+        with self._lock:
+            self._db.execute(
+                "UPDATE jobs SET stage = ?, owner = ?, updated = ? WHERE input_hash = ?"
+                f" AND (job_id = ? OR (reattached_by = ? AND {_UNFINISHED}))",
+                (stage, PROCESS_TOKEN, time.time(), input_hash, job_id or "", job_id or ""),
+            )
+
+    def cleanup(self, retention_hours: float = JOB_JOURNAL_RETENTION_HOURS) -> int:
+        """Delete entries not updated within the retention period; returns the count."""
+        cutoff = time.time() - retention_hours * 3600
+        with self._lock:
+            self._last_cleanup = time.time()
+            return self._db.execute("DELETE FROM jobs WHERE updated < ?", (cutoff,)).rowcount
+
+    def cleanup_if_due(self) -> int:
+        """cleanup() at most every CLEANUP_INTERVAL_SECONDS."""
+        if time.time() - self._last_cleanup < CLEANUP_INTERVAL_SECONDS:
+            return 0
+        return self.cleanup()
+
+
+def _entry(row) -> Optional[dict]:
+    if row is None:
+        return None
+    entry = dict(row)
+    entry["output"] = json.loads(entry["output"]) if entry["output"] else None
+    return entry
+
+
+_journal = None
+_journal_lock = threading.Lock()
+
+
+def get_journal() -> JobJournal:
+    """Process-wide journal at JOB_JOURNAL_PATH, opened on first use."""
+    global _journal
+    with _journal_lock:
+        if _journal is None:
+            _journal = JobJournal()
+        return _journal
@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+"""
+Cross-job pipelining for the serverless worker.
+
+The worker takes up to HANDLER_CONCURRENCY jobs at once (RunPod
+concurrency_modifier). Each job runs the synchronous handler in its own
+thread; only the part that occupies ComfyUI (submit, wait, OOM retry) holds
+the GPU slot. So while job N samples, job N+1 downloads, normalizes, stages
+and builds its workflow, and job N-1 interpolates and uploads to GCS, with a
+single prompt in each ComfyUI instance at a time.
+
+GPU slots are the ComfyUI instances of the pool (comfyui_pool.py), one per
+GPU; gpu_slot() routes the job to one of them.
+
+Each job has a priority lane (job_lane): fast previews are "interactive",
+ultra renders "batch". Jobs waiting for a GPU slot are served by lane, and
+with PREEMPT_BATCH (or "preemptible": true) a batch prompt is interrupted
+for an interactive job and waits for a slot again (at most MAX_PREEMPTIONS
+times per job).
+
+Each job runs with a job_progress.JobProgress bound to its thread; its
+events go to the progress_sink of make_async_handler (RunPod
+progress_update), or are yielded by make_streaming_handler.
+
+HANDLER_CONCURRENCY=1 restores one job at a time.
+"""
+import asyncio
+import collections
+import contextlib
+import functools
+import os
+import threading
+
+from comfyui_pool import COMFYUI_INSTANCES, POOL
+from job_progress import JobProgress, bind
+
+# Jobs a worker accepts at once: one sampling per GPU, one preparing, one uploading
+HANDLER_CONCURRENCY = max(1, int(os.environ.get("HANDLER_CONCURRENCY", str(COMFYUI_INSTANCES + 2))))
+
+# Priority lanes, most urgent first
+LANES = ("interactive", "normal", "batch")
+# Lane of a job without an explicit "priority", by quality_preset
+PRESET_LANES = {"fast": "interactive", "ultra": "batch"}
+# Batch-lane prompts may be interrupted for interactive jobs ("preemptible" per job overrides)
+PREEMPT_BATCH = os.environ.get("PREEMPT_BATCH", "0").lower() in ("1", "true", "yes")
+MAX_PREEMPTIONS = int(os.environ.get("MAX_PREEMPTIONS", "2"))
+# Wait samples kept per lane for the percentiles
+WAIT_SAMPLES = 1000
+
+_stats_lock = threading.Lock()
+_stats = {"gpu_busy": 0, "gpu_waiting": 0, "jobs_running": 0, "preempted": 0}
+_gpu_waits = {lane: collections.deque(maxlen=WAIT_SAMPLES) for lane in LANES}
+_job = threading.local()
+
+
+def job_lane(job_input: dict) -> str:
+    """Priority lane of a job: input "priority" if it names a lane, else by quality_preset."""
+    lane = job_input.get("priority")
+    if lane in LANES:
+        return lane
+    return PRESET_LANES.get(job_input.get("quality_preset"), "normal")
+
+
+def percentiles(samples) -> dict:
+    """p50 / p90 / p99 of wait samples in seconds (nearest rank)."""
+    ordered = sorted(samples)
+    if not ordered:
+        return {"count": 0}
+    result = {"count": len(ordered)}
+    for name, fraction in (("p50", 0.5), ("p90", 0.9), ("p99", 0.99)):
+        result[name] = round(ordered[min(len(ordered) - 1, int(fraction * len(ordered)))], 2)
+    return result
+
+
+def concurrency_modifier(current_concurrency: int) -> int:
+    """RunPod concurrency_modifier: fixed at HANDLER_CONCURRENCY."""
+    return HANDLER_CONCURRENCY
+
+
+def _count(name: str, delta: int) -> None:
+    with _stats_lock:
+        _stats[name] += delta
+
+
+def pipeline_stats() -> dict:
+    """Snapshot of jobs in the worker, GPU slot use and ComfyUI instances."""
+    with _stats_lock:
+        stats = dict(_stats)
+        stats["gpu_wait"] = {lane: percentiles(waits) for lane, waits in _gpu_waits.items()}
+    stats["comfyui_instances"] = POOL.stats()
+    return stats
+
+
+def gpu_busy() -> bool:
+    """True while a job holds a GPU slot (its prompt is in ComfyUI)."""
+    with _stats_lock:
+        return _stats["gpu_busy"] > 0
+
+
+@contextlib.contextmanager
+def gpu_slot(affinity=None):
+    """
+    Hold a GPU slot (a ComfyUI instance) for the duration of the block.
+
+    Inside the block comfyui_pool.comfyui_url() returns the held instance.
+    The calling job's lane sets its place among the jobs waiting for an
+    instance; if the prompt ended interrupted by a preemption
+    (POOL.record_preemption), the job's preemptions are counted when the
+    block exits.
+
+    Args:
+        affinity: LoRA config of the job's workflow, preferred on an
+            instance that ran the same config last
+
+    Yields:
+        Seconds spent waiting for the slot
+
+    Raises:
+        RuntimeError: If no ComfyUI instance is ready
+    """
+    lane = getattr(_job, "lane", "normal")
+    preemptible = (lane == "batch" and getattr(_job, "preemptible", False)
+                   and getattr(_job, "preemptions", 0) < MAX_PREEMPTIONS)
+    with contextlib.ExitStack() as stack:
+        _count("gpu_waiting", 1)
+        try:
+            instance, waited = stack.enter_context(POOL.slot(affinity, LANES.index(lane), preemptible))
+        finally:
+            _count("gpu_waiting", -1)
+        with _stats_lock:
+            _gpu_waits[lane].append(waited)
+        _count("gpu_busy", 1)
+        stack.callback(_count, "gpu_busy", -1)
+        try:
+            yield waited
+        finally:
+            if instance.preempted:
+                _job.preemptions = getattr(_job, "preemptions", 0) + 1
+                _count("preempted", 1)
+
+
+def _run_job(handler, event, progress_sink=None):
+    """
+    Run handler(event) in this thread with the job's lane set for gpu_slot()
+    and its progress tracker bound (events go to progress_sink(event, progress)).
+    """
+    job_input = event.get("input") or {}
+    _job.lane = job_lane(job_input)
+    _job.preemptible = bool(job_input.get("preemptible", PREEMPT_BATCH))
+    _job.preemptions = 0
+    progress = JobProgress(functools.partial(progress_sink, event) if progress_sink else None)
+    result = None
+    try:
+        with bind(progress):
+            result = handler(event)
+        return result
+    finally:
+        progress.finish(success=isinstance(result, dict) and result.get("status") == "success")
+        _job.lane = "normal"
+        _job.preemptible = False
+
+
+def make_async_handler(handler, progress_sink=None):
+    """
+    Wrap a synchronous handler(event) so RunPod can run several jobs concurrently.
+
+    The handler runs in a worker thread; the event loop stays free to accept
+    the next job. progress_sink(event, progress) receives the job's progress
+    events from that thread (runpod.serverless.progress_update).
+    """
+    async def async_handler(event):
+        _count("jobs_running", 1)
+        try:
+            return await asyncio.get_running_loop().run_in_executor(None, _run_job, handler, event, progress_sink)
+        finally:
+            _count("jobs_running", -1)
+
+    async_handler.__name__ = f"async_{handler.__name__}"
+    async_handler.__doc__ = handler.__doc__
+    return async_handler
+
+
+def make_streaming_handler(handler):
+    """
+    Wrap a synchronous handler(event) as a RunPod generator handler.
+
+    Yields {"progress": event} for each progress event while the handler
+    runs in a worker thread, then the handler's result.
+    """
+    async def stream_handler(event):
+        loop = asyncio.get_running_loop()
+        events = asyncio.Queue()
+
+        def sink(_event, progress):
+            loop.call_soon_threadsafe(events.put_nowait, progress)
+
+        _count("jobs_running", 1)
+        try:
+            result = loop.run_in_executor(None, _run_job, handler, event, sink)
+            while True:
+                next_event = asyncio.ensure_future(events.get())
+                await asyncio.wait({next_event, result}, return_when=asyncio.FIRST_COMPLETED)
+                if not next_event.done():
+                    next_event.cancel()
+                    break
+                yield {"progress": next_event.result()}
+            while not events.empty():
+                yield {"progress": events.get_nowait()}
+            yield await result
+        finally:
+            _count("jobs_running", -1)
+
+    stream_handler.__name__ = f"stream_{handler.__name__}"
+    stream_handler.__doc__ = handler.__doc__
+    return stream_handler
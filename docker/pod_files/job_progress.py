@@ -0,0 +1,368 @@
+#!/usr/bin/env python3
+"""
+Live job progress with ETAs.
+
+A job moves through STAGES; each stage transition, sampler step, decode
+chunk and upload chunk becomes a progress event:
+
+    {"stage": "sampling", "stage_index": 4, "stages": 8, "step": 5, "steps": 8,
+     "node": "161", "percent": 61.0, "elapsed_seconds": 41.2, "eta_seconds": 26.3}
+
+eta_seconds is the time left: for the running stage, extrapolated from its
+progress once steps arrive, else its predicted duration minus the time spent
+in it; plus the predicted durations of the stages still ahead. Predictions
+come from the cost model (WorkflowBuilder.estimate_workflow_cost: sampling
+token-steps, decoded pixel-frames; upload megabytes) times a seconds-per-unit
+rate per stage. Rates start at the defaults below and follow each finished
+job (EWMA), so ETAs settle after the first jobs on a worker. Time waiting
+for a GPU slot is not predicted.
+
+Sampler steps and decode progress come from ComfyUI's websocket
+(ComfyUIProgressListener: "executing" / "progress" messages for the job's
+client_id). Events go to the job's sink: RunPod progress_update on
+serverless (every PROGRESS_INTERVAL_SECONDS at most, stage transitions
+always), the generator of job_pipeline.make_streaming_handler with
+STREAM_PROGRESS, or the POD_MODE job server.
+
+Code deep in the handler reports through current_progress(), the tracker of
+the job running in the calling thread (one that reports nowhere outside a job).
+"""
+import contextlib
+import json
+import os
+import threading
+import time
+from typing import Callable, Optional
+
+try:
+    import websocket  # websocket-client
+except ImportError:
+    websocket = None
+
+STAGES = ("download", "prepare", "gpu_wait", "loading", "sampling", "decode", "postprocess", "upload")
+
+# Step events reach the sink at most this often (stage transitions and last steps always)
+PROGRESS_INTERVAL_SECONDS = float(os.environ.get("PROGRESS_INTERVAL_SECONDS", "2"))
+# Serverless: send events with runpod.serverless.progress_update (shown in /status while running)
+PROGRESS_UPDATES = os.environ.get("PROGRESS_UPDATES", "1").lower() in ("1", "true", "yes")
+# Serverless: run as a generator handler; /stream yields the events, /status aggregates them
+STREAM_PROGRESS = os.environ.get("STREAM_PROGRESS", "0").lower() in ("1", "true", "yes")
+
+# Seconds per unit of each stage: sampling per 1000 token-steps, decode per megapixel-frame,
+# upload per MB, the others per job. Starting points for an H100; refined per finished job
+DEFAULT_RATES = {
+    "download": 3.0,
+    "prepare": 4.0,
+    "gpu_wait": 0.0,
+    "loading": 10.0,
+    "sampling": float(os.environ.get("SAMPLING_SECONDS_PER_KILO_TOKEN_STEP", "0.3")),
+    "decode": float(os.environ.get("DECODE_SECONDS_PER_MEGAPIXEL_FRAME", "0.2")),
+    "postprocess": 5.0,
+    "upload": 0.1,
+}
+# Predicted units of a stage whose cost is unknown (workflow not traced, file size not known yet)
+DEFAULT_UNITS = {"sampling": 100.0, "decode": 50.0, "upload": 20.0}
+# Weight of the latest job in the rates
+RATE_EWMA_ALPHA = 0.3
+
+_rates = dict(DEFAULT_RATES)
+_rates_lock = threading.Lock()
+_local = threading.local()
+
+SAMPLER_CLASSES = ("SamplerCustomAdvanced", "SamplerCustom", "KSampler", "KSamplerAdvanced")
+DECODE_CLASSES = ("VAEDecode", "VAEDecodeTiled", "LTX2StreamingVideoOutput")
+OUTPUT_CLASSES = ("VHS_VideoCombine",)
+
+
+def node_stage(class_type: Optional[str]) -> Optional[str]:
+    """Stage a ComfyUI node runs in, or None for nodes that do not change it."""
+    if class_type in SAMPLER_CLASSES:
+        return "sampling"
+    if class_type in DECODE_CLASSES:
+        return "decode"
+    if class_type in OUTPUT_CLASSES:
+        return "postprocess"
+    return None
+
+
+def stage_rates() -> dict:
+    """Current seconds-per-unit rates of the stages."""
+    with _rates_lock:
+        return dict(_rates)
+
+
+class JobProgress:
+    """
+    Progress of one job: current stage, its step, and the ETA.
+
+    Args:
+        sink: Callable(event dict) receiving the events, or None
+        interval: Minimum seconds between step events
+    """
+
+    def __init__(self, sink: Optional[Callable[[dict], None]] = None,
+                 interval: float = PROGRESS_INTERVAL_SECONDS):
+        self.sink = sink
+        self.interval = interval
+        self.start = time.time()
+        self.units = {}
+        self.samplers = {}
+        self.samplers_done = set()
+        self.stage = None
+        self.stage_start = None
+        self.fraction = 0.0
+        self.step = None
+        self.durations = {}
+        self.rewound = False
+        self.last_event = None
+        self._last_emit = 0.0
+        self._lock = threading.Lock()
+
+    def plan(self, cost: Optional[dict] = None, **units) -> None:
+        """
+        Set predicted units: an estimate_workflow_cost result and / or stage=units.
+        """
+        with self._lock:
+            if cost:
+                self.samplers = dict(cost.get("samplers") or {})
+                if cost.get("sampling_cost"):
+                    self.units["sampling"] = cost["sampling_cost"] / 1000
+                if cost.get("decode_cost"):
+                    self.units["decode"] = cost["decode_cost"] / 1e6
+            self.units.update(units)
+
+    def set_stage(self, name: str, units: Optional[float] = None) -> None:
+        """Enter a stage (no-op if already in it); units predicts its size."""
+        with self._lock:
+            if units is not None:
+                self.units[name] = units
+            if name == self.stage:
+                return
+            self._close_stage(time.time())
+            if self.stage is not None and STAGES.index(name) < STAGES.index(self.stage):
+                # Preempted back to the GPU queue: stage durations no longer describe one pass
+                self.rewound = True
+            self.stage = name
+            self.stage_start = time.time()
+            self.fraction = 0.0
+            self.step = None
+            event = self._event()
+        self._emit(event, force=True)
+
+    def set_step(self, value: float, total: float, node: Optional[str] = None) -> None:
+        """
+        Progress within the current stage: value of total (sampler steps, decode
+        chunks, bytes). Steps of successive samplers are weighted by their cost.
+        """
+        if not total:
+            return
+        with self._lock:
+            value = min(value, total)
+            self.step = (value, total, node)
+            if self.stage == "sampling" and node in self.samplers:
+                cost = sum(self.samplers.values()) or 1
+                done = sum(self.samplers[other] for other in self.samplers_done if other != node)
+                self.fraction = (done + self.samplers[node] * value / total) / cost
+                if value >= total:
+                    self.samplers_done.add(node)
+            else:
+                self.fraction = value / total
+            event = self._event()
+        self._emit(event, force=value >= total)
+
+    def finish(self, success: bool = True) -> dict:
+        """
+        End the job; on success (without a preemption), refine the stage rates
+        from its durations.
+
+        Returns:
+            Seconds spent per stage
+        """
+        with self._lock:
+            self._close_stage(time.time())
+            self.stage = None
+            durations = dict(self.durations)
+            units = dict(self.units)
+        if success and not self.rewound:
+            with _rates_lock:
+                for name, seconds in durations.items():
+                    amount = units.get(name, 1.0 if name not in DEFAULT_UNITS else None)
+                    if name != "gpu_wait" and amount:
+                        _rates[name] += RATE_EWMA_ALPHA * (seconds / amount - _rates[name])
+        return {name: round(seconds, 2) for name, seconds in durations.items()}
+
+    def stage_durations(self) -> dict:
+        """Seconds spent per stage so far (the current stage up to now)."""
+        with self._lock:
+            durations = dict(self.durations)
+            if self.stage is not None:
+                durations[self.stage] = durations.get(self.stage, 0.0) + time.time() - self.stage_start
+        return {name: round(seconds, 2) for name, seconds in durations.items()}
+
+    def eta(self) -> Optional[float]:
+        """Predicted seconds until the job ends (None before the first stage)."""
+        with self._lock:
+            return self._eta(time.time())
+
+    def _predicted(self, name: str, rates: dict) -> float:
+        return rates[name] * self.units.get(name, DEFAULT_UNITS.get(name, 1.0))
+
+    def _eta(self, now: float) -> Optional[float]:
+        if self.stage is None:
+            return None
+        rates = stage_rates()
+        in_stage = now - self.stage_start
+        if self.fraction > 0:
+            remaining = in_stage * (1 - self.fraction) / self.fraction
+        else:
+            remaining = max(0.0, self._predicted(self.stage, rates) - in_stage)
+        for name in STAGES[STAGES.index(self.stage) + 1:]:
+            remaining += self._predicted(name, rates)
+        return remaining
+
+    def _close_stage(self, now: float) -> None:
+        if self.stage is not None:
+            self.durations[self.stage] = self.durations.get(self.stage, 0.0) + now - self.stage_start
+
+    def _event(self) -> dict:
+        now = time.time()
+        elapsed = now - self.start
+        eta = self._eta(now)
+        event = {"stage": self.stage, "stage_index": STAGES.index(self.stage), "stages": len(STAGES)}
+        if self.step is not None:
+            value, total, node = self.step
+            event.update(step=value, steps=total)
+            if node is not None:
+                event["node"] = node
+        event.update(
+            percent=round(100 * elapsed / (elapsed + eta), 1) if eta is not None and elapsed + eta > 0 else 0.0,
+            elapsed_seconds=round(elapsed, 1),
+            eta_seconds=round(eta, 1) if eta is not None else None,
+        )
+        self.last_event = event
+        return event
+
+    def _emit(self, event: dict, force: bool = False) -> None:
+        if self.sink is None:
+            return
+        now = time.time()
+        if not force and now - self._last_emit < self.interval:
+            return
+        self._last_emit = now
+        try:
+            self.sink(event)
+        except Exception as e:
+            print(f"  Warning: progress update failed: {e}")
+
+
+@contextlib.contextmanager
+def bind(progress: JobProgress):
+    """Make progress the current_progress() of this thread for the block."""
+    previous = getattr(_local, "progress", None)
+    _local.progress = progress
+    try:
+        yield progress
+    finally:
+        _local.progress = previous
+
+
+def current_progress() -> JobProgress:
+    """Tracker of the job running in this thread (a sink-less one outside a job)."""
+    progress = getattr(_local, "progress", None)
+    if progress is None:
+        progress = _local.progress = JobProgress()
+    return progress
+
+
+class ComfyUIProgressListener:
+    """
+    Follow a prompt on ComfyUI's websocket and report it to a JobProgress.
+
+    ComfyUI sends a prompt's "executing" / "progress" messages only to the
+    client_id it was queued with, so connect (start()) before submitting.
+    Without websocket-client, or if the connection fails, the job only
+    reports the stages the handler sets.
+
+    node_seconds accumulates the execution time of each node (from one
+    "executing" message to the next; cached nodes do not appear).
+
+    Args:
+        base_url: ComfyUI instance (http://host:port)
+        client_id: client_id the prompt is submitted with
+        workflow: The workflow (node class types give the stages)
+        progress: Tracker to report to
+    """
+
+    def __init__(self, base_url: str, client_id: str, workflow: dict, progress: JobProgress):
+        self.url = f"ws{base_url[4:]}/ws?clientId={client_id}" if base_url.startswith("http") else base_url
+        self.classes = {str(node_id): node.get("class_type") for node_id, node in workflow.items()}
+        self.progress = progress
+        self.node_seconds = {}
+        self._node = None
+        self._node_start = None
+        self._socket = None
+        self._thread = None
+        self._stopped = threading.Event()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def start(self):
+        if websocket is None:
+            return self
+        try:
+            self._socket = websocket.create_connection(self.url, timeout=5)
+            self._socket.settimeout(1)
+        except Exception as e:
+            print(f"  Warning: no ComfyUI progress (websocket: {e})")
+            self._socket = None
+            return self
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+        if self._socket is not None:
+            try:
+                self._socket.close()
+            except Exception:
+                pass
+
+    def _run(self) -> None:
+        while not self._stopped.is_set():
+            try:
+                message = self._socket.recv()
+            except websocket.WebSocketTimeoutException:
+                continue
+            except Exception:
+                break
+            # Binary messages are latent previews
+            if isinstance(message, str) and message:
+                try:
+                    self.handle(json.loads(message))
+                except ValueError:
+                    continue
+
+    def handle(self, message: dict) -> None:
+        """Map one ComfyUI websocket message to stage / step updates."""
+        data = message.get("data") or {}
+        node = data.get("node")
+        if message.get("type") == "executing":
+            now = time.time()
+            if self._node is not None:
+                self.node_seconds[self._node] = self.node_seconds.get(self._node, 0.0) + now - self._node_start
+            self._node, self._node_start = (str(node), now) if node is not None else (None, None)
+        stage = node_stage(self.classes.get(str(node)))
+        if stage is None:
+            return
+        if message.get("type") == "executing":
+            self.progress.set_stage(stage)
+        elif message.get("type") == "progress":
+            self.progress.set_stage(stage)
+            self.progress.set_step(data.get("value", 0), data.get("max", 0), str(node))
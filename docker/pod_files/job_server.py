@@ -0,0 +1,409 @@
+#!/usr/bin/env python3
+"""
+RunPod-compatible job API for dedicated pods (POD_MODE).
+
+An always-warm pod serves the same handler as the serverless worker over
+HTTP, with the routes of a RunPod endpoint:
+
+    POST /run           {"input": {...}}  -> {"id": ..., "status": "IN_QUEUE"}
+    POST /runsync       {"input": {...}}  -> final status, or the current one after
+                                             RUNSYNC_WAIT_SECONDS (?wait=ms overrides)
+    GET  /status/{id}                     -> {"id", "status", "delayTime", "executionTime",
+                                              "output" / "error"}; while running, "output"
+                                              is the latest progress event (job_progress.py)
+    POST /cancel/{id}                     -> {"id", "status"}
+    GET  /stream/{id}                     -> NDJSON status lines, one per status change or
+                                              progress event, until the job ends
+    GET  /health                          -> job counts and pipeline stats
+
+The same routes are served under /v2/{endpoint_id}/..., so a RunPod client
+switches to the pod by changing only its base URL. With POD_API_KEY set,
+requests need "Authorization: Bearer <key>" like RunPod. The API binds
+POD_JOB_HOST (default 127.0.0.1); serve refuses any other address unless
+POD_API_KEY is set, so jobs are never open to the network without a key.
+
+Jobs wait in an in-process queue with one FIFO per priority lane and tenant
+(LaneQueue: input "priority" / quality_preset, and "tenant"), and
+HANDLER_CONCURRENCY workers run them through make_async_handler, so GPU
+slots, lanes and cross-job pipelining work as on serverless. Cancelling a
+queued job removes it; a running job keeps its GPU slot until the handler
+returns, and its result is discarded. /health reports queue-wait and
+GPU-wait percentiles per lane.
+"""
+import asyncio
+import collections
+import hmac
+import ipaddress
+import json
+import math
+import os
+import time
+import uuid
+
+from aiohttp import web
+
+from comfyui_pool import LANE_AGING_SECONDS
+from job_pipeline import (HANDLER_CONCURRENCY, LANES, WAIT_SAMPLES, job_lane, make_async_handler, percentiles,
+                          pipeline_stats)
+
+POD_JOB_HOST = os.environ.get("POD_JOB_HOST", "127.0.0.1")
+POD_JOB_PORT = int(os.environ.get("POD_JOB_PORT", "8000"))
+POD_API_KEY = os.environ.get("POD_API_KEY", "")
+# /runsync returns the current status after this long (RunPod: 90s)
+RUNSYNC_WAIT_SECONDS = float(os.environ.get("RUNSYNC_WAIT_SECONDS", "90"))
+# Finished jobs stay queryable this long (RunPod: 30 min for /run)
+JOB_RESULT_TTL = float(os.environ.get("JOB_RESULT_TTL", "1800"))
+# /run answers 429 beyond this many queued jobs
+MAX_QUEUED_JOBS = int(os.environ.get("MAX_QUEUED_JOBS", "100"))
+# /stream re-sends the status at least this often
+STREAM_HEARTBEAT_SECONDS = 15
+
+TERMINAL_STATUSES = ("COMPLETED", "FAILED", "CANCELLED")
+
+
+class Job:
+    """One submitted job and its RunPod-style status."""
+
+    def __init__(self, job_input: dict):
+        self.id = f"pod-{uuid.uuid4()}"
+        self.input = job_input
+        self.lane = job_lane(job_input)
+        self.tenant = str(job_input.get("tenant", "default"))
+        self.status = "IN_QUEUE"
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self.output = None
+        self.error = None
+        self.progress = None
+        self.changed = asyncio.Event()
+
+    @property
+    def done(self) -> bool:
+        return self.status in TERMINAL_STATUSES
+
+    def set_status(self, status: str) -> None:
+        """Update the status and wake everyone waiting on changed."""
+        self.status = status
+        if status == "IN_PROGRESS":
+            self.started = time.time()
+        elif status in TERMINAL_STATUSES:
+            self.finished = time.time()
+        self._notify()
+
+    def set_progress(self, progress: dict) -> None:
+        """Record a progress event of the running job (RunPod progress_update)."""
+        if self.status == "IN_PROGRESS":
+            self.progress = progress
+            self._notify()
+
+    def _notify(self) -> None:
+        """Wake everyone waiting on changed."""
+        changed, self.changed = self.changed, asyncio.Event()
+        changed.set()
+
+    def set_result(self, result) -> None:
+        """
+        Record the handler's return value the way RunPod does.
+
+        A top-level "error" key fails the job; the rest of the dict is the output.
+        """
+        if isinstance(result, dict) and result.get("error"):
+            output = {key: value for key, value in result.items() if key != "error"}
+            self.error = result["error"] if isinstance(result["error"], str) else json.dumps(result["error"])
+            self.output = output or None
+            self.set_status("FAILED")
+        else:
+            self.output = result
+            self.set_status("COMPLETED")
+
+    async def wait(self, timeout: float) -> None:
+        """Wait until the job ends or timeout seconds pass."""
+        deadline = time.time() + timeout
+        while not self.done and time.time() < deadline:
+            try:
+                await asyncio.wait_for(self.changed.wait(), deadline - time.time())
+            except asyncio.TimeoutError:
+                break
+
+    def to_dict(self) -> dict:
+        result = {"id": self.id, "status": self.status}
+        if self.started:
+            result["delayTime"] = int((self.started - self.created) * 1000)
+            if self.finished:
+                result["executionTime"] = int((self.finished - self.started) * 1000)
+        if self.output is not None:
+            result["output"] = self.output
+        elif self.progress is not None and not self.done:
+            result["output"] = self.progress
+        if self.error is not None:
+            result["error"] = self.error
+        return result
+
+
+class LaneQueue:
+    """
+    Jobs waiting for a worker: one FIFO per (lane, tenant).
+
+    get() takes the head job of the most urgent lane and rotates between the
+    tenants of a lane, least recently served first. Each LANE_AGING_SECONDS
+    (comfyui_pool, shared with the GPU-slot queue) a job waits makes it one
+    lane more urgent, ahead of the jobs native to that lane, so a steady
+    stream of previews cannot starve batch jobs.
+    """
+
+    def __init__(self):
+        self._fifos = {}
+        self._last_served = {}
+        self._available = asyncio.Condition()
+
+    def __len__(self) -> int:
+        return sum(len(fifo) for fifo in self._fifos.values())
+
+    def lane_sizes(self) -> dict:
+        sizes = {lane: 0 for lane in LANES}
+        for (lane, _tenant), fifo in self._fifos.items():
+            sizes[lane] += len(fifo)
+        return sizes
+
+    async def put(self, job: Job) -> None:
+        async with self._available:
+            self._fifos.setdefault((job.lane, job.tenant), collections.deque()).append(job)
+            self._available.notify()
+
+    def remove(self, job: Job) -> bool:
+        """Drop a queued job (cancel); False if it is not queued."""
+        fifo = self._fifos.get((job.lane, job.tenant))
+        if fifo is None or job not in fifo:
+            return False
+        fifo.remove(job)
+        if not fifo:
+            del self._fifos[(job.lane, job.tenant)]
+        return True
+
+    async def get(self) -> Job:
+        async with self._available:
+            while not self._fifos:
+                await self._available.wait()
+            return self._pop()
+
+    def _pop(self) -> Job:
+        now = time.time()
+
+        def urgency(key):
+            lane, _tenant = key
+            head = self._fifos[key][0]
+            aged = max(0, LANES.index(lane) - int((now - head.created) // LANE_AGING_SECONDS))
+            return (aged, aged == LANES.index(lane), self._last_served.get(key, 0.0), head.created)
+
+        key = min(self._fifos, key=urgency)
+        self._last_served[key] = now
+        fifo = self._fifos[key]
+        job = fifo.popleft()
+        if not fifo:
+            del self._fifos[key]
+        return job
+
+
+class JobServer:
+    """In-process job queue and the HTTP routes in front of it."""
+
+    def __init__(self, handler, concurrency: int = HANDLER_CONCURRENCY, api_key: str = POD_API_KEY):
+        self.handler = make_async_handler(handler, progress_sink=self._progress_sink)
+        self.concurrency = concurrency
+        self.api_key = api_key
+        self.loop = None
+        self.jobs = {}
+        self.queue = None
+        self.workers = []
+        self.queue_waits = {lane: collections.deque(maxlen=WAIT_SAMPLES) for lane in LANES}
+
+    # Queue
+
+    async def submit(self, job_input: dict) -> Job:
+        """
+        Queue a job.
+
+        Raises:
+            web.HTTPTooManyRequests: If MAX_QUEUED_JOBS jobs are already waiting
+        """
+        self.prune()
+        if len(self.queue) >= MAX_QUEUED_JOBS:
+            raise web.HTTPTooManyRequests(text=json.dumps({"error": "Queue is full"}),
+                                          content_type="application/json")
+        job = Job(job_input)
+        self.jobs[job.id] = job
+        await self.queue.put(job)
+        return job
+
+    def prune(self) -> None:
+        """Forget jobs finished more than JOB_RESULT_TTL ago."""
+        cutoff = time.time() - JOB_RESULT_TTL
+        for job_id in [job_id for job_id, job in self.jobs.items() if job.finished and job.finished < cutoff]:
+            del self.jobs[job_id]
+
+    async def _worker(self) -> None:
+        while True:
+            job = await self.queue.get()
+            if job.status == "CANCELLED":
+                continue
+            job.set_status("IN_PROGRESS")
+            self.queue_waits[job.lane].append(job.started - job.created)
+            try:
+                result = await self.handler({"id": job.id, "input": job.input})
+            except Exception as e:
+                result = {"error": f"{type(e).__name__}: {e}"}
+            if job.status != "CANCELLED":
+                job.set_result(result)
+
+    def _progress_sink(self, event: dict, progress: dict) -> None:
+        """Progress event from a handler thread; applied on the event loop."""
+        job = self.jobs.get(event["id"])
+        if job is not None:
+            self.loop.call_soon_threadsafe(job.set_progress, progress)
+
+    async def _start_workers(self, app) -> None:
+        self.loop = asyncio.get_running_loop()
+        self.queue = LaneQueue()
+        self.workers = [asyncio.create_task(self._worker()) for _ in range(self.concurrency)]
+
+    async def _stop_workers(self, app) -> None:
+        for worker in self.workers:
+            worker.cancel()
+        await asyncio.gather(*self.workers, return_exceptions=True)
+
+    # Routes
+
+    def _get_job(self, request) -> Job:
+        job = self.jobs.get(request.match_info["job_id"])
+        if job is None:
+            raise web.HTTPNotFound(text=json.dumps({"error": "Job not found"}), content_type="application/json")
+        return job
+
+    @staticmethod
+    async def _read_input(request) -> dict:
+        try:
+            body = await request.json()
+        except ValueError:
+            body = None
+        if not isinstance(body, dict) or not isinstance(body.get("input"), dict):
+            raise web.HTTPBadRequest(text=json.dumps({"error": "Body must be {\"input\": {...}}"}),
+                                     content_type="application/json")
+        return body["input"]
+
+    async def run(self, request):
+        job = await self.submit(await self._read_input(request))
+        return web.json_response({"id": job.id, "status": job.status})
+
+    @staticmethod
+    def _read_wait(request) -> float:
+        if "wait" not in request.query:
+            return RUNSYNC_WAIT_SECONDS
+        try:
+            wait = float(request.query["wait"]) / 1000
+        except ValueError:
+            wait = None
+        if wait is None or not math.isfinite(wait) or wait < 0:
+            raise web.HTTPBadRequest(text=json.dumps({"error": "wait must be a non-negative number of ms"}),
+                                     content_type="application/json")
+        return wait
+
+    async def runsync(self, request):
+        wait = self._read_wait(request)
+        job = await self.submit(await self._read_input(request))
+        await job.wait(wait)
+        return web.json_response(job.to_dict())
+
+    async def status(self, request):
+        return web.json_response(self._get_job(request).to_dict())
+
+    async def cancel(self, request):
+        job = self._get_job(request)
+        if not job.done:
+            self.queue.remove(job)
+            job.set_status("CANCELLED")
+        return web.json_response({"id": job.id, "status": job.status})
+
+    async def stream(self, request):
+        job = self._get_job(request)
+        response = web.StreamResponse(headers={"Content-Type": "application/x-ndjson"})
+        await response.prepare(request)
+        while True:
+            changed = job.changed
+            await response.write((json.dumps(job.to_dict()) + "\n").encode())
+            if job.done:
+                break
+            try:
+                await asyncio.wait_for(changed.wait(), STREAM_HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+        await response.write_eof()
+        return response
+
+    async def health(self, request):
+        counts = {status: 0 for status in ("IN_QUEUE", "IN_PROGRESS") + TERMINAL_STATUSES}
+        running = {lane: 0 for lane in LANES}
+        for job in self.jobs.values():
+            counts[job.status] += 1
+            if job.status == "IN_PROGRESS":
+                running[job.lane] += 1
+        workers = pipeline_stats()
+        queued = self.queue.lane_sizes()
+        lanes = {
+            lane: {
+                "queued": queued[lane],
+                "running": running[lane],
+                "queue_wait": percentiles(self.queue_waits[lane]),
+                "gpu_wait": workers["gpu_wait"][lane],
+            }
+            for lane in LANES
+        }
+        return web.json_response({"jobs": counts, "lanes": lanes, "concurrency": self.concurrency,
+                                  "workers": workers})
+
+    @web.middleware
+    async def _auth(self, request, handler):
+        if self.api_key and not authorized(request.headers.get("Authorization", ""), self.api_key):
+            raise web.HTTPUnauthorized(text=json.dumps({"error": "Unauthorized"}), content_type="application/json")
+        return await handler(request)
+
+    def make_app(self) -> web.Application:
+        app = web.Application(middlewares=[self._auth])
+        app.on_startup.append(self._start_workers)
+        app.on_cleanup.append(self._stop_workers)
+        for prefix in ("", "/v2/{endpoint_id}"):
+            app.router.add_post(f"{prefix}/run", self.run)
+            app.router.add_post(f"{prefix}/runsync", self.runsync)
+            app.router.add_get(f"{prefix}/status/{{job_id}}", self.status)
+            app.router.add_post(f"{prefix}/cancel/{{job_id}}", self.cancel)
+            app.router.add_get(f"{prefix}/stream/{{job_id}}", self.stream)
+            app.router.add_get(f"{prefix}/health", self.health)
+        return app
+
+
+def authorized(header: str, api_key: str) -> bool:
+    """Whether an Authorization header ("Bearer <key>" or the bare key) carries api_key (constant time)."""
+    token = header[len("Bearer "):] if header.startswith("Bearer ") else header
+    return hmac.compare_digest(token.encode(), api_key.encode())
+
+
+def is_loopback(host: str) -> bool:
+    if host == "localhost":
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+def check_bind(host: str, api_key: str) -> None:
+    """Refuse to serve jobs beyond loopback without POD_API_KEY."""
+    if not api_key and not is_loopback(host):
+        raise ValueError(f"POD_JOB_HOST={host} is reachable from other machines: set POD_API_KEY "
+                         f"or bind 127.0.0.1")
+
+
+def serve(handler, host: str = POD_JOB_HOST, port: int = POD_JOB_PORT, api_key: str = POD_API_KEY) -> None:
+    """Run the job API until the process is stopped."""
+    check_bind(host, api_key)
+    web.run_app(JobServer(handler, api_key=api_key).make_app(), host=host, port=port, print=None)
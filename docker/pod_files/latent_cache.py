@@ -0,0 +1,307 @@
+#!/usr/bin/env python3
+"""
+On-disk cache of VAE-encoded latents for repeated inputs.
+
+Shared by the handler (decides hit/miss before building the workflow) and the
+ltx2_handler_nodes custom nodes (LTX2LatentCacheLoad / LTX2LatentCacheSave),
+which run inside ComfyUI on the same container disk.
+
+Entries are keyed by (kind, VAE id, content hash, encode parameters) and
+evicted least-recently-used by file mtime once the cache exceeds its size
+budget. A hit found by the handler is pinned with a lease until its job
+ends, so another job's save cannot evict it before LTX2LatentCacheLoad
+reads it; leases of jobs that died expire after LATENT_CACHE_LEASE_SECONDS.
+
+The same store (in JOB_LATENT_DIR) keeps the final video/audio latents of
+jobs run with persist_latent, plus a JSON sidecar of their generation
+parameters, for refine_from_job_id follow-ups.
+"""
+import fcntl
+import hashlib
+import json
+import os
+import time
+from contextlib import contextmanager
+from typing import Optional
+
+LATENT_CACHE_DIR = os.environ.get("LATENT_CACHE_DIR", "/comfyui/latent_cache")
+LATENT_CACHE_MAX_BYTES = int(float(os.environ.get("LATENT_CACHE_MAX_GB", "10")) * 1e9)
+# Longer than a job may wait for its prompt (rp_handler.wait_for_completion)
+LATENT_CACHE_LEASE_SECONDS = int(os.environ.get("LATENT_CACHE_LEASE_SECONDS", "3600"))
+
+# Final AV latents persisted per job (persist_latent / refine_from_job_id). Kept on
+# the network volume when mounted so a follow-up job can land on any worker.
+JOB_LATENT_DIR = os.environ.get(
+    "JOB_LATENT_DIR",
+    "/runpod-volume/ltx2_job_latents" if os.path.isdir("/runpod-volume") else "/comfyui/latent_cache/jobs",
+)
+JOB_LATENT_MAX_BYTES = int(float(os.environ.get("JOB_LATENT_MAX_GB", "50")) * 1e9)
+
+CACHE_SUFFIX = ".latent.pt"
+LEASE_DIR_NAME = "leases"
+LOCK_NAME = ".lock"
+
+
+def make_key(kind: str, vae_id: str, content_hash: str, **params) -> str:
+    """
+    Build a cache key.
+
+    Args:
+        kind: Entry kind ("image", "audio")
+        vae_id: VAE identity (checkpoint filename the VAE is loaded from)
+        content_hash: SHA-256 of the staged input bytes
+        **params: Encode parameters that change the latent (resolution, compression)
+
+    Returns:
+        Key string, safe to use as a filename
+    """
+    payload = json.dumps(
+        {"kind": kind, "vae": vae_id, "content": content_hash, **params},
+        sort_keys=True,
+    )
+    return f"{kind}_{hashlib.sha256(payload.encode()).hexdigest()[:32]}"
+
+
+def job_latent_key(job_id: str) -> str:
+    """Cache key of the persisted final latents of a job."""
+    return f"job_{_safe_id(job_id)}"
+
+
+def _safe_id(value: str) -> str:
+    return "".join(c if c.isalnum() or c in "-_" else "_" for c in str(value))
+
+
+def _to_cpu(value):
+    """Detach tensors (recursively through dicts) for serialization."""
+    import torch
+
+    if isinstance(value, torch.Tensor):
+        return value.detach().cpu()
+    if isinstance(value, dict):
+        return {name: _to_cpu(item) for name, item in value.items()}
+    return value
+
+
+class LatentCache:
+    """LRU directory of torch-serialized LATENT dicts."""
+
+    def __init__(self, cache_dir: str = LATENT_CACHE_DIR, max_bytes: int = LATENT_CACHE_MAX_BYTES,
+                 lease_seconds: int = LATENT_CACHE_LEASE_SECONDS):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.lease_seconds = lease_seconds
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key + CACHE_SUFFIX)
+
+    @contextmanager
+    def _locked(self):
+        """
+        Serialize pinning and eviction (handler and ComfyUI processes).
+        Unlocked where the filesystem has no flock (some network volumes).
+        """
+        os.makedirs(self.cache_dir, exist_ok=True)
+        with open(os.path.join(self.cache_dir, LOCK_NAME), "a") as lock:
+            try:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            except OSError:
+                pass
+            try:
+                yield
+            finally:
+                try:
+                    fcntl.flock(lock, fcntl.LOCK_UN)
+                except OSError:
+                    pass
+
+    def _lease_path(self, key: str, lease_id: str) -> str:
+        return os.path.join(self.cache_dir, LEASE_DIR_NAME, f"{key}.{_safe_id(lease_id)}")
+
+    def pin(self, key: str, lease_id: str) -> bool:
+        """
+        Check for an entry and, on a hit, lease it to lease_id so eviction
+        skips it until release(lease_id) or the lease expires.
+
+        Returns:
+            True on a hit (entry present and pinned)
+        """
+        with self._locked():
+            if not self.contains(key):
+                return False
+            os.makedirs(os.path.join(self.cache_dir, LEASE_DIR_NAME), exist_ok=True)
+            with open(self._lease_path(key, lease_id), "w"):
+                pass
+        return True
+
+    def release(self, lease_id: str) -> int:
+        """
+        Drop every lease held by lease_id.
+
+        Returns:
+            Number of leases released
+        """
+        suffix = "." + _safe_id(lease_id)
+        lease_dir = os.path.join(self.cache_dir, LEASE_DIR_NAME)
+        try:
+            names = [n for n in os.listdir(lease_dir) if n.endswith(suffix)]
+        except FileNotFoundError:
+            return 0
+        released = 0
+        for name in names:
+            try:
+                os.remove(os.path.join(lease_dir, name))
+                released += 1
+            except FileNotFoundError:
+                continue
+        return released
+
+    def _leased_keys(self) -> set:
+        """Keys with an unexpired lease (expired lease files are removed)."""
+        lease_dir = os.path.join(self.cache_dir, LEASE_DIR_NAME)
+        try:
+            names = os.listdir(lease_dir)
+        except FileNotFoundError:
+            return set()
+        keys = set()
+        now = time.time()
+        for name in names:
+            path = os.path.join(lease_dir, name)
+            try:
+                if now - os.stat(path).st_mtime > self.lease_seconds:
+                    os.remove(path)
+                    continue
+            except FileNotFoundError:
+                continue
+            keys.add(name.split(".", 1)[0])
+        return keys
+
+    def contains(self, key: str, touch: bool = True) -> bool:
+        """
+        Check for an entry. By default a hit refreshes its LRU position so it
+        is not evicted before the job that found it loads it.
+        """
+        path = self.path(key)
+        if not os.path.isfile(path):
+            return False
+        if touch:
+            try:
+                os.utime(path)
+            except OSError:
+                return False
+        return True
+
+    def load(self, key: str) -> Optional[dict]:
+        """Load a LATENT dict (tensors on CPU), or None if not cached."""
+        import torch
+
+        path = self.path(key)
+        try:
+            latent = torch.load(path, map_location="cpu", weights_only=True)
+        except FileNotFoundError:
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return latent
+
+    def save(self, key: str, latent: dict) -> None:
+        """Store a LATENT dict atomically, then evict down to the size budget."""
+        import torch
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        entry = _to_cpu(latent)
+        path = self.path(key)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        torch.save(entry, tmp_path)
+        os.replace(tmp_path, path)
+        self.evict()
+
+    def metadata_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key + ".json")
+
+    def save_metadata(self, key: str, metadata: dict) -> None:
+        """Store a JSON sidecar (generation parameters) next to an entry."""
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = self.metadata_path(key)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(metadata, f, indent=2)
+        os.replace(tmp_path, path)
+
+    def load_metadata(self, key: str) -> Optional[dict]:
+        """Load the JSON sidecar of an entry, or None if missing."""
+        try:
+            with open(self.metadata_path(key), 'r') as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def evict(self) -> int:
+        """
+        Delete least-recently-used entries until the cache fits max_bytes.
+        Leased entries are kept (and still count towards the size).
+
+        Returns:
+            Number of entries removed
+        """
+        with self._locked():
+            return self._evict()
+
+    def _evict(self) -> int:
+        try:
+            names = [n for n in os.listdir(self.cache_dir) if n.endswith(CACHE_SUFFIX)]
+        except FileNotFoundError:
+            return 0
+        leased = self._leased_keys()
+
+        entries = []
+        total = 0
+        for name in names:
+            path = os.path.join(self.cache_dir, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+            total += stat.st_size
+
+        removed = 0
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if os.path.basename(path)[:-len(CACHE_SUFFIX)] in leased:
+                continue
+            try:
+                os.remove(path)
+                total -= size
+                removed += 1
+            except OSError:
+                continue
+            sidecar = path[:-len(CACHE_SUFFIX)] + ".json"
+            if os.path.exists(sidecar):
+                os.remove(sidecar)
+        if removed:
+            print(f"[latent_cache] Evicted {removed} entries ({total / 1e9:.2f} GB kept)")
+        return removed
+
+    def stats(self) -> dict:
+        """Entry count, total size and age of the cache directory."""
+        try:
+            names = [n for n in os.listdir(self.cache_dir) if n.endswith(CACHE_SUFFIX)]
+        except FileNotFoundError:
+            names = []
+        total = 0
+        oldest = None
+        for name in names:
+            try:
+                stat = os.stat(os.path.join(self.cache_dir, name))
+            except OSError:
+                continue
+            total += stat.st_size
+            oldest = stat.st_mtime if oldest is None else min(oldest, stat.st_mtime)
+        return {
+            "entries": len(names),
+            "total_bytes": total,
+            "oldest_age_seconds": round(time.time() - oldest, 1) if oldest else None,
+        }
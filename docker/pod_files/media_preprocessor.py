@@ -0,0 +1,339 @@
+#!/usr/bin/env python3
+"""
+CPU-side media normalization before upload to ComfyUI.
+
+Images are decoded, EXIF-rotated and resized/padded to the exact output size
+with the same semantics as the template's ImageResizeKJv2 node
+(upscale_method=lanczos, keep_proportion=pad, crop_position=center,
+pad_color=0,0,0, divisible_by=32), then written as PNG. The workflow can then
+skip the resize node, and the upload is a small lossless file instead of the
+original 10-20MB PNG.
+
+Audio is decoded once (librosa), optionally resampled/downmixed, trimmed and
+written as FLAC. The sample-accurate duration comes from the same decode, and
+the workflow can skip the TrimAudioDuration node.
+"""
+import io
+import os
+import time
+from typing import Optional, Tuple, Union
+
+
+class MediaPreprocessor:
+    """Normalize input images and audio on the CPU before staging."""
+
+    DIVISIBLE_BY = 32
+    PAD_COLOR = (0, 0, 0)
+    PNG_COMPRESS_LEVEL = 6
+
+    # LTX-2 audio VAE input rate (LTXVAudioVAEEncode resamples to this internally)
+    AUDIO_VAE_SAMPLE_RATE = 16000
+    # The VAE and VHS_VideoCombine handle at most stereo
+    MAX_AUDIO_CHANNELS = 2
+
+    # Silence detection: RMS over short windows, relative to the loudest window
+    SILENCE_WINDOW_MS = 20
+    SILENCE_THRESHOLD_DB = -40.0
+    SILENCE_MIN_SECONDS = 0.3    # Shorter leading/trailing silence is not worth trimming
+    SILENCE_KEEP_SECONDS = 0.1   # Silence kept next to speech so mouth motion can settle
+
+    @staticmethod
+    def pad_geometry(src_width: int, src_height: int, width: int, height: int,
+                     divisible_by: int = 32) -> dict:
+        """
+        Compute resize/pad geometry matching ImageResizeKJv2 (keep_proportion=pad, center).
+
+        The node fits the image inside width x height, rounds the fitted size
+        down to divisible_by, centers it using padding computed from the
+        unrounded size, and extends right/bottom padding so the padded frame
+        is divisible_by again.
+
+        Args:
+            src_width: Source image width
+            src_height: Source image height
+            width: Target width
+            height: Target height
+            divisible_by: Size alignment (default 32)
+
+        Returns:
+            dict with inner_width, inner_height, pad_left, pad_top, out_width, out_height
+        """
+        ratio = min(width / src_width, height / src_height)
+        inner_width = round(src_width * ratio)
+        inner_height = round(src_height * ratio)
+
+        pad_left = (width - inner_width) // 2
+        pad_right = width - inner_width - pad_left
+        pad_top = (height - inner_height) // 2
+        pad_bottom = height - inner_height - pad_top
+
+        if divisible_by > 1:
+            inner_width -= inner_width % divisible_by
+            inner_height -= inner_height % divisible_by
+
+        if pad_left > 0 or pad_right > 0 or pad_top > 0 or pad_bottom > 0:
+            padded_width = inner_width + pad_left + pad_right
+            padded_height = inner_height + pad_top + pad_bottom
+            if divisible_by > 1:
+                if padded_width % divisible_by:
+                    pad_right += divisible_by - padded_width % divisible_by
+                if padded_height % divisible_by:
+                    pad_bottom += divisible_by - padded_height % divisible_by
+            out_width = inner_width + pad_left + pad_right
+            out_height = inner_height + pad_top + pad_bottom
+        else:
+            pad_left = pad_top = 0
+            out_width = inner_width
+            out_height = inner_height
+
+        return {
+            "inner_width": inner_width,
+            "inner_height": inner_height,
+            "pad_left": pad_left,
+            "pad_top": pad_top,
+            "out_width": out_width,
+            "out_height": out_height,
+        }
+
+    @staticmethod
+    def load_image(image_bytes: bytes):
+        """
+        Decode image bytes the way ComfyUI's LoadImage does.
+
+        First frame only, EXIF orientation applied, 32-bit integer images
+        scaled to 8-bit, converted to RGB.
+
+        Returns:
+            PIL.Image in RGB mode
+        """
+        from PIL import Image, ImageOps
+
+        img = Image.open(io.BytesIO(image_bytes))
+        img.seek(0)
+        img = ImageOps.exif_transpose(img)
+        if img.mode == 'I':
+            img = img.point(lambda i: i * (1 / 255))
+        return img.convert("RGB")
+
+    @staticmethod
+    def get_image_size(image_bytes: bytes) -> Tuple[int, int]:
+        """Return (width, height) after EXIF orientation, without a full decode."""
+        from PIL import Image
+
+        img = Image.open(io.BytesIO(image_bytes))
+        width, height = img.size
+        try:
+            orientation = img.getexif().get(0x0112, 1)
+        except Exception:
+            orientation = 1
+        if orientation in (5, 6, 7, 8):
+            width, height = height, width
+        return width, height
+
+    @staticmethod
+    def normalize_image(
+        image_bytes: bytes,
+        width: int,
+        height: int,
+        filename: str = "input.png",
+    ) -> Tuple[bytes, str, dict]:
+        """
+        Resize/pad an image to the workflow resolution and encode it as PNG.
+
+        The pixel path mirrors LoadImage -> ImageResizeKJv2: the decoded image
+        goes through ComfyUI's float32 -> uint8 conversion before the PIL
+        lanczos resize, so the staged PNG equals the node's output.
+
+        Args:
+            image_bytes: Original image bytes
+            width: Target width
+            height: Target height
+            filename: Original filename (used to name the output)
+
+        Returns:
+            Tuple of (png_bytes, png_filename, info dict)
+        """
+        import numpy as np
+        from PIL import Image
+
+        start = time.time()
+        img = MediaPreprocessor.load_image(image_bytes)
+        src_width, src_height = img.size
+        geometry = MediaPreprocessor.pad_geometry(
+            src_width, src_height, width, height, MediaPreprocessor.DIVISIBLE_BY
+        )
+
+        # LoadImage produces float32 / 255; comfy.utils.lanczos converts back with
+        # clip(255 * x).astype(uint8) before resizing with PIL
+        pixels = np.asarray(img).astype(np.float32) / 255.0
+        pixels = np.clip(255. * pixels, 0, 255).astype(np.uint8)
+        resized = Image.fromarray(pixels).resize(
+            (geometry["inner_width"], geometry["inner_height"]), resample=Image.Resampling.LANCZOS
+        )
+
+        if (geometry["out_width"], geometry["out_height"]) != resized.size:
+            canvas = Image.new("RGB", (geometry["out_width"], geometry["out_height"]), MediaPreprocessor.PAD_COLOR)
+            canvas.paste(resized, (geometry["pad_left"], geometry["pad_top"]))
+            resized = canvas
+
+        buffer = io.BytesIO()
+        resized.save(buffer, format="PNG", compress_level=MediaPreprocessor.PNG_COMPRESS_LEVEL)
+        png_bytes = buffer.getvalue()
+
+        stem = os.path.splitext(os.path.basename(filename))[0] or "input"
+        png_filename = f"{stem}_{geometry['out_width']}x{geometry['out_height']}.png"
+
+        info = {
+            "source_size": [src_width, src_height],
+            "output_size": [geometry["out_width"], geometry["out_height"]],
+            "input_bytes": len(image_bytes),
+            "output_bytes": len(png_bytes),
+            "seconds": round(time.time() - start, 3),
+        }
+        print(f"  Normalized image: {src_width}x{src_height} ({len(image_bytes)} bytes) -> "
+              f"{geometry['out_width']}x{geometry['out_height']} PNG ({len(png_bytes)} bytes) "
+              f"in {info['seconds']:.2f}s")
+        return png_bytes, png_filename, info
+
+    @staticmethod
+    def detect_silence(samples, sample_rate: int) -> Tuple[float, float]:
+        """
+        Measure trimmable leading and trailing silence.
+
+        Args:
+            samples: float array shaped (channels, samples)
+            sample_rate: Sample rate of samples
+
+        Returns:
+            Tuple of (leading_seconds, trailing_seconds); each is 0.0 when the
+            silence is shorter than SILENCE_MIN_SECONDS
+        """
+        import numpy as np
+
+        window = max(1, int(sample_rate * MediaPreprocessor.SILENCE_WINDOW_MS / 1000))
+        signal = samples.mean(axis=0)
+        num_windows = len(signal) // window
+        if num_windows == 0:
+            return 0.0, 0.0
+
+        frames = signal[:num_windows * window].reshape(num_windows, window)
+        rms = np.sqrt(np.mean(np.square(frames, dtype=np.float64), axis=1))
+        peak = rms.max()
+        if peak <= 0:
+            return 0.0, 0.0
+
+        voiced = np.flatnonzero(rms >= peak * 10 ** (MediaPreprocessor.SILENCE_THRESHOLD_DB / 20))
+        window_seconds = window / sample_rate
+        total_seconds = samples.shape[1] / sample_rate
+        keep = MediaPreprocessor.SILENCE_KEEP_SECONDS
+
+        leading = max(0.0, voiced[0] * window_seconds - keep)
+        trailing = max(0.0, total_seconds - (voiced[-1] + 1) * window_seconds - keep)
+        if leading < MediaPreprocessor.SILENCE_MIN_SECONDS:
+            leading = 0.0
+        if trailing < MediaPreprocessor.SILENCE_MIN_SECONDS:
+            trailing = 0.0
+        return leading, trailing
+
+    @staticmethod
+    def normalize_audio(
+        audio_bytes: bytes,
+        filename: str = "input.mp3",
+        max_duration: Optional[float] = None,
+        sample_rate: Optional[Union[int, str]] = None,
+        mono: bool = False,
+        trim_silence: bool = False,
+    ) -> Tuple[bytes, str, float, dict]:
+        """
+        Decode audio once, resample/downmix/trim it and encode it as FLAC.
+
+        Args:
+            audio_bytes: Original audio bytes (any format librosa/ffmpeg can read)
+            filename: Original filename (format hint and output name)
+            max_duration: Trim to this many seconds (None = keep full length)
+            sample_rate: Output rate in Hz, "vae" for AUDIO_VAE_SAMPLE_RATE,
+                or None to keep the source rate
+            mono: Downmix to one channel
+            trim_silence: Cut leading/trailing silence (see detect_silence);
+                info["silence"] reports what was cut
+
+        Returns:
+            Tuple of (flac_bytes, flac_filename, duration_seconds, info dict)
+        """
+        import librosa
+        import numpy as np
+        import soundfile as sf
+        import tempfile
+
+        start = time.time()
+
+        _, ext = os.path.splitext(filename)
+        with tempfile.NamedTemporaryFile(suffix=ext or '.mp3', delete=False) as tmp:
+            tmp.write(audio_bytes)
+            tmp_path = tmp.name
+        try:
+            samples, source_rate = librosa.load(tmp_path, sr=None, mono=False)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+        # librosa returns (samples,) for mono and (channels, samples) otherwise
+        samples = np.atleast_2d(samples)
+        source_channels = samples.shape[0]
+        source_duration = samples.shape[1] / source_rate
+
+        if mono:
+            samples = samples.mean(axis=0, keepdims=True)
+        elif source_channels > MediaPreprocessor.MAX_AUDIO_CHANNELS:
+            samples = samples[:MediaPreprocessor.MAX_AUDIO_CHANNELS]
+
+        if max_duration is not None:
+            samples = samples[:, :int(round(max_duration * source_rate))]
+
+        silence = None
+        if trim_silence:
+            full_duration = samples.shape[1] / source_rate
+            leading, trailing = MediaPreprocessor.detect_silence(samples, source_rate)
+            start_index = int(round(leading * source_rate))
+            end_index = samples.shape[1] - int(round(trailing * source_rate))
+            silence = {
+                "leading_seconds": start_index / source_rate,
+                "trailing_seconds": (samples.shape[1] - end_index) / source_rate,
+                "full_duration": full_duration,
+            }
+            samples = samples[:, start_index:end_index]
+
+        if sample_rate == "vae":
+            sample_rate = MediaPreprocessor.AUDIO_VAE_SAMPLE_RATE
+        target_rate = int(sample_rate) if sample_rate else source_rate
+        if target_rate != source_rate:
+            samples = librosa.resample(samples, orig_sr=source_rate, target_sr=target_rate, res_type="soxr_hq")
+
+        duration = samples.shape[1] / target_rate
+
+        buffer = io.BytesIO()
+        sf.write(buffer, samples.T, target_rate, format="FLAC", subtype="PCM_16")
+        flac_bytes = buffer.getvalue()
+
+        stem = os.path.splitext(os.path.basename(filename))[0] or "input"
+        flac_filename = f"{stem}_{target_rate}.flac"
+
+        info = {
+            "source_sample_rate": int(source_rate),
+            "source_channels": int(source_channels),
+            "source_duration": round(source_duration, 4),
+            "sample_rate": int(target_rate),
+            "channels": int(samples.shape[0]),
+            "duration": round(duration, 4),
+            "input_bytes": len(audio_bytes),
+            "output_bytes": len(flac_bytes),
+            "seconds": round(time.time() - start, 3),
+        }
+        if silence is not None:
+            info["silence"] = silence
+            print(f"  Silence: {silence['leading_seconds']:.2f}s leading, "
+                  f"{silence['trailing_seconds']:.2f}s trailing")
+        print(f"  Normalized audio: {source_channels}ch {source_rate}Hz {source_duration:.3f}s "
+              f"({len(audio_bytes)} bytes) -> {info['channels']}ch {target_rate}Hz {duration:.3f}s "
+              f"FLAC ({len(flac_bytes)} bytes) in {info['seconds']:.2f}s")
+        return flac_bytes, flac_filename, duration, info
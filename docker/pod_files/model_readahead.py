@@ -0,0 +1,336 @@
+#!/usr/bin/env python3
+"""
+Model file readahead for ComfyUI boot.
+
+Launched in the background by start_wrapper.sh. Reads every model file the
+workflow templates reference into the page cache with parallel large
+sequential reads, so ComfyUI's own (serial) loads hit memory instead of the
+network volume.
+
+Usage:
+    python3 model_readahead.py [--workers 4] [--report /tmp/model_readahead.json]
+"""
+import argparse
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+try:
+    import requests
+except ImportError:
+    requests = None  # No /system_stats readiness report
+
+COMFYUI_URL = "http://127.0.0.1:8188"
+MODELS_DIR = "/comfyui/models"
+
+# Templates in priority order: Mode 1 first (most traffic), then Mode 2, Mode 3
+DEFAULT_TEMPLATES = [
+    "/comfyui/workflows/ltx2_enhanced.json",
+    "/comfyui/workflows/ltx2_audio_gen.json",
+    "/comfyui/workflows/ltx2_multiframe.json",
+]
+
+# Template input name -> ComfyUI models subfolder
+MODEL_INPUT_FOLDERS = {
+    "ckpt_name": "checkpoints",
+    "text_encoder": "text_encoders",
+    "lora_name": "loras",
+}
+
+READ_CHUNK_SIZE = 16 * 1024 * 1024     # 16MB per read() call
+SEGMENT_SIZE = 1024 * 1024 * 1024      # Files are split into 1GB segments read in parallel
+DEFAULT_WORKERS = 4
+
+
+def collect_template_models(template_paths: List[str]) -> List[Dict[str, str]]:
+    """
+    Collect model files referenced by workflow templates, in template order.
+
+    Args:
+        template_paths: Workflow template JSON files (missing files are skipped)
+
+    Returns:
+        List of dicts with folder and filename, de-duplicated, first use first
+    """
+    models = []
+    seen = set()
+    for template_path in template_paths:
+        if not os.path.exists(template_path):
+            continue
+        with open(template_path, 'r') as f:
+            workflow = json.load(f)
+
+        for node in workflow.values():
+            for input_name, value in node.get("inputs", {}).items():
+                folder = MODEL_INPUT_FOLDERS.get(input_name)
+                if folder is None or not isinstance(value, str):
+                    continue
+                key = (folder, value)
+                if key in seen:
+                    continue
+                seen.add(key)
+                models.append({"folder": folder, "filename": value})
+    return models
+
+
+def _available_memory_bytes() -> Optional[int]:
+    """Return MemAvailable from /proc/meminfo, or None if unknown."""
+    try:
+        with open("/proc/meminfo", 'r') as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
+
+
+def _read_segment(path: str, offset: int, length: int, stats: dict, lock: threading.Lock) -> None:
+    """Sequentially read one segment of a file, discarding the data."""
+    buf = bytearray(READ_CHUNK_SIZE)
+    view = memoryview(buf)
+    start = time.time()
+    read_total = 0
+
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        if hasattr(os, "posix_fadvise"):
+            os.posix_fadvise(fd, offset, length, os.POSIX_FADV_SEQUENTIAL)
+        with os.fdopen(fd, 'rb', buffering=0, closefd=False) as f:
+            f.seek(offset)
+            while read_total < length:
+                want = min(READ_CHUNK_SIZE, length - read_total)
+                n = f.readinto(view[:want])
+                if not n:
+                    break
+                read_total += n
+    finally:
+        os.close(fd)
+
+    end = time.time()
+    with lock:
+        stats["bytes_read"] += read_total
+        stats["first_start"] = min(stats["first_start"], start)
+        stats["last_end"] = max(stats["last_end"], end)
+        stats["segments_done"] += 1
+
+
+def _watch_comfyui(state: dict, stop: threading.Event, comfyui_url: str) -> None:
+    """Poll /system_stats and record when ComfyUI first answers."""
+    while not stop.is_set():
+        try:
+            response = requests.get(f"{comfyui_url}/system_stats", timeout=2)
+            if response.status_code == 200:
+                state["ready_at"] = time.time()
+                return
+        except Exception:
+            pass
+        stop.wait(1.0)
+
+
+def readahead(
+    models: List[Dict[str, str]],
+    models_dir: str = MODELS_DIR,
+    workers: int = DEFAULT_WORKERS,
+    max_bytes: Optional[int] = None,
+    comfyui_url: Optional[str] = COMFYUI_URL,
+) -> dict:
+    """
+    Prefetch model files into the page cache.
+
+    Files are split into segments and submitted in model-list order, so the
+    first models in the templates finish first while later ones overlap.
+
+    Args:
+        models: Output of collect_template_models()
+        models_dir: ComfyUI models root (symlinks into the network volume are followed)
+        workers: Number of parallel reader threads
+        max_bytes: Stop queueing files once this many bytes are scheduled
+                   (defaults to 80% of MemAvailable so early files are not evicted)
+        comfyui_url: ComfyUI base URL to watch for readiness (None to disable)
+
+    Returns:
+        Report dict with per-file throughput and timing summary
+    """
+    if max_bytes is None:
+        available = _available_memory_bytes()
+        max_bytes = int(available * 0.8) if available else None
+
+    start = time.time()
+    lock = threading.Lock()
+    files = []
+    scheduled_bytes = 0
+    seen_paths = set()
+
+    for model in models:
+        path = os.path.join(models_dir, model["folder"], model["filename"])
+        entry = {
+            "folder": model["folder"],
+            "filename": model["filename"],
+            "path": path,
+            "status": "pending",
+        }
+        files.append(entry)
+
+        real_path = os.path.realpath(path)
+        if not os.path.isfile(real_path):
+            entry["status"] = "missing"
+            continue
+        if real_path in seen_paths:
+            entry["status"] = "duplicate"
+            continue
+        seen_paths.add(real_path)
+
+        size = os.path.getsize(real_path)
+        entry["size_bytes"] = size
+        if max_bytes is not None and scheduled_bytes + size > max_bytes:
+            entry["status"] = "skipped_memory_budget"
+            continue
+        scheduled_bytes += size
+        entry["real_path"] = real_path
+        entry["stats"] = {
+            "bytes_read": 0,
+            "first_start": float("inf"),
+            "last_end": 0.0,
+            "segments_done": 0,
+        }
+        entry["status"] = "scheduled"
+
+    # Watch ComfyUI readiness in parallel with the reads
+    watch_state = {"ready_at": None}
+    stop_watch = threading.Event()
+    watcher = None
+    if comfyui_url and requests is not None:
+        watcher = threading.Thread(
+            target=_watch_comfyui, args=(watch_state, stop_watch, comfyui_url), daemon=True
+        )
+        watcher.start()
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        futures = []
+        for entry in files:
+            if entry["status"] != "scheduled":
+                continue
+            size = entry["size_bytes"]
+            for offset in range(0, max(size, 1), SEGMENT_SIZE):
+                length = min(SEGMENT_SIZE, size - offset)
+                futures.append(pool.submit(
+                    _read_segment, entry["real_path"], offset, length, entry["stats"], lock
+                ))
+        for future in futures:
+            try:
+                future.result()
+            except OSError as e:
+                print(f"[readahead] Read error: {e}")
+
+    end = time.time()
+
+    # If ComfyUI is still booting, give the watcher a little longer to report
+    if watcher is not None:
+        watcher.join(timeout=60)
+        stop_watch.set()
+    ready_at = watch_state["ready_at"]
+
+    report_files = []
+    total_bytes = 0
+    warmed_before_ready = 0
+    files_before_ready = 0
+    for entry in files:
+        item = {
+            "folder": entry["folder"],
+            "filename": entry["filename"],
+            "status": entry["status"],
+        }
+        stats = entry.get("stats")
+        if stats and stats["segments_done"]:
+            elapsed = max(stats["last_end"] - stats["first_start"], 1e-6)
+            item.update({
+                "status": "done",
+                "size_bytes": entry["size_bytes"],
+                "bytes_read": stats["bytes_read"],
+                "seconds": round(elapsed, 2),
+                "mb_per_s": round(stats["bytes_read"] / elapsed / 1e6, 1),
+                "finished_at": round(stats["last_end"] - start, 2),
+            })
+            total_bytes += stats["bytes_read"]
+            if ready_at is not None and stats["last_end"] <= ready_at:
+                warmed_before_ready += stats["bytes_read"]
+                files_before_ready += 1
+        report_files.append(item)
+
+    wall_seconds = end - start
+    # The readers share one disk, so the time saved cannot be derived from
+    # their busy time: compare comfyui_ready_after with a MODEL_READAHEAD=0 boot.
+    report = {
+        "files": report_files,
+        "workers": workers,
+        "total_bytes": total_bytes,
+        "wall_seconds": round(wall_seconds, 2),
+        "aggregate_mb_per_s": round(total_bytes / max(wall_seconds, 1e-6) / 1e6, 1),
+        "comfyui_ready_after": round(ready_at - start, 2) if ready_at else None,
+        # > 0: warm-up done this long before /system_stats answered; < 0: still reading then
+        "warmup_lead_seconds": round(ready_at - end, 2) if ready_at else None,
+        "bytes_warmed_before_ready": warmed_before_ready if ready_at else None,
+        "files_warmed_before_ready": files_before_ready if ready_at else None,
+    }
+    return report
+
+
+def print_report(report: dict) -> None:
+    """Print a human-readable readahead summary."""
+    for item in report["files"]:
+        if item["status"] == "done":
+            print(f"[readahead] {item['folder']}/{item['filename']}: "
+                  f"{item['bytes_read'] / 1e9:.2f} GB in {item['seconds']:.1f}s "
+                  f"({item['mb_per_s']:.0f} MB/s)")
+        else:
+            print(f"[readahead] {item['folder']}/{item['filename']}: {item['status']}")
+
+    print(f"[readahead] Total: {report['total_bytes'] / 1e9:.2f} GB in {report['wall_seconds']:.1f}s "
+          f"({report['aggregate_mb_per_s']:.0f} MB/s, {report['workers']} workers)")
+    if report["comfyui_ready_after"] is not None:
+        lead = report["warmup_lead_seconds"]
+        timing = f"{lead:.1f}s after warm-up finished" if lead >= 0 else f"{-lead:.1f}s before warm-up finished"
+        print(f"[readahead] ComfyUI /system_stats ready after {report['comfyui_ready_after']:.1f}s ({timing}), "
+              f"{report['files_warmed_before_ready']} files / "
+              f"{report['bytes_warmed_before_ready'] / 1e9:.2f} GB already cached")
+    else:
+        print("[readahead] ComfyUI not ready before readahead finished")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prefetch model files into the page cache")
+    parser.add_argument("--models-dir", default=MODELS_DIR)
+    parser.add_argument("--template", action="append", dest="templates",
+                        help="Workflow template (repeatable, default: all ltx2 templates)")
+    parser.add_argument("--workers", type=int,
+                        default=int(os.environ.get("MODEL_READAHEAD_WORKERS", DEFAULT_WORKERS)))
+    parser.add_argument("--max-gb", type=float, default=None,
+                        help="Page cache budget in GB (default: 80%% of MemAvailable)")
+    parser.add_argument("--comfyui-url", default=COMFYUI_URL)
+    parser.add_argument("--report", default=None, help="Write JSON report to this path")
+    args = parser.parse_args()
+
+    models = collect_template_models(args.templates or DEFAULT_TEMPLATES)
+    print(f"[readahead] {len(models)} model files from templates, {args.workers} workers")
+
+    max_bytes = int(args.max_gb * 1e9) if args.max_gb else None
+    report = readahead(
+        models,
+        models_dir=args.models_dir,
+        workers=args.workers,
+        max_bytes=max_bytes,
+        comfyui_url=args.comfyui_url,
+    )
+    print_report(report)
+
+    if args.report:
+        with open(args.report, 'w') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,562 @@
+#!/usr/bin/env python3
+"""
+Model sync engine: keeps a local-disk mirror of model files with an
+integrity manifest (sizes + sha256).
+
+- Chunked parallel copy from a directory, file:// URL or http(s) URL
+- Resume: partially copied files keep a .part sidecar of finished chunks
+- Eviction (sync --evict only): least recently used mirror files are removed
+  when disk is short; plain copies never delete anything
+- Only sync keeps a mirror manifest; fetch / copy write just the files into
+  model folders that ComfyUI scans, and verify by size (the download is
+  resumed by chunk and a re-run adopts a complete file, so hashing every
+  multi-GB file again would only add minutes)
+
+Used by start_wrapper.sh (network volume -> local NVMe mirror, with
+eviction) and by scripts/migrate_models_to_volume.sh /
+scripts/download_missing_models.sh (copy / fetch, without).
+
+Usage:
+    python3 model_sync.py sync --source /runpod-volume/models --dest /models-local --from-templates --evict
+    python3 model_sync.py fetch https://huggingface.co/.../model.safetensors /workspace/ComfyUI/models/loras/
+    python3 model_sync.py copy /workspace/ComfyUI/models/loras/a.safetensors /runpod-volume/ComfyUI/models/loras/
+    python3 model_sync.py manifest /runpod-volume/models -o /runpod-volume/models/manifest.json
+"""
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, List, Optional
+from urllib.parse import urlparse, unquote
+
+try:
+    import requests
+except ImportError:
+    requests = None  # Only http(s) sources need it
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from model_readahead import collect_template_models, DEFAULT_TEMPLATES
+
+CHUNK_SIZE = 64 * 1024 * 1024       # Unit of parallel copy and resume
+IO_BLOCK_SIZE = 8 * 1024 * 1024     # Single read/write call size
+DEFAULT_WORKERS = 8
+MIRROR_RESERVE_BYTES = 2 * 1024 * 1024 * 1024  # Free space an evicting mirror keeps on its disk
+
+MANIFEST_NAME = ".model_manifest.json"   # Mirror manifest inside the destination
+SOURCE_MANIFEST_NAME = "manifest.json"   # Optional manifest shipped with a source directory
+
+# Errors of a failed file sync (reported per file, not raised)
+SYNC_ERRORS = (OSError, ValueError) + ((requests.RequestException,) if requests else ())
+
+
+def file_sha256(path: str) -> str:
+    """Compute sha256 of a file with large sequential reads."""
+    digest = hashlib.sha256()
+    with open(path, 'rb', buffering=0) as f:
+        while True:
+            block = f.read(IO_BLOCK_SIZE)
+            if not block:
+                break
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def build_manifest(root: str, files: Optional[Iterable[str]] = None, with_hash: bool = True) -> dict:
+    """
+    Build a manifest for files under root.
+
+    Args:
+        root: Directory containing the model files
+        files: Relative paths to include (default: every file under root)
+        with_hash: Compute sha256 for each file
+
+    Returns:
+        Manifest dict: {"files": {rel_path: {"size": int, "sha256": str}}}
+    """
+    if files is None:
+        files = []
+        for dirpath, _, filenames in os.walk(root, followlinks=True):
+            for filename in filenames:
+                if filename in (MANIFEST_NAME, SOURCE_MANIFEST_NAME) or filename.endswith(".part") \
+                        or filename.endswith(".part.json"):
+                    continue
+                files.append(os.path.relpath(os.path.join(dirpath, filename), root))
+
+    entries = {}
+    for rel_path in sorted(files):
+        path = os.path.join(root, rel_path)
+        if not os.path.isfile(path):
+            continue
+        entry = {"size": os.path.getsize(path)}
+        if with_hash:
+            print(f"  Hashing {rel_path}...")
+            entry["sha256"] = file_sha256(path)
+        entries[rel_path] = entry
+    return {"files": entries}
+
+
+def load_manifest(path: str) -> dict:
+    """Load a manifest file, returning an empty manifest if missing or invalid."""
+    try:
+        with open(path, 'r') as f:
+            manifest = json.load(f)
+        if isinstance(manifest.get("files"), dict):
+            return manifest
+    except (OSError, ValueError):
+        pass
+    return {"files": {}}
+
+
+def _load_json(path: str) -> dict:
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_json_atomic(path: str, data: dict) -> None:
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+class _LocalSource:
+    """Directory or file:// source read with pread."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.size = os.path.getsize(path)
+        self.supports_ranges = True
+        stat = os.stat(path)
+        self.identity = f"{os.path.realpath(path)}:{stat.st_size}:{int(stat.st_mtime)}"
+
+    def copy_range(self, dst_fd: int, offset: int, length: int) -> int:
+        src_fd = os.open(self.path, os.O_RDONLY)
+        try:
+            if hasattr(os, "posix_fadvise"):
+                os.posix_fadvise(src_fd, offset, length, os.POSIX_FADV_SEQUENTIAL)
+            copied = 0
+            while copied < length:
+                block = os.pread(src_fd, min(IO_BLOCK_SIZE, length - copied), offset + copied)
+                if not block:
+                    break
+                os.pwrite(dst_fd, block, offset + copied)
+                copied += len(block)
+            return copied
+        finally:
+            os.close(src_fd)
+
+
+class _HTTPSource:
+    """http(s) source read with Range requests."""
+
+    def __init__(self, url: str):
+        if requests is None:
+            raise OSError(f"{url}: http(s) sources need the requests package")
+        self.url = url
+        response = requests.head(url, allow_redirects=True, timeout=30)
+        response.raise_for_status()
+        self.size = int(response.headers.get("Content-Length", 0)) or None
+        self.supports_ranges = response.headers.get("Accept-Ranges", "").lower() == "bytes" \
+            and self.size is not None
+        etag = response.headers.get("ETag", "")
+        self.identity = f"{url}:{self.size}:{etag}"
+
+    def copy_range(self, dst_fd: int, offset: int, length: int) -> int:
+        headers = {}
+        if self.supports_ranges:
+            headers["Range"] = f"bytes={offset}-{offset + length - 1}"
+        with requests.get(self.url, headers=headers, stream=True, timeout=60) as response:
+            response.raise_for_status()
+            copied = 0
+            for block in response.iter_content(chunk_size=IO_BLOCK_SIZE):
+                if not block:
+                    continue
+                os.pwrite(dst_fd, block, offset + copied)
+                copied += len(block)
+            return copied
+
+
+def open_source(uri: str):
+    """Open a local path, file:// URL or http(s) URL as a copy source."""
+    parsed = urlparse(uri)
+    if parsed.scheme in ("http", "https"):
+        return _HTTPSource(uri)
+    if parsed.scheme == "file":
+        return _LocalSource(unquote(parsed.path))
+    return _LocalSource(uri)
+
+
+class ModelSync:
+    """Mirror model files into a destination directory with manifest verification."""
+
+    def __init__(
+        self,
+        dest_dir: str,
+        workers: int = DEFAULT_WORKERS,
+        chunk_size: int = CHUNK_SIZE,
+        verify: str = "hash",
+        reserve_bytes: int = 0,
+        evict: bool = False,
+        write_manifest: bool = True,
+    ):
+        """
+        Args:
+            dest_dir: Mirror root directory
+            workers: Parallel chunk copies per file
+            chunk_size: Chunk size for parallel copy and resume
+            verify: "hash" (sha256 after copy) or "size"
+            reserve_bytes: Free space to keep on the destination disk
+            evict: Remove least recently used manifest files (inside dest_dir only)
+                   to make room; off, a file that does not fit fails
+            write_manifest: Keep the mirror manifest in dest_dir; off (fetch / copy),
+                   it lives in memory only and nothing but the files is written
+        """
+        self.dest_dir = dest_dir
+        self.workers = max(1, workers)
+        self.chunk_size = chunk_size
+        self.verify = verify
+        self.reserve_bytes = reserve_bytes
+        self.evict = evict
+        self.write_manifest = write_manifest
+        os.makedirs(dest_dir, exist_ok=True)
+        self.manifest_path = os.path.join(dest_dir, MANIFEST_NAME)
+        self.manifest = load_manifest(self.manifest_path) if write_manifest else {"files": {}}
+        self._lock = threading.Lock()
+
+    def _save_manifest(self) -> None:
+        if not self.write_manifest:
+            return
+        with self._lock:
+            _write_json_atomic(self.manifest_path, self.manifest)
+
+    def _record(self, rel_path: str, entry: dict) -> None:
+        """Add a verified file to the mirror manifest."""
+        entry["mtime"] = int(os.stat(os.path.join(self.dest_dir, rel_path)).st_mtime)
+        entry["verified_at"] = time.time()
+        entry["last_used"] = time.time()
+        with self._lock:
+            self.manifest["files"][rel_path] = entry
+        self._save_manifest()
+
+    def is_current(self, rel_path: str, expected: Optional[dict] = None) -> bool:
+        """
+        Check whether a mirrored file matches the manifest.
+
+        A file is current when its size matches the mirror manifest (and the
+        expected entry, if given), its mtime has not changed since it was
+        verified, and any expected sha256 equals the recorded one.
+        """
+        path = os.path.join(self.dest_dir, rel_path)
+        entry = self.manifest["files"].get(rel_path)
+        if entry is None or not os.path.isfile(path):
+            return False
+
+        stat = os.stat(path)
+        if stat.st_size != entry.get("size") or int(stat.st_mtime) != entry.get("mtime"):
+            return False
+        if expected:
+            if expected.get("size") is not None and expected["size"] != entry["size"]:
+                return False
+            if expected.get("sha256") and expected["sha256"] != entry.get("sha256"):
+                return False
+        return True
+
+    def touch(self, rel_path: str) -> None:
+        """Mark a mirrored file as recently used (for LRU eviction)."""
+        entry = self.manifest["files"].get(rel_path)
+        if entry is not None:
+            entry["last_used"] = time.time()
+
+    def _inside_mirror(self, rel_path: str) -> bool:
+        """Whether rel_path resolves to a file inside dest_dir (not through a symlink out of it)."""
+        root = os.path.realpath(self.dest_dir)
+        return os.path.realpath(os.path.join(self.dest_dir, rel_path)).startswith(root + os.sep)
+
+    def ensure_free_space(self, needed_bytes: int, keep: Iterable[str] = ()) -> List[str]:
+        """
+        Make sure needed_bytes fit on the destination disk; with evict, remove
+        least recently used mirror files until they do.
+
+        Args:
+            needed_bytes: Bytes about to be written
+            keep: Relative paths that must not be evicted
+
+        Returns:
+            List of evicted relative paths
+
+        Raises:
+            OSError: If the bytes do not fit (after eviction)
+        """
+        keep = set(keep)
+        evicted = []
+
+        def free_bytes():
+            return shutil.disk_usage(self.dest_dir).free - self.reserve_bytes
+
+        candidates = sorted(
+            (rel for rel in self.manifest["files"] if rel not in keep and self._inside_mirror(rel)),
+            key=lambda rel: self.manifest["files"][rel].get("last_used", 0),
+        ) if self.evict else []
+        while free_bytes() < needed_bytes and candidates:
+            rel_path = candidates.pop(0)
+            path = os.path.join(self.dest_dir, rel_path)
+            if os.path.exists(path):
+                os.remove(path)
+            del self.manifest["files"][rel_path]
+            evicted.append(rel_path)
+            print(f"  Evicted {rel_path} (LRU)")
+
+        if evicted:
+            self._save_manifest()
+        if free_bytes() < needed_bytes:
+            raise OSError(f"Not enough space in {self.dest_dir}: need {needed_bytes} bytes")
+        return evicted
+
+    def sync_file(
+        self,
+        source_uri: str,
+        rel_path: str,
+        expected: Optional[dict] = None,
+        keep: Iterable[str] = (),
+    ) -> dict:
+        """
+        Copy one file into the mirror with chunked parallel I/O and resume.
+
+        Args:
+            source_uri: Local path, file:// URL or http(s) URL
+            rel_path: Destination path relative to the mirror root
+            expected: Optional manifest entry with size and/or sha256
+            keep: Files that must survive eviction while making room
+
+        Returns:
+            dict with path, status ("current", "adopted", "copied", "resumed"), bytes, seconds, mb_per_s
+
+        Raises:
+            ValueError: If the copied file fails size or hash verification
+            OSError: If the mirror disk cannot fit the file
+        """
+        start = time.time()
+        if self.is_current(rel_path, expected):
+            self.touch(rel_path)
+            self._save_manifest()
+            return {"path": rel_path, "status": "current", "bytes": 0, "seconds": 0.0}
+
+        source = open_source(source_uri)
+        size = source.size
+        if expected and expected.get("size") is not None and size is not None and size != expected["size"]:
+            raise ValueError(f"{rel_path}: source size {size} != manifest size {expected['size']}")
+
+        dest_path = os.path.join(self.dest_dir, rel_path)
+        part_path = f"{dest_path}.part"
+        state_path = f"{part_path}.json"
+        os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+
+        # Complete file already present but not yet in the manifest (e.g. an
+        # earlier cp/wget): adopt it instead of copying again
+        if os.path.isfile(dest_path) and size is not None and os.path.getsize(dest_path) == size:
+            entry = {"size": size, "source": source_uri}
+            if self.verify == "hash" or (expected and expected.get("sha256")):
+                entry["sha256"] = file_sha256(dest_path)
+                if expected and expected.get("sha256") and expected["sha256"] != entry["sha256"]:
+                    entry = None
+            if entry is not None:
+                self._record(rel_path, entry)
+                return {"path": rel_path, "status": "adopted", "bytes": 0,
+                        "seconds": round(time.time() - start, 2)}
+
+        # Resume state: only valid for the same source and chunking
+        state = _load_json(state_path)
+        resumable = (
+            source.supports_ranges
+            and state.get("identity") == source.identity
+            and state.get("chunk_size") == self.chunk_size
+            and os.path.exists(part_path)
+        )
+        done = set(state.get("done", [])) if resumable else set()
+        resumed = bool(done)
+        if not resumable:
+            state = {"identity": source.identity, "chunk_size": self.chunk_size, "done": []}
+
+        already = sum(min(self.chunk_size, size - i * self.chunk_size) for i in done) if size else 0
+        if size is not None:
+            self.ensure_free_space(size - already, keep=set(keep) | {rel_path})
+
+        fd = os.open(part_path, os.O_WRONLY | os.O_CREAT | (0 if resumable else os.O_TRUNC), 0o644)
+        try:
+            if size is not None and source.supports_ranges:
+                os.ftruncate(fd, size)
+                num_chunks = max(1, -(-size // self.chunk_size))
+                pending = [i for i in range(num_chunks) if i not in done]
+                state_lock = threading.Lock()
+
+                def copy_chunk(index: int) -> None:
+                    offset = index * self.chunk_size
+                    length = min(self.chunk_size, size - offset)
+                    copied = source.copy_range(fd, offset, length)
+                    if copied != length:
+                        raise IOError(f"{rel_path}: short read at chunk {index} ({copied}/{length})")
+                    with state_lock:
+                        done.add(index)
+                        state["done"] = sorted(done)
+                        _write_json_atomic(state_path, state)
+
+                with ThreadPoolExecutor(max_workers=self.workers) as pool:
+                    for future in [pool.submit(copy_chunk, i) for i in pending]:
+                        future.result()
+            else:
+                # Server without range support: single sequential stream
+                size = source.copy_range(fd, 0, size or 0)
+                os.ftruncate(fd, size)
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+        actual_size = os.path.getsize(part_path)
+        if size is not None and actual_size != size:
+            raise ValueError(f"{rel_path}: copied {actual_size} bytes, expected {size}")
+
+        entry = {"size": actual_size, "source": source_uri}
+        if self.verify == "hash" or (expected and expected.get("sha256")):
+            entry["sha256"] = file_sha256(part_path)
+            if expected and expected.get("sha256") and expected["sha256"] != entry["sha256"]:
+                os.remove(part_path)
+                os.remove(state_path)
+                raise ValueError(f"{rel_path}: sha256 mismatch after copy")
+        elif expected and expected.get("sha256"):
+            entry["sha256"] = expected["sha256"]
+
+        os.replace(part_path, dest_path)
+        if os.path.exists(state_path):
+            os.remove(state_path)
+
+        self._record(rel_path, entry)
+
+        elapsed = time.time() - start
+        return {
+            "path": rel_path,
+            "status": "resumed" if resumed else "copied",
+            "bytes": actual_size,
+            "seconds": round(elapsed, 2),
+            "mb_per_s": round(actual_size / max(elapsed, 1e-6) / 1e6, 1),
+        }
+
+    def sync(self, source_root: str, files: List[str], source_manifest: Optional[dict] = None) -> dict:
+        """
+        Mirror a list of files from a source root.
+
+        Args:
+            source_root: Source directory, file:// URL or http(s) base URL
+            files: Relative paths to mirror (order is copy order)
+            source_manifest: Expected sizes/hashes (default: <source_root>/manifest.json if local)
+
+        Returns:
+            dict with per-file results and failure count
+        """
+        parsed_root = urlparse(source_root)
+        if source_manifest is None and parsed_root.scheme not in ("http", "https"):
+            local_root = unquote(parsed_root.path) if parsed_root.scheme == "file" else source_root
+            source_manifest = load_manifest(os.path.join(local_root, SOURCE_MANIFEST_NAME))
+        expected_files = (source_manifest or {}).get("files", {})
+
+        results = []
+        failures = 0
+        for rel_path in files:
+            if parsed_root.scheme in ("http", "https", "file"):
+                source_uri = f"{source_root.rstrip('/')}/{rel_path}"
+            else:
+                source_uri = os.path.join(source_root, rel_path)
+            try:
+                result = self.sync_file(source_uri, rel_path, expected_files.get(rel_path), keep=files)
+            except SYNC_ERRORS as e:
+                result = {"path": rel_path, "status": "failed", "error": str(e)}
+                failures += 1
+            results.append(result)
+            print(f"  {rel_path}: {result['status']}"
+                  + (f" ({result['bytes'] / 1e9:.2f} GB, {result['mb_per_s']:.0f} MB/s)"
+                     if result.get("bytes") else "")
+                  + (f" - {result['error']}" if result.get("error") else ""))
+        return {"files": results, "failures": failures}
+
+
+def _template_files(template_paths: List[str]) -> List[str]:
+    return [f"{m['folder']}/{m['filename']}" for m in collect_template_models(template_paths)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Model mirror with integrity manifest")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_sync = sub.add_parser("sync", help="Mirror files from a source root into a destination")
+    p_sync.add_argument("--source", required=True)
+    p_sync.add_argument("--dest", required=True)
+    p_sync.add_argument("--file", action="append", default=[], help="Relative path (repeatable)")
+    p_sync.add_argument("--from-templates", action="store_true", help="Add model files used by templates")
+    p_sync.add_argument("--template", action="append", dest="templates")
+    p_sync.add_argument("--manifest", default=None, help="Source manifest (default: <source>/manifest.json)")
+    p_sync.add_argument("--evict", action="store_true",
+                        help="Remove least recently used mirror files when the disk is short")
+    p_sync.add_argument("--reserve-gb", type=float, default=None,
+                        help="Free space to keep (default: 2 with --evict, else 0)")
+
+    p_fetch = sub.add_parser("fetch", help="Download a URL into a directory (replaces wget -c)")
+    p_fetch.add_argument("url")
+    p_fetch.add_argument("dest_dir")
+
+    p_copy = sub.add_parser("copy", help="Copy local files into a directory (replaces cp -v)")
+    p_copy.add_argument("sources", nargs="+")
+    p_copy.add_argument("dest_dir")
+
+    p_manifest = sub.add_parser("manifest", help="Write a size/sha256 manifest for a directory")
+    p_manifest.add_argument("root")
+    p_manifest.add_argument("-o", "--output", default=None)
+    p_manifest.add_argument("--size-only", action="store_true")
+
+    for p, verify in ((p_sync, "hash"), (p_fetch, "size"), (p_copy, "size")):
+        p.add_argument("--workers", type=int, default=DEFAULT_WORKERS)
+        p.add_argument("--verify", choices=["hash", "size"], default=verify)
+
+    args = parser.parse_args()
+
+    if args.command == "manifest":
+        manifest = build_manifest(args.root, with_hash=not args.size_only)
+        output = args.output or os.path.join(args.root, SOURCE_MANIFEST_NAME)
+        _write_json_atomic(output, manifest)
+        print(f"Manifest written: {output} ({len(manifest['files'])} files)")
+        return 0
+
+    if args.command == "sync":
+        files = list(args.file)
+        if args.from_templates:
+            files += [f for f in _template_files(args.templates or DEFAULT_TEMPLATES) if f not in files]
+        source_manifest = load_manifest(args.manifest) if args.manifest else None
+        reserve_gb = args.reserve_gb if args.reserve_gb is not None else (
+            MIRROR_RESERVE_BYTES / 1024 ** 3 if args.evict else 0)
+        engine = ModelSync(args.dest, workers=args.workers, verify=args.verify,
+                           reserve_bytes=int(reserve_gb * 1024 ** 3), evict=args.evict)
+        report = engine.sync(args.source, files, source_manifest)
+        return 1 if report["failures"] else 0
+
+    engine = ModelSync(args.dest_dir, workers=args.workers, verify=args.verify, write_manifest=False)
+    sources = [args.url] if args.command == "fetch" else args.sources
+    failures = 0
+    for source_uri in sources:
+        filename = os.path.basename(unquote(urlparse(source_uri).path))
+        try:
+            result = engine.sync_file(source_uri, filename)
+            print(f"  {source_uri} -> {os.path.join(args.dest_dir, filename)}: {result['status']}")
+        except SYNC_ERRORS as e:
+            print(f"  ❌ {source_uri}: {e}")
+            failures += 1
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
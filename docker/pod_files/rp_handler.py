@@ -14,9 +14,15 @@ import runpod
 import requests
 import json
 import base64
+import copy
+import functools
+import hashlib
 import time
 import os
+import shutil
 import sys
+import threading
+import uuid
 
 # Add handler directory to path for imports
 sys.path.insert(0, '/workspace/handler')
@@ -25,8 +31,31 @@ sys.path.insert(0, '/')  # For root-level imports
 from url_downloader import URLDownloader
 from workflow_builder import WorkflowBuilder
 from gcs_uploader import upload_video_to_gcs, delete_local_video
-
-COMFYUI_URL = "http://127.0.0.1:8188"
+from media_preprocessor import MediaPreprocessor
+from video_postprocess import INTERPOLATORS, interpolate_video, pad_video_and_mux_audio
+from latent_cache import JOB_LATENT_DIR, JOB_LATENT_MAX_BYTES, LatentCache, job_latent_key, make_key
+from job_pipeline import (HANDLER_CONCURRENCY, concurrency_modifier, gpu_slot, make_async_handler,
+                          make_streaming_handler)
+from comfyui_pool import COMFYUI_INSTANCES, POOL, comfyui_url
+from job_journal import get_journal, job_input_hash
+from job_progress import PROGRESS_UPDATES, STREAM_PROGRESS, ComfyUIProgressListener, current_progress
+from job_capture import capture_job, current_capture
+
+# VAE decode VRAM budget (auto_decode_tiling): ComfyUI offloads the diffusion model
+# before decoding when needed, so at least this share of the card is usable
+DECODE_VRAM_FRACTION = 0.6
+
+# OOM retry (oom_retry): the retry decodes with this share of the first attempt's
+# VRAM budget; OOM_RETRY_TEMPORAL_SIZE (frames per decode tile) caps it further
+OOM_RETRY_VRAM_SCALE = 0.5
+OOM_RETRY_FALLBACK_VRAM_BYTES = int(8e9)
+OOM_RETRY_TEMPORAL_SIZE = int(os.environ.get("OOM_RETRY_TEMPORAL_SIZE", "0")) or None
+
+# Substrings of ComfyUI execution errors caused by CUDA out-of-memory
+OOM_ERROR_MARKERS = ("OutOfMemoryError", "out of memory", "Allocation on device")
+# Nodes whose OOM a retry with smaller decode tiles can fix; an OOM anywhere else fails the job
+DECODE_NODE_TYPES = ("VAEDecode", "VAEDecodeTiled", "LTX2StreamingVideoOutput", "LTXVAudioVAEDecode",
+                     "VHS_VideoCombine")
 
 # Quality presets based on test_720p.py
 QUALITY_PRESETS = {
@@ -61,24 +90,44 @@ DEFAULT_NEGATIVE_PROMPT = "static, bad teeth, blurry, low quality, pixelated, co
 DEFAULT_AUDIO_GEN_POSITIVE_PROMPT = "A person speaking naturally, high quality, detailed facial expressions, natural movements"
 DEFAULT_AUDIO_GEN_NEGATIVE_PROMPT = "static, blurry, low quality, pixelated, compressed artifacts, flickering"
 
+# Workflow templates, and ComfyUI output directories searched for videos (os.pathsep-separated)
+COMFYUI_WORKFLOW_DIR = os.environ.get("COMFYUI_WORKFLOW_DIR", "/comfyui/workflows")
+COMFYUI_OUTPUT_DIRS = os.environ.get("COMFYUI_OUTPUT_DIRS", "/workspace/ComfyUI/output:/comfyui/output").split(os.pathsep)
+
 # Initialize workflow builder (will be done after ComfyUI is ready)
 workflow_builder = None
+_workflow_builder_lock = threading.Lock()
+
+
+def init_workflow_builder():
+    """
+    Load the workflow templates once per worker (concurrent jobs share the builder).
+
+    Returns:
+        Error message if the main template is missing, else None
+    """
+    global workflow_builder
+    with _workflow_builder_lock:
+        if workflow_builder is not None:
+            return None
+        template_path = os.path.join(COMFYUI_WORKFLOW_DIR, "ltx2_enhanced.json")
+        audio_gen_template_path = os.path.join(COMFYUI_WORKFLOW_DIR, "ltx2_audio_gen.json")
+        multiframe_template_path = os.path.join(COMFYUI_WORKFLOW_DIR, "ltx2_multiframe.json")
+        if not os.path.exists(template_path):
+            return f"Workflow template not found: {template_path}"
+        workflow_builder = WorkflowBuilder(template_path, audio_gen_template_path, multiframe_template_path)
+        print(f"Workflow builder initialized from {template_path}")
+        return None
 
 
 def wait_for_comfyui(timeout=300):
-    """Wait for ComfyUI to be ready."""
+    """Wait for ComfyUI to be ready (at least one instance of the pool)."""
     print("Waiting for ComfyUI...")
-    start = time.time()
-    while time.time() - start < timeout:
-        try:
-            response = requests.get(f"{COMFYUI_URL}/system_stats", timeout=5)
-            if response.status_code == 200:
-                print("ComfyUI is ready")
-                return True
-        except Exception:
-            pass
-        time.sleep(2)
-    return False
+    if not POOL.wait_until_ready(timeout):
+        return False
+    ready = sum(instance.ready for instance in POOL.instances)
+    print(f"ComfyUI is ready ({ready}/{len(POOL.instances)} instances)")
+    return True
 
 
 def upload_file_to_comfyui(file_bytes: bytes, filename: str, subfolder: str = "") -> str:
@@ -99,7 +148,7 @@ def upload_file_to_comfyui(file_bytes: bytes, filename: str, subfolder: str = ""
         data["subfolder"] = subfolder
 
     response = requests.post(
-        f"{COMFYUI_URL}/upload/image",
+        f"{comfyui_url()}/upload/image",
         files=files,
         data=data,
         timeout=60
@@ -109,22 +158,614 @@ def upload_file_to_comfyui(file_bytes: bytes, filename: str, subfolder: str = ""
     result = response.json()
     uploaded_name = result.get("name", filename)
     print(f"  Uploaded: {filename} -> {uploaded_name}")
+    current_capture().add_media(file_bytes, filename, role="staged", name=uploaded_name)
     return uploaded_name
 
 
-def wait_for_completion(prompt_id: str, timeout: int = 1080) -> dict:
+def normalize_image_for_upload(image_bytes: bytes, image_filename: str, width: int, height: int,
+                               enabled: bool = True):
+    """
+    Resize/pad an input image to the workflow resolution on the CPU.
+
+    Falls back to the original bytes (and the in-graph ImageResizeKJv2 node)
+    if normalization is disabled or the image cannot be decoded here.
+
+    Returns:
+        Tuple of (image_bytes, image_filename, ingest_info or None)
+    """
+    current_capture().add_media(image_bytes, image_filename)
+    if not enabled:
+        return image_bytes, image_filename, None
+    try:
+        return MediaPreprocessor.normalize_image(image_bytes, width, height, image_filename)
+    except Exception as e:
+        print(f"  Warning: CPU image normalization failed, using in-graph resize: {e}")
+        return image_bytes, image_filename, None
+
+
+def normalize_audio_for_upload(audio_bytes: bytes, audio_filename: str, input_data: dict,
+                               trim_silence: bool = False, max_duration: float = None):
+    """
+    Decode input audio once on the CPU: resample/downmix as requested, trim to
+    the planned duration and take the sample-accurate duration from the same
+    decode.
+
+    With trim_silence, leading/trailing silence is cut and the returned
+    duration is the voiced span (ingest_info["silence"] has the cut amounts).
+    ingest_info["source_duration"] is the untrimmed length.
+
+    Falls back to the original bytes (and the in-graph TrimAudioDuration node,
+    which trims to the returned duration) if normalization is disabled or fails.
+
+    Args:
+        max_duration: Planned audio length in seconds (None = the whole audio)
+
+    Returns:
+        Tuple of (audio_bytes, audio_filename, audio_duration, ingest_info or None)
+    """
+    normalized = None
+    if input_data.get("normalize_audio", True):
+        try:
+            normalized = MediaPreprocessor.normalize_audio(
+                audio_bytes,
+                audio_filename,
+                max_duration=max_duration,
+                sample_rate=input_data.get("audio_sample_rate"),
+                mono=bool(input_data.get("audio_mono", False)),
+                trim_silence=trim_silence,
+            )
+        except Exception as e:
+            print(f"  Warning: CPU audio normalization failed, using original audio: {e}")
+    if normalized is None:
+        audio_duration = URLDownloader._get_audio_duration(audio_bytes, audio_filename)
+        if max_duration is not None:
+            audio_duration = min(audio_duration, max_duration)
+        normalized = (audio_bytes, audio_filename, audio_duration, None)
+    silence = (normalized[3] or {}).get("silence")
+    current_capture().add_media(audio_bytes, audio_filename,
+                                duration=silence["full_duration"] if silence else normalized[2],
+                                voiced_duration=normalized[2] if silence else None)
+    return normalized
+
+
+def latent_cache_lease_id(event: dict) -> str:
+    """Lease holder of the latent cache hits of a job (released by unified_handler)."""
+    return str(event.get("id") or f"local_{id(event)}")
+
+
+def plan_latent_cache(enabled: bool, lease_id: str, image_bytes: bytes = None, width: int = None,
+                      height: int = None, img_compression: int = None, audio_bytes: bytes = None):
+    """
+    Look up cached VAE encodes for the staged inputs.
+
+    Hits are pinned to lease_id (LatentCache.pin), so a save by a concurrent
+    job cannot evict them before LTX2LatentCacheLoad reads them; the leases
+    are released when the job ends.
+
+    Args:
+        enabled: use_latent_cache input flag
+        lease_id: Lease holder (latent_cache_lease_id)
+        image_bytes: Uploaded image bytes (None = no image encode in this mode)
+        width, height, img_compression: Image encode parameters (part of the key)
+        audio_bytes: Uploaded audio bytes (None = no audio encode in this mode)
+
+    Returns:
+        Tuple of (latent_cache plan for WorkflowBuilder or None, stats dict or None)
+    """
+    if not enabled:
+        return None, None
+
+    cache = LatentCache()
+    vae_ids = workflow_builder.get_vae_ids()
+    plan = {}
+    if image_bytes is not None:
+        key = make_key(
+            "image", vae_ids["image"], hashlib.sha256(image_bytes).hexdigest(),
+            width=width, height=height, img_compression=img_compression,
+        )
+        plan["image"] = {"key": key, "hit": cache.pin(key, lease_id)}
+    if audio_bytes is not None:
+        key = make_key("audio", vae_ids["audio"], hashlib.sha256(audio_bytes).hexdigest())
+        plan["audio"] = {"key": key, "hit": cache.pin(key, lease_id)}
+
+    hits = sum(1 for entry in plan.values() if entry["hit"])
+    stats = {
+        "hits": hits,
+        "misses": len(plan) - hits,
+        "entries": {kind: "hit" if entry["hit"] else "miss" for kind, entry in plan.items()},
+    }
+    print(f"  Latent cache: {stats['entries']}")
+    return plan, stats
+
+
+def get_decode_vram_budget():
+    """
+    VRAM available to the VAE decode, from ComfyUI /system_stats.
+
+    The budget is the free VRAM, but never below DECODE_VRAM_FRACTION of the
+    card (the model may still be resident when the job is submitted).
+    DECODE_VRAM_GB overrides it.
+
+    Returns:
+        Budget in bytes, or None if unknown (template tiling is kept)
+    """
+    if os.environ.get("DECODE_VRAM_GB"):
+        return int(float(os.environ["DECODE_VRAM_GB"]) * 1e9)
+    try:
+        stats = requests.get(f"{comfyui_url()}/system_stats", timeout=10).json()
+        device = stats["devices"][0]
+        return int(max(device["vram_free"], device["vram_total"] * DECODE_VRAM_FRACTION))
+    except (requests.RequestException, ValueError, KeyError, IndexError) as e:
+        print(f"  Warning: could not read VRAM from /system_stats, keeping template tiling: {e}")
+        return None
+
+
+def parse_generation_fps(input_data: dict, fps: int):
+    """
+    Internal sampling frame rate (generation_fps), or None for native fps.
+
+    Only values below the delivered fps are used; the video is interpolated
+    to fps after generation.
+    """
+    generation_fps = input_data.get("generation_fps")
+    if generation_fps is None:
+        return None
+    if not isinstance(generation_fps, (int, float)) or generation_fps < 1 or generation_fps >= fps:
+        print(f"  Warning: ignoring generation_fps={generation_fps} (must be 1 to fps-1)")
+        return None
+    return int(generation_fps)
+
+
+def interpolate_to_fps(video_path: str, fps: int, frame_plan: dict, input_data: dict) -> dict:
+    """
+    Interpolate a low-fps generation to the delivered fps (in place).
+
+    Returns:
+        frame_plan plus method/seconds, or error if interpolation failed
+        (the video is then returned at generation_fps)
+    """
+    method = input_data.get("interpolation", "minterpolate")
+    if method not in INTERPOLATORS:
+        method = "minterpolate"
+    print(f"Interpolating {frame_plan['generation_fps']}fps -> {fps}fps ({method})...")
+    try:
+        info = interpolate_video(video_path, fps, method=method)
+        return {**frame_plan, "method": method, "seconds": info["seconds"]}
+    except Exception as e:
+        print(f"Warning: frame interpolation failed, returning {frame_plan['generation_fps']}fps video: {e}")
+        return {**frame_plan, "method": method, "error": str(e)}
+
+
+def parse_num_variants(input_data: dict) -> int:
+    """Videos to sample in one batch (num_variants), 1 to WorkflowBuilder.MAX_VARIANTS."""
+    num_variants = input_data.get("num_variants", 1)
+    if not isinstance(num_variants, int) or num_variants < 1:
+        print(f"  Warning: ignoring num_variants={num_variants}")
+        return 1
+    if num_variants > WorkflowBuilder.MAX_VARIANTS:
+        print(f"  Warning: num_variants={num_variants} capped to {WorkflowBuilder.MAX_VARIANTS}")
+        return WorkflowBuilder.MAX_VARIANTS
+    return num_variants
+
+
+def find_output_video(video_info: dict):
+    """Local path of a ComfyUI video output, or None if the file is missing."""
+    video_filename = video_info.get("filename", "output.mp4")
+    video_subfolder = video_info.get("subfolder", "")
+    candidates = [os.path.join(output_dir, video_subfolder, video_filename) for output_dir in COMFYUI_OUTPUT_DIRS]
+    candidates += [os.path.join(output_dir, video_filename) for output_dir in COMFYUI_OUTPUT_DIRS if video_subfolder]
+    return next((path for path in candidates if os.path.exists(path)), None)
+
+
+def resolve_seed(input_data: dict, job_id: str, default: int = None) -> int:
+    """
+    Seed of a job; opens its journal entry.
+
+    Input "seed" wins. A retry of an input whose earlier run was cut off
+    (handler restart) reuses that run's seed, so its prompt can be
+    reattached; otherwise default, else random.
+    """
+    journal = get_journal()
+    input_hash = job_input_hash(input_data)
+    entry = journal.find_unfinished(input_hash)
+    if "seed" in input_data:
+        seed = input_data["seed"]
+    elif entry and entry["seed"] is not None:
+        seed = entry["seed"]
+        print(f"  Reusing seed {seed} of an interrupted run of this input")
+    elif default is not None:
+        seed = default
+    else:
+        seed = int(time.time() * 1000) % (2**48)
+    journal.start(input_hash, job_id, seed)
+    return seed
+
+
+class PendingReattach:
+    """A reattach in progress in this process; jobs of the same input wait for its video."""
+
+    def __init__(self, entry: dict):
+        self.entry = entry
+        self.done = threading.Event()
+        self.copies = {}    # Waiting job id -> video_info of its own copy (None: no video)
+
+
+# Input hash -> PendingReattach
+_reattaches = {}
+_reattaches_lock = threading.Lock()
+
+
+def copy_output_video(video_info: dict, job_id: str):
+    """Hard link (else copy) of a ComfyUI video output under a file name of the job; its video_info, or None."""
+    path = find_output_video(video_info)
+    if path is None:
+        return None
+    root, ext = os.path.splitext(path)
+    copy_path = f"{root}_{''.join(c if c.isalnum() or c in '-_' else '_' for c in str(job_id))}{ext}"
+    try:
+        try:
+            os.link(path, copy_path)
+        except OSError:
+            shutil.copyfile(path, copy_path)
+    except OSError as e:
+        print(f"  Warning: could not copy {path} for job {job_id}: {e}")
+        return None
+    return {**video_info, "filename": os.path.basename(copy_path)}
+
+
+def reattach_prompt(input_hash: str, job_id: str):
+    """
+    Resume an interrupted run of the same input from the job journal.
+
+    One job claims the journal entry (JobJournal.claim_unfinished) and uses
+    the journaled output if the video is still on disk, else waits for the
+    journaled prompt through /history if ComfyUI still has it (running,
+    queued or finished). Other jobs of the same input arriving meanwhile
+    wait for that job and get their own copy of its video (the owner's
+    file is deleted after its upload).
+
+    Returns:
+        Tuple of (prompt_id, video_info, attempts) as from execute_workflow,
+        or None to run the workflow
+    """
+    journal = get_journal()
+    start = time.time()
+    with _reattaches_lock:
+        pending = _reattaches.get(input_hash)
+        waiting = pending is not None
+        if waiting:
+            pending.copies[job_id] = None
+        else:
+            entry = journal.claim_unfinished(input_hash, job_id)
+            if entry is None:
+                return None
+            pending = _reattaches[input_hash] = PendingReattach(entry)
+    if waiting:
+        entry = pending.entry
+        print(f"Waiting for the reattach of prompt {entry['prompt_id']} by another job of this input")
+        pending.done.wait()
+        video_info = pending.copies[job_id]
+        if video_info is None:
+            return None
+        journal.update(input_hash, job_id, prompt_id=entry["prompt_id"], comfyui_url=entry["comfyui_url"],
+                       stage="generated", output=video_info)
+        instance = next((i for i in POOL.instances if i.url == entry["comfyui_url"]), POOL.instances[0])
+        return entry["prompt_id"], video_info, [{
+            "attempt": 1,
+            "profile": "default",
+            "result": "reattached",
+            "seconds": round(time.time() - start, 1),
+            "comfyui_instance": instance.index,
+        }]
+
+    video_info = None
+    try:
+        result = resume_prompt(entry, input_hash, job_id)
+        if result is not None:
+            video_info = result[1]
+        return result
+    finally:
+        with _reattaches_lock:
+            for waiting_job_id in pending.copies:
+                pending.copies[waiting_job_id] = video_info and copy_output_video(video_info, waiting_job_id)
+            del _reattaches[input_hash]
+        pending.done.set()
+        if video_info is None:
+            journal.update(input_hash, entry["job_id"], stage="failed")
+
+
+def resume_prompt(entry: dict, input_hash: str, job_id: str):
+    """Reattach the claimed journal entry's prompt (see reattach_prompt); None if it cannot be resumed."""
+    journal = get_journal()
+    instance = next((i for i in POOL.instances if i.url == entry["comfyui_url"]), None)
+    if instance is None:
+        return None
+    prompt_id = entry["prompt_id"]
+    start = time.time()
+
+    video_info = entry["output"]
+    if video_info and find_output_video(video_info):
+        print(f"Reusing output of interrupted prompt {prompt_id}: {video_info.get('filename')}")
+    else:
+        try:
+            history = requests.get(f"{instance.url}/history/{prompt_id}", timeout=10).json()
+            queue = requests.get(f"{instance.url}/queue", timeout=10).json()
+        except (requests.RequestException, ValueError) as e:
+            print(f"  Warning: could not check interrupted prompt {prompt_id}: {e}")
+            return None
+        queued = queue.get("queue_running", []) + queue.get("queue_pending", [])
+        if prompt_id not in history and not any(item[1] == prompt_id for item in queued):
+            return None
+        print(f"Reattaching to prompt {prompt_id} on ComfyUI instance {instance.index}")
+        journal.update(input_hash, entry["job_id"], stage="submitted")
+        try:
+            video_info = wait_for_completion(prompt_id, timeout=1080, base_url=instance.url)
+        except (TimeoutError, RuntimeError) as e:
+            print(f"  Reattached prompt failed, running the workflow again: {e}")
+            return None
+        if not find_output_video(video_info):
+            return None
+        journal.update(input_hash, entry["job_id"], stage="generated", output=video_info)
+    journal.update(input_hash, job_id, prompt_id=prompt_id, comfyui_url=instance.url, stage="generated",
+                   output=video_info)
+
+    attempts = [{
+        "attempt": 1,
+        "profile": "default",
+        "result": "reattached",
+        "seconds": round(time.time() - start, 1),
+        "comfyui_instance": instance.index,
+    }]
+    return prompt_id, video_info, attempts
+
+
+def finish_variant_videos(prompt_id: str, num_variants: int, seed: int, fps: int, frame_plan: dict,
+                          input_data: dict, job_id: str, attempts: list) -> list:
+    """
+    Collect, interpolate and upload variants 1..num_variants-1 of a batched job.
+
+    Variant 0 is the job's main video and goes through the usual path. The
+    outputs are read from the ComfyUI instance that ran the last attempt.
+
+    Returns:
+        One entry per variant: variant, seed, video_url / gcs_url / video_filename
+        (video_base64 + gcs_error if the upload failed, error if the output is missing)
+    """
+    output_ids = workflow_builder.get_variant_output_ids(num_variants)[1:]
+    try:
+        instance_url = POOL.instances[attempts[-1].get("comfyui_instance", 0)].url
+        history = requests.get(f"{instance_url}/history/{prompt_id}", timeout=10).json()
+        outputs = history.get(prompt_id, {}).get("outputs", {})
+    except (requests.RequestException, ValueError) as e:
+        print(f"Warning: could not read variant outputs: {e}")
+        outputs = {}
+
+    variants = []
+    for variant, node_id in enumerate(output_ids, start=1):
+        entry = {"variant": variant, "seed": seed + variant}
+        videos = outputs.get(node_id, {}).get("gifs", [])
+        video_path = find_output_video(videos[0]) if videos else None
+        if video_path is None:
+            entry["error"] = f"No video output from node {node_id}"
+            variants.append(entry)
+            continue
+
+        if frame_plan:
+            entry["interpolation"] = interpolate_to_fps(video_path, fps, frame_plan, input_data)
+
+        gcs_result = upload_video_to_gcs(video_path=video_path, job_id=job_id, subfolder="ltx2_videos")
+        if gcs_result["success"]:
+            entry.update({
+                "video_url": gcs_result["public_url"],
+                "gcs_url": gcs_result["gcs_url"],
+                "video_filename": gcs_result["filename"],
+                "video_size_bytes": gcs_result["size_bytes"],
+            })
+            delete_local_video(video_path)
+        else:
+            with open(video_path, "rb") as f:
+                entry.update({
+                    "video_base64": base64.b64encode(f.read()).decode(),
+                    "video_url": None,
+                    "gcs_url": None,
+                    "video_filename": os.path.basename(video_path),
+                    "gcs_error": gcs_result["error"],
+                })
+        variants.append(entry)
+    return variants
+
+
+def variant_summary(num_variants: int, seed: int, attempts: list) -> dict:
+    """Seeds and per-variant GPU time of a batched job (compare with one single-variant job)."""
+    sampling_seconds = attempts[-1].get("seconds", 0)
+    return {
+        "count": num_variants,
+        "seeds": [seed + variant for variant in range(num_variants)],
+        "workflow_seconds": sampling_seconds,
+        "seconds_per_variant": round(sampling_seconds / num_variants, 1),
+    }
+
+
+def list_variant_videos(seed: int, gcs_result: dict, video_filename: str, variant_videos):
+    """Response "videos" of a batched job: variant 0 (the main video) followed by variant_videos."""
+    if variant_videos is None:
+        return None
+    main = {"variant": 0, "seed": seed}
+    if gcs_result["success"]:
+        main.update({
+            "video_url": gcs_result["public_url"],
+            "gcs_url": gcs_result["gcs_url"],
+            "video_filename": gcs_result["filename"],
+            "video_size_bytes": gcs_result["size_bytes"],
+        })
+    else:
+        # video_base64 of variant 0 is the top-level one
+        main.update({"video_url": None, "gcs_url": None, "video_filename": video_filename})
+    return [main] + variant_videos
+
+
+def plan_resolution(input_data: dict, image_bytes: bytes = None):
+    """
+    Output size for a request: the resolution bucket matching the image's
+    aspect ratio (WorkflowBuilder.snap_resolution). Without width and
+    height the tier is the one of the default 1280x736 (720p); an explicit
+    width or height is used as given unless resolution_tier is also set.
+    Tier "auto" picks the tier closest to width x height; exact_resolution
+    turns snapping off.
+
+    Returns:
+        Tuple of (width, height, bucket_info or None)
+
+    Raises:
+        ValueError: Unknown resolution_tier
+    """
+    width = input_data.get("width", 1280)
+    height = input_data.get("height", 736)
+    tier = input_data.get("resolution_tier")
+    sized = "width" in input_data or "height" in input_data
+    if input_data.get("exact_resolution", False) or (sized and not tier):
+        return width, height, None
+
+    aspect_ratio = width / height
+    if image_bytes is not None:
+        try:
+            image_width, image_height = MediaPreprocessor.get_image_size(image_bytes)
+            aspect_ratio = image_width / image_height
+        except Exception as e:
+            print(f"  Warning: could not read image size, bucketing by requested size: {e}")
+
+    if tier in (None, "", "auto"):
+        tier = None
+    bucket = workflow_builder.snap_resolution(aspect_ratio, width, height, tier=tier)
+    print(f"  Resolution bucket: {bucket['width']}x{bucket['height']} ({bucket['tier']}, "
+          f"source aspect {bucket['source_aspect_ratio']})")
+    return bucket["width"], bucket["height"], bucket
+
+
+@functools.lru_cache(maxsize=1)
+def latent_upscaler_available() -> bool:
+    """Check that ComfyUI lists the LTX-2 latent upsampler model (two_stage latent mode)."""
+    try:
+        info = requests.get(f"{comfyui_url()}/object_info/LatentUpscaleModelLoader", timeout=10).json()
+        models = info["LatentUpscaleModelLoader"]["input"]["required"]["model_name"][0]
+        return WorkflowBuilder.LATENT_UPSCALER_MODEL in models
+    except (requests.RequestException, ValueError, KeyError, IndexError, TypeError):
+        return False
+
+
+def plan_two_stage(input_data: dict, width: int, height: int):
+    """
+    Two-stage plan for the two_stage input, or None for one-stage generation.
+
+    two_stage: true (latent if the upsampler model is installed, else pixel),
+    "latent" or "pixel"; two_stage_steps / two_stage_denoise set the
+    refinement pass.
+    """
+    mode = input_data.get("two_stage", False)
+    if not mode:
+        return None
+    if mode not in ("latent", "pixel"):
+        mode = "latent"
+    if mode == "latent" and not latent_upscaler_available():
+        print(f"  Warning: {WorkflowBuilder.LATENT_UPSCALER_MODEL} not installed, upscaling in pixel space")
+        mode = "pixel"
+    return workflow_builder.plan_two_stage(
+        width, height, mode=mode,
+        refine_steps=int(input_data.get("two_stage_steps", 3)),
+        refine_denoise=float(input_data.get("two_stage_denoise", 0.4)),
+    )
+
+
+def plan_job_latent(event: dict, input_data: dict):
+    """
+    Decide where the final latents of this job are persisted (persist_latent).
+
+    Returns:
+        Tuple of (latent job id or None, job latent cache key or None)
+    """
+    if not input_data.get("persist_latent", False):
+        return None, None
+    latent_job_id = str(event.get("id") or f"local_{int(time.time() * 1000)}")
+    return latent_job_id, job_latent_key(latent_job_id)
+
+
+def save_job_latent_metadata(latent_key: str, metadata: dict) -> bool:
+    """
+    Write the generation parameters next to persisted job latents.
+
+    Returns:
+        True if the latents exist and the metadata was written
+    """
+    cache = LatentCache(JOB_LATENT_DIR, JOB_LATENT_MAX_BYTES)
+    if not cache.contains(latent_key):
+        print(f"  Warning: job latents not found after generation: {latent_key}")
+        return False
+    try:
+        cache.save_metadata(latent_key, {**metadata, "created_at": time.time()})
+    except OSError as e:
+        print(f"  Warning: failed to write job latent metadata: {e}")
+        return False
+    return True
+
+
+class ComfyUIOOMError(RuntimeError):
+    """ComfyUI execution failed with CUDA out-of-memory (node_type: the node that ran out, if reported)."""
+
+    def __init__(self, message: str, node_type: str = None):
+        super().__init__(message)
+        self.node_type = node_type
+
+    @property
+    def in_decode(self) -> bool:
+        return self.node_type in DECODE_NODE_TYPES
+
+
+class ComfyUIInterruptedError(RuntimeError):
+    """ComfyUI execution was interrupted (/interrupt)."""
+
+
+def is_oom_error(messages) -> bool:
+    """Check ComfyUI status messages for a CUDA out-of-memory error."""
+    text = json.dumps(messages, default=str).lower()
+    return any(marker.lower() in text for marker in OOM_ERROR_MARKERS)
+
+
+def failed_node_type(messages):
+    """class_type of the node a failed prompt stopped at (execution_error), or None."""
+    for message in messages:
+        if message and message[0] == "execution_error" and isinstance(message[1], dict):
+            return message[1].get("node_type")
+    return None
+
+
+def free_comfyui_memory():
+    """Ask ComfyUI to unload all models and empty the CUDA cache (/free)."""
+    try:
+        requests.post(
+            f"{comfyui_url()}/free", json={"unload_models": True, "free_memory": True}, timeout=10
+        )
+        # /free is handled by the prompt worker between prompts
+        time.sleep(2)
+    except requests.RequestException as e:
+        print(f"  Warning: /free failed: {e}")
+
+
+def wait_for_completion(prompt_id: str, timeout: int = 1080, base_url: str = None) -> dict:
     """
     Wait for ComfyUI workflow to complete.
 
     Args:
         prompt_id: ComfyUI prompt ID
         timeout: Maximum wait time in seconds
+        base_url: ComfyUI instance running the prompt (default: comfyui_url())
 
     Returns:
         Video output info dict with filename
 
     Raises:
         TimeoutError: If generation times out
+        ComfyUIOOMError: If generation fails with CUDA out-of-memory
+        ComfyUIInterruptedError: If the prompt was interrupted
         RuntimeError: If generation fails
     """
     print(f"Waiting for generation (prompt_id: {prompt_id})...")
@@ -132,13 +773,18 @@ def wait_for_completion(prompt_id: str, timeout: int = 1080) -> dict:
 
     while time.time() - start_time < timeout:
         try:
-            response = requests.get(f"{COMFYUI_URL}/history/{prompt_id}", timeout=10)
+            response = requests.get(f"{base_url or comfyui_url()}/history/{prompt_id}", timeout=10)
             history = response.json()
 
             if prompt_id in history:
                 # Check for errors
                 if history[prompt_id].get("status", {}).get("status_str") == "error":
                     error_msg = history[prompt_id].get("status", {}).get("messages", [])
+                    if is_oom_error(error_msg):
+                        raise ComfyUIOOMError(f"Generation failed (CUDA out of memory): {error_msg}",
+                                              node_type=failed_node_type(error_msg))
+                    if any(message and message[0] == "execution_interrupted" for message in error_msg):
+                        raise ComfyUIInterruptedError(f"Generation interrupted: {error_msg}")
                     raise RuntimeError(f"Generation failed: {error_msg}")
 
                 outputs = history[prompt_id].get("outputs", {})
@@ -168,6 +814,282 @@ def wait_for_completion(prompt_id: str, timeout: int = 1080) -> dict:
     raise TimeoutError(f"Generation timeout after {timeout}s (18 min limit)")
 
 
+def submit_workflow(workflow: dict, client_prefix: str, client_id: str = None) -> str:
+    """
+    Queue a workflow on ComfyUI.
+
+    Args:
+        workflow: Workflow to queue
+        client_prefix: client_id prefix
+        client_id: Full client_id (a progress listener is connected with it)
+
+    Returns:
+        prompt_id
+
+    Raises:
+        RuntimeError: If ComfyUI rejects the workflow
+    """
+    instance = POOL.current()
+    if COMFYUI_INSTANCES > 1 and instance is not None:
+        # Instances share the output dir; keep their filename counters apart
+        workflow = copy.deepcopy(workflow)
+        for node in workflow.values():
+            if isinstance(node["inputs"].get("filename_prefix"), str):
+                node["inputs"]["filename_prefix"] += f"_gpu{instance.index}"
+
+    payload = {
+        "prompt": workflow,
+        "client_id": client_id or f"{client_prefix}_{int(time.time())}"
+    }
+    current_capture().set_workflow(workflow)
+
+    response = requests.post(f"{comfyui_url()}/prompt", json=payload, timeout=30)
+    if response.status_code != 200:
+        raise RuntimeError(f"ComfyUI rejected workflow: {response.text}")
+
+    result = response.json()
+    if "error" in result:
+        raise RuntimeError(f"ComfyUI error: {result['error']}")
+
+    prompt_id = result.get("prompt_id")
+    if not prompt_id:
+        raise RuntimeError("No prompt_id returned from ComfyUI")
+    return prompt_id
+
+
+def execute_workflow(workflow: dict, build_workflow, decode_vram_bytes, input_data: dict,
+                     client_prefix: str = "runpod", job_id: str = None):
+    """
+    Run a workflow, retrying once with a degraded memory profile on CUDA OOM.
+
+    Holds the GPU slot (job_pipeline.gpu_slot) from submission to the last
+    attempt, so concurrent jobs queue here rather than in ComfyUI. With
+    several ComfyUI instances the job goes to the least-loaded one,
+    preferring an instance that last ran the same LoRA config. If a more
+    urgent job preempts the prompt, the slot is released and the job waits
+    for one again (attempt result "preempted").
+
+    Each submission is recorded in the job's journal entry; if an earlier
+    handler process was cut off while running the same input, its prompt
+    is reattached instead (attempt result "reattached", see reattach_prompt).
+
+    Reports the gpu_wait and loading stages, and the prompt's sampler steps
+    and decode progress from ComfyUI's websocket, to the job's progress
+    tracker (job_progress.py), with the workflow's cost for the ETA.
+
+    On OOM in the VAE decode (DECODE_NODE_TYPES), ComfyUI unloads its models
+    (/free) and the workflow is rebuilt with OOM_RETRY_VRAM_SCALE of the
+    decode VRAM budget (smaller VAE tiles), optionally capped to
+    OOM_RETRY_TEMPORAL_SIZE frames per temporal tile. An OOM anywhere else
+    (sampling, model loading) is not retried: the retry only changes the
+    decode tiling, so the job fails with an error naming the node.
+
+    Args:
+        workflow: Workflow for the first attempt
+        build_workflow: Callable(decode_vram_bytes=...) rebuilding the same job
+        decode_vram_bytes: Decode VRAM budget of the first attempt (None = template tiling)
+        input_data: Job input (oom_retry, oom_retry_temporal_size)
+        client_prefix: ComfyUI client_id prefix
+        job_id: Job id (its journal entry, with the input hash)
+
+    Returns:
+        Tuple of (prompt_id, video_info, attempts)
+
+    Raises:
+        TimeoutError / RuntimeError: If the last attempt fails; the exception
+        carries the attempt list as .attempts
+    """
+    # A run of the same input cut off by a handler restart: finish it instead of recomputing
+    input_hash = job_input_hash(input_data)
+    progress = current_progress()
+    reattached = reattach_prompt(input_hash, job_id)
+    if reattached:
+        progress.set_stage("postprocess")
+        return reattached
+    journal = get_journal()
+    progress.plan(workflow_builder.estimate_workflow_cost(workflow))
+
+    attempts = []
+    profile = "default"
+    max_attempts = 2 if input_data.get("oom_retry", True) else 1
+
+    # One prompt per ComfyUI instance at a time; other jobs keep preparing / uploading meanwhile.
+    # A prompt preempted for a more urgent lane waits for a slot again and reruns
+    while True:
+        progress.set_stage("gpu_wait")
+        with gpu_slot(workflow_builder.get_lora_config(workflow)) as gpu_wait_seconds:
+            instance = POOL.current()
+            if gpu_wait_seconds > 0.1:
+                print(f"  Waited {gpu_wait_seconds:.1f}s for the GPU")
+            if profile == "default" and (gpu_wait_seconds > 0.1 or COMFYUI_INSTANCES > 1):
+                # The budget was read while another job's prompt held the GPU, or from another instance; re-read it
+                fresh_budget = get_decode_vram_budget() if decode_vram_bytes else None
+                if fresh_budget and fresh_budget != decode_vram_bytes:
+                    decode_vram_bytes = fresh_budget
+                    workflow = build_workflow(decode_vram_bytes=decode_vram_bytes)
+
+            while True:
+                attempt = {
+                    "attempt": len(attempts) + 1,
+                    "profile": profile,
+                    "decode_tiling": workflow_builder.get_decode_tiling(workflow),
+                }
+                if gpu_wait_seconds is not None:
+                    attempt["gpu_wait_seconds"] = round(gpu_wait_seconds, 1)
+                    gpu_wait_seconds = None
+                attempt["comfyui_instance"] = instance.index
+                attempts.append(attempt)
+                attempt_start = time.time()
+                progress.set_stage("loading")
+                client_id = f"{client_prefix}_{uuid.uuid4().hex}"
+                listener = ComfyUIProgressListener(instance.url, client_id, workflow, progress)
+                try:
+                    with listener:
+                        prompt_id = submit_workflow(workflow, client_prefix, client_id)
+                        POOL.prompt_started(prompt_id)
+                        journal.update(input_hash, job_id, prompt_id=prompt_id, comfyui_url=instance.url,
+                                       stage="submitted")
+                        video_info = wait_for_completion(prompt_id, timeout=1080)
+                    journal.update(input_hash, job_id, stage="generated", output=video_info)
+                    progress.set_stage("postprocess")
+                    attempt["result"] = "success"
+                    attempt["seconds"] = round(time.time() - attempt_start, 1)
+                    return prompt_id, video_info, attempts
+                except ComfyUIOOMError as e:
+                    attempt["result"] = "oom"
+                    attempt["oom_node"] = e.node_type
+                    attempt["seconds"] = round(time.time() - attempt_start, 1)
+                    if not e.in_decode:
+                        # Smaller decode tiles do not help the sampler; the same graph would fail again
+                        free_comfyui_memory()
+                        error = ComfyUIOOMError(
+                            f"CUDA out of memory in {e.node_type or 'an unknown node'} (not the VAE decode): "
+                            f"lower width/height or the duration, use two_stage, or fewer num_variants",
+                            node_type=e.node_type)
+                        error.attempts = attempts
+                        raise error from e
+                    if sum(a["result"] == "oom" for a in attempts) >= max_attempts:
+                        e.attempts = attempts
+                        raise
+                    print(f"  CUDA OOM in {e.node_type} on attempt {attempt['attempt']}, "
+                          f"freeing ComfyUI memory and retrying with smaller decode tiles")
+                except ComfyUIInterruptedError as e:
+                    attempt["seconds"] = round(time.time() - attempt_start, 1)
+                    if not POOL.record_preemption():
+                        attempt["result"] = "error"
+                        e.attempts = attempts
+                        raise
+                    attempt["result"] = "preempted"
+                    print(f"  Preempted on attempt {attempt['attempt']}, waiting for the GPU again")
+                    break
+                except (TimeoutError, RuntimeError) as e:
+                    attempt["result"] = "error"
+                    attempt["seconds"] = round(time.time() - attempt_start, 1)
+                    e.attempts = attempts
+                    raise
+                finally:
+                    current_capture().add_node_timings(listener.node_seconds, workflow)
+
+                free_comfyui_memory()
+                base_budget = decode_vram_bytes or get_decode_vram_budget() or OOM_RETRY_FALLBACK_VRAM_BYTES
+                profile = "low_memory"
+                workflow = build_workflow(decode_vram_bytes=int(base_budget * OOM_RETRY_VRAM_SCALE))
+                temporal_cap = input_data.get("oom_retry_temporal_size", OOM_RETRY_TEMPORAL_SIZE)
+                if temporal_cap:
+                    workflow_builder.cap_decode_temporal_size(workflow, int(temporal_cap))
+
+
+def attempt_gpu_seconds(attempts: list) -> float:
+    """ComfyUI time of a job's prompts, all attempts (GPU slot waits excluded)."""
+    return round(sum(attempt.get("seconds", 0) for attempt in attempts), 1)
+
+
+def run_video_job(event: dict, workflow: dict, build_workflow, decode_vram_bytes, input_data: dict,
+                  client_prefix: str, finish) -> dict:
+    """
+    Shared tail of the generation handlers: run the workflow
+    (execute_workflow), locate its video, let the mode post-process it,
+    upload it to GCS (base64 fallback) and build the success response.
+
+    Args:
+        event: RunPod event (job id for the GCS path)
+        workflow, build_workflow, decode_vram_bytes, input_data, client_prefix: See execute_workflow
+        finish: Callable(prompt_id, video_path, attempts) -> dict of the mode's
+            output fields. It post-processes the local video in place. A
+            "variant_videos" entry (finish_variant_videos, or None) becomes the
+            response "videos" list (list_variant_videos, with the "seed" field).
+
+    Returns:
+        Handler result dict
+    """
+    try:
+        prompt_id, video_info, attempts = execute_workflow(
+            workflow, build_workflow, decode_vram_bytes, input_data, client_prefix=client_prefix,
+            job_id=event.get("id"),
+        )
+    except (TimeoutError, RuntimeError) as e:
+        return {"status": "error", "error": str(e), "attempts": getattr(e, "attempts", None)}
+
+    video_filename = video_info.get("filename", "output.mp4")
+    video_path = find_output_video(video_info)
+    if not video_path:
+        return {"status": "error", "error": f"Video file not found: {video_filename}"}
+
+    fields = finish(prompt_id, video_path, attempts)
+    has_variants = "variant_videos" in fields
+    variant_videos = fields.pop("variant_videos", None)
+    fields.update(memory_profile=attempts[-1]["profile"], attempts=attempts)
+    if input_data.get("streaming_output", False):
+        # False: requested but skipped (frames post-processed in the graph, see _apply_streaming_output)
+        fields["streaming_output"] = WorkflowBuilder.is_streaming_output(workflow)
+
+    print("Step 5/5: Uploading to GCS...")
+    current_progress().set_stage("upload", units=os.path.getsize(video_path) / 1e6)
+    gcs_result = upload_video_to_gcs(
+        video_path=video_path,
+        job_id=event.get("id", None),
+        subfolder="ltx2_videos",
+        on_progress=current_progress().set_step
+    )
+    if has_variants:
+        fields["videos"] = list_variant_videos(fields["seed"], gcs_result, video_filename, variant_videos)
+
+    if not gcs_result["success"]:
+        # Fallback to base64 if GCS upload fails
+        print(f"Warning: GCS upload failed: {gcs_result['error']}")
+        print("Falling back to base64 encoding...")
+        with open(video_path, "rb") as f:
+            video_base64 = base64.b64encode(f.read()).decode()
+
+        return {
+            "status": "success",
+            "output": {
+                "video_base64": video_base64,
+                "video_url": None,
+                "gcs_url": None,
+                "video_filename": video_filename,
+                "prompt_id": prompt_id,
+                **fields,
+                "gcs_error": gcs_result["error"]
+            }
+        }
+
+    # Clean up local file after successful upload
+    delete_local_video(video_path)
+
+    return {
+        "status": "success",
+        "output": {
+            "video_url": gcs_result["public_url"],
+            "gcs_url": gcs_result["gcs_url"],
+            "video_filename": gcs_result["filename"],
+            "video_size_bytes": gcs_result["size_bytes"],
+            "prompt_id": prompt_id,
+            **fields
+        }
+    }
+
+
 def handler(event):
     """
     Enhanced RunPod Handler with URL support and template-based workflow.
@@ -201,8 +1123,6 @@ def handler(event):
         }
     }
     """
-    global workflow_builder
-
     start_time = time.time()
 
     try:
@@ -211,14 +1131,9 @@ def handler(event):
             return {"status": "error", "error": "ComfyUI failed to start"}
 
         # Initialize workflow builder if needed
-        if workflow_builder is None:
-            template_path = "/comfyui/workflows/ltx2_enhanced.json"
-            audio_gen_template_path = "/comfyui/workflows/ltx2_audio_gen.json"
-            multiframe_template_path = "/comfyui/workflows/ltx2_multiframe.json"
-            if not os.path.exists(template_path):
-                return {"status": "error", "error": f"Workflow template not found: {template_path}"}
-            workflow_builder = WorkflowBuilder(template_path, audio_gen_template_path, multiframe_template_path)
-            print(f"Workflow builder initialized from {template_path}")
+        builder_error = init_workflow_builder()
+        if builder_error:
+            return {"status": "error", "error": builder_error}
 
         input_data = event.get("input", {})
 
@@ -239,20 +1154,55 @@ def handler(event):
 
         # Download files
         print("Step 1/4: Downloading files...")
+        current_progress().set_stage("download")
         try:
             image_bytes, image_filename = URLDownloader.download_image(image_url)
         except Exception as e:
             return {"status": "error", "error": f"Failed to download image: {e}"}
 
+        num_variants = parse_num_variants(input_data)
+        trim_silence = bool(input_data.get("trim_silence", False))
+        if trim_silence and num_variants > 1:
+            print("  Warning: trim_silence is not supported with num_variants, generating full length")
+            trim_silence = False
         try:
-            audio_bytes, audio_filename, audio_duration = URLDownloader.download_audio(audio_url)
+            source_audio_bytes, source_audio_filename, _ = URLDownloader.download_audio(
+                audio_url, compute_duration=False
+            )
+            audio_bytes, audio_filename, audio_duration, audio_ingest = normalize_audio_for_upload(
+                source_audio_bytes, source_audio_filename, input_data, trim_silence=trim_silence
+            )
         except Exception as e:
             return {"status": "error", "error": f"Failed to download audio: {e}"}
 
         print(f"  Audio duration: {audio_duration:.2f}s")
 
+        # Silence cut on the CPU: only the voiced span is generated
+        silence = (audio_ingest or {}).get("silence")
+        if trim_silence and silence is None:
+            print("  Warning: trim_silence requires normalize_audio, generating full length")
+        if silence and not (silence["leading_seconds"] or silence["trailing_seconds"]):
+            silence = None
+        full_audio_duration = silence["full_duration"] if silence else audio_duration
+
+        width, height, resolution_bucket = plan_resolution(input_data, image_bytes)
+
+        # Optional two-stage generation: sample at half size, upscale to width x height
+        two_stage_plan = plan_two_stage(input_data, width, height)
+        if two_stage_plan and num_variants > 1:
+            print("  Warning: two_stage is not supported with num_variants, sampling at full size")
+            two_stage_plan = None
+        image_width, image_height = two_stage_plan["working"] if two_stage_plan else (width, height)
+        encode_width, encode_height = two_stage_plan["stage1"] if two_stage_plan else (width, height)
+
+        # Resize/pad on CPU so the upload is small and the resize node can be skipped
+        image_bytes, image_filename, image_ingest = normalize_image_for_upload(
+            image_bytes, image_filename, image_width, image_height, input_data.get("normalize_image", True)
+        )
+
         # Upload files to ComfyUI
         print("Step 2/4: Uploading to ComfyUI...")
+        current_progress().set_stage("prepare")
         try:
             image_name = upload_file_to_comfyui(image_bytes, image_filename)
             audio_name = upload_file_to_comfyui(audio_bytes, audio_filename)
@@ -260,9 +1210,7 @@ def handler(event):
             return {"status": "error", "error": f"Failed to upload files: {e}"}
 
         # Get configuration
-        width = input_data.get("width", 1280)
-        height = input_data.get("height", 736)
-        seed = input_data.get("seed", int(time.time() * 1000) % (2**48))
+        seed = resolve_seed(input_data, event.get("id"))
         prompt_positive = input_data.get("prompt_positive", DEFAULT_POSITIVE_PROMPT)
         prompt_negative = input_data.get("prompt_negative", DEFAULT_NEGATIVE_PROMPT)
 
@@ -290,9 +1238,25 @@ def handler(event):
             fps = 30
         fps = int(fps)
 
+        # Optional lower sampling frame rate, interpolated back to fps after generation
+        generation_fps = parse_generation_fps(input_data, fps)
+        render_fps = generation_fps or fps
+
+        latent_cache_plan, latent_cache_stats = plan_latent_cache(
+            input_data.get("use_latent_cache", True), latent_cache_lease_id(event),
+            image_bytes=image_bytes, width=encode_width, height=encode_height, img_compression=img_compression,
+            audio_bytes=audio_bytes,
+        )
+        latent_job_id, persist_latent_key = plan_job_latent(event, input_data)
+        if (two_stage_plan or num_variants > 1) and persist_latent_key:
+            print("  Warning: persist_latent is not supported with two_stage / num_variants, skipping")
+            latent_job_id, persist_latent_key = None, None
+
         # Build workflow using template
         print("Step 3/4: Building workflow...")
-        workflow = workflow_builder.build_workflow(
+        decode_vram_bytes = get_decode_vram_budget() if input_data.get("auto_decode_tiling", False) else None
+        build_workflow = functools.partial(
+            workflow_builder.build_workflow,
             image_name=image_name,
             audio_name=audio_name,
             audio_duration=audio_duration,
@@ -301,7 +1265,7 @@ def handler(event):
             seed=seed,
             width=width,
             height=height,
-            fps=fps,
+            fps=render_fps,
             steps=preset["steps"],
             cfg_scale=1.0,
             lora_distilled=lora_distilled,
@@ -310,118 +1274,154 @@ def handler(event):
             img_compression=img_compression,
             img_strength=img_strength,
             buffer_seconds=buffer_seconds,
+            image_prenormalized=image_ingest is not None,
+            audio_prenormalized=audio_ingest is not None,
+            latent_cache=latent_cache_plan,
+            persist_latent_key=persist_latent_key,
+            streaming_output=bool(input_data.get("streaming_output", False)),
+            two_stage=two_stage_plan,
+            num_variants=num_variants,
         )
+        workflow = build_workflow(decode_vram_bytes=decode_vram_bytes)
+        generated_frames = workflow["162"]["inputs"]["length"]
+        generated_audio_duration = audio_duration
+        two_stage = None
+        if two_stage_plan:
+            two_stage = {**two_stage_plan, **workflow_builder.estimate_two_stage_cost(
+                two_stage_plan, generated_frames, preset["steps"]
+            )}
+            if two_stage["mode"] == "latent":
+                two_stage["refine_seed"] = workflow_builder.refine_seed(seed)
 
         # Get video parameters for response
         video_params = workflow_builder.get_video_params(audio_duration, fps=fps, buffer_seconds=buffer_seconds)
+        frame_plan = None
+        if generation_fps:
+            frame_plan = workflow_builder.plan_generation_fps(
+                audio_duration, fps, generation_fps, buffer_seconds=buffer_seconds
+            )
+        silence_plan = None
+        if silence:
+            silence_plan = workflow_builder.plan_silence_trim(
+                full_audio_duration,
+                silence["leading_seconds"],
+                silence["trailing_seconds"],
+                fps=render_fps,
+                buffer_seconds=buffer_seconds,
+            )
 
         print(f"  Resolution: {width}x{height}")
         print(f"  Frames: {video_params['num_frames']} @ {fps}fps = {video_params['actual_duration']:.1f}s")
+        if frame_plan:
+            print(f"  Generating at {generation_fps}fps: {frame_plan['generated_frames']} frames "
+                  f"({frame_plan['frames_saved']} saved), interpolated to {fps}fps")
+        if silence_plan:
+            print(f"  Silence trim: generating {silence_plan['num_frames']}/{silence_plan['full_num_frames']} "
+                  f"frames ({silence_plan['frames_saved']} saved)")
+        if two_stage:
+            print(f"  Two-stage ({two_stage['mode']}): {two_stage['stage1'][0]}x{two_stage['stage1'][1]} -> "
+                  f"{two_stage['working'][0]}x{two_stage['working'][1]}, "
+                  f"estimated cost {two_stage['estimated_cost_ratio']:.0%} of one-stage")
+        if num_variants > 1:
+            print(f"  Variants: {num_variants} in one batch (seeds {seed}..{seed + num_variants - 1})")
         print(f"  Quality: {quality_preset} ({preset['description']})")
         print(f"  Seed: {seed}")
 
         # Submit to ComfyUI
         print("Step 4/4: Generating video...")
-        payload = {
-            "prompt": workflow,
-            "client_id": f"runpod_{int(time.time())}"
-        }
-
-        response = requests.post(f"{COMFYUI_URL}/prompt", json=payload, timeout=30)
-        if response.status_code != 200:
-            return {"status": "error", "error": f"ComfyUI rejected workflow: {response.text}"}
-
-        result = response.json()
-        if "error" in result:
-            return {"status": "error", "error": f"ComfyUI error: {result['error']}"}
-
-        prompt_id = result.get("prompt_id")
-        if not prompt_id:
-            return {"status": "error", "error": "No prompt_id returned from ComfyUI"}
-
-        # Wait for completion
-        try:
-            video_info = wait_for_completion(prompt_id, timeout=1080)
-        except TimeoutError as e:
-            return {"status": "error", "error": str(e)}
-        except RuntimeError as e:
-            return {"status": "error", "error": str(e)}
-
-        # Read and encode video
-        video_filename = video_info.get("filename", "output.mp4")
-        video_subfolder = video_info.get("subfolder", "")
-
-        if video_subfolder:
-            video_path = f"/workspace/ComfyUI/output/{video_subfolder}/{video_filename}"
-        else:
-            video_path = f"/workspace/ComfyUI/output/{video_filename}"
-
-        # Also check comfyui output directory
-        if not os.path.exists(video_path):
-            video_path = f"/comfyui/output/{video_filename}"
 
-        if not os.path.exists(video_path):
-            return {"status": "error", "error": f"Video file not found: {video_filename}"}
-
-        generation_time = time.time() - start_time
-
-        # Get job_id from RunPod event for GCS path organization
-        job_id = event.get("id", None)
-
-        # Upload to GCS
-        print("Step 5/5: Uploading to GCS...")
-        gcs_result = upload_video_to_gcs(
-            video_path=video_path,
-            job_id=job_id,
-            subfolder="ltx2_videos"
-        )
-
-        if not gcs_result["success"]:
-            # Fallback to base64 if GCS upload fails
-            print(f"Warning: GCS upload failed: {gcs_result['error']}")
-            print("Falling back to base64 encoding...")
-            with open(video_path, "rb") as f:
-                video_base64 = base64.b64encode(f.read()).decode()
-
-            return {
-                "status": "success",
-                "output": {
-                    "video_base64": video_base64,
-                    "video_url": None,
-                    "gcs_url": None,
-                    "video_filename": video_filename,
-                    "prompt_id": prompt_id,
-                    "resolution": f"{width}x{height}",
-                    "duration": f"{audio_duration:.1f}s",
-                    "frames": video_params["num_frames"],
-                    "fps": fps,
-                    "seed": seed,
-                    "quality_preset": quality_preset,
-                    "generation_time": round(generation_time, 1),
-                    "gcs_error": gcs_result["error"]
+        def finish(prompt_id, video_path, attempts):
+            # Restore the cut silence: static frames + the full-length original audio
+            delivered_duration, delivered_params = audio_duration, video_params
+            silence_trim = None
+            if silence_plan:
+                silence_trim = {
+                    "leading_seconds": round(silence["leading_seconds"], 3),
+                    "trailing_seconds": round(silence["trailing_seconds"], 3),
+                    "frames_generated": silence_plan["num_frames"],
+                    "frames_saved": silence_plan["frames_saved"],
                 }
-            }
-
-        # Clean up local file after successful upload
-        delete_local_video(video_path)
+                audio_ext = os.path.splitext(source_audio_filename)[1] or ".mp3"
+                full_audio_path = f"{os.path.splitext(video_path)[0]}.source{audio_ext}"
+                try:
+                    with open(full_audio_path, "wb") as f:
+                        f.write(source_audio_bytes)
+                    pad_video_and_mux_audio(
+                        video_path,
+                        full_audio_path,
+                        silence_plan["pad_start_frames"],
+                        silence_plan["pad_end_frames"],
+                        total_frames=silence_plan["full_num_frames"],
+                    )
+                    delivered_duration = full_audio_duration
+                    delivered_params = workflow_builder.get_video_params(
+                        delivered_duration, fps=fps, buffer_seconds=buffer_seconds
+                    )
+                except Exception as e:
+                    print(f"Warning: silence padding failed, returning voiced span only: {e}")
+                    silence_trim["error"] = str(e)
+                finally:
+                    if os.path.exists(full_audio_path):
+                        os.remove(full_audio_path)
+
+            # Low-fps generation: interpolate to the requested fps (audio stream copied as is)
+            interpolation = None
+            if frame_plan:
+                interpolation = interpolate_to_fps(video_path, fps, frame_plan, input_data)
+
+            generation_time = time.time() - start_time
+
+            saved_latent_job_id = latent_job_id
+            if latent_job_id and not save_job_latent_metadata(persist_latent_key, {
+                "mode": "lipsync",
+                "width": width,
+                "height": height,
+                "fps": render_fps,
+                "num_frames": generated_frames,
+                "audio_duration": generated_audio_duration,
+                "seed": seed,
+                "prompt_positive": prompt_positive,
+                "prompt_negative": prompt_negative,
+                "quality_preset": quality_preset,
+                "steps": preset["steps"],
+                "lora_distilled": lora_distilled,
+                "lora_detailer": lora_detailer,
+                "lora_camera": lora_camera,
+                "img_strength": img_strength,
+                "generation_time": round(generation_time, 1),
+                "gpu_seconds": attempt_gpu_seconds(attempts),
+            }):
+                saved_latent_job_id = None
+
+            # Batched variants: variant 0 is the main video, the others are uploaded here
+            variant_videos, variants = None, None
+            if num_variants > 1:
+                variant_videos = finish_variant_videos(
+                    prompt_id, num_variants, seed, fps, frame_plan, input_data, event.get("id"), attempts
+                )
+                variants = variant_summary(num_variants, seed, attempts)
 
-        return {
-            "status": "success",
-            "output": {
-                "video_url": gcs_result["public_url"],
-                "gcs_url": gcs_result["gcs_url"],
-                "video_filename": gcs_result["filename"],
-                "video_size_bytes": gcs_result["size_bytes"],
-                "prompt_id": prompt_id,
+            return {
                 "resolution": f"{width}x{height}",
-                "duration": f"{audio_duration:.1f}s",
-                "frames": video_params["num_frames"],
+                "duration": f"{delivered_duration:.1f}s",
+                "frames": delivered_params["num_frames"],
                 "fps": fps,
                 "seed": seed,
                 "quality_preset": quality_preset,
-                "generation_time": round(generation_time, 1)
+                "generation_time": round(generation_time, 1),
+                "resolution_bucket": resolution_bucket,
+                "image_ingest": image_ingest,
+                "audio_ingest": audio_ingest,
+                "silence_trim": silence_trim,
+                "interpolation": interpolation,
+                "two_stage": two_stage,
+                "variants": variants,
+                "variant_videos": variant_videos,
+                "latent_cache": latent_cache_stats,
+                "latent_job_id": saved_latent_job_id
             }
-        }
+
+        return run_video_job(event, workflow, build_workflow, decode_vram_bytes, input_data, "runpod", finish)
 
     except Exception as e:
         import traceback
@@ -469,8 +1469,6 @@ def audio_gen_handler(event):
         }
     }
     """
-    global workflow_builder
-
     start_time = time.time()
 
     try:
@@ -479,14 +1477,9 @@ def audio_gen_handler(event):
             return {"status": "error", "error": "ComfyUI failed to start"}
 
         # Initialize workflow builder if needed
-        if workflow_builder is None:
-            template_path = "/comfyui/workflows/ltx2_enhanced.json"
-            audio_gen_template_path = "/comfyui/workflows/ltx2_audio_gen.json"
-            multiframe_template_path = "/comfyui/workflows/ltx2_multiframe.json"
-            if not os.path.exists(template_path):
-                return {"status": "error", "error": f"Workflow template not found: {template_path}"}
-            workflow_builder = WorkflowBuilder(template_path, audio_gen_template_path, multiframe_template_path)
-            print(f"Workflow builder initialized with audio_gen template")
+        builder_error = init_workflow_builder()
+        if builder_error:
+            return {"status": "error", "error": builder_error}
 
         # Check if audio_gen template is available
         if workflow_builder.audio_gen_template is None:
@@ -520,22 +1513,38 @@ def audio_gen_handler(event):
 
         # Download image
         print("Step 1/4: Downloading image...")
+        current_progress().set_stage("download")
         try:
             image_bytes, image_filename = URLDownloader.download_image(image_url)
         except Exception as e:
             return {"status": "error", "error": f"Failed to download image: {e}"}
 
+        num_variants = parse_num_variants(input_data)
+        width, height, resolution_bucket = plan_resolution(input_data, image_bytes)
+
+        # Optional two-stage generation: sample at half size, upscale to width x height
+        two_stage_plan = plan_two_stage(input_data, width, height)
+        if two_stage_plan and num_variants > 1:
+            print("  Warning: two_stage is not supported with num_variants, sampling at full size")
+            two_stage_plan = None
+        image_width, image_height = two_stage_plan["working"] if two_stage_plan else (width, height)
+        encode_width, encode_height = two_stage_plan["stage1"] if two_stage_plan else (width, height)
+
+        # Resize/pad on CPU so the upload is small and the resize node can be skipped
+        image_bytes, image_filename, image_ingest = normalize_image_for_upload(
+            image_bytes, image_filename, image_width, image_height, input_data.get("normalize_image", True)
+        )
+
         # Upload image to ComfyUI
         print("Step 2/4: Uploading to ComfyUI...")
+        current_progress().set_stage("prepare")
         try:
             image_name = upload_file_to_comfyui(image_bytes, image_filename)
         except Exception as e:
             return {"status": "error", "error": f"Failed to upload image: {e}"}
 
         # Get configuration
-        width = input_data.get("width", 1280)
-        height = input_data.get("height", 736)
-        seed = input_data.get("seed", int(time.time() * 1000) % (2**48))
+        seed = resolve_seed(input_data, event.get("id"))
         prompt_positive = input_data.get("prompt_positive", DEFAULT_AUDIO_GEN_POSITIVE_PROMPT)
         prompt_negative = input_data.get("prompt_negative", DEFAULT_AUDIO_GEN_NEGATIVE_PROMPT)
 
@@ -563,9 +1572,24 @@ def audio_gen_handler(event):
             fps = 30
         fps = int(fps)
 
+        # Optional lower sampling frame rate, interpolated back to fps after generation
+        generation_fps = parse_generation_fps(input_data, fps)
+        render_fps = generation_fps or fps
+
         # Build workflow using audio generation template
+        latent_cache_plan, latent_cache_stats = plan_latent_cache(
+            input_data.get("use_latent_cache", True), latent_cache_lease_id(event),
+            image_bytes=image_bytes, width=encode_width, height=encode_height, img_compression=img_compression,
+        )
+        latent_job_id, persist_latent_key = plan_job_latent(event, input_data)
+        if (two_stage_plan or num_variants > 1) and persist_latent_key:
+            print("  Warning: persist_latent is not supported with two_stage / num_variants, skipping")
+            latent_job_id, persist_latent_key = None, None
+
         print("Step 3/4: Building audio generation workflow...")
-        workflow = workflow_builder.build_audio_gen_workflow(
+        decode_vram_bytes = get_decode_vram_budget() if input_data.get("auto_decode_tiling", False) else None
+        build_workflow = functools.partial(
+            workflow_builder.build_audio_gen_workflow,
             image_name=image_name,
             duration=duration,
             prompt_positive=prompt_positive,
@@ -573,7 +1597,7 @@ def audio_gen_handler(event):
             seed=seed,
             width=width,
             height=height,
-            fps=fps,
+            fps=render_fps,
             steps=preset["steps"],
             cfg_scale=1.0,
             lora_distilled=lora_distilled,
@@ -582,113 +1606,89 @@ def audio_gen_handler(event):
             img_compression=img_compression,
             img_strength=img_strength,
             buffer_seconds=buffer_seconds,
+            image_prenormalized=image_ingest is not None,
+            latent_cache=latent_cache_plan,
+            persist_latent_key=persist_latent_key,
+            streaming_output=bool(input_data.get("streaming_output", False)),
+            two_stage=two_stage_plan,
+            num_variants=num_variants,
         )
+        workflow = build_workflow(decode_vram_bytes=decode_vram_bytes)
+
+        two_stage = None
+        if two_stage_plan:
+            two_stage = {**two_stage_plan, **workflow_builder.estimate_two_stage_cost(
+                two_stage_plan, workflow["162"]["inputs"]["length"], preset["steps"]
+            )}
+            if two_stage["mode"] == "latent":
+                two_stage["refine_seed"] = workflow_builder.refine_seed(seed)
 
         # Get video/audio parameters for response
         gen_params = workflow_builder.get_audio_gen_params(duration, fps=fps, buffer_seconds=buffer_seconds)
+        frame_plan = None
+        if generation_fps:
+            frame_plan = workflow_builder.plan_generation_fps(
+                duration, fps, generation_fps, buffer_seconds=buffer_seconds
+            )
 
         print(f"  Resolution: {width}x{height}")
         print(f"  Duration: {duration}s")
         print(f"  Video frames: {gen_params['num_frames']} @ {fps}fps")
+        if frame_plan:
+            print(f"  Generating at {generation_fps}fps: {frame_plan['generated_frames']} frames "
+                  f"({frame_plan['frames_saved']} saved), interpolated to {fps}fps")
         print(f"  Audio frames: {gen_params['audio_frames']} @ 25Hz")
+        if two_stage:
+            print(f"  Two-stage ({two_stage['mode']}): {two_stage['stage1'][0]}x{two_stage['stage1'][1]} -> "
+                  f"{two_stage['working'][0]}x{two_stage['working'][1]}, "
+                  f"estimated cost {two_stage['estimated_cost_ratio']:.0%} of one-stage")
+        if num_variants > 1:
+            print(f"  Variants: {num_variants} in one batch (seeds {seed}..{seed + num_variants - 1})")
         print(f"  Quality: {quality_preset} ({preset['description']})")
         print(f"  Seed: {seed}")
 
         # Submit to ComfyUI
         print("Step 4/4: Generating video + audio...")
-        payload = {
-            "prompt": workflow,
-            "client_id": f"runpod_audiogen_{int(time.time())}"
-        }
-
-        response = requests.post(f"{COMFYUI_URL}/prompt", json=payload, timeout=30)
-        if response.status_code != 200:
-            return {"status": "error", "error": f"ComfyUI rejected workflow: {response.text}"}
 
-        result = response.json()
-        if "error" in result:
-            return {"status": "error", "error": f"ComfyUI error: {result['error']}"}
+        def finish(prompt_id, video_path, attempts):
+            # Low-fps generation: interpolate to the requested fps (audio stream copied as is)
+            interpolation = None
+            if frame_plan:
+                interpolation = interpolate_to_fps(video_path, fps, frame_plan, input_data)
 
-        prompt_id = result.get("prompt_id")
-        if not prompt_id:
-            return {"status": "error", "error": "No prompt_id returned from ComfyUI"}
-
-        # Wait for completion
-        try:
-            video_info = wait_for_completion(prompt_id, timeout=1080)
-        except TimeoutError as e:
-            return {"status": "error", "error": str(e)}
-        except RuntimeError as e:
-            return {"status": "error", "error": str(e)}
-
-        # Read and encode video
-        video_filename = video_info.get("filename", "output.mp4")
-        video_subfolder = video_info.get("subfolder", "")
-
-        if video_subfolder:
-            video_path = f"/workspace/ComfyUI/output/{video_subfolder}/{video_filename}"
-        else:
-            video_path = f"/workspace/ComfyUI/output/{video_filename}"
-
-        # Also check comfyui output directory
-        if not os.path.exists(video_path):
-            video_path = f"/comfyui/output/{video_filename}"
-
-        if not os.path.exists(video_path):
-            return {"status": "error", "error": f"Video file not found: {video_filename}"}
-
-        generation_time = time.time() - start_time
-
-        # Get job_id from RunPod event for GCS path organization
-        job_id = event.get("id", None)
-
-        # Upload to GCS
-        print("Step 5/5: Uploading to GCS...")
-        gcs_result = upload_video_to_gcs(
-            video_path=video_path,
-            job_id=job_id,
-            subfolder="ltx2_videos"
-        )
+            generation_time = time.time() - start_time
 
-        if not gcs_result["success"]:
-            # Fallback to base64 if GCS upload fails
-            print(f"Warning: GCS upload failed: {gcs_result['error']}")
-            print("Falling back to base64 encoding...")
-            with open(video_path, "rb") as f:
-                video_base64 = base64.b64encode(f.read()).decode()
+            saved_latent_job_id = latent_job_id
+            if latent_job_id and not save_job_latent_metadata(persist_latent_key, {
+                "mode": "audio_gen",
+                "width": width,
+                "height": height,
+                "fps": render_fps,
+                "num_frames": workflow["162"]["inputs"]["length"],
+                "audio_duration": duration,
+                "seed": seed,
+                "prompt_positive": prompt_positive,
+                "prompt_negative": prompt_negative,
+                "quality_preset": quality_preset,
+                "steps": preset["steps"],
+                "lora_distilled": lora_distilled,
+                "lora_detailer": lora_detailer,
+                "lora_camera": lora_camera,
+                "img_strength": img_strength,
+                "generation_time": round(generation_time, 1),
+                "gpu_seconds": attempt_gpu_seconds(attempts),
+            }):
+                saved_latent_job_id = None
+
+            # Batched variants: variant 0 is the main video, the others are uploaded here
+            variant_videos, variants = None, None
+            if num_variants > 1:
+                variant_videos = finish_variant_videos(
+                    prompt_id, num_variants, seed, fps, frame_plan, input_data, event.get("id"), attempts
+                )
+                variants = variant_summary(num_variants, seed, attempts)
 
             return {
-                "status": "success",
-                "output": {
-                    "video_base64": video_base64,
-                    "video_url": None,
-                    "gcs_url": None,
-                    "video_filename": video_filename,
-                    "prompt_id": prompt_id,
-                    "resolution": f"{width}x{height}",
-                    "duration": f"{duration:.1f}s",
-                    "frames": gen_params["num_frames"],
-                    "audio_frames": gen_params["audio_frames"],
-                    "fps": fps,
-                    "seed": seed,
-                    "quality_preset": quality_preset,
-                    "mode": "audio_gen",
-                    "generation_time": round(generation_time, 1),
-                    "gcs_error": gcs_result["error"]
-                }
-            }
-
-        # Clean up local file after successful upload
-        delete_local_video(video_path)
-
-        return {
-            "status": "success",
-            "output": {
-                "video_url": gcs_result["public_url"],
-                "gcs_url": gcs_result["gcs_url"],
-                "video_filename": gcs_result["filename"],
-                "video_size_bytes": gcs_result["size_bytes"],
-                "prompt_id": prompt_id,
                 "resolution": f"{width}x{height}",
                 "duration": f"{duration:.1f}s",
                 "frames": gen_params["num_frames"],
@@ -697,9 +1697,19 @@ def audio_gen_handler(event):
                 "seed": seed,
                 "quality_preset": quality_preset,
                 "mode": "audio_gen",
-                "generation_time": round(generation_time, 1)
+                "generation_time": round(generation_time, 1),
+                "resolution_bucket": resolution_bucket,
+                "image_ingest": image_ingest,
+                "interpolation": interpolation,
+                "two_stage": two_stage,
+                "variants": variants,
+                "variant_videos": variant_videos,
+                "latent_cache": latent_cache_stats,
+                "latent_job_id": saved_latent_job_id
             }
-        }
+
+        return run_video_job(event, workflow, build_workflow, decode_vram_bytes, input_data, "runpod_audiogen",
+                             finish)
 
     except Exception as e:
         import traceback
@@ -743,8 +1753,6 @@ def multi_keyframe_handler(event):
         }
     }
     """
-    global workflow_builder
-
     start_time = time.time()
 
     try:
@@ -753,14 +1761,9 @@ def multi_keyframe_handler(event):
             return {"status": "error", "error": "ComfyUI failed to start"}
 
         # Initialize workflow builder if needed
-        if workflow_builder is None:
-            template_path = "/comfyui/workflows/ltx2_enhanced.json"
-            audio_gen_template_path = "/comfyui/workflows/ltx2_audio_gen.json"
-            multiframe_template_path = "/comfyui/workflows/ltx2_multiframe.json"
-            if not os.path.exists(template_path):
-                return {"status": "error", "error": f"Workflow template not found: {template_path}"}
-            workflow_builder = WorkflowBuilder(template_path, audio_gen_template_path, multiframe_template_path)
-            print(f"Workflow builder initialized with multiframe template")
+        builder_error = init_workflow_builder()
+        if builder_error:
+            return {"status": "error", "error": builder_error}
 
         # Check if multiframe template is available
         if workflow_builder.multiframe_template is None:
@@ -811,20 +1814,50 @@ def multi_keyframe_handler(event):
         if not is_mode_3a and not is_mode_3b:
             return {"status": "error", "error": "Must provide either audio_url (Mode 3a) or duration (Mode 3b)"}
 
+        normalize_image = input_data.get("normalize_image", True)
+
         # Download keyframe images
         print(f"Step 1/5: Downloading {len(keyframes)} keyframe images...")
+        current_progress().set_stage("download")
         keyframe_data = []
+        image_ingest = []  # One entry per unique image
+        # Repeated keyframes (loop-back, bookends) are fetched once per URL and
+        # staged once per content hash; the builder then shares one
+        # Load/Resize/Preprocess chain per uploaded image
+        image_name_by_url = {}
+        image_name_by_hash = {}
         for i, kf in enumerate(keyframes):
-            try:
-                image_bytes, image_filename = URLDownloader.download_image(kf["image_url"])
-            except Exception as e:
-                return {"status": "error", "error": f"Failed to download keyframe {i+1} image: {e}"}
+            image_url = kf["image_url"]
+            image_name = image_name_by_url.get(image_url)
 
-            # Upload to ComfyUI
-            try:
-                image_name = upload_file_to_comfyui(image_bytes, f"keyframe_{i}_{image_filename}")
-            except Exception as e:
-                return {"status": "error", "error": f"Failed to upload keyframe {i+1} image: {e}"}
+            if image_name is None:
+                try:
+                    image_bytes, image_filename = URLDownloader.download_image(image_url)
+                except Exception as e:
+                    return {"status": "error", "error": f"Failed to download keyframe {i+1} image: {e}"}
+
+                # The first keyframe's aspect ratio picks the resolution bucket
+                if i == 0:
+                    width, height, resolution_bucket = plan_resolution(input_data, image_bytes)
+
+                content_hash = hashlib.sha256(image_bytes).hexdigest()
+                image_name = image_name_by_hash.get(content_hash)
+
+                if image_name is None:
+                    image_bytes, image_filename, ingest_info = normalize_image_for_upload(
+                        image_bytes, image_filename, width, height, normalize_image
+                    )
+                    image_ingest.append(ingest_info)
+
+                    # Upload to ComfyUI
+                    try:
+                        image_name = upload_file_to_comfyui(image_bytes, f"keyframe_{i}_{image_filename}")
+                    except Exception as e:
+                        return {"status": "error", "error": f"Failed to upload keyframe {i+1} image: {e}"}
+                    image_name_by_hash[content_hash] = image_name
+                image_name_by_url[image_url] = image_name
+            else:
+                print(f"  Keyframe {i+1}: reusing {image_name}")
 
             keyframe_data.append({
                 "image_name": image_name,
@@ -832,9 +1865,14 @@ def multi_keyframe_handler(event):
                 "strength": kf.get("strength", 1.0 if i == 0 else 0.8)
             })
 
+        unique_images = len(image_name_by_hash)
+        if unique_images < len(keyframes):
+            print(f"  {len(keyframes)} keyframes use {unique_images} unique images")
+
         # Handle audio (Mode 3a) or duration (Mode 3b)
         audio_name = None
         audio_duration = None
+        audio_ingest = None
 
         if is_mode_3a:
             # Mode 3a: Download and process audio
@@ -843,7 +1881,10 @@ def multi_keyframe_handler(event):
                 return {"status": "error", "error": f"Invalid audio_url: {audio_url}"}
 
             try:
-                audio_bytes, audio_filename, audio_duration = URLDownloader.download_audio(audio_url)
+                audio_bytes, audio_filename, _ = URLDownloader.download_audio(audio_url, compute_duration=False)
+                audio_bytes, audio_filename, audio_duration, audio_ingest = normalize_audio_for_upload(
+                    audio_bytes, audio_filename, input_data
+                )
             except Exception as e:
                 return {"status": "error", "error": f"Failed to download audio: {e}"}
 
@@ -869,9 +1910,7 @@ def multi_keyframe_handler(event):
             print(f"  Target duration: {duration:.1f}s")
 
         # Get configuration
-        width = input_data.get("width", 1280)
-        height = input_data.get("height", 736)
-        seed = input_data.get("seed", int(time.time() * 1000) % (2**48))
+        seed = resolve_seed(input_data, event.get("id"))
         prompt_positive = input_data.get("prompt_positive", DEFAULT_POSITIVE_PROMPT if is_mode_3a else DEFAULT_AUDIO_GEN_POSITIVE_PROMPT)
         prompt_negative = input_data.get("prompt_negative", DEFAULT_NEGATIVE_PROMPT if is_mode_3a else DEFAULT_AUDIO_GEN_NEGATIVE_PROMPT)
 
@@ -912,7 +1951,10 @@ def multi_keyframe_handler(event):
         # v55+: Always use chained LTXVAddGuide nodes (fixes flickering issue)
         # v59: auto_buffer_guide supports dual strategies to prevent buffer flickering
         print("Step 3/5: Building multi-keyframe workflow (chained LTXVAddGuide)...")
-        workflow = workflow_builder.build_multiframe_chained_workflow(
+        current_progress().set_stage("prepare")
+        decode_vram_bytes = get_decode_vram_budget() if input_data.get("auto_decode_tiling", False) else None
+        build_workflow = functools.partial(
+            workflow_builder.build_multiframe_chained_workflow,
             keyframes=keyframe_data,
             audio_name=audio_name,
             audio_duration=audio_duration,
@@ -933,7 +1975,11 @@ def multi_keyframe_handler(event):
             frame_alignment=frame_alignment,
             buffer_seconds=buffer_seconds,
             auto_buffer_guide=auto_buffer_guide,
+            image_prenormalized=all(info is not None for info in image_ingest),
+            audio_prenormalized=audio_ingest is not None,
+            streaming_output=bool(input_data.get("streaming_output", False)),
         )
+        workflow = build_workflow(decode_vram_bytes=decode_vram_bytes)
 
         # Get video parameters for response
         gen_params = workflow_builder.get_multiframe_params(
@@ -961,109 +2007,219 @@ def multi_keyframe_handler(event):
 
         # Submit to ComfyUI
         print("Step 4/5: Generating video...")
-        payload = {
-            "prompt": workflow,
-            "client_id": f"runpod_multiframe_{int(time.time())}"
+
+        def finish(prompt_id, video_path, attempts):
+            return {
+                "resolution": f"{width}x{height}",
+                "duration": f"{gen_params['target_duration']:.1f}s",
+                "frames": gen_params["num_frames"],
+                "keyframes": len(keyframe_data),
+                "unique_images": unique_images,
+                "fps": fps,
+                "seed": seed,
+                "quality_preset": quality_preset,
+                "mode": "3a" if is_mode_3a else "3b",
+                "generation_time": round(time.time() - start_time, 1),
+                "resolution_bucket": resolution_bucket,
+                "image_ingest": image_ingest,
+                "audio_ingest": audio_ingest
+            }
+
+        return run_video_job(event, workflow, build_workflow, decode_vram_bytes, input_data, "runpod_multiframe",
+                             finish)
+
+    except Exception as e:
+        import traceback
+        return {
+            "status": "error",
+            "error": str(e),
+            "traceback": traceback.format_exc()
         }
 
-        response = requests.post(f"{COMFYUI_URL}/prompt", json=payload, timeout=30)
-        if response.status_code != 200:
-            return {"status": "error", "error": f"ComfyUI rejected workflow: {response.text}"}
 
-        result = response.json()
-        if "error" in result:
-            return {"status": "error", "error": f"ComfyUI error: {result['error']}"}
+def refine_handler(event):
+    """
+    Refine / re-dub handler: partial denoise from the persisted latents of an
+    earlier job (run with persist_latent).
 
-        prompt_id = result.get("prompt_id")
-        if not prompt_id:
-            return {"status": "error", "error": "No prompt_id returned from ComfyUI"}
+    Input format:
+    {
+        "input": {
+            "refine_from_job_id": "abc-123",          // latent_job_id of the source job
+            "audio_url": "https://example.com/new.mp3", // optional: re-dub with new audio
+            "quality_preset": "ultra",                // optional, default: source preset
+            "refine_denoise": 0.45,                   // optional, default 0.7 re-dub / 0.45 refine
+            "steps": 4,                               // optional, default preset steps * denoise
+            "prompt_positive": "...",                 // optional, default: source prompt
+            "seed": 12345                             // optional, default: source seed
+        }
+    }
 
-        # Wait for completion
-        try:
-            video_info = wait_for_completion(prompt_id, timeout=1080)
-        except TimeoutError as e:
-            return {"status": "error", "error": str(e)}
-        except RuntimeError as e:
-            return {"status": "error", "error": str(e)}
+    Output format: same as Mode 1, plus refined_from, denoise, steps,
+    gpu_seconds (ComfyUI time of this job) and, for sources that recorded
+    their GPU time, estimated_full_gpu_seconds / gpu_seconds_saved (vs a
+    full regeneration at the same preset).
+    """
+    start_time = time.time()
 
-        # Read and process video
-        video_filename = video_info.get("filename", "output.mp4")
-        video_subfolder = video_info.get("subfolder", "")
+    try:
+        if not wait_for_comfyui(timeout=120):
+            return {"status": "error", "error": "ComfyUI failed to start"}
 
-        if video_subfolder:
-            video_path = f"/workspace/ComfyUI/output/{video_subfolder}/{video_filename}"
-        else:
-            video_path = f"/workspace/ComfyUI/output/{video_filename}"
+        builder_error = init_workflow_builder()
+        if builder_error:
+            return {"status": "error", "error": builder_error}
 
-        if not os.path.exists(video_path):
-            video_path = f"/comfyui/output/{video_filename}"
+        input_data = event.get("input", {})
 
-        if not os.path.exists(video_path):
-            return {"status": "error", "error": f"Video file not found: {video_filename}"}
+        if not input_data.get("refine_from_job_id"):
+            return {"status": "error", "error": "Missing required field: refine_from_job_id"}
+        source_job_id = str(input_data["refine_from_job_id"])
+        source_key = job_latent_key(source_job_id)
+        job_latents = LatentCache(JOB_LATENT_DIR, JOB_LATENT_MAX_BYTES)
+        source = job_latents.load_metadata(source_key)
+        if source is None or not job_latents.contains(source_key):
+            return {"status": "error", "error": f"No persisted latents for job: {source_job_id}"}
+
+        width = source["width"]
+        height = source["height"]
+        fps = source["fps"]
+        num_frames = source["num_frames"]
+        video_duration = num_frames / fps
+
+        # Optional re-dub: new audio replaces the persisted audio latent
+        audio_url = input_data.get("audio_url")
+        audio_name = None
+        audio_duration = source["audio_duration"]
+        audio_ingest = None
+        if audio_url:
+            if not URLDownloader.validate_url(audio_url):
+                return {"status": "error", "error": f"Invalid audio_url: {audio_url}"}
+            print("Step 1/4: Downloading audio...")
+            current_progress().set_stage("download")
+            try:
+                audio_bytes, audio_filename, _ = URLDownloader.download_audio(audio_url, compute_duration=False)
+                # Planned duration: the source video (a sub-frame overshoot is trimmed)
+                audio_bytes, audio_filename, audio_duration, audio_ingest = normalize_audio_for_upload(
+                    audio_bytes, audio_filename, input_data, max_duration=video_duration
+                )
+            except Exception as e:
+                return {"status": "error", "error": f"Failed to download audio: {e}"}
+            source_audio_duration = (audio_ingest or {}).get("source_duration", audio_duration)
+            if source_audio_duration > video_duration + 1 / fps:
+                return {
+                    "status": "error",
+                    "error": f"New audio ({source_audio_duration:.2f}s) is longer than the source video "
+                             f"({video_duration:.2f}s); run a full Mode 1 job instead",
+                }
+            print("Step 2/4: Uploading to ComfyUI...")
+            current_progress().set_stage("prepare")
+            try:
+                audio_name = upload_file_to_comfyui(audio_bytes, audio_filename)
+            except Exception as e:
+                return {"status": "error", "error": f"Failed to upload audio: {e}"}
 
-        generation_time = time.time() - start_time
+        quality_preset = input_data.get("quality_preset", source.get("quality_preset", "high"))
+        if quality_preset not in QUALITY_PRESETS:
+            quality_preset = "high"
+        preset = QUALITY_PRESETS[quality_preset]
 
-        # Get job_id from RunPod event for GCS path organization
-        job_id = event.get("id", None)
+        denoise = input_data.get("refine_denoise", 0.7 if audio_name else 0.45)
+        if not isinstance(denoise, (int, float)) or denoise <= 0 or denoise > 1:
+            denoise = 0.7 if audio_name else 0.45
+        steps = int(input_data.get("steps", max(2, round(preset["steps"] * denoise))))
 
-        # Upload to GCS
-        print("Step 5/5: Uploading to GCS...")
-        gcs_result = upload_video_to_gcs(
-            video_path=video_path,
-            job_id=job_id,
-            subfolder="ltx2_videos"
+        seed = resolve_seed(input_data, event.get("id"), default=source["seed"])
+        prompt_positive = input_data.get("prompt_positive", source["prompt_positive"])
+        prompt_negative = input_data.get("prompt_negative", source["prompt_negative"])
+        lora_camera = input_data.get("lora_camera", preset["lora_camera"])
+        lora_distilled = input_data.get("lora_distilled", preset["lora_distilled"])
+        lora_detailer = input_data.get("lora_detailer", preset["lora_detailer"])
+        img_strength = input_data.get("img_strength", source.get("img_strength", 1.0))
+
+        latent_job_id, persist_latent_key = plan_job_latent(event, input_data)
+
+        print("Step 3/4: Building refine workflow...")
+        current_progress().set_stage("prepare")
+        decode_vram_bytes = get_decode_vram_budget() if input_data.get("auto_decode_tiling", False) else None
+        build_workflow = functools.partial(
+            workflow_builder.build_refine_workflow,
+            job_latent_key=source_key,
+            num_frames=num_frames,
+            prompt_positive=prompt_positive,
+            prompt_negative=prompt_negative,
+            seed=seed,
+            width=width,
+            height=height,
+            fps=fps,
+            steps=steps,
+            denoise=denoise,
+            cfg_scale=1.0,
+            lora_distilled=lora_distilled,
+            lora_detailer=lora_detailer,
+            lora_camera=lora_camera,
+            img_strength=img_strength,
+            audio_name=audio_name,
+            audio_duration=audio_duration,
+            audio_prenormalized=audio_ingest is not None,
+            persist_latent_key=persist_latent_key,
+            streaming_output=bool(input_data.get("streaming_output", False)),
         )
+        workflow = build_workflow(decode_vram_bytes=decode_vram_bytes)
 
-        if not gcs_result["success"]:
-            # Fallback to base64 if GCS upload fails
-            print(f"Warning: GCS upload failed: {gcs_result['error']}")
-            print("Falling back to base64 encoding...")
-            with open(video_path, "rb") as f:
-                video_base64 = base64.b64encode(f.read()).decode()
+        print(f"  Refining job {source_job_id}: {width}x{height}, {num_frames} frames @ {fps}fps")
+        print(f"  {'Re-dub' if audio_name else 'Refine'}: denoise {denoise}, {steps} steps ({quality_preset})")
+        print(f"  Seed: {seed}")
 
-            return {
-                "status": "success",
-                "output": {
-                    "video_base64": video_base64,
-                    "video_url": None,
-                    "gcs_url": None,
-                    "video_filename": video_filename,
-                    "prompt_id": prompt_id,
-                    "resolution": f"{width}x{height}",
-                    "duration": f"{gen_params['target_duration']:.1f}s",
-                    "frames": gen_params["num_frames"],
-                    "keyframes": len(keyframe_data),
-                    "fps": fps,
-                    "seed": seed,
-                    "quality_preset": quality_preset,
-                    "mode": "3a" if is_mode_3a else "3b",
-                    "generation_time": round(generation_time, 1),
-                    "gcs_error": gcs_result["error"]
-                }
-            }
+        print("Step 4/4: Generating video...")
 
-        # Clean up local file after successful upload
-        delete_local_video(video_path)
+        def finish(prompt_id, video_path, attempts):
+            # Sampling dominates: a full run at this preset scales the source's GPU time by step count.
+            # Sources persisted before gpu_seconds was recorded have no estimate
+            gpu_seconds = attempt_gpu_seconds(attempts)
+            estimated_full_gpu_seconds = None
+            if source.get("gpu_seconds"):
+                estimated_full_gpu_seconds = round(
+                    source["gpu_seconds"] * preset["steps"] / max(1, source["steps"]), 1
+                )
+
+            saved_latent_job_id = latent_job_id
+            if latent_job_id and not save_job_latent_metadata(persist_latent_key, {
+                **source,
+                "mode": "refine",
+                "audio_duration": audio_duration,
+                "seed": seed,
+                "prompt_positive": prompt_positive,
+                "prompt_negative": prompt_negative,
+                "quality_preset": quality_preset,
+                "steps": preset["steps"],
+                "img_strength": img_strength,
+                "generation_time": round(time.time() - start_time, 1),
+                "gpu_seconds": estimated_full_gpu_seconds,
+            }):
+                saved_latent_job_id = None
 
-        return {
-            "status": "success",
-            "output": {
-                "video_url": gcs_result["public_url"],
-                "gcs_url": gcs_result["gcs_url"],
-                "video_filename": gcs_result["filename"],
-                "video_size_bytes": gcs_result["size_bytes"],
-                "prompt_id": prompt_id,
+            return {
                 "resolution": f"{width}x{height}",
-                "duration": f"{gen_params['target_duration']:.1f}s",
-                "frames": gen_params["num_frames"],
-                "keyframes": len(keyframe_data),
+                "duration": f"{video_duration:.1f}s",
+                "frames": num_frames,
                 "fps": fps,
                 "seed": seed,
                 "quality_preset": quality_preset,
-                "mode": "3a" if is_mode_3a else "3b",
-                "generation_time": round(generation_time, 1)
+                "mode": "redub" if audio_name else "refine",
+                "refined_from": source_job_id,
+                "denoise": denoise,
+                "steps": steps,
+                "generation_time": round(time.time() - start_time, 1),
+                "gpu_seconds": gpu_seconds,
+                "estimated_full_gpu_seconds": estimated_full_gpu_seconds,
+                "gpu_seconds_saved": (round(max(0.0, estimated_full_gpu_seconds - gpu_seconds), 1)
+                                      if estimated_full_gpu_seconds is not None else None),
+                "audio_ingest": audio_ingest,
+                "latent_job_id": saved_latent_job_id
             }
-        }
+
+        return run_video_job(event, workflow, build_workflow, decode_vram_bytes, input_data, "runpod_refine", finish)
 
     except Exception as e:
         import traceback
@@ -1101,25 +2257,23 @@ def legacy_handler(event):
                     file_bytes = base64.b64decode(b64_data)
                     upload_file_to_comfyui(file_bytes, name)
 
-        payload = {"prompt": workflow, "client_id": "runpod-handler"}
-        response = requests.post(f"{COMFYUI_URL}/prompt", json=payload, timeout=30)
+        with gpu_slot():
+            payload = {"prompt": workflow, "client_id": "runpod-handler"}
+            response = requests.post(f"{comfyui_url()}/prompt", json=payload, timeout=30)
 
-        if response.status_code != 200:
-            return {"error": f"ComfyUI error: {response.text}"}
+            if response.status_code != 200:
+                return {"error": f"ComfyUI error: {response.text}"}
 
-        result = response.json()
-        prompt_id = result.get("prompt_id")
-        if not prompt_id:
-            return {"error": "No prompt_id returned"}
+            result = response.json()
+            prompt_id = result.get("prompt_id")
+            if not prompt_id:
+                return {"error": "No prompt_id returned"}
 
-        video_info = wait_for_completion(prompt_id, timeout=1080)
+            video_info = wait_for_completion(prompt_id, timeout=1080)
         video_filename = video_info.get("filename", "output.mp4")
-        video_path = f"/workspace/ComfyUI/output/{video_filename}"
-
-        if not os.path.exists(video_path):
-            video_path = f"/comfyui/output/{video_filename}"
+        video_path = find_output_video(video_info)
 
-        if os.path.exists(video_path):
+        if video_path:
             with open(video_path, "rb") as f:
                 video_b64 = base64.b64encode(f.read()).decode()
             return {
@@ -1154,11 +2308,41 @@ def unified_handler(event):
     - Input: keyframes[] + duration
     - Output: Video with keyframe guides + generated audio
 
+    Refine / re-dub: from persisted job latents
+    - Input: refine_from_job_id (+ optional audio_url)
+    - Output: Refined video, or video re-synced to the new audio
+
     Legacy: Pre-built workflow
     - Input: workflow object
     - Output: Workflow execution result
+
+    The job's journal entry (resolve_seed / execute_workflow) is closed as
+    done or failed with the result, and its latent cache leases released.
+    With JOB_CAPTURE, a scrubbed record of the job is written for replay
+    (job_capture.py).
     """
     input_data = event.get("input", {})
+    with capture_job(event) as capture:
+        try:
+            result = dispatch_job(event)
+        finally:
+            LatentCache().release(latent_cache_lease_id(event))
+        capture.finish(result, current_progress().stage_durations())
+    if not input_data.get("workflow"):
+        journal = get_journal()
+        journal.finish(job_input_hash(input_data), event.get("id"),
+                       "done" if result.get("status") == "success" else "failed")
+        journal.cleanup_if_due()
+    return result
+
+
+def dispatch_job(event):
+    """Route a job to the handler of its mode (see unified_handler)."""
+    input_data = event.get("input", {})
+
+    # Refine / re-dub: partial denoise from a persisted job latent
+    if input_data.get("refine_from_job_id"):
+        return refine_handler(event)
 
     # Mode 3: Multi-keyframe (3a with audio_url, 3b with duration)
     if input_data.get("keyframes"):
@@ -1189,16 +2373,36 @@ if __name__ == "__main__":
     print("  - Mode 2 (Audio Gen): image_url + duration")
     print("  - Mode 3a (Multi-keyframe + Lip-sync): keyframes[] + audio_url")
     print("  - Mode 3b (Multi-keyframe + Audio Gen): keyframes[] + duration")
+    print("  - Refine / re-dub: refine_from_job_id (+ audio_url)")
     print("  - Legacy mode: workflow + images")
     print("Note: Mode 3 uses chained LTXVAddGuide nodes (v59: dual buffer guide strategies)")
 
+    # Job journal: drop entries past JOB_JOURNAL_RETENTION_HOURS, keep recent ones for reattaching
+    print(f"Job journal: {get_journal().path} ({get_journal().cleanup()} expired entries removed)")
+
     # Check if running in Pod mode (not serverless)
     pod_mode = os.environ.get("POD_MODE", "").lower() in ("1", "true", "yes")
     if pod_mode:
-        print("Running in POD_MODE - keeping container alive for testing")
-        print("ComfyUI should be available at http://127.0.0.1:8188")
-        # Keep the process alive
-        import signal
-        signal.pause()
+        # Dedicated pod: RunPod-style job API (/run, /runsync, /status, /cancel, /stream) on POD_JOB_PORT
+        from job_server import POD_JOB_HOST, POD_JOB_PORT, serve
+        print(f"Running in POD_MODE - job API on {POD_JOB_HOST}:{POD_JOB_PORT}, {HANDLER_CONCURRENCY} concurrent jobs")
+        serve(unified_handler)
+    elif STREAM_PROGRESS:
+        # Generator handler: /stream yields progress events, then the result; /status aggregates them
+        print(f"Concurrency: {HANDLER_CONCURRENCY} jobs per worker, streaming progress")
+        runpod.serverless.start({
+            "handler": make_streaming_handler(unified_handler),
+            "concurrency_modifier": concurrency_modifier,
+            "return_aggregate_stream": True,
+        })
     else:
-        runpod.serverless.start({"handler": unified_handler})
+        # Up to HANDLER_CONCURRENCY jobs overlap their CPU stages; sampling is serialized.
+        # Progress events (stage, sampler step, ETA) show in /status while the job runs
+        print(f"Concurrency: {HANDLER_CONCURRENCY} jobs per worker, one prompt in ComfyUI at a time")
+        runpod.serverless.start({
+            "handler": make_async_handler(
+                unified_handler,
+                progress_sink=runpod.serverless.progress_update if PROGRESS_UPDATES else None,
+            ),
+            "concurrency_modifier": concurrency_modifier,
+        })
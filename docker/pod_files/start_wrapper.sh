@@ -21,7 +21,7 @@ if [ -n "$NETWORK_VOLUME" ] && [ -d "$NETWORK_VOLUME/models" ]; then
     echo "✅ Network Volume detected, setting up symlinks..."
 
     # 创建符号链接到 Network Volume
-    for subdir in checkpoints text_encoders loras; do
+    for subdir in checkpoints text_encoders loras latent_upscale_models; do
         if [ -d "$NETWORK_VOLUME/models/$subdir" ]; then
             rm -rf "$COMFYUI_MODELS/$subdir" 2>/dev/null || true
             ln -sf "$NETWORK_VOLUME/models/$subdir" "$COMFYUI_MODELS/$subdir"
@@ -30,10 +30,16 @@ if [ -n "$NETWORK_VOLUME" ] && [ -d "$NETWORK_VOLUME/models" ]; then
     done
 
     MODEL_PATH="$NETWORK_VOLUME/models"
+    if [ ! -d "$MODEL_PATH/latent_upscale_models" ]; then
+        mkdir -p "$MODEL_PATH/latent_upscale_models"
+        rm -rf "$COMFYUI_MODELS/latent_upscale_models" 2>/dev/null || true
+        ln -sf "$MODEL_PATH/latent_upscale_models" "$COMFYUI_MODELS/latent_upscale_models"
+        echo "   Linked: latent_upscale_models"
+    fi
 else
     echo "⚠️  No Network Volume, using local storage"
     MODEL_PATH="$COMFYUI_MODELS"
-    mkdir -p "$MODEL_PATH/checkpoints" "$MODEL_PATH/text_encoders" "$MODEL_PATH/loras"
+    mkdir -p "$MODEL_PATH/checkpoints" "$MODEL_PATH/text_encoders" "$MODEL_PATH/loras" "$MODEL_PATH/latent_upscale_models"
 fi
 
 # 兜底下载函数
@@ -92,14 +98,72 @@ download_if_missing \
     "https://huggingface.co/Lightricks/LTX-2-19b-LoRA-Camera-Control-Dolly-In/resolve/main/ltx-2-19b-lora-camera-control-dolly-in.safetensors" \
     200000000 &
 
+# Latent upscaler x2 (~1GB, two_stage 请求使用)
+download_if_missing \
+    "$MODEL_PATH/latent_upscale_models/ltx-2-spatial-upscaler-x2-1.0.safetensors" \
+    "https://huggingface.co/Lightricks/LTX-2/resolve/main/ltx-2-spatial-upscaler-x2-1.0.safetensors" \
+    500000000 &
+
 # 等待所有下载完成
 wait
 
+# 本地 NVMe 镜像 (LOCAL_MODEL_MIRROR=/path 开启): 按模板所需模型从 Network Volume 同步,
+# 使用 manifest (size + sha256) 校验, 分块并行复制, 支持断点续传和 LRU 淘汰
+if [ -n "$LOCAL_MODEL_MIRROR" ] && [ -n "$NETWORK_VOLUME" ] && [ -f /model_sync.py ]; then
+    echo ""
+    echo "=== Syncing Local Model Mirror ==="
+    if python3 -u /model_sync.py sync \
+        --source "$NETWORK_VOLUME/models" \
+        --dest "$LOCAL_MODEL_MIRROR" \
+        --from-templates \
+        --file latent_upscale_models/ltx-2-spatial-upscaler-x2-1.0.safetensors \
+        --evict \
+        --verify "${LOCAL_MODEL_MIRROR_VERIFY:-hash}"; then
+        for subdir in checkpoints text_encoders loras latent_upscale_models; do
+            if [ -d "$LOCAL_MODEL_MIRROR/$subdir" ]; then
+                rm -rf "$COMFYUI_MODELS/$subdir" 2>/dev/null || true
+                ln -sf "$LOCAL_MODEL_MIRROR/$subdir" "$COMFYUI_MODELS/$subdir"
+                echo "   Linked (local mirror): $subdir"
+            fi
+        done
+        MODEL_PATH="$LOCAL_MODEL_MIRROR"
+    else
+        echo "⚠️  Local mirror sync failed, using Network Volume directly"
+    fi
+fi
+
 echo ""
 echo "=== Final Model Status ==="
 ls -lh "$MODEL_PATH/checkpoints/" 2>/dev/null | grep -v "^total" | head -3
 ls -lh "$MODEL_PATH/loras/" 2>/dev/null | grep -v "^total" | head -5
 
+# 后台预读模型文件到 page cache (与 ComfyUI 启动并行, MODEL_READAHEAD=0 关闭)
+if [ "${MODEL_READAHEAD:-1}" != "0" ] && [ -f /model_readahead.py ]; then
+    echo ""
+    echo "=== Model Readahead ==="
+    python3 -u /model_readahead.py --report /tmp/model_readahead.json &
+    echo "Readahead started in background (report: /tmp/model_readahead.json)"
+fi
+
+# 多 GPU: 每张卡一个 ComfyUI 实例 (COMFYUI_INSTANCES=auto 按 GPU 数量),
+# 实例 i 使用 GPU i 和端口 COMFYUI_BASE_PORT+i; 实例 0 由原始启动脚本启动
+if [ "${COMFYUI_INSTANCES:-1}" = "auto" ]; then
+    COMFYUI_INSTANCES=$(nvidia-smi -L 2>/dev/null | wc -l)
+    [ "$COMFYUI_INSTANCES" -ge 1 ] 2>/dev/null || COMFYUI_INSTANCES=1
+fi
+export COMFYUI_INSTANCES="${COMFYUI_INSTANCES:-1}"
+COMFYUI_BASE_PORT="${COMFYUI_BASE_PORT:-8188}"
+if [ "$COMFYUI_INSTANCES" -gt 1 ]; then
+    echo ""
+    echo "=== Extra ComfyUI Instances ==="
+    for i in $(seq 1 $((COMFYUI_INSTANCES - 1))); do
+        python -u /comfyui/main.py --disable-auto-launch --disable-metadata \
+            --listen 127.0.0.1 --port $((COMFYUI_BASE_PORT + i)) --cuda-device "$i" \
+            > "/tmp/comfyui_$i.log" 2>&1 &
+        echo "   Instance $i: GPU $i, port $((COMFYUI_BASE_PORT + i)) (log: /tmp/comfyui_$i.log)"
+    done
+fi
+
 echo ""
 echo "Starting RunPod Handler..."
 
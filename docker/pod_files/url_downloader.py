@@ -6,7 +6,7 @@ Extracts audio duration using librosa.
 import os
 import io
 import requests
-from typing import Tuple
+from typing import Optional, Tuple
 from urllib.parse import urlparse
 
 
@@ -81,15 +81,17 @@ class URLDownloader:
         return image_bytes, filename
 
     @staticmethod
-    def download_audio(url: str) -> Tuple[bytes, str, float]:
+    def download_audio(url: str, compute_duration: bool = True) -> Tuple[bytes, str, Optional[float]]:
         """
         Download audio from URL and extract duration.
 
         Args:
             url: Audio URL to download
+            compute_duration: Decode the audio to get its duration. Pass False when
+                the caller decodes it anyway (MediaPreprocessor.normalize_audio)
 
         Returns:
-            Tuple of (audio_bytes, filename, duration_seconds)
+            Tuple of (audio_bytes, filename, duration_seconds or None)
 
         Raises:
             ValueError: If audio type is invalid or file too large
@@ -128,13 +130,17 @@ class URLDownloader:
         if len(audio_bytes) > URLDownloader.MAX_AUDIO_SIZE:
             raise ValueError(f"Audio too large: {len(audio_bytes)} bytes")
 
-        # Extract duration using librosa
-        duration = URLDownloader._get_audio_duration(audio_bytes, filename)
-
         # Ensure filename has extension
         if not ext:
             filename = 'input.mp3'
 
+        if not compute_duration:
+            print(f"  Downloaded audio: {len(audio_bytes)} bytes -> {filename}")
+            return audio_bytes, filename, None
+
+        # Extract duration using librosa
+        duration = URLDownloader._get_audio_duration(audio_bytes, filename)
+
         print(f"  Downloaded audio: {len(audio_bytes)} bytes, duration: {duration:.2f}s -> {filename}")
         return audio_bytes, filename, duration
 
@@ -0,0 +1,445 @@
+#!/usr/bin/env python3
+"""
+Post-processing of generated videos with ffmpeg.
+
+Used when the sampled video is shorter than the delivered video, e.g. when
+leading/trailing silence was cut from the audio before generation
+(trim_silence): the video is padded with static frames back to the planned
+length and the full-length audio is muxed in.
+
+Low-fps generation (generation_fps) is brought back to the requested frame
+rate by interpolate_video, with a pluggable interpolator (INTERPOLATORS).
+
+Also holds the streaming decode/encode used by the LTX2StreamingVideoOutput
+node: latent frames are VAE-decoded in temporal chunks and each chunk is
+piped to ffmpeg as uint8 as soon as it is decoded, so host memory is bounded
+by one chunk instead of the whole float video.
+"""
+import math
+import os
+import shutil
+import subprocess
+import tempfile
+import time
+import wave
+from typing import Callable, Dict, Iterator, Optional
+
+
+def find_ffmpeg() -> Optional[str]:
+    """
+    Locate an ffmpeg binary.
+
+    Prefers ffmpeg on PATH, then the binary bundled with imageio-ffmpeg
+    (installed with VideoHelperSuite).
+
+    Returns:
+        Path to ffmpeg, or None if not found
+    """
+    path = shutil.which("ffmpeg")
+    if path:
+        return path
+    try:
+        import imageio_ffmpeg
+        return imageio_ffmpeg.get_ffmpeg_exe()
+    except Exception:
+        return None
+
+
+def pad_video_and_mux_audio(
+    video_path: str,
+    audio_path: str,
+    pad_start_frames: int,
+    pad_end_frames: int,
+    total_frames: Optional[int] = None,
+    crf: int = 19,
+    timeout: int = 300,
+) -> dict:
+    """
+    Pad a video with cloned first/last frames and replace its audio track.
+
+    The video is re-encoded (libx264, yuv420p, same settings as the
+    VHS_VideoCombine node) and written over video_path.
+
+    Args:
+        video_path: Generated MP4 (modified in place)
+        audio_path: Audio to mux (any format ffmpeg reads), starts at frame 0
+        pad_start_frames: Frames to prepend (clone of the first frame)
+        pad_end_frames: Frames to append (clone of the last frame)
+        total_frames: Cut the padded video to this many frames (None: keep all)
+        crf: x264 quality
+        timeout: ffmpeg timeout in seconds
+
+    Returns:
+        dict with pad_start_frames, pad_end_frames, seconds
+
+    Raises:
+        RuntimeError: If ffmpeg is missing or fails
+    """
+    ffmpeg = find_ffmpeg()
+    if ffmpeg is None:
+        raise RuntimeError("ffmpeg not found")
+
+    start = time.time()
+    base, ext = os.path.splitext(video_path)
+    tmp_path = f"{base}.padded{ext}"
+
+    pad_filter = (
+        f"tpad=start={max(0, pad_start_frames)}:start_mode=clone:"
+        f"stop={max(0, pad_end_frames)}:stop_mode=clone"
+    )
+    cmd = [
+        ffmpeg, "-y", "-loglevel", "error",
+        "-i", video_path,
+        "-i", audio_path,
+        "-filter:v", pad_filter,
+        "-map", "0:v:0", "-map", "1:a:0",
+    ]
+    if total_frames is not None:
+        cmd += ["-frames:v", str(total_frames)]
+    cmd += [
+        "-c:v", "libx264", "-crf", str(crf), "-pix_fmt", "yuv420p",
+        "-c:a", "aac", "-b:a", "192k",
+        tmp_path,
+    ]
+    result = subprocess.run(cmd, capture_output=True, text=True, timeout=timeout)
+    if result.returncode != 0:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise RuntimeError(f"ffmpeg failed: {result.stderr.strip()[-500:]}")
+
+    os.replace(tmp_path, video_path)
+    info = {
+        "pad_start_frames": pad_start_frames,
+        "pad_end_frames": pad_end_frames,
+        "seconds": round(time.time() - start, 2),
+    }
+    print(f"  Padded video: +{pad_start_frames} leading, +{pad_end_frames} trailing frames "
+          f"in {info['seconds']:.1f}s")
+    return info
+
+
+def _ffmpeg_interpolator(build_filter: Callable[[float], str]) -> Callable:
+    """Interpolator that re-encodes the video through an ffmpeg filter and copies the audio."""
+
+    def interpolate(input_path: str, output_path: str, target_fps: float, crf: int, timeout: int) -> None:
+        ffmpeg = find_ffmpeg()
+        if ffmpeg is None:
+            raise RuntimeError("ffmpeg not found")
+        cmd = [
+            ffmpeg, "-y", "-loglevel", "error",
+            "-i", input_path,
+            "-filter:v", build_filter(target_fps),
+            "-map", "0:v:0", "-map", "0:a?",
+            "-c:v", "libx264", "-crf", str(crf), "-pix_fmt", "yuv420p",
+            "-c:a", "copy",
+            output_path,
+        ]
+        result = subprocess.run(cmd, capture_output=True, text=True, timeout=timeout)
+        if result.returncode != 0:
+            raise RuntimeError(f"ffmpeg failed: {result.stderr.strip()[-500:]}")
+
+    return interpolate
+
+
+# Frame interpolators: fn(input_path, output_path, target_fps, crf, timeout).
+# The audio stream must be copied untouched so it stays in sync.
+INTERPOLATORS: Dict[str, Callable] = {
+    # Motion-compensated (slowest, best). minterpolate stops at the last source frame's timestamp, so
+    # a cloned trailing frame gives it the last frame interval and the video keeps the audio's length.
+    "minterpolate": _ffmpeg_interpolator(
+        lambda fps: f"tpad=stop=1:stop_mode=clone,"
+                    f"minterpolate=fps={fps}:mi_mode=mci:mc_mode=aobmc:me_mode=bidir:vsbmc=1"
+    ),
+    # Cross-fade of neighbouring frames
+    "blend": _ffmpeg_interpolator(lambda fps: f"framerate=fps={fps}"),
+    # Frame duplication
+    "duplicate": _ffmpeg_interpolator(lambda fps: f"fps={fps}"),
+}
+
+
+def register_interpolator(name: str, interpolator: Callable) -> None:
+    """Add an interpolator (e.g. a learned model) selectable by name."""
+    INTERPOLATORS[name] = interpolator
+
+
+def interpolate_video(video_path: str, target_fps: float, method: str = "minterpolate",
+                      crf: int = 19, timeout: int = 600) -> dict:
+    """
+    Interpolate a video to target_fps in place, keeping its audio track.
+
+    Args:
+        video_path: MP4 to convert (modified in place)
+        target_fps: Output frame rate
+        method: Key of INTERPOLATORS
+        crf: x264 quality
+        timeout: Timeout in seconds
+
+    Returns:
+        dict with method, target_fps, seconds
+
+    Raises:
+        ValueError: If method is unknown
+        RuntimeError: If the interpolator fails
+    """
+    if method not in INTERPOLATORS:
+        raise ValueError(f"Unknown interpolation method: {method} (available: {', '.join(INTERPOLATORS)})")
+
+    start = time.time()
+    base, ext = os.path.splitext(video_path)
+    tmp_path = f"{base}.interp{ext}"
+    try:
+        INTERPOLATORS[method](video_path, tmp_path, target_fps, crf, timeout)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+    os.replace(tmp_path, video_path)
+    info = {
+        "method": method,
+        "target_fps": target_fps,
+        "seconds": round(time.time() - start, 2),
+    }
+    print(f"  Interpolated to {target_fps}fps ({method}) in {info['seconds']:.1f}s")
+    return info
+
+
+def write_wav(path: str, waveform, sample_rate: int) -> None:
+    """
+    Write a ComfyUI AUDIO waveform as 16-bit PCM WAV.
+
+    Args:
+        path: Output path
+        waveform: Tensor [batch, channels, samples] or [channels, samples], float -1..1
+        sample_rate: Sample rate in Hz
+    """
+    if waveform.dim() == 3:
+        waveform = waveform[0]
+    pcm = (waveform.detach().float().clamp(-1.0, 1.0) * 32767.0).round().short()
+    with wave.open(path, "wb") as f:
+        f.setnchannels(pcm.shape[0])
+        f.setsampwidth(2)
+        f.setframerate(int(sample_rate))
+        f.writeframes(pcm.t().contiguous().cpu().numpy().tobytes())
+
+
+class StreamingVideoEncoder:
+    """
+    ffmpeg process fed raw RGB24 frames on stdin.
+
+    Same output settings as VHS_VideoCombine (video/h264-mp4, yuv420p); the
+    audio file, if any, is muxed by the same process.
+    """
+
+    def __init__(self, output_path: str, width: int, height: int, fps: float,
+                 audio_path: Optional[str] = None, crf: int = 19):
+        ffmpeg = find_ffmpeg()
+        if ffmpeg is None:
+            raise RuntimeError("ffmpeg not found")
+
+        self.output_path = output_path
+        self.width = width
+        self.height = height
+        self.frames_written = 0
+        cmd = [
+            ffmpeg, "-y", "-loglevel", "error",
+            "-f", "rawvideo", "-pix_fmt", "rgb24", "-s", f"{width}x{height}", "-r", str(fps),
+            "-i", "-",
+        ]
+        if audio_path:
+            cmd += ["-i", audio_path, "-map", "0:v:0", "-map", "1:a:0", "-c:a", "aac", "-b:a", "192k"]
+        cmd += ["-c:v", "libx264", "-crf", str(crf), "-pix_fmt", "yuv420p", output_path]
+        self._stderr = tempfile.TemporaryFile()
+        self._process = subprocess.Popen(cmd, stdin=subprocess.PIPE, stderr=self._stderr)
+
+    def write(self, frames) -> None:
+        """
+        Encode a chunk of frames.
+
+        Args:
+            frames: Tensor [frames, height, width, 3], float 0..1 (any device)
+        """
+        import torch
+
+        data = (frames[..., :3].clamp(0.0, 1.0) * 255.0).round().to("cpu", dtype=torch.uint8)
+        try:
+            self._process.stdin.write(data.contiguous().numpy().tobytes())
+        except BrokenPipeError:
+            self._fail()
+        self.frames_written += data.shape[0]
+
+    def close(self, timeout: int = 300) -> None:
+        """Flush and wait for ffmpeg."""
+        self._process.stdin.close()
+        if self._process.wait(timeout=timeout) != 0:
+            self._fail()
+        self._stderr.close()
+
+    def abort(self) -> None:
+        """Kill ffmpeg and remove the partial output."""
+        self._process.kill()
+        self._process.wait()
+        self._stderr.close()
+        if os.path.exists(self.output_path):
+            os.remove(self.output_path)
+
+    def _fail(self):
+        self._process.wait()
+        self._stderr.seek(0)
+        message = self._stderr.read().decode(errors="replace").strip()[-500:]
+        raise RuntimeError(f"ffmpeg failed: {message}")
+
+
+def decode_latent_chunks(vae, samples, tile_size: int = 640, overlap: int = 80,
+                         temporal_size: int = 64, temporal_overlap: int = 8,
+                         on_progress: Optional[Callable[[int, int], None]] = None) -> Iterator:
+    """
+    VAE-decode a video latent in temporal chunks.
+
+    Each chunk of temporal_size pixel frames is decoded in a window that
+    adds temporal_overlap pixel frames (rounded to latent frames, at least
+    one) of context on both sides; the frames the context decodes to are
+    dropped, including the window's first latent frame, which the causal
+    decoder expands to a single frame. Consecutive windows also share one
+    context length of kept frames, which are crossfaded linearly from one
+    window to the next. Spatial tiling follows VAEDecodeTiled.
+
+    Tolerance: if the decoder's temporal receptive field is at most the
+    context (in latent frames, each side), every frame equals a full decode
+    up to float rounding. The LTX-2 decoder reaches further, so frames
+    differ slightly from a full decode, mostly inside the crossfades; the
+    crossfade keeps that from showing as a hard seam. Raise
+    temporal_overlap to shrink the difference. check_streaming_output.py
+    measures both cases with neighbour-mixing fake VAEs.
+
+    Args:
+        vae: ComfyUI VAE
+        samples: Latent tensor [batch, channels, frames, height, width]
+        tile_size, overlap: Spatial tile size / overlap in pixels
+        temporal_size, temporal_overlap: Chunk length / context and crossfade length in pixel frames
+        on_progress: Optional callback(latent frames decoded, total latent frames) per chunk
+
+    Yields:
+        Image tensors [frames, height, width, channels], float 0..1
+    """
+    import torch
+
+    temporal_compression = vae.temporal_compression_decode() or 1
+    spatial_compression = vae.spacial_compression_decode()
+    frames_for = vae.upscale_ratio[0] if callable(vae.upscale_ratio[0]) else (lambda n: n * temporal_compression)
+
+    chunk = max(1, temporal_size // temporal_compression)
+    context = max(1, temporal_overlap // temporal_compression)
+    fade = min(context, chunk - 1)
+    latent_frames = samples.shape[2]
+
+    held = None  # Last window's frames in the crossfade with the next one
+    for start in range(0, latent_frames, chunk):
+        end = min(latent_frames, start + chunk)
+        keep_start = max(0, start - fade)
+        window_start = max(0, keep_start - context)
+        window_end = min(latent_frames, end + context)
+        images = vae.decode_tiled(
+            samples[:, :, window_start:window_end],
+            tile_x=tile_size // spatial_compression,
+            tile_y=tile_size // spatial_compression,
+            overlap=overlap // spatial_compression,
+            tile_t=window_end - window_start,
+            overlap_t=0,
+        )
+        if images.dim() == 5:
+            images = images.reshape(-1, images.shape[-3], images.shape[-2], images.shape[-1])
+
+        # Window frame i is output frame offset + i (the windows are aligned at their last frame)
+        offset = frames_for(window_end) - images.shape[0]
+        images = images[frames_for(keep_start) - offset:frames_for(end) - offset]
+
+        if held is not None:
+            weight = _crossfade_weights(images, held.shape[0])
+            images = torch.cat([held * (1 - weight) + images[:held.shape[0]] * weight, images[held.shape[0]:]])
+        if end < latent_frames and fade:
+            split = images.shape[0] - (frames_for(end) - frames_for(end - fade))
+            images, held = images[:split], images[split:]
+        else:
+            held = None
+
+        if on_progress is not None:
+            on_progress(end, latent_frames)
+        yield images
+
+
+def _crossfade_weights(images, count: int):
+    """Weights of the incoming window over count frames, (1..count) / (count + 1), per frame."""
+    import torch
+
+    weight = torch.arange(1, count + 1, dtype=images.dtype, device=images.device) / (count + 1)
+    return weight.reshape(-1, *([1] * (images.dim() - 1)))
+
+
+def stream_latent_to_video(vae, samples, output_path: str, fps: float, audio: Optional[dict] = None,
+                           crf: int = 19, trim_to_audio: bool = False, tile_size: int = 640,
+                           overlap: int = 80, temporal_size: int = 64, temporal_overlap: int = 8,
+                           on_progress: Optional[Callable[[int, int], None]] = None) -> dict:
+    """
+    Decode a video latent chunk by chunk straight into an MP4.
+
+    Args:
+        vae: ComfyUI VAE
+        samples: Latent tensor [batch, channels, frames, height, width] (batch 1)
+        output_path: MP4 to write
+        fps: Frame rate
+        audio: Optional ComfyUI AUDIO dict ({"waveform", "sample_rate"}) to mux
+        crf: x264 quality
+        trim_to_audio: Stop at the end of the audio (like VHS_VideoCombine trim_to_audio)
+        tile_size, overlap, temporal_size, temporal_overlap, on_progress: See decode_latent_chunks
+
+    Returns:
+        dict with frames, width, height, peak_chunk_frames, seconds
+    """
+    start = time.time()
+    audio_path = None
+    max_frames = None
+    if audio is not None:
+        audio_path = f"{os.path.splitext(output_path)[0]}.audio.wav"
+        write_wav(audio_path, audio["waveform"], audio["sample_rate"])
+        if trim_to_audio:
+            max_frames = math.ceil(audio["waveform"].shape[-1] / audio["sample_rate"] * fps)
+
+    encoder = None
+    peak_chunk_frames = 0
+    try:
+        for images in decode_latent_chunks(vae, samples, tile_size, overlap, temporal_size, temporal_overlap,
+                                           on_progress):
+            if max_frames is not None:
+                written = encoder.frames_written if encoder else 0
+                images = images[:max(0, max_frames - written)]
+                if images.shape[0] == 0:
+                    break
+            if encoder is None:
+                encoder = StreamingVideoEncoder(
+                    output_path, images.shape[2], images.shape[1], fps, audio_path=audio_path, crf=crf
+                )
+            encoder.write(images)
+            peak_chunk_frames = max(peak_chunk_frames, images.shape[0])
+            del images
+        if encoder is None:
+            raise RuntimeError("Latent has no frames to decode")
+        encoder.close()
+    except BaseException:
+        if encoder is not None:
+            encoder.abort()
+        raise
+    finally:
+        if audio_path and os.path.exists(audio_path):
+            os.remove(audio_path)
+
+    info = {
+        "frames": encoder.frames_written,
+        "width": encoder.width,
+        "height": encoder.height,
+        "peak_chunk_frames": peak_chunk_frames,
+        "seconds": round(time.time() - start, 2),
+    }
+    print(f"  Streamed {info['frames']} frames ({info['width']}x{info['height']}) to "
+          f"{os.path.basename(output_path)} in {info['seconds']:.1f}s")
+    return info
@@ -27,6 +27,71 @@ class WorkflowBuilder:
     # Maximum keyframes supported
     MAX_KEYFRAMES = 9
 
+    # Output nodes: everything not feeding one of these is pruned after graph edits
+    OUTPUT_NODE_TYPES = ("VHS_VideoCombine", "LTX2StreamingVideoOutput", "LTX2JobLatentSave")
+
+    # Node ids added by the latent cache (template ids stay below 300 / multiframe from 400)
+    IMAGE_ENCODE_NODE_ID = "320"
+    IMAGE_CACHE_NODE_ID = "321"
+    AUDIO_ENCODE_NODE_ID = "322"
+    # Job latent persistence / refine
+    JOB_LATENT_SAVE_NODE_ID = "330"
+    JOB_LATENT_LOAD_NODE_ID = "331"
+    AUDIO_DECODE_NODE_ID = "332"
+
+    # LTX2StreamingVideoOutput decode chunk (pixel frames); the templates decode all
+    # frames at once (temporal_size 4096)
+    STREAMING_TEMPORAL_SIZE = 64
+
+    # Two-stage generation (plan_two_stage): sample at half size, then x2 latent upsample +
+    # short refinement pass ("latent"), or decode and upscale the frames ("pixel")
+    LATENT_UPSCALER_MODEL = "ltx-2-spatial-upscaler-x2-1.0.safetensors"
+    UPSCALE_MODEL_NODE_ID = "340"
+    LATENT_UPSAMPLE_NODE_ID = "341"
+    REFINE_IMAGE_NODE_ID = "342"
+    REFINE_AUDIO_MASK_NODE_ID = "343"
+    REFINE_AUDIO_NODE_ID = "344"
+    REFINE_CONCAT_NODE_ID = "345"
+    REFINE_SCHEDULER_NODE_ID = "346"
+    REFINE_SAMPLER_NODE_ID = "347"
+    REFINE_SEPARATE_NODE_ID = "348"
+    PIXEL_UPSCALE_NODE_ID = "349"
+    OUTPUT_CROP_NODE_ID = "350"
+    REFINE_NOISE_NODE_ID = "351"
+    # The refine pass is noised from its own seed (stage 1 seed + offset, wrapped to RandomNoise's
+    # 64-bit range) so it does not re-add the stage 1 noise pattern
+    REFINE_SEED_OFFSET = 0x9E3779B9
+    # Sampling cost per step ~ tokens x (1 + tokens / SAMPLING_ATTENTION_TOKENS): linear
+    # layers plus self-attention, whose share grows with tokens / (6 x hidden size 4096)
+    SAMPLING_ATTENTION_TOKENS = 6 * 4096
+
+    # Batched variants (num_variants): one sampling pass at batch_size N. Variant i is noised
+    # from seed + i (LTX2VariantNoise) and sliced out of the batch (LatentFromBatch) for its
+    # own decode and output node; node ids VARIANT_NODE_ID_BASE + 10 * i + (0..4)
+    MAX_VARIANTS = 4
+    AUDIO_REPEAT_NODE_ID = "360"
+    VARIANT_NODE_ID_BASE = 370
+
+    # Resolution buckets (snap_resolution): landscape sizes per pixel budget, all divisible by 32,
+    # for 1:1, 4:3, 3:2, 16:9 and 21:9; portrait buckets are the same sizes transposed.
+    # 720p 16:9 is the template default 1280x736
+    RESOLUTION_BUCKETS = {
+        "480p": [(640, 640), (736, 544), (768, 512), (864, 480), (960, 416)],
+        "720p": [(960, 960), (1120, 832), (1184, 768), (1280, 736), (1472, 640)],
+        "1080p": [(1440, 1440), (1664, 1248), (1760, 1184), (1920, 1088), (2208, 928)],
+    }
+
+    # VAE decode VRAM model (plan_decode_tiling): peak = base + bytes/voxel x pixels x frames of
+    # one tile. Not fitted yet: these are estimates anchored on two settings known to run (tile
+    # 640 over a whole 10s 1280x736 clip on a 24 GB RTX 4090, tile 768 from test/test_highres.py
+    # on a 32 GB RTX 5090), so auto_decode_tiling is off by default. Fit them on a GPU with
+    # test/measure_decode_vram.py and commit its data points (test/decode_vram_points.json).
+    DECODE_BASE_BYTES = int(1.5e9)
+    DECODE_BYTES_PER_VOXEL = 120
+    # Candidate tiles, largest first; overlap is tile_size // 8 as in the templates (640/80)
+    DECODE_TILE_SIZES = (1024, 768, 640, 512, 384, 256)
+    DECODE_TEMPORAL_SIZES = (4096, 256, 128, 64, 32, 16)
+
     def __init__(
         self,
         template_path: str = "/comfyui/workflows/ltx2_enhanced.json",
@@ -70,6 +135,14 @@ class WorkflowBuilder:
         img_compression: int = 23,
         img_strength: float = 1.0,
         buffer_seconds: float = 1.0,
+        image_prenormalized: bool = False,
+        audio_prenormalized: bool = False,
+        latent_cache: Optional[dict] = None,
+        persist_latent_key: Optional[str] = None,
+        streaming_output: bool = False,
+        decode_vram_bytes: Optional[int] = None,
+        two_stage: Optional[dict] = None,
+        num_variants: int = 1,
     ) -> dict:
         """
         Inject parameters into workflow template.
@@ -92,6 +165,22 @@ class WorkflowBuilder:
             img_compression: Image compression level (default 23, lower = better quality)
             img_strength: First frame injection strength (default 0.9)
             buffer_seconds: Extra buffer time beyond input duration (default 1.0s)
+            image_prenormalized: Image was already resized/padded to width x height
+                on the CPU (MediaPreprocessor), so the ImageResizeKJv2 node is skipped
+            audio_prenormalized: Audio was already decoded and trimmed to audio_duration
+                on the CPU, so the TrimAudioDuration node is skipped
+            latent_cache: Cached VAE encodes, {"image"|"audio": {"key": str, "hit": bool}}
+                (see _apply_latent_cache)
+            persist_latent_key: Save the final video/audio latents under this key
+                (LTX2JobLatentSave) for refine_from_job_id follow-ups
+            streaming_output: Decode and encode in temporal chunks
+                (LTX2StreamingVideoOutput, see _apply_streaming_output)
+            decode_vram_bytes: VRAM budget for the VAE decode; sizes the decode tiles
+                (plan_decode_tiling). None keeps the template tiling
+            two_stage: Two-stage plan (plan_two_stage): sample at half size, then
+                upscale to width x height; None = one stage
+            num_variants: Videos sampled in one batch, seeds seed .. seed + num_variants - 1
+                (see _apply_variants); not combined with two_stage / persist_latent_key
 
         Returns:
             Complete workflow ready for ComfyUI execution
@@ -110,8 +199,8 @@ class WorkflowBuilder:
         params = {
             "INPUT_IMAGE": image_name,
             "INPUT_AUDIO": audio_name,
-            "WIDTH": width,
-            "HEIGHT": height,
+            "WIDTH": two_stage["working"][0] if two_stage else width,
+            "HEIGHT": two_stage["working"][1] if two_stage else height,
             "NUM_FRAMES": num_frames,
             "AUDIO_DURATION": audio_duration,
             "FPS": fps,
@@ -130,6 +219,24 @@ class WorkflowBuilder:
         # Deep copy template and inject parameters
         workflow = self._inject_parameters(self.template, params)
 
+        if image_prenormalized:
+            self._bypass_nodes(workflow, "ImageResizeKJv2", "image")
+        if audio_prenormalized:
+            self._bypass_nodes(workflow, "TrimAudioDuration", "audio")
+        if persist_latent_key:
+            self._add_job_latent_save(workflow, persist_latent_key)
+        if two_stage:
+            self._apply_two_stage(workflow, two_stage)
+        if decode_vram_bytes:
+            decode_width, decode_height = two_stage["decode"] if two_stage else (width, height)
+            self._apply_decode_tiling(workflow, decode_width, decode_height, num_frames, decode_vram_bytes)
+        if streaming_output:
+            self._apply_streaming_output(workflow)
+        if latent_cache:
+            self._apply_latent_cache(workflow, latent_cache)
+        if num_variants > 1:
+            self._apply_variants(workflow, num_variants)
+
         return workflow
 
     def _inject_parameters(self, workflow: dict, params: Dict[str, Any]) -> dict:
@@ -151,6 +258,471 @@ class WorkflowBuilder:
 
         return replace_value(workflow)
 
+    def _bypass_nodes(self, workflow: dict, class_type: str, passthrough_input: str) -> None:
+        """
+        Remove all nodes of class_type, rewiring their consumers to the node's input.
+
+        Used when the handler already did the node's work on the CPU
+        (ImageResizeKJv2 -> "image", TrimAudioDuration -> "audio").
+
+        Args:
+            workflow: Workflow dict (modified in place)
+            class_type: Node class to remove
+            passthrough_input: Input whose source replaces the node's output
+        """
+        removed = {
+            node_id: node["inputs"][passthrough_input]
+            for node_id, node in workflow.items()
+            if node.get("class_type") == class_type
+        }
+        for node_id in removed:
+            del workflow[node_id]
+
+        for node in workflow.values():
+            for input_name, value in node.get("inputs", {}).items():
+                if isinstance(value, list) and len(value) == 2 and value[0] in removed:
+                    node["inputs"][input_name] = removed[value[0]]
+
+    def get_vae_ids(self) -> dict:
+        """Checkpoint names the image and audio VAEs are loaded from (latent cache identity)."""
+        return {
+            "image": self.template["184"]["inputs"]["ckpt_name"],
+            "audio": self.template["171"]["inputs"]["ckpt_name"],
+        }
+
+    def _apply_latent_cache(self, workflow: dict, latent_cache: dict) -> None:
+        """
+        Substitute cached VAE encodes into a template workflow.
+
+        image (LTXVImgToVideoInplace, node 239):
+            hit:  LTX2LatentCacheLoad -> LTX2ImgToVideoInplaceLatent
+                  (LoadImage / resize / preprocess are pruned)
+            miss: LTX2ImageVAEEncode -> LTX2LatentCacheSave -> LTX2ImgToVideoInplaceLatent
+        audio (LTXVAudioVAEEncode, node 242):
+            hit:  node 242 becomes LTX2LatentCacheLoad
+            miss: the encode moves to a new id and node 242 becomes LTX2LatentCacheSave
+
+        Args:
+            workflow: Workflow dict (modified in place)
+            latent_cache: {"image"|"audio": {"key": str, "hit": bool}}
+        """
+        image = latent_cache.get("image")
+        if image and workflow.get("239", {}).get("class_type") == "LTXVImgToVideoInplace":
+            inplace = workflow["239"]["inputs"]
+            if not image["hit"]:
+                workflow[self.IMAGE_ENCODE_NODE_ID] = {
+                    "inputs": {
+                        "vae": inplace["vae"],
+                        "image": inplace["image"],
+                        "latent": inplace["latent"]
+                    },
+                    "class_type": "LTX2ImageVAEEncode",
+                    "_meta": {"title": "Image VAE Encode"}
+                }
+                workflow[self.IMAGE_CACHE_NODE_ID] = {
+                    "inputs": {
+                        "latent": [self.IMAGE_ENCODE_NODE_ID, 0],
+                        "cache_key": image["key"]
+                    },
+                    "class_type": "LTX2LatentCacheSave",
+                    "_meta": {"title": "Save Image Latent"}
+                }
+            else:
+                workflow[self.IMAGE_CACHE_NODE_ID] = {
+                    "inputs": {
+                        "cache_key": image["key"]
+                    },
+                    "class_type": "LTX2LatentCacheLoad",
+                    "_meta": {"title": "Load Image Latent"}
+                }
+            workflow["239"] = {
+                "inputs": {
+                    "latent": inplace["latent"],
+                    "image_latent": [self.IMAGE_CACHE_NODE_ID, 0],
+                    "strength": inplace["strength"]
+                },
+                "class_type": "LTX2ImgToVideoInplaceLatent",
+                "_meta": {"title": "Image to Video (Cached Latent)"}
+            }
+
+        audio = latent_cache.get("audio")
+        if audio and workflow.get("242", {}).get("class_type") == "LTXVAudioVAEEncode":
+            if audio["hit"]:
+                workflow["242"] = {
+                    "inputs": {
+                        "cache_key": audio["key"]
+                    },
+                    "class_type": "LTX2LatentCacheLoad",
+                    "_meta": {"title": "Load Audio Latent"}
+                }
+            else:
+                workflow[self.AUDIO_ENCODE_NODE_ID] = workflow["242"]
+                workflow["242"] = {
+                    "inputs": {
+                        "latent": [self.AUDIO_ENCODE_NODE_ID, 0],
+                        "cache_key": audio["key"]
+                    },
+                    "class_type": "LTX2LatentCacheSave",
+                    "_meta": {"title": "Save Audio Latent"}
+                }
+
+        self._prune_unreachable(workflow)
+
+    def _add_job_latent_save(self, workflow: dict, key: str) -> None:
+        """Persist the separated AV latents (LTXVSeparateAVLatent, node 245) under key."""
+        workflow[self.JOB_LATENT_SAVE_NODE_ID] = {
+            "inputs": {
+                "video_latent": ["245", 0],
+                "audio_latent": ["245", 1],
+                "cache_key": key
+            },
+            "class_type": "LTX2JobLatentSave",
+            "_meta": {"title": "Save Job Latents"}
+        }
+
+    def _apply_streaming_output(self, workflow: dict) -> bool:
+        """
+        Replace VAEDecodeTiled (234) -> VHS_VideoCombine (190) with one
+        LTX2StreamingVideoOutput node under id 190.
+
+        The node decodes STREAMING_TEMPORAL_SIZE frames at a time and pipes
+        each chunk to ffmpeg as uint8, so host RAM holds one chunk instead of
+        the whole float video. Same tiling, crf and output entry ("gifs").
+
+        Returns:
+            False (graph unchanged) if the decoded frames are post-processed
+            in the graph (two-stage pixel upscale or output crop), else True.
+            is_streaming_output tells the same from the built graph.
+        """
+        if workflow["190"]["inputs"].get("images") != ["234", 0]:
+            print("  Streaming output skipped: decoded frames are post-processed in the graph "
+                  "(two-stage pixel upscale / crop)")
+            return False
+        decode = workflow.pop("234")["inputs"]
+        combine = workflow["190"]["inputs"]
+        inputs = {
+            "samples": decode["samples"],
+            "vae": decode["vae"],
+            "frame_rate": combine["frame_rate"],
+            "filename_prefix": combine["filename_prefix"],
+            "crf": combine["crf"],
+            "trim_to_audio": combine.get("trim_to_audio", False),
+            "tile_size": decode["tile_size"],
+            "overlap": decode["overlap"],
+            "temporal_size": min(decode["temporal_size"], self.STREAMING_TEMPORAL_SIZE),
+            "temporal_overlap": decode["temporal_overlap"],
+        }
+        if "audio" in combine:
+            inputs["audio"] = combine["audio"]
+        workflow["190"] = {
+            "inputs": inputs,
+            "class_type": "LTX2StreamingVideoOutput",
+            "_meta": {"title": "Video Output (Streaming)"}
+        }
+        return True
+
+    @staticmethod
+    def is_streaming_output(workflow: dict) -> bool:
+        """Whether a built graph writes its video(s) with LTX2StreamingVideoOutput."""
+        return any(node.get("class_type") == "LTX2StreamingVideoOutput" for node in workflow.values())
+
+    @staticmethod
+    def _tile_count(length: int, tile: int, overlap: int) -> int:
+        """Tiles along one axis with VAEDecodeTiled's stride (tile - overlap)."""
+        if length <= tile:
+            return 1
+        return math.ceil((length - overlap) / (tile - overlap))
+
+    def plan_decode_tiling(self, width: int, height: int, num_frames: int, vram_bytes: int) -> dict:
+        """
+        Pick VAEDecodeTiled tile sizes for a clip and a VRAM budget.
+
+        Tries every spatial/temporal candidate (DECODE_TILE_SIZES plus the whole
+        frame, DECODE_TEMPORAL_SIZES) and keeps the one with the fewest
+        tiles whose estimated peak (DECODE_BASE_BYTES + DECODE_BYTES_PER_VOXEL
+        per tile voxel) fits vram_bytes; ties go to the larger spatial tile.
+        If nothing fits, the smallest tiles are returned with fits=False.
+
+        Args:
+            width: Video width
+            height: Video height
+            num_frames: Video frame count
+            vram_bytes: VRAM available to the decode
+
+        Returns:
+            dict with tile_size, overlap, temporal_size, temporal_overlap,
+            tiles, estimated_bytes, fits
+        """
+        # One tile covering the whole frame is also a candidate
+        full_frame = math.ceil(max(width, height) / 32) * 32
+        tile_sizes = sorted({t for t in self.DECODE_TILE_SIZES if t < full_frame} | {full_frame}, reverse=True)
+
+        best = None
+        for tile_size in tile_sizes:
+            overlap = tile_size // 8
+            spatial_tiles = self._tile_count(width, tile_size, overlap) * self._tile_count(height, tile_size, overlap)
+            for temporal_size in self.DECODE_TEMPORAL_SIZES:
+                temporal_overlap = 8 if temporal_size >= 32 else 4
+                tiles = spatial_tiles * self._tile_count(num_frames, temporal_size, temporal_overlap)
+                voxels = min(tile_size, width) * min(tile_size, height) * min(temporal_size, num_frames)
+                plan = {
+                    "tile_size": tile_size,
+                    "overlap": overlap,
+                    "temporal_size": temporal_size,
+                    "temporal_overlap": temporal_overlap,
+                    "tiles": tiles,
+                    "estimated_bytes": self.DECODE_BASE_BYTES + self.DECODE_BYTES_PER_VOXEL * voxels,
+                }
+                if plan["estimated_bytes"] <= vram_bytes and (best is None or tiles < best["tiles"]):
+                    best = plan
+
+        if best is None:
+            return {**plan, "fits": False}
+        return {**best, "fits": True}
+
+    def _apply_decode_tiling(self, workflow: dict, width: int, height: int, num_frames: int,
+                             vram_bytes: int) -> dict:
+        """Set the VAEDecodeTiled (234) tiling from plan_decode_tiling."""
+        plan = self.plan_decode_tiling(width, height, num_frames, vram_bytes)
+        for name in ("tile_size", "overlap", "temporal_size", "temporal_overlap"):
+            workflow["234"]["inputs"][name] = plan[name]
+        print(f"  Decode tiling: {plan['tile_size']}px/{plan['temporal_size']}f, {plan['tiles']} tiles, "
+              f"~{plan['estimated_bytes'] / 1e9:.1f}/{vram_bytes / 1e9:.1f} GB"
+              f"{'' if plan['fits'] else ' (over budget)'}")
+        return plan
+
+    def get_decode_tiling(self, workflow: dict) -> Optional[dict]:
+        """Tiling of the VAE decode: VAEDecodeTiled (234) or the streaming output node (190)."""
+        for node_id in ("234", "190"):
+            node = workflow.get(node_id)
+            if node and "tile_size" in node["inputs"]:
+                return {name: node["inputs"][name]
+                        for name in ("tile_size", "overlap", "temporal_size", "temporal_overlap")}
+        return None
+
+    def cap_decode_temporal_size(self, workflow: dict, max_frames: int) -> None:
+        """Limit the frames decoded per temporal tile (OOM retry), on every decode node."""
+        for node in workflow.values():
+            if node["class_type"] in ("VAEDecodeTiled", "LTX2StreamingVideoOutput"):
+                inputs = node["inputs"]
+                inputs["temporal_size"] = min(inputs["temporal_size"], max_frames)
+                inputs["temporal_overlap"] = min(inputs["temporal_overlap"], max(4, inputs["temporal_size"] // 4))
+
+    def get_lora_config(self, workflow: dict) -> tuple:
+        """LoRAs patched into the model, as sorted (lora_name, strength) pairs (instance affinity)."""
+        return tuple(sorted(
+            (node["inputs"]["lora_name"], node["inputs"].get("strength_model"))
+            for node in workflow.values()
+            if node["class_type"] in ("LoraLoaderModelOnly", "LoraLoader")
+        ))
+
+    def _latent_size(self, workflow: dict, link, depth: int = 0) -> Optional[tuple]:
+        """
+        (width, height, frames, batch) in pixels of the latent a link carries.
+
+        Follows latent inputs upstream to the node that sets the size
+        (EmptyLTXVLatentVideo), doubling width / height at LTXVLatentUpsampler
+        and taking the batch from RepeatLatentBatch / LatentFromBatch.
+        """
+        node = workflow.get(str(link[0])) if isinstance(link, list) and depth < 64 else None
+        if node is None:
+            return None
+        inputs = node["inputs"]
+        if all(isinstance(inputs.get(name), int) for name in ("width", "height", "length")):
+            return inputs["width"], inputs["height"], inputs["length"], inputs.get("batch_size", 1)
+        for name in ("latent_image", "samples", "video_latent", "latent", "av_latent"):
+            size = self._latent_size(workflow, inputs.get(name), depth + 1)
+            if size is None:
+                continue
+            width, height, frames, batch = size
+            if node["class_type"] == "LTXVLatentUpsampler":
+                width, height = width * 2, height * 2
+            elif node["class_type"] == "RepeatLatentBatch":
+                batch *= inputs.get("amount", 1)
+            elif node["class_type"] == "LatentFromBatch":
+                batch = inputs.get("length", 1)
+            return width, height, frames, batch
+        return None
+
+    def estimate_workflow_cost(self, workflow: dict) -> dict:
+        """
+        Predicted work of a built workflow, for progress ETAs (job_progress.py).
+
+        Sampling is in token-steps as in estimate_two_stage_cost, per sampler
+        node; decoding is in decoded pixel-frames. Latents whose size cannot
+        be traced (job latent loads) fall back to EmptyLTXVLatentVideo (162).
+
+        Returns:
+            dict with samplers ({node_id: token-steps}, in execution order),
+            sampling_cost and decode_cost
+        """
+        fallback = workflow.get("162", {}).get("inputs", {})
+        fallback_size = None
+        if all(isinstance(fallback.get(name), int) for name in ("width", "height", "length")):
+            fallback_size = (fallback["width"], fallback["height"], fallback["length"], fallback.get("batch_size", 1))
+
+        def step_cost(size):
+            width, height, frames, batch = size
+            tokens = (1 + (frames - 1) // 8) * (width // 32) * (height // 32)
+            return batch * tokens * (1 + tokens / self.SAMPLING_ATTENTION_TOKENS)
+
+        samplers = []
+        decode_cost = 0
+        for node_id, node in workflow.items():
+            inputs = node["inputs"]
+            if node["class_type"] in ("SamplerCustomAdvanced", "SamplerCustom"):
+                size = self._latent_size(workflow, inputs.get("latent_image")) or fallback_size
+                scheduler = workflow.get(str(inputs["sigmas"][0]), {}) if isinstance(inputs.get("sigmas"), list) else {}
+                steps = scheduler.get("inputs", {}).get("steps")
+                if size and isinstance(steps, int):
+                    samplers.append((node_id, steps * step_cost(size)))
+            elif node["class_type"] in ("VAEDecodeTiled", "VAEDecode", "LTX2StreamingVideoOutput"):
+                size = self._latent_size(workflow, inputs.get("samples")) or fallback_size
+                if size:
+                    decode_cost += size[0] * size[1] * size[2] * size[3]
+        # The refine pass samples the first pass's output, so it runs second; ids grow with the graph
+        samplers.sort(key=lambda item: int(item[0]) if item[0].isdigit() else 0)
+        return {
+            "samplers": {node_id: round(cost) for node_id, cost in samplers},
+            "sampling_cost": round(sum(cost for _, cost in samplers)),
+            "decode_cost": decode_cost,
+        }
+
+    def build_refine_workflow(
+        self,
+        job_latent_key: str,
+        num_frames: int,
+        prompt_positive: str,
+        prompt_negative: str,
+        seed: int,
+        width: int = 1280,
+        height: int = 736,
+        fps: int = 30,
+        steps: int = 4,
+        denoise: float = 0.5,
+        cfg_scale: float = 1.0,
+        lora_distilled: float = 0.6,
+        lora_detailer: float = 1.0,
+        lora_camera: float = 0.3,
+        img_strength: float = 1.0,
+        audio_name: Optional[str] = None,
+        audio_duration: Optional[float] = None,
+        audio_prenormalized: bool = False,
+        persist_latent_key: Optional[str] = None,
+        streaming_output: bool = False,
+        decode_vram_bytes: Optional[int] = None,
+    ) -> dict:
+        """
+        Build a partial-denoise workflow that starts from a persisted job latent.
+
+        The enhanced template is used with EmptyLTXVLatentVideo / LTXVImgToVideoInplace
+        replaced by LTX2JobLatentLoad and BasicScheduler set to denoise < 1.
+        The first latent frame keeps its noise mask (1 - img_strength), and the
+        audio latent stays fixed (mask 0), so only the video is re-sampled.
+
+        Args:
+            job_latent_key: Key of the persisted latents (latent_cache.job_latent_key)
+            num_frames: Frame count of the persisted run (latent length must match)
+            prompt_positive: Positive prompt text
+            prompt_negative: Negative prompt text
+            seed: Noise seed
+            width: Video width of the persisted run
+            height: Video height of the persisted run
+            fps: Frames per second of the persisted run
+            steps: Sampling steps actually run
+            denoise: Fraction of the noise schedule to re-run (0-1)
+            cfg_scale: CFG scale
+            lora_distilled: Distilled LoRA strength
+            lora_detailer: Detailer LoRA strength
+            lora_camera: Camera LoRA strength
+            img_strength: First frame hold strength
+            audio_name: New uploaded audio (re-dub); None keeps the persisted audio latent
+            audio_duration: Duration of the new audio
+            audio_prenormalized: New audio already trimmed on the CPU (skip TrimAudioDuration)
+            persist_latent_key: Persist this run's latents too (chained refines)
+            streaming_output: Decode and encode in temporal chunks (LTX2StreamingVideoOutput)
+            decode_vram_bytes: VRAM budget for the VAE decode (plan_decode_tiling)
+
+        Returns:
+            Complete workflow ready for ComfyUI execution
+        """
+        params = {
+            "INPUT_IMAGE": "",
+            "INPUT_AUDIO": audio_name or "",
+            "WIDTH": width,
+            "HEIGHT": height,
+            "NUM_FRAMES": num_frames,
+            "AUDIO_DURATION": audio_duration or 0.0,
+            "FPS": fps,
+            "PROMPT_POSITIVE": prompt_positive,
+            "PROMPT_NEGATIVE": prompt_negative,
+            "SEED": seed,
+            "STEPS": steps,
+            "CFG_SCALE": cfg_scale,
+            "LORA_DISTILLED_STRENGTH": lora_distilled,
+            "LORA_DETAILER_STRENGTH": lora_detailer,
+            "LORA_CAMERA_STRENGTH": lora_camera,
+            "IMG_COMPRESSION": 0,
+            "IMG_STRENGTH": img_strength,
+        }
+        workflow = self._inject_parameters(self.template, params)
+
+        workflow[self.JOB_LATENT_LOAD_NODE_ID] = {
+            "inputs": {
+                "cache_key": job_latent_key,
+                "first_frame_strength": img_strength
+            },
+            "class_type": "LTX2JobLatentLoad",
+            "_meta": {"title": "Load Job Latents"}
+        }
+        workflow["166"]["inputs"]["video_latent"] = [self.JOB_LATENT_LOAD_NODE_ID, 0]
+        workflow["238"]["inputs"]["denoise"] = denoise
+
+        if audio_name:
+            # Re-dub: the new audio goes through the normal encode path
+            if audio_prenormalized:
+                self._bypass_nodes(workflow, "TrimAudioDuration", "audio")
+        else:
+            # Keep the persisted audio: fixed audio latent, decoded for the output mux
+            workflow["248"]["inputs"]["samples"] = [self.JOB_LATENT_LOAD_NODE_ID, 1]
+            workflow[self.AUDIO_DECODE_NODE_ID] = {
+                "inputs": {
+                    "samples": ["245", 1],
+                    "audio_vae": ["171", 0]
+                },
+                "class_type": "LTXVAudioVAEDecode",
+                "_meta": {"title": "Audio VAE Decode"}
+            }
+            workflow["190"]["inputs"]["audio"] = [self.AUDIO_DECODE_NODE_ID, 0]
+
+        if persist_latent_key:
+            self._add_job_latent_save(workflow, persist_latent_key)
+        if decode_vram_bytes:
+            self._apply_decode_tiling(workflow, width, height, num_frames, decode_vram_bytes)
+        if streaming_output:
+            self._apply_streaming_output(workflow)
+
+        self._prune_unreachable(workflow)
+        return workflow
+
+    def _prune_unreachable(self, workflow: dict) -> None:
+        """Remove nodes that no output node (OUTPUT_NODE_TYPES) depends on."""
+        pending = [
+            node_id for node_id, node in workflow.items()
+            if node.get("class_type") in self.OUTPUT_NODE_TYPES
+        ]
+        reachable = set(pending)
+        while pending:
+            node = workflow[pending.pop()]
+            for value in node.get("inputs", {}).values():
+                if isinstance(value, list) and len(value) == 2 and value[0] in workflow \
+                        and value[0] not in reachable:
+                    reachable.add(value[0])
+                    pending.append(value[0])
+
+        for node_id in [n for n in workflow if n not in reachable]:
+            del workflow[node_id]
+
     def get_video_params(self, audio_duration: float, fps: int = 24, buffer_seconds: float = 1.0) -> dict:
         """
         Calculate video parameters from audio duration.
@@ -178,6 +750,435 @@ class WorkflowBuilder:
             "fps": fps,
         }
 
+    def plan_silence_trim(
+        self,
+        full_duration: float,
+        leading_seconds: float,
+        trailing_seconds: float,
+        fps: int = 24,
+        buffer_seconds: float = 1.0,
+    ) -> dict:
+        """
+        Plan generation for audio with leading/trailing silence cut off.
+
+        Only the voiced span (plus buffer) is sampled; the missing frames are
+        added back as static frames after decoding, so the delivered video
+        has the same frame count as an untrimmed run.
+
+        Args:
+            full_duration: Audio duration before trimming
+            leading_seconds: Silence cut from the start
+            trailing_seconds: Silence cut from the end
+            fps: Frames per second
+            buffer_seconds: Extra buffer time beyond audio duration
+
+        Returns:
+            dict with num_frames (to generate), full_num_frames, pad_start_frames,
+            pad_end_frames, trim_end_frames, frames_saved; pad_start_frames +
+            num_frames + pad_end_frames - trim_end_frames == full_num_frames
+        """
+        voiced_duration = full_duration - leading_seconds - trailing_seconds
+        num_frames = self.get_video_params(voiced_duration, fps=fps, buffer_seconds=buffer_seconds)["num_frames"]
+        full_num_frames = self.get_video_params(full_duration, fps=fps, buffer_seconds=buffer_seconds)["num_frames"]
+
+        # Leading padding must match the cut exactly to keep lip-sync; the tail
+        # absorbs rounding (and the 30-frame minimum on short clips). When the
+        # minimum makes the voiced span overrun, the surplus generated frames
+        # are past the audio and are cut from the end
+        pad_start_frames = round(leading_seconds * fps)
+        pad_end_frames = max(0, full_num_frames - num_frames - pad_start_frames)
+        trim_end_frames = max(0, num_frames + pad_start_frames - full_num_frames)
+
+        return {
+            "num_frames": num_frames,
+            "full_num_frames": full_num_frames,
+            "pad_start_frames": pad_start_frames,
+            "pad_end_frames": pad_end_frames,
+            "trim_end_frames": trim_end_frames,
+            "frames_saved": max(0, full_num_frames - num_frames),
+        }
+
+    def plan_generation_fps(
+        self,
+        duration: float,
+        fps: int,
+        generation_fps: int,
+        buffer_seconds: float = 1.0,
+    ) -> dict:
+        """
+        Frame counts of a low-fps generation (generation_fps) against native fps.
+
+        The video is sampled at generation_fps and interpolated to fps after
+        decoding. Sampling cost grows with latent frames (1 + (num_frames - 1) / 8),
+        so latent_frame_ratio is the share of the native run's video tokens.
+
+        Args:
+            duration: Audio / target duration in seconds
+            fps: Delivered frame rate
+            generation_fps: Sampled frame rate
+            buffer_seconds: Extra buffer time (as get_video_params)
+
+        Returns:
+            dict with generation_fps, generated_frames, native_frames, frames_saved,
+            latent_frame_ratio
+        """
+        native_frames = self.get_video_params(duration, fps=fps, buffer_seconds=buffer_seconds)["num_frames"]
+        generated_frames = self.get_video_params(
+            duration, fps=generation_fps, buffer_seconds=buffer_seconds
+        )["num_frames"]
+
+        def latent_frames(num_frames):
+            return 1 + (num_frames - 1) // 8
+
+        return {
+            "generation_fps": generation_fps,
+            "generated_frames": generated_frames,
+            "native_frames": native_frames,
+            "frames_saved": native_frames - generated_frames,
+            "latent_frame_ratio": round(latent_frames(generated_frames) / latent_frames(native_frames), 3),
+        }
+
+    def _apply_variants(self, workflow: dict, num_variants: int) -> None:
+        """
+        Sample num_variants videos in one batch and write one video per variant.
+
+        EmptyLTXVLatentVideo (162) and LTXVEmptyLatentAudio get batch_size
+        num_variants; an encoded input audio latent is repeated to the batch
+        (RepeatLatentBatch before the audio noise mask, 248). RandomNoise (178)
+        becomes LTX2VariantNoise, which noises batch element i from seed + i, so
+        variant i is the video a single job with seed + i would give. Text and
+        image conditioning, model loads and the sampling steps are shared.
+
+        After sampling, each variant's video latent (and generated audio latent)
+        is sliced out with LatentFromBatch and gets its own copy of the decode
+        and output nodes (VAEDecodeTiled -> VHS_VideoCombine, or the streaming
+        output node). Variant 0 keeps ids 234 / 190; get_variant_output_ids
+        lists the output nodes in variant order.
+        """
+        if num_variants > self.MAX_VARIANTS:
+            raise ValueError(f"num_variants must be at most {self.MAX_VARIANTS}")
+        streaming = workflow["190"]["class_type"] == "LTX2StreamingVideoOutput"
+        if not streaming and workflow["190"]["inputs"].get("images") != ["234", 0]:
+            raise ValueError("num_variants needs the decoded frames to go straight to the output node")
+
+        workflow["162"]["inputs"]["batch_size"] = num_variants
+        for node in workflow.values():
+            if node["class_type"] == "LTXVEmptyLatentAudio":
+                node["inputs"]["batch_size"] = num_variants
+        if workflow.get("248", {}).get("class_type") == "SetLatentNoiseMask":
+            workflow[self.AUDIO_REPEAT_NODE_ID] = {
+                "inputs": {
+                    "samples": workflow["248"]["inputs"]["samples"],
+                    "amount": num_variants
+                },
+                "class_type": "RepeatLatentBatch",
+                "_meta": {"title": "Repeat Audio Latent"}
+            }
+            workflow["248"]["inputs"]["samples"] = [self.AUDIO_REPEAT_NODE_ID, 0]
+        workflow["178"] = {
+            "inputs": {"noise_seed": workflow["178"]["inputs"]["noise_seed"]},
+            "class_type": "LTX2VariantNoise",
+            "_meta": {"title": "Noise (seed + variant)"}
+        }
+
+        output = workflow.pop("190")
+        decode = None if streaming else workflow.pop("234")
+        audio_source = output["inputs"].get("audio")
+        audio_decode = None
+        if audio_source and workflow[audio_source[0]]["class_type"] == "LTXVAudioVAEDecode":
+            # Generated audio is batched too: decode each variant's slice
+            audio_decode = workflow.pop(audio_source[0])
+
+        for variant in range(num_variants):
+            base = self.VARIANT_NODE_ID_BASE + 10 * variant
+            video_slice_id = str(base)
+            workflow[video_slice_id] = {
+                "inputs": {"samples": ["245", 0], "batch_index": variant, "length": 1},
+                "class_type": "LatentFromBatch",
+                "_meta": {"title": f"Video Latent (variant {variant})"}
+            }
+            output_inputs = copy.deepcopy(output["inputs"])
+            if variant:
+                output_inputs["filename_prefix"] = f"{output_inputs['filename_prefix']}_v{variant}"
+
+            if audio_decode:
+                audio_slice_id, audio_decode_id = str(base + 1), str(base + 2)
+                workflow[audio_slice_id] = {
+                    "inputs": {"samples": audio_decode["inputs"]["samples"], "batch_index": variant, "length": 1},
+                    "class_type": "LatentFromBatch",
+                    "_meta": {"title": f"Audio Latent (variant {variant})"}
+                }
+                workflow[audio_decode_id] = {
+                    "inputs": {**audio_decode["inputs"], "samples": [audio_slice_id, 0]},
+                    "class_type": audio_decode["class_type"],
+                    "_meta": {"title": f"Audio Decode (variant {variant})"}
+                }
+                output_inputs["audio"] = [audio_decode_id, 0]
+
+            if streaming:
+                output_inputs["samples"] = [video_slice_id, 0]
+            else:
+                decode_id = "234" if variant == 0 else str(base + 3)
+                workflow[decode_id] = {
+                    "inputs": {**decode["inputs"], "samples": [video_slice_id, 0]},
+                    "class_type": decode["class_type"],
+                    "_meta": {"title": f"VAE Decode (variant {variant})"}
+                }
+                output_inputs["images"] = [decode_id, 0]
+
+            workflow[self.get_variant_output_ids(num_variants)[variant]] = {
+                "inputs": output_inputs,
+                "class_type": output["class_type"],
+                "_meta": {"title": f"Video Output (variant {variant})"}
+            }
+
+    def get_variant_output_ids(self, num_variants: int) -> list:
+        """Output node ids of a num_variants workflow, in variant (seed) order."""
+        return ["190"] + [str(self.VARIANT_NODE_ID_BASE + 10 * variant + 4) for variant in range(1, num_variants)]
+
+    def snap_resolution(self, aspect_ratio: float, width: int = 1280, height: int = 736,
+                        tier: Optional[str] = None) -> dict:
+        """
+        Pick the resolution bucket closest to an aspect ratio.
+
+        The tier (pixel budget) is the given one, or with tier None the one
+        whose area is closest to width x height (log scale). Within the tier the bucket
+        (landscape or transposed) with the closest log aspect ratio wins, so
+        a portrait image gets a portrait frame instead of pillarboxing.
+
+        Args:
+            aspect_ratio: Source width / height (usually of the input image)
+            width: Requested width (sets the tier if tier is None)
+            height: Requested height
+            tier: RESOLUTION_BUCKETS key, overrides the requested size
+
+        Returns:
+            dict with tier, width, height, aspect_ratio (bucket), source_aspect_ratio,
+            requested ([width, height])
+
+        Raises:
+            ValueError: tier is not None and not a RESOLUTION_BUCKETS key
+        """
+        if tier is not None and tier not in self.RESOLUTION_BUCKETS:
+            raise ValueError(f"Unknown resolution_tier {tier!r}, expected one of "
+                             f"{', '.join(self.RESOLUTION_BUCKETS)} or auto")
+        if tier is None:
+            def area_distance(name):
+                bucket_width, bucket_height = self.RESOLUTION_BUCKETS[name][0]
+                return abs(math.log(bucket_width * bucket_height / (width * height)))
+
+            tier = min(self.RESOLUTION_BUCKETS, key=area_distance)
+        candidates = set()
+        for bucket_width, bucket_height in self.RESOLUTION_BUCKETS[tier]:
+            candidates.add((bucket_width, bucket_height))
+            candidates.add((bucket_height, bucket_width))
+        bucket_width, bucket_height = min(
+            sorted(candidates),
+            key=lambda size: abs(math.log(size[0] / size[1] / aspect_ratio)),
+        )
+        return {
+            "tier": tier,
+            "width": bucket_width,
+            "height": bucket_height,
+            "aspect_ratio": round(bucket_width / bucket_height, 3),
+            "source_aspect_ratio": round(aspect_ratio, 3),
+            "requested": [width, height],
+        }
+
+    def plan_two_stage(self, width: int, height: int, mode: str = "latent",
+                       refine_steps: int = 3, refine_denoise: float = 0.4) -> dict:
+        """
+        Stage sizes for two-stage generation at a requested output size.
+
+        Stage 1 samples at half the output size, rounded up to the 32 px
+        latent grid. The x2 upsample (latent) or frame upscale (pixel) gives
+        the working size, a multiple of 64 that is at least the output size;
+        any excess is center-cropped from the decoded frames. The input
+        image is fitted to the working size.
+
+        Args:
+            width: Requested output width
+            height: Requested output height
+            mode: "latent" (LTXVLatentUpsampler + refinement pass) or "pixel" (ImageScale)
+            refine_steps: Steps of the refinement pass (latent mode)
+            refine_denoise: Denoise of the refinement pass (latent mode)
+
+        Returns:
+            dict with mode, stage1, working, output, crop ([x, y]), decode
+            (size the VAE decodes at), refine_steps, refine_denoise
+        """
+        stage1 = [math.ceil(width / 64) * 32, math.ceil(height / 64) * 32]
+        working = [stage1[0] * 2, stage1[1] * 2]
+        return {
+            "mode": mode,
+            "stage1": stage1,
+            "working": working,
+            "output": [width, height],
+            "crop": [(working[0] - width) // 2, (working[1] - height) // 2],
+            "decode": working if mode == "latent" else stage1,
+            "refine_steps": refine_steps,
+            "refine_denoise": refine_denoise,
+        }
+
+    def estimate_two_stage_cost(self, plan: dict, num_frames: int, steps: int) -> dict:
+        """
+        Predicted sampling cost of a two-stage plan relative to one-stage at the output size.
+
+        Args:
+            plan: plan_two_stage result
+            num_frames: Video frame count
+            steps: Sampling steps of the (first-stage / native) pass
+
+        Returns:
+            dict with stage1_cost, refine_cost, native_cost (token-steps) and estimated_cost_ratio
+        """
+        latent_frames = 1 + (num_frames - 1) // 8
+
+        def step_cost(size):
+            tokens = latent_frames * (size[0] // 32) * (size[1] // 32)
+            return tokens * (1 + tokens / self.SAMPLING_ATTENTION_TOKENS)
+
+        output = [math.ceil(plan["output"][0] / 32) * 32, math.ceil(plan["output"][1] / 32) * 32]
+        stage1_cost = steps * step_cost(plan["stage1"])
+        refine_cost = plan["refine_steps"] * step_cost(plan["working"]) if plan["mode"] == "latent" else 0
+        native_cost = steps * step_cost(output)
+        return {
+            "stage1_cost": round(stage1_cost),
+            "refine_cost": round(refine_cost),
+            "native_cost": round(native_cost),
+            "estimated_cost_ratio": round((stage1_cost + refine_cost) / native_cost, 3),
+        }
+
+    @classmethod
+    def refine_seed(cls, seed: int) -> int:
+        """Noise seed of the two-stage refine pass for a stage 1 seed."""
+        return (int(seed) + cls.REFINE_SEED_OFFSET) % (1 << 64)
+
+    def _apply_two_stage(self, workflow: dict, plan: dict) -> None:
+        """
+        Turn a one-stage graph (built at the working size) into a two-stage one.
+
+        Latent mode: EmptyLTXVLatentVideo (162) is set to the stage 1 size; the
+        sampled video latent goes through LTXVLatentUpsampler, gets the first
+        frame re-injected at full size and is re-sampled for refine_steps at
+        refine_denoise with the audio latent held fixed, from its own noise
+        seed (refine_seed); VAEDecodeTiled (234) decodes the refined latent. Pixel mode: the stage 1 frames are scaled
+        to the working size. Both center-crop to the output size if needed.
+        """
+        workflow["162"]["inputs"]["width"], workflow["162"]["inputs"]["height"] = plan["stage1"]
+        working_width, working_height = plan["working"]
+
+        if plan["mode"] == "latent":
+            workflow[self.UPSCALE_MODEL_NODE_ID] = {
+                "inputs": {"model_name": self.LATENT_UPSCALER_MODEL},
+                "class_type": "LatentUpscaleModelLoader",
+                "_meta": {"title": "Load Latent Upscaler"}
+            }
+            workflow[self.LATENT_UPSAMPLE_NODE_ID] = {
+                "inputs": {
+                    "samples": ["245", 0],
+                    "upscale_model": [self.UPSCALE_MODEL_NODE_ID, 0],
+                    "vae": ["184", 2]
+                },
+                "class_type": "LTXVLatentUpsampler",
+                "_meta": {"title": "Latent Upsample x2"}
+            }
+            workflow[self.REFINE_IMAGE_NODE_ID] = {
+                "inputs": {
+                    "vae": ["184", 2],
+                    "image": workflow["239"]["inputs"]["image"],
+                    "latent": [self.LATENT_UPSAMPLE_NODE_ID, 0],
+                    "strength": workflow["239"]["inputs"]["strength"],
+                    "bypass": False
+                },
+                "class_type": "LTXVImgToVideoInplace",
+                "_meta": {"title": "Image to Video (Refine)"}
+            }
+            # Audio latent from stage 1 is kept as is (mask 0)
+            workflow[self.REFINE_AUDIO_MASK_NODE_ID] = {
+                "inputs": {"value": 0, "width": working_width, "height": working_height},
+                "class_type": "SolidMask",
+                "_meta": {"title": "Audio Mask (Refine)"}
+            }
+            workflow[self.REFINE_AUDIO_NODE_ID] = {
+                "inputs": {
+                    "samples": ["245", 1],
+                    "mask": [self.REFINE_AUDIO_MASK_NODE_ID, 0]
+                },
+                "class_type": "SetLatentNoiseMask",
+                "_meta": {"title": "Set Noise Mask (Refine)"}
+            }
+            workflow[self.REFINE_CONCAT_NODE_ID] = {
+                "inputs": {
+                    "video_latent": [self.REFINE_IMAGE_NODE_ID, 0],
+                    "audio_latent": [self.REFINE_AUDIO_NODE_ID, 0]
+                },
+                "class_type": "LTXVConcatAVLatent",
+                "_meta": {"title": "Concat AV Latent (Refine)"}
+            }
+            workflow[self.REFINE_SCHEDULER_NODE_ID] = {
+                "inputs": {
+                    **workflow["238"]["inputs"],
+                    "steps": plan["refine_steps"],
+                    "denoise": plan["refine_denoise"]
+                },
+                "class_type": "BasicScheduler",
+                "_meta": {"title": "Scheduler (Refine)"}
+            }
+            workflow[self.REFINE_NOISE_NODE_ID] = {
+                "inputs": {
+                    **workflow["178"]["inputs"],
+                    "noise_seed": self.refine_seed(workflow["178"]["inputs"]["noise_seed"])
+                },
+                "class_type": "RandomNoise",
+                "_meta": {"title": "Random Noise (Refine)"}
+            }
+            workflow[self.REFINE_SAMPLER_NODE_ID] = {
+                "inputs": {
+                    **workflow["161"]["inputs"],
+                    "noise": [self.REFINE_NOISE_NODE_ID, 0],
+                    "sigmas": [self.REFINE_SCHEDULER_NODE_ID, 0],
+                    "latent_image": [self.REFINE_CONCAT_NODE_ID, 0]
+                },
+                "class_type": "SamplerCustomAdvanced",
+                "_meta": {"title": "Sampler (Refine)"}
+            }
+            workflow[self.REFINE_SEPARATE_NODE_ID] = {
+                "inputs": {"av_latent": [self.REFINE_SAMPLER_NODE_ID, 0]},
+                "class_type": "LTXVSeparateAVLatent",
+                "_meta": {"title": "Separate AV (Refine)"}
+            }
+            workflow["234"]["inputs"]["samples"] = [self.REFINE_SEPARATE_NODE_ID, 0]
+            images = ["234", 0]
+        else:
+            workflow[self.PIXEL_UPSCALE_NODE_ID] = {
+                "inputs": {
+                    "image": ["234", 0],
+                    "upscale_method": "lanczos",
+                    "width": working_width,
+                    "height": working_height,
+                    "crop": "disabled"
+                },
+                "class_type": "ImageScale",
+                "_meta": {"title": "Upscale Frames"}
+            }
+            images = [self.PIXEL_UPSCALE_NODE_ID, 0]
+
+        if plan["working"] != plan["output"]:
+            workflow[self.OUTPUT_CROP_NODE_ID] = {
+                "inputs": {
+                    "image": images,
+                    "width": plan["output"][0],
+                    "height": plan["output"][1],
+                    "x": plan["crop"][0],
+                    "y": plan["crop"][1]
+                },
+                "class_type": "ImageCrop",
+                "_meta": {"title": "Crop to Output"}
+            }
+            images = [self.OUTPUT_CROP_NODE_ID, 0]
+        workflow["190"]["inputs"]["images"] = images
+
     def build_audio_gen_workflow(
         self,
         image_name: str,
@@ -196,6 +1197,13 @@ class WorkflowBuilder:
         img_compression: int = 23,
         img_strength: float = 1.0,
         buffer_seconds: float = 1.0,
+        image_prenormalized: bool = False,
+        latent_cache: Optional[dict] = None,
+        persist_latent_key: Optional[str] = None,
+        streaming_output: bool = False,
+        decode_vram_bytes: Optional[int] = None,
+        two_stage: Optional[dict] = None,
+        num_variants: int = 1,
     ) -> dict:
         """
         Build workflow for Image-to-Video+Audio generation (no input audio).
@@ -220,6 +1228,15 @@ class WorkflowBuilder:
             img_compression: Image compression level (default 23)
             img_strength: First frame injection strength (default 1.0)
             buffer_seconds: Extra buffer time beyond target duration (default 1.0s)
+            image_prenormalized: Image already resized/padded on the CPU (skip ImageResizeKJv2)
+            latent_cache: Cached image VAE encode, {"image": {"key": str, "hit": bool}}
+            persist_latent_key: Save the final video/audio latents under this key
+            streaming_output: Decode and encode in temporal chunks (LTX2StreamingVideoOutput)
+            decode_vram_bytes: VRAM budget for the VAE decode (plan_decode_tiling)
+            two_stage: Two-stage plan (plan_two_stage): sample at half size, then
+                upscale to width x height; None = one stage
+            num_variants: Videos sampled in one batch, seeds seed .. seed + num_variants - 1
+                (see _apply_variants); not combined with two_stage / persist_latent_key
 
         Returns:
             Complete workflow ready for ComfyUI execution
@@ -244,8 +1261,8 @@ class WorkflowBuilder:
         # Create parameter mapping for placeholder replacement
         params = {
             "INPUT_IMAGE": image_name,
-            "WIDTH": width,
-            "HEIGHT": height,
+            "WIDTH": two_stage["working"][0] if two_stage else width,
+            "HEIGHT": two_stage["working"][1] if two_stage else height,
             "NUM_FRAMES": num_frames,
             "AUDIO_FRAMES": audio_frames,
             "FPS": fps,
@@ -264,6 +1281,22 @@ class WorkflowBuilder:
         # Deep copy template and inject parameters
         workflow = self._inject_parameters(self.audio_gen_template, params)
 
+        if image_prenormalized:
+            self._bypass_nodes(workflow, "ImageResizeKJv2", "image")
+        if persist_latent_key:
+            self._add_job_latent_save(workflow, persist_latent_key)
+        if two_stage:
+            self._apply_two_stage(workflow, two_stage)
+        if decode_vram_bytes:
+            decode_width, decode_height = two_stage["decode"] if two_stage else (width, height)
+            self._apply_decode_tiling(workflow, decode_width, decode_height, num_frames, decode_vram_bytes)
+        if streaming_output:
+            self._apply_streaming_output(workflow)
+        if latent_cache:
+            self._apply_latent_cache(workflow, latent_cache)
+        if num_variants > 1:
+            self._apply_variants(workflow, num_variants)
+
         return workflow
 
     def get_audio_gen_params(self, duration: float, fps: int = 24, buffer_seconds: float = 1.0) -> dict:
@@ -378,6 +1411,10 @@ class WorkflowBuilder:
         trim_to_audio: bool = False,
         frame_alignment: int = 8,
         buffer_seconds: float = 1.0,
+        image_prenormalized: bool = False,
+        audio_prenormalized: bool = False,
+        streaming_output: bool = False,
+        decode_vram_bytes: Optional[int] = None,
     ) -> dict:
         """
         Build workflow for multi-keyframe video generation (Mode 3).
@@ -407,6 +1444,10 @@ class WorkflowBuilder:
             trim_to_audio: Whether to trim video to audio length (default False)
             frame_alignment: Frame alignment interval for keyframes (default 8, set to 1 to disable)
             buffer_seconds: Extra buffer time beyond input duration (default 1.0s)
+            image_prenormalized: Keyframe images already resized/padded on the CPU (skip ImageResizeKJv2)
+            audio_prenormalized: Mode 3a audio already trimmed on the CPU (skip TrimAudioDuration)
+            streaming_output: Decode and encode in temporal chunks (LTX2StreamingVideoOutput)
+            decode_vram_bytes: VRAM budget for the VAE decode (plan_decode_tiling)
 
         Returns:
             Complete workflow ready for ComfyUI execution
@@ -447,11 +1488,25 @@ class WorkflowBuilder:
 
         # Create load/resize/preprocess nodes for each keyframe
         keyframe_node_ids = []
+        # Keyframes that reference the same uploaded image share one
+        # LoadImage -> Resize -> Preprocess chain (loop-back / bookend videos)
+        preprocess_by_image = {}
         for i, kf in enumerate(keyframes):
             image_name = kf.get("image_name", "")
             frame_position = kf.get("frame_position", "first" if i == 0 else "last")
             strength = kf.get("strength", 1.0)
 
+            # Calculate frame index
+            frame_idx = self._calculate_frame_index(frame_position, num_frames, frame_alignment)
+
+            if image_name in preprocess_by_image:
+                keyframe_node_ids.append({
+                    "preprocess_node_id": preprocess_by_image[image_name],
+                    "frame_idx": frame_idx,
+                    "strength": strength
+                })
+                continue
+
             # LoadImage node
             load_node_id = str(node_id)
             workflow[load_node_id] = {
@@ -494,9 +1549,7 @@ class WorkflowBuilder:
             }
             node_id += 1
 
-            # Calculate frame index
-            frame_idx = self._calculate_frame_index(frame_position, num_frames, frame_alignment)
-
+            preprocess_by_image[image_name] = preprocess_node_id
             keyframe_node_ids.append({
                 "preprocess_node_id": preprocess_node_id,
                 "frame_idx": frame_idx,
@@ -597,25 +1650,27 @@ class WorkflowBuilder:
             }
             node_id += 1
 
-            # TrimAudioDuration node
-            trim_audio_node_id = str(node_id)
-            workflow[trim_audio_node_id] = {
-                "inputs": {
-                    "audio": [load_audio_node_id, 0],
-                    "max_duration": audio_duration,
-                    "duration": audio_duration,
-                    "start_index": 0
-                },
-                "class_type": "TrimAudioDuration",
-                "_meta": {"title": "Trim Audio"}
-            }
-            node_id += 1
+            # TrimAudioDuration node (audio trimmed on the CPU needs none)
+            audio_input_node_id = load_audio_node_id
+            if not audio_prenormalized:
+                audio_input_node_id = str(node_id)
+                workflow[audio_input_node_id] = {
+                    "inputs": {
+                        "audio": [load_audio_node_id, 0],
+                        "max_duration": audio_duration,
+                        "duration": audio_duration,
+                        "start_index": 0
+                    },
+                    "class_type": "TrimAudioDuration",
+                    "_meta": {"title": "Trim Audio"}
+                }
+                node_id += 1
 
             # Audio VAE Encode
             audio_encode_node_id = str(node_id)
             workflow[audio_encode_node_id] = {
                 "inputs": {
-                    "audio": [trim_audio_node_id, 0],
+                    "audio": [audio_input_node_id, 0],
                     "audio_vae": ["171", 0]
                 },
                 "class_type": "LTXVAudioVAEEncode",
@@ -660,7 +1715,7 @@ class WorkflowBuilder:
             }
             node_id += 1
 
-            audio_output_ref = [trim_audio_node_id, 0]
+            audio_output_ref = [audio_input_node_id, 0]
 
         # Add SamplerCustomAdvanced node
         sampler_node_id = "161"
@@ -715,6 +1770,13 @@ class WorkflowBuilder:
 
         workflow = self._inject_parameters(workflow, params)
 
+        if image_prenormalized:
+            self._bypass_nodes(workflow, "ImageResizeKJv2", "image")
+        if decode_vram_bytes:
+            self._apply_decode_tiling(workflow, width, height, num_frames, decode_vram_bytes)
+        if streaming_output:
+            self._apply_streaming_output(workflow)
+
         return workflow
 
     def get_multiframe_params(
@@ -822,6 +1884,10 @@ class WorkflowBuilder:
         frame_alignment: int = 8,
         buffer_seconds: float = 1.0,
         auto_buffer_guide: Union[bool, str] = True,
+        image_prenormalized: bool = False,
+        audio_prenormalized: bool = False,
+        streaming_output: bool = False,
+        decode_vram_bytes: Optional[int] = None,
     ) -> dict:
         """
         Build workflow for multi-keyframe video generation using chained LTXVAddGuide nodes (Mode 4).
@@ -860,6 +1926,10 @@ class WorkflowBuilder:
                 - True or "add_node": Add implicit guide node at buffer end (方案 A)
                 - "extend_last": Move last keyframe position to buffer end (方案 C)
                 - False or "none": Disable buffer guide
+            image_prenormalized: Keyframe images already resized/padded on the CPU (skip ImageResizeKJv2)
+            audio_prenormalized: Mode 3a audio already trimmed on the CPU (skip TrimAudioDuration)
+            streaming_output: Decode and encode in temporal chunks (LTX2StreamingVideoOutput)
+            decode_vram_bytes: VRAM budget for the VAE decode (plan_decode_tiling)
 
         Returns:
             Complete workflow ready for ComfyUI execution
@@ -900,11 +1970,26 @@ class WorkflowBuilder:
 
         # Create load/resize/preprocess nodes for each keyframe
         keyframe_node_ids = []
+        # Keyframes that reference the same uploaded image share one
+        # LoadImage -> Resize -> Preprocess chain (loop-back / bookend videos)
+        preprocess_by_image = {}
+
         for i, kf in enumerate(keyframes):
             image_name = kf.get("image_name", "")
             frame_position = kf.get("frame_position", "first" if i == 0 else "last")
             strength = kf.get("strength", 1.0)
 
+            # Calculate frame index
+            frame_idx = self._calculate_frame_index(frame_position, num_frames, frame_alignment)
+
+            if image_name in preprocess_by_image:
+                keyframe_node_ids.append({
+                    "preprocess_node_id": preprocess_by_image[image_name],
+                    "frame_idx": frame_idx,
+                    "strength": strength
+                })
+                continue
+
             # LoadImage node
             load_node_id = str(node_id)
             workflow[load_node_id] = {
@@ -947,9 +2032,7 @@ class WorkflowBuilder:
             }
             node_id += 1
 
-            # Calculate frame index
-            frame_idx = self._calculate_frame_index(frame_position, num_frames, frame_alignment)
-
+            preprocess_by_image[image_name] = preprocess_node_id
             keyframe_node_ids.append({
                 "preprocess_node_id": preprocess_node_id,
                 "frame_idx": frame_idx,
@@ -1096,25 +2179,27 @@ class WorkflowBuilder:
             }
             node_id += 1
 
-            # TrimAudioDuration node
-            trim_audio_node_id = str(node_id)
-            workflow[trim_audio_node_id] = {
-                "inputs": {
-                    "audio": [load_audio_node_id, 0],
-                    "max_duration": audio_duration,
-                    "duration": audio_duration,
-                    "start_index": 0
-                },
-                "class_type": "TrimAudioDuration",
-                "_meta": {"title": "Trim Audio"}
-            }
-            node_id += 1
+            # TrimAudioDuration node (audio trimmed on the CPU needs none)
+            audio_input_node_id = load_audio_node_id
+            if not audio_prenormalized:
+                audio_input_node_id = str(node_id)
+                workflow[audio_input_node_id] = {
+                    "inputs": {
+                        "audio": [load_audio_node_id, 0],
+                        "max_duration": audio_duration,
+                        "duration": audio_duration,
+                        "start_index": 0
+                    },
+                    "class_type": "TrimAudioDuration",
+                    "_meta": {"title": "Trim Audio"}
+                }
+                node_id += 1
 
             # Audio VAE Encode
             audio_encode_node_id = str(node_id)
             workflow[audio_encode_node_id] = {
                 "inputs": {
-                    "audio": [trim_audio_node_id, 0],
+                    "audio": [audio_input_node_id, 0],
                     "audio_vae": ["171", 0]
                 },
                 "class_type": "LTXVAudioVAEEncode",
@@ -1159,7 +2244,7 @@ class WorkflowBuilder:
             }
             node_id += 1
 
-            audio_output_ref = [trim_audio_node_id, 0]
+            audio_output_ref = [audio_input_node_id, 0]
 
         # Add SamplerCustomAdvanced node
         sampler_node_id = "161"
@@ -1214,4 +2299,11 @@ class WorkflowBuilder:
 
         workflow = self._inject_parameters(workflow, params)
 
+        if image_prenormalized:
+            self._bypass_nodes(workflow, "ImageResizeKJv2", "image")
+        if decode_vram_bytes:
+            self._apply_decode_tiling(workflow, width, height, num_frames, decode_vram_bytes)
+        if streaming_output:
+            self._apply_streaming_output(workflow)
+
         return workflow
@@ -0,0 +1,484 @@
+#!/usr/bin/env python3
+"""
+Batch client for the LTX-2 endpoint: runs a JSONL file of jobs through
+RunPod's async API (/run + /status) and downloads the videos.
+
+Each line of the jobs file is a job input ({"image_url": ..., "audio_url":
+..., ...}, see test_api_client.py) or {"id": "name", "input": {...}}. The
+id names the output files; without one it is a hash of the input (with a
+-2, -3... suffix for repeated inputs).
+
+- At most --concurrency jobs are submitted or running at once; 429 and 5xx
+  answers are retried with exponential backoff.
+- /status is polled at half the job's reported ETA (eta_seconds of the
+  progress output, job_progress.py), between --min-poll and --max-poll;
+  without an ETA the interval grows by half each poll.
+- Failed, cancelled and timed-out jobs are resubmitted up to --retries
+  times; jobs running past --job-timeout are cancelled.
+- Videos are downloaded to --output-dir/<id>.mp4 (variants: <id>_v<n>.mp4)
+  by --download-concurrency workers, through .part files resumed with HTTP
+  Range after a dropped connection; inline (video_base64) results are
+  decoded.
+
+Progress is checkpointed to --output-dir/batch_state.jsonl (one line per
+state change: submitted, completed, downloaded, failed). Running the same
+command again after an interruption skips downloaded jobs, finishes the
+downloads of completed ones, polls submitted ones instead of resubmitting
+them (jobs whose results expired are submitted again), and skips failed
+ones unless --retry-failed.
+
+Needs aiohttp. test/fake_runpod_api.py serves a local endpoint to try it
+against (--endpoint-url http://127.0.0.1:8000).
+
+Usage:
+    export RUNPOD_API_KEY=your_api_key
+    python scripts/batch_client.py jobs.jsonl --output-dir ./videos [--concurrency 16]
+"""
+import argparse
+import asyncio
+import base64
+import collections
+import hashlib
+import json
+import os
+import random
+import sys
+import time
+from typing import Optional
+
+import aiohttp
+
+ENDPOINT_ID = os.environ.get("RUNPOD_ENDPOINT_ID", "42qdgmzjc9ldy5")
+RUNPOD_API_URL = f"https://api.runpod.ai/v2/{ENDPOINT_ID}"
+STATE_FILE = "batch_state.jsonl"
+
+FAILED_STATUSES = ("FAILED", "CANCELLED", "TIMED_OUT")
+# Poll at this share of the reported ETA
+POLL_ETA_FRACTION = 0.5
+# Growth of the poll interval while no ETA is reported
+POLL_BACKOFF = 1.5
+# Attempts of an API request or download before giving up
+REQUEST_ATTEMPTS = 6
+# Backoff of retried requests: base * 2^attempt seconds, capped
+BACKOFF_BASE_SECONDS = 1.0
+BACKOFF_MAX_SECONDS = 30.0
+CHUNK_BYTES = 1024 * 1024
+
+
+def backoff(attempt: int, base: float = BACKOFF_BASE_SECONDS) -> float:
+    """Exponential backoff with full jitter."""
+    return random.uniform(0, min(BACKOFF_MAX_SECONDS, base * 2 ** attempt))
+
+
+def percentiles(samples) -> dict:
+    """p50 / p90 / p99 of samples in seconds (nearest rank)."""
+    ordered = sorted(samples)
+    if not ordered:
+        return {"count": 0}
+    result = {"count": len(ordered)}
+    for name, fraction in (("p50", 0.5), ("p90", 0.9), ("p99", 0.99)):
+        result[name] = round(ordered[min(len(ordered) - 1, int(fraction * len(ordered)))], 2)
+    return result
+
+
+def load_jobs(path: str) -> list:
+    """(key, input) pairs of a jobs JSONL file, in file order."""
+    jobs = []
+    seen = collections.Counter()
+    with open(path) as f:
+        for number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            if not isinstance(entry, dict):
+                raise ValueError(f"{path}:{number}: expected a JSON object")
+            if isinstance(entry.get("input"), dict):
+                key, job_input = entry.get("id"), entry["input"]
+            else:
+                key, job_input = None, entry
+            if key is None:
+                key = hashlib.sha256(json.dumps(job_input, sort_keys=True).encode()).hexdigest()[:16]
+            key = str(key)
+            seen[key] += 1
+            if seen[key] > 1:
+                key = f"{key}-{seen[key]}"
+            jobs.append((key, job_input))
+    return jobs
+
+
+def without_base64(value):
+    """Output with inline videos (video_base64) left out, for the checkpoint."""
+    if isinstance(value, dict):
+        return {key: without_base64(item) for key, item in value.items() if not key.endswith("base64")}
+    if isinstance(value, list):
+        return [without_base64(item) for item in value]
+    return value
+
+
+def video_files(key: str, output: dict) -> list:
+    """
+    Files of a handler output: [{"name", "url" or "base64"}], one per variant.
+
+    Variant 0 is <key>.mp4; its inline fallback is the top-level video_base64.
+    """
+    extension = os.path.splitext(output.get("video_filename") or "")[1] or ".mp4"
+    videos = output.get("videos") or [{"variant": 0, "video_url": output.get("video_url")}]
+    files = []
+    for video in videos:
+        variant = video.get("variant", 0)
+        name = f"{key}{extension}" if variant == 0 else f"{key}_v{variant}{extension}"
+        inline = video.get("video_base64") or (output.get("video_base64") if variant == 0 else None)
+        if video.get("video_url"):
+            files.append({"name": name, "url": video["video_url"]})
+        elif inline:
+            files.append({"name": name, "base64": inline})
+        else:
+            raise ValueError(f"no video_url or video_base64 for variant {variant}")
+    return files
+
+
+class BatchState:
+    """
+    Append-only checkpoint of a batch: one JSON line per job state change,
+    later lines updating the fields of earlier ones.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.jobs = {}
+        if os.path.exists(path):
+            with open(path) as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue  # Line cut short by an interruption
+                    self.jobs.setdefault(record["key"], {}).update(record)
+        self._file = open(path, "a")
+
+    def get(self, key: str) -> dict:
+        return self.jobs.get(key, {})
+
+    def record(self, key: str, state: str, **fields) -> None:
+        record = {"key": key, "state": state, "time": round(time.time(), 3), **fields}
+        self.jobs.setdefault(key, {}).update(record)
+        self._file.write(json.dumps(record) + "\n")
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def close(self) -> None:
+        self._file.close()
+
+
+class BatchClient:
+    """
+    Runs jobs through a RunPod endpoint's async API and downloads the results.
+
+    Args:
+        endpoint_url: Endpoint base URL (https://api.runpod.ai/v2/<endpoint id>)
+        api_key: RunPod API key
+        output_dir: Directory of the videos and the checkpoint
+        concurrency: Jobs submitted or running at once
+        download_concurrency: Downloads at once
+        min_poll: Shortest /status interval, seconds
+        max_poll: Longest /status interval, seconds
+        job_timeout: Seconds from submission before a job is cancelled
+        retries: Resubmissions of a failed job
+        retry_failed: Run jobs the checkpoint records as failed again
+    """
+
+    def __init__(self, endpoint_url: str, api_key: str, output_dir: str, concurrency: int = 16,
+                 download_concurrency: int = 4, min_poll: float = 2.0, max_poll: float = 30.0,
+                 job_timeout: float = 1800.0, retries: int = 1, retry_failed: bool = False):
+        self.endpoint_url = endpoint_url.rstrip("/")
+        self.headers = {"Authorization": f"Bearer {api_key}"} if api_key else {}
+        self.output_dir = output_dir
+        self.concurrency = concurrency
+        self.download_concurrency = download_concurrency
+        self.min_poll = min_poll
+        self.max_poll = max_poll
+        self.job_timeout = job_timeout
+        self.retries = retries
+        self.retry_failed = retry_failed
+        self.state = None
+        self.session = None
+        self.counts = collections.Counter()
+        self.latencies = []
+
+    async def run(self, jobs: list) -> dict:
+        """Run (key, input) jobs to completion; returns the summary."""
+        os.makedirs(self.output_dir, exist_ok=True)
+        self.state = BatchState(os.path.join(self.output_dir, STATE_FILE))
+        start = time.time()
+        job_queue, download_queue = asyncio.Queue(), asyncio.Queue()
+        for key, job_input in jobs:
+            entry = self.state.get(key)
+            if entry.get("state") == "downloaded" and all(
+                    os.path.exists(os.path.join(self.output_dir, file["name"])) for file in entry["files"]):
+                self.counts["skipped"] += 1
+            elif entry.get("state") == "failed" and not self.retry_failed:
+                self.counts["skipped_failed"] += 1
+            elif entry.get("state") in ("completed", "downloaded"):
+                download_queue.put_nowait(key)
+            else:
+                job_queue.put_nowait((key, job_input))
+
+        connector = aiohttp.TCPConnector(limit=self.concurrency + self.download_concurrency)
+        timeout = aiohttp.ClientTimeout(total=None, sock_connect=30, sock_read=60)
+        async with aiohttp.ClientSession(connector=connector, timeout=timeout) as self.session:
+            workers = [asyncio.create_task(self._job_worker(job_queue, download_queue))
+                       for _ in range(self.concurrency)]
+            workers += [asyncio.create_task(self._download_worker(download_queue))
+                        for _ in range(self.download_concurrency)]
+            try:
+                await job_queue.join()
+                await download_queue.join()
+            finally:
+                for worker in workers:
+                    worker.cancel()
+                await asyncio.gather(*workers, return_exceptions=True)
+                self.state.close()
+        return self.summary(len(jobs), time.time() - start)
+
+    def summary(self, total: int, seconds: float) -> dict:
+        finished = self.counts["downloaded"]
+        return {
+            "jobs": total,
+            **{name: self.counts[name] for name in (
+                "downloaded", "failed", "download_errors", "skipped", "skipped_failed",
+                "submitted", "resubmitted", "resumed_polls", "resumed_downloads", "polls")},
+            "seconds": round(seconds, 1),
+            "jobs_per_minute": round(finished * 60 / seconds, 2) if seconds > 0 else None,
+            "job_seconds": percentiles(self.latencies),
+        }
+
+    # API
+
+    async def _api(self, method: str, path: str, payload: Optional[dict] = None):
+        """
+        Call the endpoint; 429, 5xx and connection errors are retried.
+
+        Returns:
+            (HTTP status, JSON body or None)
+        """
+        url = f"{self.endpoint_url}/{path}"
+        for attempt in range(REQUEST_ATTEMPTS):
+            try:
+                async with self.session.request(method, url, json=payload, headers=self.headers) as response:
+                    if response.status == 429 or response.status >= 500:
+                        error = f"HTTP {response.status}"
+                    else:
+                        body = await response.json(content_type=None) if response.status != 204 else None
+                        return response.status, body
+            except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+                error = f"{type(e).__name__}: {e}"
+            if attempt < REQUEST_ATTEMPTS - 1:
+                await asyncio.sleep(backoff(attempt))
+        raise RuntimeError(f"{method} {path}: {error}")
+
+    async def _submit(self, key: str, job_input: dict, attempt: int) -> str:
+        status, body = await self._api("POST", "run", {"input": job_input})
+        if status != 200 or not (body or {}).get("id"):
+            raise RuntimeError(f"/run: HTTP {status}: {body}")
+        self.counts["submitted"] += 1
+        self.state.record(key, "submitted", job_id=body["id"], attempt=attempt, submitted=round(time.time(), 3))
+        return body["id"]
+
+    async def _poll(self, job_id: str, submitted: float) -> Optional[dict]:
+        """
+        Poll a job until it ends (cancelling it after job_timeout).
+
+        Returns:
+            The final /status body, or None if the endpoint no longer knows the job
+        """
+        delay = self.min_poll
+        while True:
+            status, body = await self._api("GET", f"status/{job_id}")
+            self.counts["polls"] += 1
+            if status == 404:
+                return None
+            if status != 200:
+                raise RuntimeError(f"/status: HTTP {status}: {body}")
+            if body.get("status") == "COMPLETED" or body.get("status") in FAILED_STATUSES:
+                return body
+            if time.time() - submitted > self.job_timeout:
+                await self._api("POST", f"cancel/{job_id}")
+                return {"id": job_id, "status": "TIMED_OUT", "error": f"No result after {self.job_timeout:.0f}s"}
+            progress = body.get("output") if isinstance(body.get("output"), dict) else {}
+            if progress.get("eta_seconds") is not None:
+                delay = min(self.max_poll, max(self.min_poll, progress["eta_seconds"] * POLL_ETA_FRACTION))
+            else:
+                delay = min(self.max_poll, delay * POLL_BACKOFF)
+            await asyncio.sleep(delay * random.uniform(0.9, 1.1))
+
+    # Workers
+
+    async def _job_worker(self, job_queue: asyncio.Queue, download_queue: asyncio.Queue) -> None:
+        while True:
+            key, job_input = await job_queue.get()
+            try:
+                if await self._run_job(key, job_input):
+                    download_queue.put_nowait(key)
+            except Exception as e:
+                # Left as submitted (or not at all) in the checkpoint: the next run picks it up
+                self.counts["failed"] += 1
+                print(f"  {key}: {e}")
+            finally:
+                job_queue.task_done()
+
+    async def _run_job(self, key: str, job_input: dict) -> bool:
+        """Submit (or resume polling) a job until it completes or runs out of retries."""
+        entry = self.state.get(key)
+        attempt = entry.get("attempt", 0) if entry.get("state") == "submitted" else 0
+        job_id = entry.get("job_id") if entry.get("state") == "submitted" else None
+        submitted = entry.get("submitted", time.time())
+        if job_id:
+            self.counts["resumed_polls"] += 1
+        while True:
+            if job_id is None:
+                job_id = await self._submit(key, job_input, attempt)
+                submitted = time.time()
+            result = await self._poll(job_id, submitted)
+            if result is None:
+                # Results expire some time after the job ends: run it again
+                self.counts["resubmitted"] += 1
+                job_id = None
+                continue
+            output = result.get("output") if isinstance(result.get("output"), dict) else {}
+            if result["status"] == "COMPLETED" and output.get("status") != "error":
+                break
+            error = result.get("error") or output.get("error") or result["status"]
+            if attempt >= self.retries:
+                self.counts["failed"] += 1
+                self.state.record(key, "failed", job_id=job_id, status=result["status"], error=str(error)[:1000])
+                print(f"  {key}: {result['status']}: {str(error)[:200]}")
+                return False
+            attempt += 1
+            self.counts["resubmitted"] += 1
+            job_id = None
+
+        output = output.get("output", output)
+        files = video_files(key, output)
+        for file in files:
+            if "base64" in file:
+                path = os.path.join(self.output_dir, file["name"])
+                with open(path + ".part", "wb") as f:
+                    f.write(base64.b64decode(file.pop("base64")))
+                os.replace(path + ".part", path)
+        self.latencies.append(time.time() - submitted)
+        self.state.record(key, "completed", job_id=job_id, files=files, output=without_base64(output),
+                          seconds=round(time.time() - submitted, 1))
+        return True
+
+    async def _download_worker(self, download_queue: asyncio.Queue) -> None:
+        while True:
+            key = await download_queue.get()
+            try:
+                for file in self.state.get(key)["files"]:
+                    if file.get("url"):
+                        await self._download(file["url"], os.path.join(self.output_dir, file["name"]))
+                self.counts["downloaded"] += 1
+                self.state.record(key, "downloaded")
+            except Exception as e:
+                # Stays completed: the next run retries the download
+                self.counts["download_errors"] += 1
+                print(f"  {key}: download failed: {e}")
+            finally:
+                download_queue.task_done()
+
+    async def _download(self, url: str, path: str) -> None:
+        """Download url to path through path.part, resuming it after dropped connections."""
+        if os.path.exists(path):
+            return
+        part = path + ".part"
+        for attempt in range(REQUEST_ATTEMPTS):
+            offset = os.path.getsize(part) if os.path.exists(part) else 0
+            if offset:
+                self.counts["resumed_downloads"] += 1
+            headers = {"Range": f"bytes={offset}-"} if offset else {}
+            try:
+                async with self.session.get(url, headers=headers) as response:
+                    if response.status == 416:
+                        # Range past the end: the part is complete if it matches the size
+                        total = response.headers.get("Content-Range", "").rpartition("/")[2]
+                        if total.isdigit() and int(total) == offset:
+                            break
+                        os.remove(part)
+                        continue
+                    if response.status not in (200, 206):
+                        if response.status == 429 or response.status >= 500:
+                            raise aiohttp.ClientResponseError(response.request_info, (), status=response.status)
+                        raise RuntimeError(f"HTTP {response.status}")
+                    if response.status == 200:
+                        offset = 0  # Range not honoured: start over
+                    expected = offset + response.content_length if response.content_length is not None else None
+                    with open(part, "ab" if offset else "wb") as f:
+                        async for chunk in response.content.iter_chunked(CHUNK_BYTES):
+                            f.write(chunk)
+                    if expected is not None and os.path.getsize(part) < expected:
+                        raise aiohttp.ClientPayloadError(f"{os.path.getsize(part)} of {expected} bytes")
+                break
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                if attempt == REQUEST_ATTEMPTS - 1:
+                    raise RuntimeError(f"{type(e).__name__}: {e}")
+                await asyncio.sleep(backoff(attempt, base=0.5))
+        os.replace(part, path)
+
+
+def print_summary(summary: dict) -> None:
+    print("\n" + "=" * 60)
+    print(f"Jobs: {summary['jobs']}  downloaded: {summary['downloaded']}  failed: {summary['failed']}  "
+          f"download errors: {summary['download_errors']}")
+    print(f"Skipped (already downloaded): {summary['skipped']}  skipped failed: {summary['skipped_failed']}")
+    print(f"Submitted: {summary['submitted']}  resubmitted: {summary['resubmitted']}  "
+          f"resumed polls: {summary['resumed_polls']}  resumed downloads: {summary['resumed_downloads']}")
+    job_seconds = summary["job_seconds"]
+    print(f"Wall time: {summary['seconds']}s  throughput: {summary['jobs_per_minute']} jobs/min  "
+          f"polls: {summary['polls']}")
+    if job_seconds:
+        print(f"Job seconds: p50 {job_seconds['p50']:.1f}  p90 {job_seconds['p90']:.1f}  "
+              f"p99 {job_seconds['p99']:.1f}")
+    print("=" * 60)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("jobs", help="JSONL file of job inputs")
+    parser.add_argument("--output-dir", default="batch_output", help="Videos and checkpoint (default: batch_output)")
+    parser.add_argument("--endpoint-url", default=RUNPOD_API_URL, help=f"Endpoint URL (default: {RUNPOD_API_URL})")
+    parser.add_argument("--api-key", default=os.environ.get("RUNPOD_API_KEY"), help="Default: $RUNPOD_API_KEY")
+    parser.add_argument("--concurrency", type=int, default=16, help="Jobs in flight (default: 16)")
+    parser.add_argument("--download-concurrency", type=int, default=4, help="Downloads at once (default: 4)")
+    parser.add_argument("--min-poll", type=float, default=2.0, help="Shortest poll interval (default: 2s)")
+    parser.add_argument("--max-poll", type=float, default=30.0, help="Longest poll interval (default: 30s)")
+    parser.add_argument("--job-timeout", type=float, default=1800, help="Cancel jobs after this long (default: 1800s)")
+    parser.add_argument("--retries", type=int, default=1, help="Resubmissions of a failed job (default: 1)")
+    parser.add_argument("--retry-failed", action="store_true", help="Run jobs checkpointed as failed again")
+    parser.add_argument("--json", help="Write the summary to this file")
+    args = parser.parse_args()
+
+    if not args.api_key and args.endpoint_url == RUNPOD_API_URL:
+        print("Error: set RUNPOD_API_KEY or pass --api-key")
+        return 1
+    jobs = load_jobs(args.jobs)
+    client = BatchClient(args.endpoint_url, args.api_key, args.output_dir, concurrency=args.concurrency,
+                         download_concurrency=args.download_concurrency, min_poll=args.min_poll,
+                         max_poll=args.max_poll, job_timeout=args.job_timeout, retries=args.retries,
+                         retry_failed=args.retry_failed)
+    print(f"Running {len(jobs)} jobs on {args.endpoint_url} ({args.concurrency} in flight), "
+          f"output: {args.output_dir}")
+    try:
+        summary = asyncio.run(client.run(jobs))
+    except KeyboardInterrupt:
+        print(f"\nInterrupted; progress is in {os.path.join(args.output_dir, STATE_FILE)}. "
+              f"Run the same command again to resume.")
+        return 130
+    print_summary(summary)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(summary, f, indent=2)
+    return 0 if not summary["failed"] and not summary["download_errors"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -9,11 +9,16 @@ echo "========================================"
 
 BASE="/workspace/ComfyUI/models"
 
+# 模型同步引擎 (分块并行下载 + 断点续传 + sha256 记录)
+SCRIPT_DIR="$(cd "$(dirname "$0")" && pwd)"
+MODEL_SYNC="${MODEL_SYNC:-${SCRIPT_DIR}/../docker/pod_files/model_sync.py}"
+[ -f "$MODEL_SYNC" ] || MODEL_SYNC="/model_sync.py"
+
 echo ""
 echo "步骤 1: 下载音频处理模型 (MelBandRoformer)"
 echo "----------------------------------------"
 cd "${BASE}/diffusion_models"
-wget -c https://huggingface.co/Kijai/MelBandRoFormer_comfy/resolve/main/MelBandRoformer_fp16.safetensors
+python3 "$MODEL_SYNC" fetch https://huggingface.co/Kijai/MelBandRoFormer_comfy/resolve/main/MelBandRoformer_fp16.safetensors .
 ls -lh MelBandRoformer_fp16.safetensors
 
 echo ""
@@ -22,13 +27,13 @@ echo "----------------------------------------"
 cd "${BASE}/loras"
 
 echo "下载 distilled-lora-384..."
-wget -c https://huggingface.co/Lightricks/LTX-2/resolve/main/ltx-2-19b-distilled-lora-384.safetensors
+python3 "$MODEL_SYNC" fetch https://huggingface.co/Lightricks/LTX-2/resolve/main/ltx-2-19b-distilled-lora-384.safetensors .
 
 echo "下载 ic-lora-detailer..."
-wget -c https://huggingface.co/Lightricks/LTX-2-19b-IC-LoRA-Detailer/resolve/main/ltx-2-19b-ic-lora-detailer.safetensors
+python3 "$MODEL_SYNC" fetch https://huggingface.co/Lightricks/LTX-2-19b-IC-LoRA-Detailer/resolve/main/ltx-2-19b-ic-lora-detailer.safetensors .
 
 echo "下载 camera-control-dolly-in..."
-wget -c https://huggingface.co/Lightricks/LTX-2-19b-LoRA-Camera-Control-Dolly-In/resolve/main/ltx-2-19b-lora-camera-control-dolly-in.safetensors
+python3 "$MODEL_SYNC" fetch https://huggingface.co/Lightricks/LTX-2-19b-LoRA-Camera-Control-Dolly-In/resolve/main/ltx-2-19b-lora-camera-control-dolly-in.safetensors .
 
 echo ""
 echo "步骤 3: 验证文件"
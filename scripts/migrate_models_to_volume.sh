@@ -12,6 +12,11 @@ SRC_BASE="/workspace/ComfyUI/models"
 # 目标路径 (Network Volume)
 DEST_BASE="/runpod-volume/ComfyUI/models"
 
+# 模型同步引擎 (分块并行复制 + 断点续传 + sha256 校验)
+SCRIPT_DIR="$(cd "$(dirname "$0")" && pwd)"
+MODEL_SYNC="${MODEL_SYNC:-${SCRIPT_DIR}/../docker/pod_files/model_sync.py}"
+[ -f "$MODEL_SYNC" ] || MODEL_SYNC="/model_sync.py"
+
 echo ""
 echo "步骤 1: 创建目标目录结构"
 echo "----------------------------------------"
@@ -25,11 +30,11 @@ echo "步骤 2: 复制主模型 (~19GB)"
 echo "----------------------------------------"
 if [ -f "${SRC_BASE}/diffusion_models/ltx-2-19b-dev-fp8.safetensors" ]; then
     echo "从 diffusion_models 复制..."
-    cp -v "${SRC_BASE}/diffusion_models/ltx-2-19b-dev-fp8.safetensors" \
+    python3 "$MODEL_SYNC" copy --verify size "${SRC_BASE}/diffusion_models/ltx-2-19b-dev-fp8.safetensors" \
        "${DEST_BASE}/checkpoints/"
 elif [ -f "${SRC_BASE}/checkpoints/ltx-2-19b-dev-fp8.safetensors" ]; then
     echo "从 checkpoints 复制..."
-    cp -v "${SRC_BASE}/checkpoints/ltx-2-19b-dev-fp8.safetensors" \
+    python3 "$MODEL_SYNC" copy --verify size "${SRC_BASE}/checkpoints/ltx-2-19b-dev-fp8.safetensors" \
        "${DEST_BASE}/checkpoints/"
 else
     echo "⚠️ 主模型不存在，尝试查找..."
@@ -40,13 +45,13 @@ echo ""
 echo "步骤 3: 复制音频处理模型"
 echo "----------------------------------------"
 # MelBandRoformer 可能在 checkpoints 或 diffusion_models
-find ${SRC_BASE} -name "MelBandRoformer*" -type f -exec cp -v {} "${DEST_BASE}/diffusion_models/" \;
+find ${SRC_BASE} -name "MelBandRoformer*" -type f -exec python3 "$MODEL_SYNC" copy --verify size {} "${DEST_BASE}/diffusion_models/" \;
 
 echo ""
 echo "步骤 4: 复制 LoRA 文件"
 echo "----------------------------------------"
 if [ -d "${SRC_BASE}/loras" ]; then
-    cp -v "${SRC_BASE}/loras"/ltx-2-19b-*.safetensors "${DEST_BASE}/loras/" 2>/dev/null || echo "⚠️ 部分 LoRA 文件未找到"
+    python3 "$MODEL_SYNC" copy --verify size "${SRC_BASE}/loras"/ltx-2-19b-*.safetensors "${DEST_BASE}/loras/" || echo "⚠️ 部分 LoRA 文件未找到"
 else
     echo "⚠️ loras 目录不存在"
 fi
@@ -66,6 +71,10 @@ echo ""
 echo "LoRA 文件 (loras):"
 ls -lh "${DEST_BASE}/loras/" || echo "⚠️ 目录为空"
 
+echo ""
+echo "生成 manifest (size + sha256; model_sync.py sync 以此目录为 --source 时据此校验):"
+python3 "$MODEL_SYNC" manifest "${DEST_BASE}"
+
 echo ""
 echo "========================================"
 echo "✅ 模型迁移完成"
@@ -0,0 +1,374 @@
+#!/usr/bin/env python3
+"""
+Replay captured production jobs (job_capture.py, JOB_CAPTURE=1).
+
+Two targets:
+  --comfyui URL   submit each job's captured workflow to a ComfyUI instance
+                  (real, or test/fake_comfyui.py); standard library only,
+                  websocket-client adds per-node timings
+  --handler       run the reconstructed job inputs through
+                  rp_handler.unified_handler in this process (needs the
+                  handler's dependencies; ComfyUI from the COMFYUI_* env);
+                  GCS uploads are copied to a temp dir unless --gcs
+
+Jobs start at their captured arrival offsets divided by --speed (2 = twice
+the original rate; 0 = back to back), at most --concurrency at once.
+Media are synthesized stand-ins with the captured kind, image size and
+audio duration; prompt texts are filler with the captured word count;
+seeds are the captured ones, so two replays of a capture submit identical
+work. Workflows loading cached latents (LTX2LatentCacheLoad,
+LTX2JobLatentLoad) are skipped against a real ComfyUI unless
+--include-latent-loads, and refine / legacy jobs through the handler.
+
+Reports, per job and as p50/p90/p99: the replayed seconds against the
+captured ones (ComfyUI: the captured successful attempt; handler: the
+whole job), ComfyUI execution time, and per node class with
+websocket-client.
+
+Usage:
+    python scripts/replay_jobs.py /comfyui/job_captures --comfyui http://127.0.0.1:8188 [--speed 2]
+    python scripts/replay_jobs.py captures-20261019.jsonl --handler --concurrency 4 [--mode lipsync]
+"""
+import argparse
+import asyncio
+import collections
+import contextlib
+import functools
+import glob
+import json
+import os
+import re
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, os.path.join(ROOT, "docker", "pod_files"))
+sys.path.insert(0, os.path.join(ROOT, "test"))
+
+from job_pipeline import percentiles
+from load_test import local_upload, serve_media, write_png, write_wav
+
+SCRUBBED_TEXT = re.compile(r"^\[scrubbed (\d+) words\]$")
+MEDIA_REF = re.compile(r"^media:(image|audio):(\d+)$")
+LATENT_LOAD_CLASSES = ("LTX2LatentCacheLoad", "LTX2JobLatentLoad")
+FILLER_WORDS = ("a", "person", "speaking", "naturally", "in", "soft", "light", "with", "subtle", "motion")
+DEFAULT_IMAGE_SIZE = (1280, 736)
+DEFAULT_AUDIO_SECONDS = 5.0
+POLL_SECONDS = 0.5
+
+
+def load_captures(paths: list) -> list:
+    """Capture records from files and directories of captures-*.jsonl, by arrival."""
+    files = []
+    for path in paths:
+        files += sorted(glob.glob(os.path.join(path, "captures-*.jsonl"))) if os.path.isdir(path) else [path]
+    records = []
+    for file in files:
+        with open(file) as f:
+            records += [json.loads(line) for line in f if line.strip()]
+    return sorted(records, key=lambda record: record["arrival"])
+
+
+def filler(words: int) -> str:
+    return " ".join(FILLER_WORDS[index % len(FILLER_WORDS)] for index in range(words))
+
+
+def restore(value, media: dict):
+    """Scrubbed value -> replayable: filler texts, media refs from media ("image:0" -> name / URL)."""
+    if isinstance(value, dict):
+        return {key: restore(item, media) for key, item in value.items()}
+    if isinstance(value, list):
+        return [restore(item, media) for item in value]
+    if isinstance(value, str):
+        text = SCRUBBED_TEXT.match(value)
+        if text:
+            return filler(int(text.group(1)))
+        ref = MEDIA_REF.match(value)
+        if ref:
+            return media.get(f"{ref.group(1)}:{ref.group(2)}", value)
+    return value
+
+
+class MediaFactory:
+    """Deterministic stand-ins for captured media, written once per sha256 and shape."""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+
+    def path(self, entry: dict) -> str:
+        if entry["kind"] == "image":
+            width, height = entry.get("size") or DEFAULT_IMAGE_SIZE
+            name = f"{entry['sha256'][:16]}_{width}x{height}.png"
+            write = functools.partial(write_png, width=width, height=height)
+        else:
+            seconds = float(entry.get("duration") or DEFAULT_AUDIO_SECONDS)
+            name = f"{entry['sha256'][:16]}_{seconds:.2f}s.wav"
+            write = functools.partial(write_wav, seconds=seconds)
+        path = os.path.join(self.directory, name)
+        if not os.path.exists(path):
+            write(path)
+        return path
+
+
+def captured_comfyui_seconds(record: dict):
+    """Seconds of the captured successful ComfyUI attempt (submission to outputs)."""
+    attempts = (record.get("output") or {}).get("attempts") or []
+    succeeded = [attempt for attempt in attempts if attempt.get("result") == "success"]
+    return succeeded[-1].get("seconds") if succeeded else None
+
+
+def node_class_seconds(nodes: dict) -> dict:
+    seconds = collections.defaultdict(float)
+    for node in nodes.values():
+        seconds[node.get("class_type") or "?"] += node["seconds"]
+    return {name: round(value, 2) for name, value in seconds.items()}
+
+
+class ComfyUITarget:
+    """Submit captured workflows to one ComfyUI instance."""
+
+    def __init__(self, url: str, media: MediaFactory, include_latent_loads: bool, timeout: float):
+        self.url = url.rstrip("/")
+        self.media = media
+        self.include_latent_loads = include_latent_loads
+        self.timeout = timeout
+        self._uploaded = {}
+
+    def _request(self, path: str, data: bytes = None, headers: dict = None) -> dict:
+        request = urllib.request.Request(f"{self.url}{path}", data=data, headers=headers or {})
+        with urllib.request.urlopen(request, timeout=60) as response:
+            return json.loads(response.read() or b"{}")
+
+    def upload(self, entry: dict) -> str:
+        """Upload the stand-in of a staged media entry; returns its name in ComfyUI."""
+        path = self.media.path(entry)
+        if path not in self._uploaded:
+            boundary = uuid.uuid4().hex
+            with open(path, "rb") as f:
+                content = f.read()
+            body = b"".join([
+                f"--{boundary}\r\nContent-Disposition: form-data; name=\"overwrite\"\r\n\r\ntrue\r\n".encode(),
+                f"--{boundary}\r\nContent-Disposition: form-data; name=\"image\"; "
+                f"filename=\"replay_{os.path.basename(path)}\"\r\nContent-Type: application/octet-stream\r\n\r\n"
+                .encode(), content, f"\r\n--{boundary}--\r\n".encode(),
+            ])
+            result = self._request("/upload/image", body,
+                                   {"Content-Type": f"multipart/form-data; boundary={boundary}"})
+            self._uploaded[path] = result.get("name", f"replay_{os.path.basename(path)}")
+        return self._uploaded[path]
+
+    def skip_reason(self, record: dict):
+        workflow = record.get("workflow")
+        if not workflow:
+            return "no workflow captured"
+        loads = {node.get("class_type") for node in workflow.values()} & set(LATENT_LOAD_CLASSES)
+        if loads and not self.include_latent_loads:
+            return f"loads cached latents ({', '.join(sorted(loads))})"
+        return None
+
+    def run(self, record: dict) -> dict:
+        staged = {f"{entry['kind']}:{entry['index']}": self.upload(entry)
+                  for entry in record.get("media", []) if entry["role"] == "staged"}
+        workflow = restore(record["workflow"], staged)
+        client_id = f"replay_{uuid.uuid4().hex}"
+        listener = self._listener(client_id, workflow)
+        start = time.time()
+        with listener or contextlib.nullcontext():
+            prompt_id = self._request("/prompt", json.dumps({"prompt": workflow, "client_id": client_id}).encode(),
+                                      {"Content-Type": "application/json"})["prompt_id"]
+            entry = self._wait(prompt_id)
+        result = {"seconds": time.time() - start, "ok": entry["status"].get("status_str") == "success"}
+        stamps = {message[0]: message[1].get("timestamp") for message in entry["status"].get("messages", [])
+                  if isinstance(message, list) and len(message) == 2 and isinstance(message[1], dict)}
+        if stamps.get("execution_start") and stamps.get("execution_success"):
+            result["execution_seconds"] = (stamps["execution_success"] - stamps["execution_start"]) / 1000
+        if not result["ok"]:
+            errors = [message[1].get("exception_message") for message in entry["status"].get("messages", [])
+                      if message[0] == "execution_error"]
+            result["error"] = (errors[0] if errors and errors[0] else entry["status"].get("status_str"))[:120]
+        if listener is not None:
+            result["nodes"] = node_class_seconds({node: {"class_type": workflow.get(node, {}).get("class_type"),
+                                                         "seconds": seconds}
+                                                  for node, seconds in listener.node_seconds.items()})
+        return result
+
+    def _wait(self, prompt_id: str) -> dict:
+        deadline = time.time() + self.timeout
+        while time.time() < deadline:
+            try:
+                history = self._request(f"/history/{prompt_id}")
+            except urllib.error.URLError:
+                history = {}
+            # ComfyUI adds the prompt to the history when it ends
+            if history.get(prompt_id):
+                return history[prompt_id]
+            time.sleep(POLL_SECONDS)
+        raise TimeoutError(f"prompt {prompt_id} not done after {self.timeout:.0f}s")
+
+    def _listener(self, client_id: str, workflow: dict):
+        from job_progress import ComfyUIProgressListener, JobProgress, websocket
+        if websocket is None:
+            return None
+        return ComfyUIProgressListener(self.url, client_id, workflow, JobProgress())
+
+
+class HandlerTarget:
+    """Run reconstructed job inputs through rp_handler.unified_handler."""
+
+    def __init__(self, media: MediaFactory, gcs: bool, upload_dir: str):
+        import rp_handler
+        self.rp_handler = rp_handler
+        self.media = media
+        self.media_url = serve_media(media.directory)
+        if not gcs:
+            rp_handler.upload_video_to_gcs = functools.partial(local_upload, upload_dir)
+        if not rp_handler.wait_for_comfyui(timeout=60):
+            raise SystemExit("ComfyUI is not reachable (COMFYUI_HOST / COMFYUI_BASE_PORT)")
+
+    def skip_reason(self, record: dict):
+        if record.get("mode") in ("refine", "legacy", "invalid"):
+            return f"{record.get('mode')} jobs are not replayed through the handler"
+        return None
+
+    def run(self, record: dict) -> dict:
+        sources = {f"{entry['kind']}:{entry['index']}": f"{self.media_url}/{os.path.basename(self.media.path(entry))}"
+                   for entry in record.get("media", []) if entry["role"] == "source"}
+        event = {"id": f"replay-{record.get('job_id') or uuid.uuid4().hex}", "input": restore(record["input"], sources)}
+        start = time.time()
+        result = self.rp_handler.unified_handler(event)
+        ok = isinstance(result, dict) and result.get("status") == "success"
+        return {"seconds": time.time() - start, "ok": ok,
+                "error": None if ok else str((result or {}).get("error"))[:120]}
+
+
+async def replay(target, records: list, speed: float, concurrency: int) -> list:
+    slots = asyncio.Semaphore(concurrency)
+    loop = asyncio.get_running_loop()
+    first = records[0]["arrival"] if records else 0.0
+    start = time.time()
+
+    async def run(record):
+        if speed:
+            await asyncio.sleep(max(0.0, start + (record["arrival"] - first) / speed - time.time()))
+        summary = {"job_id": record.get("job_id"), "mode": record.get("mode"),
+                   "captured_seconds": record.get("seconds"),
+                   "captured_comfyui_seconds": captured_comfyui_seconds(record),
+                   "captured_nodes": node_class_seconds(record.get("nodes") or {})}
+        reason = target.skip_reason(record)
+        if reason:
+            return {**summary, "skipped": reason}
+        arrived = time.time()
+        async with slots:
+            summary["queue_wait"] = time.time() - arrived
+            try:
+                summary.update(await loop.run_in_executor(None, target.run, record))
+            except Exception as e:
+                summary.update(ok=False, error=f"{type(e).__name__}: {e}"[:120])
+        return summary
+
+    return await asyncio.gather(*(run(record) for record in records))
+
+
+def report(results: list, target_name: str) -> dict:
+    done = [result for result in results if result.get("ok")]
+    captured_key = "captured_comfyui_seconds" if target_name == "comfyui" else "captured_seconds"
+    ratios = [result["seconds"] / result[captured_key] for result in done if result.get(captured_key)]
+    print(f"\n  {'job':<28} {'mode':<18} {'captured s':>10} {'replay s':>9} {'ratio':>6}")
+    for result in results:
+        captured = result.get(captured_key)
+        if "skipped" in result:
+            line = f"skipped: {result['skipped']}"
+        elif not result.get("ok"):
+            line = f"failed: {result.get('error')}"
+        else:
+            ratio = f"{result['seconds'] / captured:>6.2f}" if captured else f"{'-':>6}"
+            line = f"{captured or '-':>10} {result['seconds']:>9.1f} {ratio}"
+        print(f"  {str(result['job_id'])[:28]:<28} {str(result['mode']):<18} {line}")
+
+    node_ratios = collections.defaultdict(list)
+    for result in done:
+        for name, seconds in (result.get("nodes") or {}).items():
+            if result["captured_nodes"].get(name):
+                node_ratios[name].append(seconds / result["captured_nodes"][name])
+    summary = {
+        "target": target_name,
+        "jobs": len(results),
+        "succeeded": len(done),
+        "failed": sum(1 for result in results if not result.get("ok") and "skipped" not in result),
+        "skipped": sum(1 for result in results if "skipped" in result),
+        "replay_seconds": percentiles([result["seconds"] for result in done]),
+        "replay_to_captured": percentiles(ratios),
+        "execution_seconds": percentiles([result["execution_seconds"] for result in done
+                                          if "execution_seconds" in result]),
+        "node_class_ratio": {name: percentiles(values) for name, values in sorted(node_ratios.items())},
+    }
+    print(f"\n{summary['succeeded']}/{summary['jobs']} replayed ({summary['failed']} failed, "
+          f"{summary['skipped']} skipped)")
+    for name in ("replay_seconds", "replay_to_captured", "execution_seconds"):
+        stats = summary[name]
+        if stats["count"]:
+            print(f"  {name:<22} p50 {stats['p50']:>8.2f}  p90 {stats['p90']:>8.2f}  p99 {stats['p99']:>8.2f}")
+    for name, stats in summary["node_class_ratio"].items():
+        print(f"  {name:<22} p50 {stats['p50']:>8.2f}x captured ({stats['count']} jobs)")
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("captures", nargs="+", help="Capture files or directories (captures-*.jsonl)")
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument("--comfyui", default="http://127.0.0.1:8188", help="ComfyUI to submit workflows to")
+    target.add_argument("--handler", action="store_true", help="Replay through rp_handler.unified_handler")
+    parser.add_argument("--speed", type=float, default=1.0,
+                        help="Arrival rate multiplier (default: 1 = as captured; 0 = back to back)")
+    parser.add_argument("--concurrency", type=int, default=None,
+                        help="Jobs at once (default: 1 for --comfyui, HANDLER_CONCURRENCY for --handler)")
+    parser.add_argument("--mode", action="append", help="Only jobs of this mode (repeatable)")
+    parser.add_argument("--include-failed", action="store_true", help="Also replay jobs that failed when captured")
+    parser.add_argument("--include-latent-loads", action="store_true",
+                        help="Submit workflows loading cached latents (fake ComfyUI, or latents copied over)")
+    parser.add_argument("--limit", type=int, default=None, help="Replay the first N jobs")
+    parser.add_argument("--timeout", type=float, default=1800, help="Seconds per prompt (default: 1800)")
+    parser.add_argument("--gcs", action="store_true", help="--handler: upload to GCS (default: temp dir)")
+    parser.add_argument("--json", help="Write the per-job results and summary to this file")
+    args = parser.parse_args()
+
+    records = load_captures(args.captures)
+    records = [record for record in records
+               if (args.include_failed or record.get("status") == "success")
+               and (not args.mode or record.get("mode") in args.mode)][:args.limit]
+    if not records:
+        raise SystemExit("No captured jobs to replay")
+
+    work = tempfile.mkdtemp(prefix="ltx2_replay_")
+    media = MediaFactory(os.path.join(work, "media"))
+    os.makedirs(media.directory)
+    if args.handler:
+        from job_pipeline import HANDLER_CONCURRENCY
+        target, target_name = HandlerTarget(media, args.gcs, os.path.join(work, "uploads")), "handler"
+        concurrency = args.concurrency or HANDLER_CONCURRENCY
+    else:
+        target, target_name = ComfyUITarget(args.comfyui, media, args.include_latent_loads, args.timeout), "comfyui"
+        concurrency = args.concurrency or 1
+    span = records[-1]["arrival"] - records[0]["arrival"]
+    print(f"Replaying {len(records)} jobs ({span:.0f}s of traffic) against {target_name} at "
+          f"{'back to back' if not args.speed else f'{args.speed}x speed'}, concurrency {concurrency}")
+
+    loop = asyncio.new_event_loop()
+    loop.set_default_executor(ThreadPoolExecutor(max_workers=concurrency))
+    results = loop.run_until_complete(replay(target, records, args.speed, concurrency))
+    summary = report(results, target_name)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"summary": summary, "jobs": results}, f, indent=2, default=str)
+        print(f"Results written to {args.json}")
+    return 1 if summary["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
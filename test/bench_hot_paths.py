@@ -0,0 +1,445 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmarks of the handler's CPU-side hot paths, with a regression gate.
+
+Covers workflow building per mode and keyframe count (WorkflowBuilder.build_*,
+estimate_workflow_cost), parameter and frame planning (get_*_params,
+plan_generation_fps, plan_silence_trim, _calculate_frame_index), image and
+audio preparation (MediaPreprocessor, audio duration probing), URLDownloader
+against a local HTTP server, the GCS uploader against a fake GCS JSON API,
+and encoding the base64 fallback response.
+
+Each benchmark is timed with timeit (autoranged loops, --repeat repeats);
+compare gates on the median per-call time, which one noisy repeat does not
+move. A benchmark counts as a regression only if it is slower by both
+--threshold and --min-delta-us, and still is in each of --confirm fresh
+measurements (a one-off slowdown from another process is not). Benchmarks whose
+dependencies are missing (Pillow, librosa, requests, google-cloud-storage)
+are skipped and listed.
+
+Baselines are machine-specific JSON files: save one on the machine (or
+image) that runs the gate, then compare later runs against it.
+
+Usage:
+    python test/bench_hot_paths.py run [--filter workflow/] [--save baseline.json]
+    python test/bench_hot_paths.py compare baseline.json [--results new.json] [--threshold 0.25]
+        # exits 1 if a benchmark got slower by more than the threshold and stays slower when re-measured
+"""
+import argparse
+import base64
+import contextlib
+import json
+import os
+import platform
+import re
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import timeit
+import uuid
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+TEST_DIR = os.path.dirname(os.path.abspath(__file__))
+DOCKER_DIR = os.path.join(TEST_DIR, "..", "docker")
+sys.path.insert(0, os.path.join(DOCKER_DIR, "pod_files"))
+sys.path.insert(0, TEST_DIR)
+
+from load_test import serve_media, write_png, write_wav
+from workflow_builder import WorkflowBuilder
+
+# A run is a regression when its median time exceeds the baseline by more than this share
+DEFAULT_THRESHOLD = 0.25
+# ... and by more than this many microseconds (the few-microsecond planners jitter by more than 25%)
+DEFAULT_MIN_DELTA_US = 5.0
+# ... and it is still slower in each of this many re-measurements
+DEFAULT_CONFIRM = 2
+DEFAULT_REPEAT = 15
+KEYFRAME_COUNTS = (2, 4, 8)
+FALLBACK_VIDEO_MB = 8
+GCS_UPLOAD_MB = 20
+
+
+class FakeGCSHandler(BaseHTTPRequestHandler):
+    """Just enough of the GCS JSON API for blob uploads (multipart and resumable)."""
+
+    protocol_version = "HTTP/1.1"
+    sessions = {}
+
+    def log_message(self, format, *args):
+        pass
+
+    def _reply(self, status, body=None, headers=None):
+        data = json.dumps(body).encode() if body is not None else b""
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _body(self):
+        return self.rfile.read(int(self.headers.get("Content-Length") or 0))
+
+    def _object(self, name, size):
+        return {"kind": "storage#object", "bucket": "bench", "name": name, "size": str(size),
+                "generation": "1", "contentType": "video/mp4"}
+
+    def do_POST(self):
+        upload_type = re.search(r"uploadType=(\w+)", self.path)
+        body = self._body()
+        name = re.search(r"name=([^&]+)", self.path)
+        if upload_type and upload_type.group(1) == "resumable":
+            session = uuid.uuid4().hex
+            self.sessions[session] = {"name": json.loads(body or b"{}").get("name")
+                                      or (name and name.group(1)), "received": 0}
+            host = self.headers.get("Host")
+            self._reply(200, {}, {"Location": f"http://{host}/upload/session/{session}"})
+        else:
+            self._reply(200, self._object(name.group(1) if name else "object", len(body)))
+
+    def do_PUT(self):
+        session = self.sessions.get(self.path.rsplit("/", 1)[-1])
+        body = self._body()
+        if session is None:
+            return self._reply(404, {"error": "no such upload"})
+        session["received"] += len(body)
+        total = (self.headers.get("Content-Range") or "").rsplit("/", 1)[-1]
+        if total.isdigit() and session["received"] >= int(total):
+            return self._reply(200, self._object(session["name"], session["received"]))
+        self._reply(308, None, {"Range": f"bytes=0-{session['received'] - 1}"})
+
+
+def serve_fake_gcs():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeGCSHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{server.server_address[1]}"
+
+
+class Fixtures:
+    """Templates, media files and local servers, created on first use."""
+
+    def __init__(self):
+        self.dir = tempfile.mkdtemp(prefix="ltx2_bench_")
+        self._cache = {}
+
+    def get(self, name, create):
+        if name not in self._cache:
+            self._cache[name] = create()
+        return self._cache[name]
+
+    @property
+    def builder(self):
+        return self.get("builder", lambda: WorkflowBuilder(*(os.path.join(DOCKER_DIR, name) for name in (
+            "workflow_ltx2_enhanced.json", "workflow_ltx2_audio_gen.json", "workflow_ltx2_multiframe.json"))))
+
+    @property
+    def two_stage(self):
+        return self.get("two_stage", lambda: self.builder.plan_two_stage(1280, 704))
+
+    def file(self, name, write):
+        def create():
+            path = os.path.join(self.dir, name)
+            write(path)
+            return path
+        return self.get(name, create)
+
+    @property
+    def image(self):
+        return self.file("photo.png", lambda path: write_png(path, 1920, 1080))
+
+    @property
+    def audio(self):
+        return self.file("speech.wav", lambda path: write_wav(path, 10, sample_rate=44100))
+
+    def video(self, megabytes):
+        def write(path):
+            with open(path, "wb") as f:
+                f.write(os.urandom(megabytes << 20))
+        return self.file(f"video_{megabytes}mb.mp4", write)
+
+    @property
+    def media_url(self):
+        def create():
+            self.image, self.audio  # noqa: B018 - written before serving
+            return serve_media(self.dir)
+        return self.get("media_url", create)
+
+    @property
+    def gcs_url(self):
+        return self.get("gcs_url", serve_fake_gcs)
+
+
+def keyframes(count):
+    positions = ["first"] + [round(index / (count - 1), 3) for index in range(1, count - 1)] + ["last"]
+    return [{"image_name": f"kf_{index}.png", "frame_position": position, "strength": 1.0}
+            for index, position in enumerate(positions)]
+
+
+def workflow_benchmarks(fx):
+    common = {"prompt_positive": "A person speaking", "prompt_negative": "static", "seed": 42}
+    yield "workflow/build_workflow", lambda: lambda: fx.builder.build_workflow(
+        image_name="face.png", audio_name="line.flac", audio_duration=8.0, **common)
+    yield "workflow/build_workflow_two_stage", lambda: lambda: fx.builder.build_workflow(
+        image_name="face.png", audio_name="line.flac", audio_duration=8.0, two_stage=fx.two_stage,
+        decode_vram_bytes=int(24e9), **common)
+    yield "workflow/build_workflow_variants4", lambda: lambda: fx.builder.build_workflow(
+        image_name="face.png", audio_name="line.flac", audio_duration=8.0, num_variants=4, **common)
+    yield "workflow/build_workflow_streaming", lambda: lambda: fx.builder.build_workflow(
+        image_name="face.png", audio_name="line.flac", audio_duration=8.0, streaming_output=True, **common)
+    yield "workflow/build_audio_gen_workflow", lambda: lambda: fx.builder.build_audio_gen_workflow(
+        image_name="face.png", duration=8.0, **common)
+    yield "workflow/build_refine_workflow", lambda: lambda: fx.builder.build_refine_workflow(
+        job_latent_key="bench", num_frames=241, audio_name="line.flac", audio_duration=8.0, **common)
+    for count in KEYFRAME_COUNTS:
+        yield f"workflow/build_multiframe_workflow_k{count}", lambda count=count: lambda: \
+            fx.builder.build_multiframe_workflow(keyframes(count), audio_name="line.flac", audio_duration=8.0,
+                                                 **common)
+        yield f"workflow/build_multiframe_chained_workflow_k{count}", lambda count=count: lambda: \
+            fx.builder.build_multiframe_chained_workflow(keyframes(count), duration=8.0, **common)
+
+    def cost():
+        workflow = fx.builder.build_workflow(image_name="face.png", audio_name="line.flac", audio_duration=8.0,
+                                             two_stage=fx.two_stage, **common)
+        return lambda: fx.builder.estimate_workflow_cost(workflow)
+    yield "workflow/estimate_workflow_cost", cost
+
+
+def plan_benchmarks(fx):
+    yield "plan/get_video_params", lambda: lambda: fx.builder.get_video_params(8.3, fps=30)
+    yield "plan/get_audio_gen_params", lambda: lambda: fx.builder.get_audio_gen_params(8.3, fps=30)
+    yield "plan/get_multiframe_params_k8", lambda: lambda: fx.builder.get_multiframe_params(
+        keyframes(8), audio_duration=8.3, fps=30)
+    yield "plan/plan_two_stage", lambda: lambda: fx.builder.plan_two_stage(1280, 704)
+    yield "plan/plan_generation_fps", lambda: lambda: fx.builder.plan_generation_fps(8.3, 30, 15)
+    yield "plan/plan_silence_trim", lambda: lambda: fx.builder.plan_silence_trim(12.0, 1.2, 0.8, fps=30)
+    yield "plan/estimate_two_stage_cost", lambda: lambda: fx.builder.estimate_two_stage_cost(fx.two_stage, 241, 8)
+
+    def frame_index():
+        positions = ["first", "last", 0.0, 0.25, 0.5, 0.75, 1.0, "0.33", None]
+        return lambda: [fx.builder._calculate_frame_index(position, 241) for position in positions]
+    yield "plan/_calculate_frame_index_x9", frame_index
+
+
+def media_benchmarks(fx):
+    from media_preprocessor import MediaPreprocessor
+
+    yield "media/pad_geometry", lambda: lambda: MediaPreprocessor.pad_geometry(1920, 1080, 1280, 736)
+
+    def image(method, *args):
+        def setup():
+            import PIL  # noqa: F401
+            with open(fx.image, "rb") as f:
+                data = f.read()
+            return lambda: method(data, *args)
+        return setup
+    yield "media/get_image_size", image(MediaPreprocessor.get_image_size)
+    yield "media/normalize_image_1080p", image(MediaPreprocessor.normalize_image, 1280, 736)
+
+    def audio(call):
+        def setup():
+            import librosa  # noqa: F401
+            from url_downloader import URLDownloader  # noqa: F401 - requests
+            with open(fx.audio, "rb") as f:
+                data = f.read()
+            return lambda: call(data)
+        return setup
+    yield "media/normalize_audio_10s", audio(lambda data: MediaPreprocessor.normalize_audio(
+        data, "speech.wav", sample_rate="vae", mono=True, trim_silence=True))
+    yield "media/probe_audio_duration_10s", audio(
+        lambda data: sys.modules["url_downloader"].URLDownloader._get_audio_duration(data, "speech.wav"))
+
+
+def io_benchmarks(fx):
+    def download(method, path, **kwargs):
+        def setup():
+            import requests  # noqa: F401
+            from url_downloader import URLDownloader
+            url = f"{fx.media_url}/{path}"
+            return lambda: getattr(URLDownloader, method)(url, **kwargs)
+        return setup
+    yield "io/download_image", download("download_image", "photo.png")
+    yield "io/download_audio", download("download_audio", "speech.wav", compute_duration=False)
+
+    def gcs(progress):
+        def setup():
+            from google.auth.credentials import AnonymousCredentials
+            from google.cloud import storage
+
+            import gcs_uploader
+            client = storage.Client(project="bench", credentials=AnonymousCredentials(),
+                                    client_options={"api_endpoint": fx.gcs_url})
+            gcs_uploader.get_gcs_client = lambda: client
+            path = fx.video(GCS_UPLOAD_MB)
+
+            def upload():
+                result = gcs_uploader.upload_video_to_gcs(path, job_id="bench",
+                                                          on_progress=(lambda sent, total: None) if progress else None)
+                if not result["success"]:
+                    raise RuntimeError(result["error"])
+            return upload
+        return setup
+    yield f"io/gcs_upload_{GCS_UPLOAD_MB}mb", gcs(progress=False)
+    yield f"io/gcs_upload_{GCS_UPLOAD_MB}mb_chunked", gcs(progress=True)
+
+    def fallback():
+        path = fx.video(FALLBACK_VIDEO_MB)
+
+        def encode():
+            with open(path, "rb") as f:
+                video_base64 = base64.b64encode(f.read()).decode()
+            return json.dumps({"status": "success", "output": {"video_base64": video_base64, "video_url": None}})
+        return encode
+    yield f"io/fallback_response_{FALLBACK_VIDEO_MB}mb", fallback
+
+
+def all_benchmarks(fx):
+    """(name, setup) pairs; setup() returns the callable to time or raises ImportError."""
+    for group in (workflow_benchmarks, plan_benchmarks, media_benchmarks, io_benchmarks):
+        try:
+            yield from group(fx)
+        except ImportError as e:
+            yield f"{group.__name__.split('_')[0]}/*", _raise(e)
+
+
+def _raise(error):
+    def setup():
+        raise error
+    return setup
+
+
+def measure(function, repeat: int, min_time: float) -> dict:
+    """Per-call seconds: min and median over repeat runs of an autoranged loop."""
+    timer = timeit.Timer(function)
+    number = 1
+    while True:
+        elapsed = timer.timeit(number)
+        if elapsed >= min_time / repeat:
+            break
+        number = max(number * 2, int(number * min_time / repeat / max(elapsed, 1e-9)))
+    runs = [elapsed / number for elapsed in timer.repeat(repeat, number)]
+    return {"min_us": round(min(runs) * 1e6, 2), "median_us": round(statistics.median(runs) * 1e6, 2),
+            "loops": number, "repeat": repeat}
+
+
+def run(args, names=None) -> dict:
+    """Run the benchmarks matching --filter (or only names)."""
+    fx = Fixtures()
+    results, skipped = {}, {}
+    with open(os.devnull, "w") as devnull:
+        for name, setup in all_benchmarks(fx):
+            if (args.filter and args.filter not in name) or (names is not None and name not in names):
+                continue
+            try:
+                with contextlib.redirect_stdout(devnull):
+                    function = setup()
+                    function()  # warm-up: imports, caches, connections
+                    results[name] = measure(function, args.repeat, args.min_time)
+            except ImportError as e:
+                skipped[name] = f"missing {e.name or e}"
+            print(f"  {name:<50} " + (f"{results[name]['median_us']:>12.1f} us" if name in results
+                                       else f"skipped ({skipped[name]})"))
+    return {
+        "meta": {
+            "date": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "processor": platform.processor() or None,
+            "cpus": os.cpu_count(),
+        },
+        "results": results,
+        "skipped": skipped,
+    }
+
+
+def compare(baseline: dict, current: dict, threshold: float, min_delta_us: float,
+            name_filter: str = None, verbose: bool = True) -> list:
+    """
+    Compare per-call medians; returns the names of benchmarks slower than
+    the baseline by more than threshold and min_delta_us.
+    """
+    regressions = []
+    names = set(current["results"]) | {name for name in baseline["results"] if not name_filter or name_filter in name}
+    if verbose:
+        print(f"  {'benchmark':<50} {'baseline us':>12} {'current us':>12} {'change':>8}")
+    for name in sorted(names):
+        before, after = baseline["results"].get(name), current["results"].get(name)
+        if before is None or after is None:
+            if verbose:
+                print(f"  {name:<50} {'-' if before is None else before['median_us']:>12} "
+                      f"{'-' if after is None else after['median_us']:>12}")
+            continue
+        change = after["median_us"] / before["median_us"] - 1 if before["median_us"] else 0.0
+        flag = ""
+        if change > threshold and after["median_us"] - before["median_us"] > min_delta_us:
+            regressions.append(name)
+            flag = "  SLOWER"
+        if verbose:
+            print(f"  {name:<50} {before['median_us']:>12.1f} {after['median_us']:>12.1f} {change:>+8.0%}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+    for command in ("run", "compare"):
+        sub = commands.add_parser(command)
+        if command == "compare":
+            sub.add_argument("baseline", help="Baseline JSON (from run --save)")
+            sub.add_argument("--results", help="Results JSON to check (default: run the benchmarks now)")
+            sub.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                             help=f"Allowed slowdown (default: {DEFAULT_THRESHOLD} = 25%%)")
+            sub.add_argument("--min-delta-us", type=float, default=DEFAULT_MIN_DELTA_US,
+                             help=f"Ignore slowdowns below this many microseconds (default: {DEFAULT_MIN_DELTA_US})")
+            sub.add_argument("--confirm", type=int, default=DEFAULT_CONFIRM,
+                             help=f"Re-measurements a slowdown must repeat in (default: {DEFAULT_CONFIRM})")
+        sub.add_argument("--filter", help="Only benchmarks whose name contains this")
+        sub.add_argument("--repeat", type=int, default=DEFAULT_REPEAT,
+                         help=f"Timed repeats, median taken (default: {DEFAULT_REPEAT})")
+        sub.add_argument("--min-time", type=float, default=1.0, help="Seconds per benchmark (default: 1)")
+        sub.add_argument("--save", help="Write the results JSON here")
+    args = parser.parse_args()
+
+    if args.command == "compare" and args.results:
+        with open(args.results) as f:
+            current = json.load(f)
+    else:
+        start = time.time()
+        current = run(args)
+        print(f"{len(current['results'])} benchmarks in {time.time() - start:.0f}s, "
+              f"{len(current['skipped'])} skipped")
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(current, f, indent=2)
+        print(f"Results written to {args.save}")
+    if args.command == "run":
+        return 0
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    print(f"\nBaseline {args.baseline} ({baseline['meta']['date']}, Python {baseline['meta']['python']})")
+    if not args.results:
+        # A regression must repeat: re-measure suspects and keep their fastest run, so one
+        # re-measurement back within the threshold clears them
+        suspects = compare(baseline, current, args.threshold, args.min_delta_us, args.filter, verbose=False)
+        for attempt in range(1, args.confirm + 1):
+            if not suspects:
+                break
+            print(f"Re-measuring {len(suspects)} slower benchmark(s) ({attempt}/{args.confirm})")
+            for name, result in run(args, names=set(suspects))["results"].items():
+                current["results"][name] = min(current["results"][name], result, key=lambda r: r["median_us"])
+            suspects = compare(baseline, current, args.threshold, args.min_delta_us, args.filter, verbose=False)
+    regressions = compare(baseline, current, args.threshold, args.min_delta_us, args.filter)
+    if regressions:
+        print(f"FAIL {len(regressions)} benchmark(s) more than {args.threshold:.0%} slower: {', '.join(regressions)}")
+        return 1
+    print("OK")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
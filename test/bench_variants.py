@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Compare one batched num_variants=N job with N sequential single-variant jobs.
+
+Runs against a deployed endpoint (runsync). Both sides use the same seeds
+(seed .. seed + N - 1), so the videos should match pairwise. Prints the
+ComfyUI workflow time (last entry of "attempts") and the wall time of each
+side.
+
+test/check_variants.py runs the same comparison offline against the fake
+ComfyUI (graph split, one video per variant, shared per-prompt work).
+
+Usage:
+    python test/bench_variants.py --image-url URL --audio-url URL [--variants 4]
+    python test/bench_variants.py --image-url URL --duration 5      # Mode 2
+"""
+import argparse
+import os
+import time
+
+import requests
+
+ENDPOINT_ID = os.environ.get("RUNPOD_ENDPOINT_ID", "42qdgmzjc9ldy5")
+RUNPOD_API_URL = f"https://api.runpod.ai/v2/{ENDPOINT_ID}"
+
+
+def run_job(api_key: str, job_input: dict) -> dict:
+    start = time.time()
+    response = requests.post(
+        f"{RUNPOD_API_URL}/runsync",
+        headers={"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"},
+        json={"input": job_input},
+        timeout=1200,
+    )
+    response.raise_for_status()
+    result = response.json()
+    output = result.get("output", {})
+    if output.get("status") != "success":
+        raise RuntimeError(f"Job failed: {output.get('error') or result}")
+    output = output["output"]
+    return {
+        "wall_seconds": time.time() - start,
+        "workflow_seconds": output["attempts"][-1]["seconds"],
+        "videos": [v.get("video_url") for v in output.get("videos") or [output]],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--image-url", required=True)
+    parser.add_argument("--audio-url", help="Mode 1 audio (omit for Mode 2 with --duration)")
+    parser.add_argument("--duration", type=float, default=5.0, help="Mode 2 duration (default: 5)")
+    parser.add_argument("--variants", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=12345)
+    parser.add_argument("--quality", default="fast", choices=["fast", "high", "ultra"])
+    parser.add_argument("--api-key", default=os.environ.get("RUNPOD_API_KEY"))
+    args = parser.parse_args()
+
+    if not args.api_key:
+        print("ERROR: API key required. Use --api-key or set RUNPOD_API_KEY env var")
+        return 1
+
+    base_input = {"image_url": args.image_url, "quality_preset": args.quality}
+    if args.audio_url:
+        base_input["audio_url"] = args.audio_url
+    else:
+        base_input["duration"] = args.duration
+
+    print(f"Batched: num_variants={args.variants}, seeds {args.seed}..{args.seed + args.variants - 1}")
+    batched = run_job(args.api_key, {**base_input, "seed": args.seed, "num_variants": args.variants})
+
+    print(f"Sequential: {args.variants} jobs")
+    sequential = [run_job(args.api_key, {**base_input, "seed": args.seed + variant})
+                  for variant in range(args.variants)]
+    sequential_workflow = sum(job["workflow_seconds"] for job in sequential)
+    sequential_wall = sum(job["wall_seconds"] for job in sequential)
+
+    print(f"{'':>12} {'workflow s':>11} {'wall s':>8}")
+    print(f"{'batched':>12} {batched['workflow_seconds']:>11.1f} {batched['wall_seconds']:>8.1f}")
+    print(f"{'sequential':>12} {sequential_workflow:>11.1f} {sequential_wall:>8.1f}")
+    print(f"Batched workflow time: {batched['workflow_seconds'] / sequential_workflow:.0%} of sequential")
+    for variant, url in enumerate(batched["videos"]):
+        print(f"  variant {variant}: {url}")
+        print(f"  single   {variant}: {sequential[variant]['videos'][0]}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
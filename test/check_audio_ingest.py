@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Check CPU audio ingest (MediaPreprocessor.normalize_audio) and the graphs
+built for pre-normalized audio.
+
+1. Graphs (pure Python): with audio_prenormalized, no builder emits
+   TrimAudioDuration and the audio encode reads LoadAudio directly;
+   without it, every audio graph still trims in-graph.
+2. Trim (needs numpy, librosa, soundfile): a 6 s tone normalized with
+   max_duration=4.0 comes back as exactly 4.0 s of samples, at the
+   requested rate, with the untrimmed length in info["source_duration"].
+
+Usage:
+    python test/check_audio_ingest.py
+"""
+import io
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "docker", "pod_files"))
+
+from media_preprocessor import MediaPreprocessor
+from workflow_builder import WorkflowBuilder
+
+DOCKER_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "docker")
+COMMON = {"prompt_positive": "A person speaking", "prompt_negative": "static", "seed": 42}
+KEYFRAMES = [{"image_name": "kf_0.png", "frame_position": "first", "strength": 1.0},
+             {"image_name": "kf_1.png", "frame_position": "last", "strength": 1.0}]
+
+
+def audio_graphs(builder: WorkflowBuilder, prenormalized: bool) -> dict:
+    options = dict(COMMON, audio_name="line.flac", audio_duration=8.0, audio_prenormalized=prenormalized)
+    return {
+        "build_workflow": builder.build_workflow(image_name="face.png", **options),
+        "build_refine_workflow": builder.build_refine_workflow(job_latent_key="check", num_frames=241, **options),
+        "build_multiframe_workflow": builder.build_multiframe_workflow(KEYFRAMES, **options),
+        "build_multiframe_chained_workflow": builder.build_multiframe_chained_workflow(KEYFRAMES, **options),
+    }
+
+
+def check_graphs(expect) -> None:
+    builder = WorkflowBuilder(*(os.path.join(DOCKER_DIR, name) for name in (
+        "workflow_ltx2_enhanced.json", "workflow_ltx2_audio_gen.json", "workflow_ltx2_multiframe.json")))
+    for prenormalized in (True, False):
+        for name, workflow in audio_graphs(builder, prenormalized).items():
+            classes = {node_id: node["class_type"] for node_id, node in workflow.items()}
+            trims = [node_id for node_id, class_type in classes.items() if class_type == "TrimAudioDuration"]
+            encodes = [node for node in workflow.values() if node["class_type"] == "LTXVAudioVAEEncode"]
+            sources = {classes.get(node["inputs"]["audio"][0]) for node in encodes}
+            if prenormalized:
+                expect(not trims, f"{name}: TrimAudioDuration emitted for pre-normalized audio")
+                expect(sources == {"LoadAudio"}, f"{name}: audio encode reads {sources}, expected LoadAudio")
+            else:
+                expect(len(trims) == 1 and sources == {"TrimAudioDuration"},
+                       f"{name}: in-graph trim missing without CPU ingest ({sources})")
+    print("Graphs: TrimAudioDuration only without CPU ingest")
+
+
+def check_trim(expect) -> None:
+    import numpy as np
+    import soundfile as sf
+
+    rate = 44100
+    tone = 0.5 * np.sin(2 * np.pi * 220 * np.arange(6 * rate) / rate)
+    buffer = io.BytesIO()
+    sf.write(buffer, np.stack([tone, tone], axis=1), rate, format="WAV")
+    _, _, duration, info = MediaPreprocessor.normalize_audio(buffer.getvalue(), "line.wav", max_duration=4.0,
+                                                             sample_rate="vae")
+    expect(abs(duration - 4.0) < 1 / 16000, f"trimmed duration {duration}, expected 4.0")
+    expect(info["sample_rate"] == 16000, f"sample rate {info['sample_rate']}")
+    expect(abs(info["source_duration"] - 6.0) < 1e-3, f"source duration {info['source_duration']}")
+    print(f"Trim: 6.0s -> {duration:.4f}s at {info['sample_rate']} Hz")
+
+
+def main():
+    failures = []
+
+    def expect(condition, message):
+        if not condition:
+            failures.append(message)
+
+    check_graphs(expect)
+    try:
+        import librosa  # noqa: F401
+        import numpy  # noqa: F401
+        import soundfile  # noqa: F401
+    except ImportError as e:
+        print(f"Trim: skipped ({e.name} not installed)")
+    else:
+        check_trim(expect)
+
+    for failure in failures:
+        print(f"FAIL {failure}")
+    if failures:
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
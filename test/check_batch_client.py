@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Check scripts/batch_client.py against test/fake_runpod_api.py.
+
+Runs a batch of jobs (plain, inline base64, three variants, repeated
+inputs without an id, one that always fails) through a fake endpoint that
+answers some requests with 503 and cuts some downloads halfway. The first
+run is interrupted with Ctrl-C after a few downloads; the second resumes
+it. Checks that every job was submitted once (the failing one once per
+retry), the videos match what the endpoint served, cut downloads were
+resumed with Range requests, the failing job is checkpointed as failed,
+and the second run skipped what the first finished.
+Needs aiohttp.
+
+Usage:
+    python test/check_batch_client.py
+"""
+import collections
+import json
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+TEST_DIR = os.path.dirname(os.path.abspath(__file__))
+CLIENT = os.path.join(TEST_DIR, "..", "scripts", "batch_client.py")
+sys.path.insert(0, TEST_DIR)
+
+from fake_runpod_api import start_fake_runpod_api, video_bytes
+
+VIDEO_BYTES = 300 * 1024
+RETRIES = 1
+INTERRUPT_AFTER = 4
+
+
+def make_jobs() -> list:
+    jobs = [{"id": f"clip-{index:02d}", "input": {"image_url": f"https://example.com/{index}.png",
+                                                  "audio_url": f"https://example.com/{index}.wav", "seed": index}}
+            for index in range(8)]
+    jobs.append({"id": "inline", "input": {"image_url": "https://example.com/i.png", "base64": True}})
+    jobs.append({"id": "variants", "input": {"image_url": "https://example.com/v.png", "num_variants": 3}})
+    jobs.append({"id": "broken", "input": {"image_url": "https://example.com/b.png", "fail": True}})
+    # Same input twice, no id: keyed by hash, the second with a -2 suffix
+    jobs += [{"image_url": "https://example.com/same.png", "audio_url": "https://example.com/same.wav"}] * 2
+    return jobs
+
+
+def run_client(jobs_path, output_dir, url, summary_path, interrupt=False):
+    command = [sys.executable, CLIENT, jobs_path, "--output-dir", output_dir, "--endpoint-url", url,
+               "--concurrency", "6", "--download-concurrency", "3", "--min-poll", "0.05", "--max-poll", "0.3",
+               "--retries", str(RETRIES), "--json", summary_path]
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+    if interrupt:
+        state_path = os.path.join(output_dir, "batch_state.jsonl")
+        deadline = time.time() + 60
+        while time.time() < deadline and process.poll() is None:
+            if os.path.exists(state_path):
+                with open(state_path) as f:
+                    if sum('"downloaded"' in line for line in f) >= INTERRUPT_AFTER:
+                        break
+            time.sleep(0.05)
+        process.send_signal(signal.SIGINT)
+    output, _ = process.communicate(timeout=120)
+    return process.returncode, output
+
+
+def main():
+    failures = []
+
+    def expect(condition, message):
+        if not condition:
+            failures.append(message)
+
+    api, url = start_fake_runpod_api(job_seconds=0.6, video_bytes=VIDEO_BYTES, drop_rate=0.3, error_rate=0.05,
+                                     concurrency=4, seed=7)
+    with tempfile.TemporaryDirectory() as tmp:
+        jobs_path = os.path.join(tmp, "jobs.jsonl")
+        output_dir = os.path.join(tmp, "out")
+        with open(jobs_path, "w") as f:
+            f.writelines(json.dumps(job) + "\n" for job in make_jobs())
+
+        code, output = run_client(jobs_path, output_dir, url, os.path.join(tmp, "first.json"), interrupt=True)
+        expect(code == 130 and "Run the same command again" in output, f"interrupted run: exit {code}\n{output}")
+        code, output = run_client(jobs_path, output_dir, url, os.path.join(tmp, "second.json"))
+        print(output.rstrip())
+        expect(code == 1, f"resumed run: exit {code} (the failing job should make it 1)")
+        with open(os.path.join(tmp, "second.json")) as f:
+            summary = json.load(f)
+
+        records = collections.defaultdict(list)
+        with open(os.path.join(output_dir, "batch_state.jsonl")) as f:
+            for line in f:
+                record = json.loads(line)
+                records[record["key"]].append(record)
+        states = {key: {k: v for r in history for k, v in r.items()} for key, history in records.items()}
+        keys = sorted(states)
+        expect(len(keys) == 13 and sum(key.endswith("-2") for key in keys) == 1, f"job keys {keys}")
+
+        submissions = {key: sum(r["state"] == "submitted" for r in history) for key, history in records.items()}
+        expect(submissions.pop("broken") == RETRIES + 1, "failing job not submitted once per attempt")
+        expect(set(submissions.values()) == {1}, f"jobs submitted more than once: {submissions}")
+        stats = json.loads(urllib.request.urlopen(f"{url}/fake/stats").read())
+        expect(stats["run"] == sum(submissions.values()) + RETRIES + 1,
+               f"endpoint accepted {stats['run']} jobs, checkpoint records {sum(submissions.values()) + RETRIES + 1}")
+
+        expect(states["broken"]["state"] == "failed" and "CUDA" in states["broken"].get("error", ""),
+               f"failing job {states['broken']}")
+        for key, state in states.items():
+            if key == "broken":
+                continue
+            expect(state["state"] == "downloaded", f"{key}: {state['state']}")
+            for file in state.get("files", []):
+                path = os.path.join(output_dir, file["name"])
+                served = os.path.basename(file["url"]) if file.get("url") else f"{state['job_id']}.mp4"
+                with open(path, "rb") as f:
+                    expect(f.read() == video_bytes(served, VIDEO_BYTES), f"{file['name']}: wrong content")
+        expect(len(states["variants"]["files"]) == 3 and os.path.exists(os.path.join(output_dir, "variants_v2.mp4")),
+               "variant files missing")
+        expect(not [name for name in os.listdir(output_dir) if name.endswith(".part")], "left .part files")
+        expect(stats.get("dropped", 0) > 0 and stats.get("ranges", 0) > 0,
+               f"no resumed downloads (dropped {stats.get('dropped')}, ranges {stats.get('ranges')})")
+        expect(summary["skipped"] >= INTERRUPT_AFTER, f"resumed run skipped {summary['skipped']} jobs")
+
+        polls = stats["status_polls"]
+        print(f"Endpoint: {stats['run']} jobs, {sum(polls.values())} status polls "
+              f"({sum(polls.values()) / max(1, len(polls)):.1f} per job), {stats.get('errors', 0)} injected 503s, "
+              f"{stats.get('dropped', 0)} cut downloads, {stats.get('ranges', 0)} range requests")
+
+    for failure in failures:
+        print(f"FAIL {failure}")
+    if failures:
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,333 @@
+#!/usr/bin/env python3
+"""
+Check ComfyUI instance routing (comfyui_pool.py) against fake ComfyUI servers.
+
+Starts several local HTTP servers answering /system_stats, plus one URL with
+nothing listening, and checks that:
+  - only answering instances are marked ready and receive jobs
+  - concurrent jobs spread over the ready instances, one prompt per instance
+  - a waiting job takes whichever instance frees first, not the one it
+    arrived behind
+  - a job prefers a free instance that last ran its LoRA config, and takes
+    another free instance rather than waiting for a busy matching one
+  - comfyui_url() follows the instance held by the calling thread
+  - waiters are served by priority, and an urgent waiter interrupts a
+    preemptible holder's prompt (POST /interrupt with its prompt_id, only
+    while /queue shows it running; a prompt submitted after the request is
+    interrupted when the holder reports it), and only a prompt that ended
+    interrupted counts as a preemption
+  - a holder that finishes before being interrupted is not preempted, and
+    the request does not outlive its slot
+  - a batch waiter ages past a steady stream of interactive jobs (one
+    priority per aging_seconds waited) instead of starving behind them
+  - an instance that stops answering is probed when a job fails on it and
+    gets no more jobs
+
+Usage:
+    python test/check_comfyui_pool.py [--instances 3]
+"""
+import argparse
+import json
+import os
+import socket
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "docker", "pod_files"))
+
+from comfyui_pool import ComfyUIPool
+
+GPU_SECONDS = 0.3
+LORA_A = (("ltx-2-19b-distilled-lora-384.safetensors", 0.6),)
+LORA_B = (("ltx-2-19b-distilled-lora-384.safetensors", 0.6),
+          ("ltx-2-19b-lora-camera-control-dolly-in.safetensors", 0.3))
+
+
+class FakeComfyUI(BaseHTTPRequestHandler):
+    interrupts = 0
+    interrupted = []    # prompt_id of each /interrupt
+    running = None      # prompt_id shown as running in /queue
+
+    def do_POST(self):
+        if self.path == "/interrupt":
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            FakeComfyUI.interrupts += 1
+            FakeComfyUI.interrupted.append(body.get("prompt_id"))
+            self.send_response(200)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+        else:
+            self.send_error(404)
+
+    def do_GET(self):
+        if self.path in ("/system_stats", "/queue"):
+            if self.path == "/queue":
+                running = [[0, FakeComfyUI.running, {}, {}, []]] if FakeComfyUI.running else []
+                body = json.dumps({"queue_running": running, "queue_pending": []}).encode()
+            else:
+                body = b'{"devices": [{"vram_total": 85899345920, "vram_free": 80000000000}]}'
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        else:
+            self.send_error(404)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_fake_servers(count):
+    servers = []
+    for _ in range(count):
+        server = ThreadingHTTPServer(("127.0.0.1", 0), FakeComfyUI)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+    return servers
+
+
+def unused_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--instances", type=int, default=3, help="Answering fake instances (default: 3)")
+    args = parser.parse_args()
+
+    servers = start_fake_servers(args.instances)
+    urls = [f"http://127.0.0.1:{server.server_address[1]}" for server in servers]
+    down_url = f"http://127.0.0.1:{unused_port()}"
+    pool = ComfyUIPool(urls + [down_url])
+    failures = []
+
+    # Readiness
+    if not pool.wait_until_ready(timeout=5):
+        failures.append("no instance became ready")
+    ready = [instance.ready for instance in pool.instances]
+    if ready != [True] * args.instances + [False]:
+        failures.append(f"readiness {ready}, expected the last instance down")
+
+    # Least-loaded routing: concurrent jobs, one prompt per instance
+    lock = threading.Lock()
+    active = {index: 0 for index in range(len(pool.instances))}
+    max_active = dict(active)
+    used_urls = []
+
+    def job(_):
+        with pool.slot() as (instance, _waited):
+            used_urls.append(pool.url())
+            with lock:
+                active[instance.index] += 1
+                max_active[instance.index] = max(max_active[instance.index], active[instance.index])
+            time.sleep(GPU_SECONDS)
+            with lock:
+                active[instance.index] -= 1
+            return instance.index
+
+    num_jobs = args.instances * 3
+    start = time.time()
+    with ThreadPoolExecutor(max_workers=num_jobs) as executor:
+        routed = list(executor.map(job, range(num_jobs)))
+    elapsed = time.time() - start
+    counts = [routed.count(index) for index in range(len(pool.instances))]
+    if counts[-1]:
+        failures.append("jobs routed to the instance that is down")
+    if max(max_active.values()) > 1:
+        failures.append(f"more than one prompt on an instance: {max_active}")
+    if max(counts[:-1]) - min(counts[:-1]) > 1:
+        failures.append(f"uneven spread {counts}")
+    if sorted(set(used_urls)) != sorted(urls):
+        failures.append("comfyui_url() inside the slot did not follow the held instance")
+    print(f"{num_jobs} jobs on {args.instances} instances: {counts[:-1]} in {elapsed:.1f}s "
+          f"(serial {num_jobs * GPU_SECONDS:.1f}s)")
+
+    # Outside a slot, url() is the first ready instance
+    if pool.url() != urls[0]:
+        failures.append(f"url() outside a slot is {pool.url()}, expected {urls[0]}")
+
+    # LoRA affinity: alternating configs stick to the instance that ran them
+    with pool.slot(LORA_A) as (instance_a, _):
+        pass
+    with pool.slot(LORA_B) as (instance_b, _):
+        pass
+    sticky = True
+    for affinity, expected in ((LORA_A, instance_a), (LORA_B, instance_b)) * 3:
+        with pool.slot(affinity) as (instance, _):
+            sticky &= instance is expected
+    if (args.instances > 1 and instance_a is instance_b) or not sticky:
+        failures.append("LoRA configs did not stick to their instances")
+    print(f"LoRA affinity: config A -> instance {instance_a.index}, config B -> instance {instance_b.index}")
+
+    # A busy matching instance is not waited for while another one is free
+    with pool.slot(LORA_A) as (held, _):
+        with pool.slot(LORA_A) as (instance, _):
+            spilled = instance is not held
+    if args.instances > 1 and not spilled:
+        failures.append("busy affinity instance was not bypassed")
+
+    # Shared queue: with both instances busy, a waiter gets the one that frees first
+    pair = ComfyUIPool(urls[:2])
+    pair.check_ready()
+    if args.instances > 1:
+        holds = {}
+
+        def hold(name, seconds):
+            with pair.slot() as (instance, _):
+                holds[name] = instance
+                time.sleep(seconds)
+
+        long_hold = threading.Thread(target=hold, args=("long", 1.5))
+        long_hold.start()
+        time.sleep(0.05)
+        short_hold = threading.Thread(target=hold, args=("short", 0.3))
+        short_hold.start()
+        time.sleep(0.05)
+        with pair.slot() as (instance, waited):
+            first_free = instance is holds["short"]
+        long_hold.join()
+        short_hold.join()
+        if not first_free or waited > 1.0:
+            failures.append(f"waiter got instance {instance.index} after {waited:.1f}s, "
+                            f"not the one freed first ({holds['short'].index})")
+        print(f"Shared queue: waiter took instance {instance.index} after {waited:.2f}s "
+              f"(other holder busy for 1.5s)")
+
+    # Priority: while instance 0 is held, waiters are served most urgent first
+    single = ComfyUIPool(urls[:1])
+    single.check_ready()
+    order = []
+
+    def waiter(priority, name):
+        with single.slot(priority=priority):
+            order.append(name)
+
+    with single.slot(priority=2, preemptible=False):
+        threads = []
+        for priority, name in ((2, "batch"), (1, "normal"), (0, "interactive")):
+            threads.append(threading.Thread(target=waiter, args=(priority, name)))
+            threads[-1].start()
+            time.sleep(0.05)
+    for thread in threads:
+        thread.join()
+    if order != ["interactive", "normal", "batch"] or FakeComfyUI.interrupts:
+        failures.append(f"priority order {order}, {FakeComfyUI.interrupts} interrupts without preemptible holder")
+
+    # Preemption: an interactive waiter interrupts the running prompt of a preemptible batch holder
+    with single.slot(priority=2, preemptible=True) as (holder, _):
+        FakeComfyUI.running = "batch-prompt"
+        single.prompt_started("batch-prompt")
+        urgent = threading.Thread(target=waiter, args=(0, "preview"))
+        urgent.start()
+        time.sleep(0.2)
+        FakeComfyUI.running = None
+        counted = single.record_preemption()
+    urgent.join()
+    if not counted or FakeComfyUI.interrupted != ["batch-prompt"] or holder.preemptions != 1:
+        failures.append(f"preemption: counted={counted}, interrupted {FakeComfyUI.interrupted}, "
+                        f"{holder.preemptions} preemptions")
+
+    # Requested before the holder submitted: its prompt is interrupted when reported
+    with single.slot(priority=2, preemptible=True) as (holder, _):
+        urgent = threading.Thread(target=waiter, args=(0, "preview"))
+        urgent.start()
+        time.sleep(0.2)
+        FakeComfyUI.running = "late-prompt"
+        single.prompt_started("late-prompt")
+        FakeComfyUI.running = None
+        single.record_preemption()
+    urgent.join()
+    if FakeComfyUI.interrupted[1:] != ["late-prompt"] or holder.preemptions != 2:
+        failures.append(f"preemption before submit: interrupted {FakeComfyUI.interrupted}, "
+                        f"{holder.preemptions} preemptions")
+
+    # The holder's prompt finished before the waiter asked: nothing interrupted, nothing counted
+    with single.slot(priority=2, preemptible=True) as (holder, _):
+        single.prompt_started("done-prompt")
+        urgent = threading.Thread(target=waiter, args=(0, "preview"))
+        urgent.start()
+        time.sleep(0.2)
+    urgent.join()
+    if len(FakeComfyUI.interrupted) != 2 or holder.preemptions != 2 or holder.preempt_requested:
+        failures.append(f"finished holder: interrupted {FakeComfyUI.interrupted}, {holder.preemptions} "
+                        f"preemptions, request left set={holder.preempt_requested}")
+    print(f"Priority order: {' -> '.join(order[:3])}; preemption interrupted {FakeComfyUI.interrupted}, "
+          f"{holder.preemptions} counted")
+
+    # Aging: a batch waiter behind a steady stream of interactive jobs is served once it has aged to their priority
+    aging = ComfyUIPool(urls[:1], aging_seconds=0.3)
+    aging.check_ready()
+    served = []
+
+    def stream_job(priority, name, hold):
+        with aging.slot(priority=priority):
+            served.append(name)
+            time.sleep(hold)
+
+    def arrive(priority, name):
+        stream.append(threading.Thread(target=stream_job, args=(priority, name, 0.1)))
+        stream[-1].start()
+        time.sleep(0.05)
+
+    stream = []
+    with aging.slot(priority=0):
+        arrive(2, "batch")
+        arrive(0, "interactive-0")
+    # 20 interactive jobs per second against 10 served: one is always waiting ahead of the batch job for 2 s
+    for index in range(1, 40):
+        arrive(0, f"interactive-{index}")
+    for thread in stream:
+        thread.join()
+    batch_turn = served.index("batch")
+    # Aged to priority 0 after 2 x 0.3 s, i.e. within about 7 interactive jobs (0.1 s each)
+    if not 3 <= batch_turn <= 10:
+        failures.append(f"aging: batch served {batch_turn + 1}th of {len(served)} behind interactive jobs")
+    print(f"Aging: batch served {batch_turn + 1}th of {len(served)} behind a stream of interactive jobs")
+
+    # Health: a job failing on an instance that went down takes it out of rotation
+    doomed = start_fake_servers(1)[0]
+    # The doomed server is instance 0: it takes the first job (still answering), instance 1 the next
+    health = ComfyUIPool([f"http://127.0.0.1:{doomed.server_address[1]}", urls[0]])
+    health.check_ready()
+    try:
+        with health.slot() as (live, _):
+            raise RuntimeError("simulated job failure on a live instance")
+    except RuntimeError:
+        pass
+    if not live.ready:
+        failures.append("instance marked down after a failure while it still answers")
+    with health.slot() as (_busy, _):
+        try:
+            with health.slot() as (crashed, _):
+                doomed.shutdown()
+                doomed.server_close()
+                raise RuntimeError("simulated ComfyUI crash")
+        except RuntimeError:
+            pass
+    routed = set()
+    for _ in range(3):
+        with health.slot() as (instance, _):
+            routed.add(instance.index)
+    if crashed is not live or crashed.ready or routed != {1} or crashed.jobs_failed != 2:
+        failures.append(f"crashed instance ready={crashed.ready}, jobs routed to {sorted(routed)}, "
+                        f"{crashed.jobs_failed} failures recorded")
+    print(f"Health: crashed instance {crashed.index} marked down after its failed job, "
+          f"jobs routed to {sorted(routed)}")
+
+    for server in servers:
+        server.shutdown()
+    for failure in failures:
+        print(f"FAIL {failure}")
+    if failures:
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
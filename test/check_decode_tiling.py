@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Check WorkflowBuilder.plan_decode_tiling over a resolution / length / VRAM grid.
+
+Pure Python (no ComfyUI, no GPU). Checks plans against tile counts worked
+out by hand for a fixed VRAM model, then over the grid that every plan
+fits its budget when one exists and that more VRAM never means more tiles,
+and prints the plan table.
+
+Usage:
+    python test/check_decode_tiling.py
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "docker", "pod_files"))
+
+from workflow_builder import WorkflowBuilder
+
+DOCKER_DIR = os.path.join(os.path.dirname(__file__), "..", "docker")
+
+RESOLUTIONS = [(512, 512), (768, 512), (1280, 736), (736, 1280), (1920, 1088), (2560, 1440)]
+DURATIONS = [5, 10, 20, 30]
+BUDGETS_GB = [6, 8, 12, 16, 24, 32, 48, 80]
+FPS = 30
+
+
+# Hand-computed with DECODE_BASE_BYTES 1.5 GB and DECODE_BYTES_PER_VOXEL 120 (set below), so they do not
+# move when the model is refit: (width, height, frames, budget GB) -> (tile_size, temporal_size, tiles, fits)
+EXPECTED = [
+    # 22.5 GB for voxels = 187.5M. Whole 1280 frame needs 128-frame tiles (3 temporal); 768x736x301 =
+    # 170.1M fits in one temporal tile, 2 spatial tiles (stride 672 over 1280)
+    ((1280, 736, 301, 24), (768, 4096, 2, True)),
+    # 37.5M voxels: 512x512x151 = 39.6M does not fit, 512x512x128 = 33.6M in 2 temporal tiles beats
+    # 384 (2x2 spatial)
+    ((512, 512, 151, 6), (512, 128, 2, True)),
+    # 54.2M voxels: 640x640x128 = 52.4M, 4x2 spatial x 8 temporal = 64; 768 needs 64 frames (6 x 16 = 96),
+    # 384 allows 256 frames (24 x 4 = 96), 1024 and the whole frame need 32 / 16 frames (152 / 75)
+    ((1920, 1088, 901, 8), (640, 128, 64, True)),
+    # Everything fits: one tile over the whole clip
+    ((768, 512, 301, 80), (768, 4096, 1, True)),
+    # Below the base: nothing fits, the smallest tiles are returned
+    ((1280, 736, 301, 1.5), (256, 16, None, False)),
+]
+
+
+def main():
+    builder = WorkflowBuilder(os.path.join(DOCKER_DIR, "workflow_ltx2_enhanced.json"), None, None)
+    builder.DECODE_BASE_BYTES = int(1.5e9)
+    builder.DECODE_BYTES_PER_VOXEL = 120
+    failures = 0
+
+    for (width, height, num_frames, gb), expected in EXPECTED:
+        plan = builder.plan_decode_tiling(width, height, num_frames, int(gb * 1e9))
+        actual = (plan["tile_size"], plan["temporal_size"], plan["tiles"] if plan["fits"] else None, plan["fits"])
+        if actual != expected:
+            print(f"FAIL {width}x{height} {num_frames}f {gb}GB: {actual}, expected {expected}")
+            failures += 1
+    print(f"{len(EXPECTED)} hand-computed plans checked")
+
+    print(f"{'resolution':>11} {'sec':>4} " + " ".join(f"{gb:>5}GB" for gb in BUDGETS_GB))
+    for width, height in RESOLUTIONS:
+        for seconds in DURATIONS:
+            num_frames = seconds * FPS + 1
+            row = []
+            previous_tiles = None
+            for gb in BUDGETS_GB:
+                budget = int(gb * 1e9)
+                plan = builder.plan_decode_tiling(width, height, num_frames, budget)
+
+                if plan["fits"] and plan["estimated_bytes"] > budget:
+                    print(f"FAIL {width}x{height} {seconds}s {gb}GB: over budget {plan}")
+                    failures += 1
+
+                if previous_tiles is not None and plan["fits"] and plan["tiles"] > previous_tiles:
+                    print(f"FAIL {width}x{height} {seconds}s {gb}GB: more VRAM, more tiles")
+                    failures += 1
+                if plan["fits"]:
+                    previous_tiles = plan["tiles"]
+                row.append(f"{plan['tiles']:>6}" + ("" if plan["fits"] else "!"))
+            print(f"{width:>5}x{height:<5} {seconds:>4} " + " ".join(f"{cell:>7}" for cell in row))
+
+    print("(tiles per plan; ! = nothing fits, smallest tiles used)")
+    if failures:
+        print(f"{failures} failures")
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Check low-fps generation (generation_fps) + frame interpolation.
+
+1. Cost: frame / latent-frame counts of generation at 15 and 24 fps against
+   native 30 fps (WorkflowBuilder.plan_generation_fps). Pure Python.
+2. Audio sync (needs ffmpeg): a 15 fps clip with a white flash and a beep at
+   the same instant is interpolated to 30 fps with every interpolator; the
+   flash must stay within one source frame of the beep, the beep must not
+   move, and video/audio durations must match.
+
+Usage:
+    python test/check_frame_interpolation.py
+"""
+import array
+import os
+import subprocess
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "docker", "pod_files"))
+
+from video_postprocess import INTERPOLATORS, find_ffmpeg, interpolate_video
+from workflow_builder import WorkflowBuilder
+
+DOCKER_DIR = os.path.join(os.path.dirname(__file__), "..", "docker")
+
+SOURCE_FPS = 15
+TARGET_FPS = 30
+EVENT_SECONDS = 2.0
+CLIP_SECONDS = 4.0
+AUDIO_RATE = 16000
+
+
+def print_cost_table():
+    builder = WorkflowBuilder(os.path.join(DOCKER_DIR, "workflow_ltx2_enhanced.json"), None, None)
+    print(f"{'duration':>8} {'gen fps':>7} {'frames':>7} {'native':>7} {'saved':>6} {'latent ratio':>12}")
+    for duration in (5, 10, 20, 30):
+        for generation_fps in (15, 24):
+            plan = builder.plan_generation_fps(duration, 30, generation_fps)
+            print(f"{duration:>7}s {generation_fps:>7} {plan['generated_frames']:>7} "
+                  f"{plan['native_frames']:>7} {plan['frames_saved']:>6} {plan['latent_frame_ratio']:>12}")
+
+
+def make_source_clip(ffmpeg, path):
+    """Black 15 fps clip, one white frame at EVENT_SECONDS, beep starting at EVENT_SECONDS."""
+    event_frame = int(EVENT_SECONDS * SOURCE_FPS)
+    video = (f"color=c=black:s=128x96:r={SOURCE_FPS}:d={CLIP_SECONDS},"
+             f"drawbox=c=white:t=fill:enable='eq(n\\,{event_frame})'")
+    audio = (f"aevalsrc='if(between(t\\,{EVENT_SECONDS}\\,{EVENT_SECONDS + 0.1})\\,0.8*sin(2*PI*1000*t)\\,0)'"
+             f":s={AUDIO_RATE}:d={CLIP_SECONDS}")
+    subprocess.run([
+        ffmpeg, "-y", "-loglevel", "error",
+        "-f", "lavfi", "-i", video, "-f", "lavfi", "-i", audio,
+        "-c:v", "libx264", "-pix_fmt", "yuv420p", "-c:a", "aac", path,
+    ], check=True)
+
+
+def frame_brightness(ffmpeg, path):
+    raw = subprocess.run([
+        ffmpeg, "-loglevel", "error", "-i", path,
+        "-f", "rawvideo", "-pix_fmt", "gray", "-",
+    ], check=True, capture_output=True).stdout
+    size = 128 * 96
+    return [sum(raw[i:i + size]) / size for i in range(0, len(raw), size)]
+
+
+def beep_onset_seconds(ffmpeg, path):
+    raw = subprocess.run([
+        ffmpeg, "-loglevel", "error", "-i", path,
+        "-f", "s16le", "-ac", "1", "-ar", str(AUDIO_RATE), "-",
+    ], check=True, capture_output=True).stdout
+    samples = array.array("h", raw)
+    for index, value in enumerate(samples):
+        if abs(value) > 8000:
+            return index / AUDIO_RATE, len(samples) / AUDIO_RATE
+    return None, len(samples) / AUDIO_RATE
+
+
+def check_audio_sync(ffmpeg):
+    failures = 0
+    with tempfile.TemporaryDirectory() as tmp:
+        source = os.path.join(tmp, "source.mp4")
+        make_source_clip(ffmpeg, source)
+        source_beep, _ = beep_onset_seconds(ffmpeg, source)
+
+        for method in INTERPOLATORS:
+            path = os.path.join(tmp, f"{method}.mp4")
+            with open(source, "rb") as src, open(path, "wb") as dst:
+                dst.write(src.read())
+            interpolate_video(path, TARGET_FPS, method=method)
+
+            brightness = frame_brightness(ffmpeg, path)
+            flash_seconds = max(range(len(brightness)), key=brightness.__getitem__) / TARGET_FPS
+            video_seconds = len(brightness) / TARGET_FPS
+            beep, audio_seconds = beep_onset_seconds(ffmpeg, path)
+
+            problems = []
+            if abs(flash_seconds - EVENT_SECONDS) > 1.0 / SOURCE_FPS:
+                problems.append(f"flash at {flash_seconds:.3f}s")
+            if beep is None or abs(beep - source_beep) > 0.005:
+                problems.append(f"beep moved {source_beep}s -> {beep}s")
+            if abs(video_seconds - audio_seconds) > 0.1:
+                problems.append(f"video {video_seconds:.2f}s vs audio {audio_seconds:.2f}s")
+
+            status = "FAIL " + ", ".join(problems) if problems else "ok"
+            print(f"  {method:>12}: {len(brightness)} frames, flash {flash_seconds:.3f}s, "
+                  f"beep {beep}s: {status}")
+            failures += bool(problems)
+    return failures
+
+
+def main():
+    print("Cost vs native 30fps:")
+    print_cost_table()
+
+    ffmpeg = find_ffmpeg()
+    if ffmpeg is None:
+        print("ffmpeg not found, skipping audio sync check")
+        return
+
+    print(f"Audio sync ({SOURCE_FPS} -> {TARGET_FPS} fps):")
+    failures = check_audio_sync(ffmpeg)
+    if failures:
+        print(f"{failures} failures")
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
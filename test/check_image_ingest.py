@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""
+Check CPU image ingest (MediaPreprocessor.normalize_image) against the
+in-graph path it replaces (LoadImage -> ImageResizeKJv2 of the templates).
+
+1. Geometry (pure Python): pad_geometry against inner size, offsets and
+   output size worked out by hand from ImageResizeKJv2's pad rules
+   (fit, round inner size down to 32, center on the unrounded size,
+   extend right/bottom padding to 32).
+2. Pixels (needs numpy + Pillow and a running ComfyUI with KJNodes):
+   synthetic images (landscape, portrait, exact size, upscale, EXIF-rotated
+   JPEG, RGBA, grayscale) are uploaded as-is and run through LoadImage ->
+   ImageResizeKJv2 (the template's node 241 inputs) -> SaveImage; the
+   result is compared with the CPU PNG.
+
+Tolerance: identical size; per pixel and channel |diff| <= 1 level (uint8)
+and mean |diff| <= 0.05 levels. Both paths quantize with ComfyUI's
+clip(255 * x) -> uint8 round trip and resize with PIL lanczos, so
+differences beyond float rounding are a regression.
+
+Usage:
+    python test/check_image_ingest.py [--comfyui http://127.0.0.1:8188]
+"""
+import argparse
+import io
+import json
+import os
+import sys
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+import uuid
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "docker", "pod_files"))
+
+from media_preprocessor import MediaPreprocessor
+
+DOCKER_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "docker")
+MAX_LEVEL_DIFF = 1
+MAX_MEAN_DIFF = 0.05
+WIDTH, HEIGHT = 1280, 736
+
+# (source size, target size) -> (inner width, inner height, pad left, pad top, out width, out height)
+GEOMETRY_CASES = [
+    # 1920x1080 -> fit 1280x720 (8px top/bottom), inner height 720 -> 704, bottom 8 -> 24
+    ((1920, 1080), (1280, 736), (1280, 704, 0, 8, 1280, 736)),
+    # Portrait: fit 414x736 (433px left / 433 right), inner width 414 -> 384, right 433 -> 463
+    ((1080, 1920), (1280, 736), (384, 736, 433, 0, 1280, 736)),
+    # Exact fit: no padding
+    ((1280, 736), (1280, 736), (1280, 736, 0, 0, 1280, 736)),
+    # Upscale 640x480 -> 981x736 (149 left / 150 right), inner width 981 -> 960, right 150 -> 171
+    ((640, 480), (1280, 736), (960, 736, 149, 0, 1280, 736)),
+    # Square into portrait 736x1280: fit 736x736 (272 top / 272 bottom), 736 is already a multiple of 32
+    ((1000, 1000), (736, 1280), (736, 736, 0, 272, 736, 1280)),
+]
+
+
+def check_geometry(expect) -> None:
+    for (src_width, src_height), (width, height), expected in GEOMETRY_CASES:
+        geometry = MediaPreprocessor.pad_geometry(src_width, src_height, width, height, 32)
+        actual = tuple(geometry[key] for key in (
+            "inner_width", "inner_height", "pad_left", "pad_top", "out_width", "out_height"))
+        expect(actual == expected, f"pad_geometry {src_width}x{src_height} -> {width}x{height}: "
+                                   f"{actual}, expected {expected}")
+    print(f"Geometry: {len(GEOMETRY_CASES)} cases checked")
+
+
+def make_images() -> dict:
+    """Synthetic test images (name -> encoded bytes): gradients with fine detail for lanczos to ring on."""
+    import numpy as np
+    from PIL import Image
+
+    def pattern(width, height, channels=3):
+        y, x = np.mgrid[0:height, 0:width]
+        planes = [(x * 255 // max(1, width - 1)), (y * 255 // max(1, height - 1)), ((x // 7 + y // 5) % 2) * 255]
+        planes += [((x + y) * 255 // max(1, width + height - 2))] * (channels - 3)
+        return np.stack(planes[:channels], axis=-1).astype(np.uint8)
+
+    def encode(image, fmt="PNG", **options):
+        buffer = io.BytesIO()
+        image.save(buffer, format=fmt, **options)
+        return buffer.getvalue()
+
+    images = {
+        "landscape.png": encode(Image.fromarray(pattern(1920, 1080))),
+        "portrait.png": encode(Image.fromarray(pattern(1080, 1920))),
+        "exact.png": encode(Image.fromarray(pattern(WIDTH, HEIGHT))),
+        "upscale.png": encode(Image.fromarray(pattern(640, 480))),
+        "rgba.png": encode(Image.fromarray(pattern(1000, 1000, channels=4), mode="RGBA")),
+        "gray.png": encode(Image.fromarray(pattern(900, 1200)[..., 0], mode="L")),
+    }
+    rotated = Image.fromarray(pattern(1500, 1000))
+    exif = rotated.getexif()
+    exif[0x0112] = 6  # Rotate 90 CW on display
+    images["exif_rotated.jpg"] = encode(rotated, fmt="JPEG", quality=95, exif=exif.tobytes())
+    return images
+
+
+class ComfyUI:
+    """Minimal ComfyUI client: upload, run a prompt, fetch an output image."""
+
+    def __init__(self, url: str):
+        self.url = url.rstrip("/")
+
+    def available(self) -> bool:
+        try:
+            urllib.request.urlopen(f"{self.url}/system_stats", timeout=3).read()
+            return True
+        except (urllib.error.URLError, OSError):
+            return False
+
+    def upload(self, data: bytes, filename: str) -> str:
+        boundary = uuid.uuid4().hex
+        body = (f"--{boundary}\r\nContent-Disposition: form-data; name=\"image\"; filename=\"{filename}\"\r\n"
+                f"Content-Type: application/octet-stream\r\n\r\n").encode() + data + (
+            f"\r\n--{boundary}\r\nContent-Disposition: form-data; name=\"overwrite\"\r\n\r\ntrue\r\n"
+            f"--{boundary}--\r\n").encode()
+        request = urllib.request.Request(f"{self.url}/upload/image", data=body,
+                                         headers={"Content-Type": f"multipart/form-data; boundary={boundary}"})
+        return json.loads(urllib.request.urlopen(request, timeout=60).read())["name"]
+
+    def run(self, workflow: dict, timeout: float = 120) -> dict:
+        request = urllib.request.Request(f"{self.url}/prompt", data=json.dumps({"prompt": workflow}).encode(),
+                                         headers={"Content-Type": "application/json"})
+        prompt_id = json.loads(urllib.request.urlopen(request, timeout=30).read())["prompt_id"]
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            history = json.loads(urllib.request.urlopen(f"{self.url}/history/{prompt_id}", timeout=10).read())
+            if prompt_id in history and history[prompt_id].get("outputs"):
+                return history[prompt_id]["outputs"]
+            time.sleep(0.2)
+        raise TimeoutError(f"prompt {prompt_id} did not finish in {timeout}s")
+
+    def view(self, image: dict) -> bytes:
+        query = urllib.parse.urlencode({"filename": image["filename"], "subfolder": image.get("subfolder", ""),
+                                        "type": image.get("type", "output")})
+        return urllib.request.urlopen(f"{self.url}/view?{query}", timeout=60).read()
+
+
+def in_graph_workflow(image_name: str, width: int, height: int) -> dict:
+    """LoadImage -> ImageResizeKJv2 (the template's inputs) -> SaveImage."""
+    with open(os.path.join(DOCKER_DIR, "workflow_ltx2_enhanced.json")) as f:
+        resize_inputs = dict(json.load(f)["241"]["inputs"])
+    resize_inputs.update(image=["1", 0], width=width, height=height)
+    return {
+        "1": {"class_type": "LoadImage", "inputs": {"image": image_name}},
+        "2": {"class_type": "ImageResizeKJv2", "inputs": resize_inputs},
+        "3": {"class_type": "SaveImage", "inputs": {"images": ["2", 0], "filename_prefix": "ingest_check"}},
+    }
+
+
+def check_pixels(comfyui: ComfyUI, expect) -> None:
+    import numpy as np
+    from PIL import Image
+
+    print(f"{'image':<18} {'size':>10} {'max diff':>8} {'mean diff':>9} {'upload':>17}")
+    for name, data in make_images().items():
+        for width, height in ((WIDTH, HEIGHT), (HEIGHT, WIDTH)):
+            cpu_png, _, info = MediaPreprocessor.normalize_image(data, width, height, name)
+            outputs = comfyui.run(in_graph_workflow(comfyui.upload(data, name), width, height))
+            graph_png = comfyui.view(outputs["3"]["images"][0])
+
+            cpu = np.asarray(Image.open(io.BytesIO(cpu_png)).convert("RGB")).astype(np.int16)
+            graph = np.asarray(Image.open(io.BytesIO(graph_png)).convert("RGB")).astype(np.int16)
+            label = f"{name} -> {width}x{height}"
+            if cpu.shape != graph.shape:
+                expect(False, f"{label}: CPU {cpu.shape[1]}x{cpu.shape[0]}, graph {graph.shape[1]}x{graph.shape[0]}")
+                continue
+            diff = np.abs(cpu - graph)
+            max_diff, mean_diff = int(diff.max()), float(diff.mean())
+            print(f"{name:<18} {width:>4}x{height:<5} {max_diff:>8} {mean_diff:>9.4f} "
+                  f"{len(data) / 1e3:>7.0f}->{len(cpu_png) / 1e3:.0f} KB")
+            expect(max_diff <= MAX_LEVEL_DIFF and mean_diff <= MAX_MEAN_DIFF,
+                   f"{label}: max |diff| {max_diff}, mean {mean_diff:.4f} "
+                   f"(tolerance {MAX_LEVEL_DIFF} / {MAX_MEAN_DIFF})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check CPU image ingest against the in-graph resize")
+    parser.add_argument("--comfyui", default=os.environ.get("COMFYUI_URL", "http://127.0.0.1:8188"))
+    args = parser.parse_args()
+
+    failures = []
+
+    def expect(condition, message):
+        if not condition:
+            failures.append(message)
+
+    check_geometry(expect)
+    comfyui = ComfyUI(args.comfyui)
+    try:
+        import numpy  # noqa: F401
+        import PIL  # noqa: F401
+    except ImportError as e:
+        print(f"Pixels: skipped ({e.name} not installed)")
+    else:
+        if comfyui.available():
+            check_pixels(comfyui, expect)
+        else:
+            print(f"Pixels: skipped (no ComfyUI at {args.comfyui})")
+
+    for failure in failures:
+        print(f"FAIL {failure}")
+    if failures:
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
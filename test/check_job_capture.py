@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Check the scrubbing of captured job inputs (job_capture.scrub_input).
+
+  - a legacy "workflow" input has its prompt texts scrubbed like a
+    submitted workflow
+  - strings holding a URL are dropped whatever their key
+  - values of keys outside SAFE_INPUT_KEYS are dropped; job parameters,
+    media refs (in order, keyframes included), prompt word counts and the
+    hashed tenant are kept for replay
+
+Usage:
+    python test/check_job_capture.py
+"""
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "docker", "pod_files"))
+
+from job_capture import scrub_input
+
+PRIVATE = ("Jane Doe", "12 Main St", "x.y", "sig=abc", "nude", "example.com", "acme")
+
+
+def main():
+    failures = []
+
+    def expect(condition, message):
+        if not condition:
+            failures.append(message)
+
+    legacy = scrub_input({
+        "workflow": {"6": {"class_type": "CLIPTextEncode", "inputs": {"text": "a photo of Jane Doe at 12 Main St"}}},
+        "callback": "https://x.y/z?sig=abc",
+        "negative": "nude",
+    })
+    expect(legacy == {"workflow": {"6": {"class_type": "CLIPTextEncode", "inputs": {"text": "[scrubbed 9 words]"}}},
+                      "callback": "[scrubbed]", "negative": "[scrubbed]"}, f"legacy input {legacy}")
+
+    keyframes = scrub_input({
+        "keyframes": [{"image_url": "https://example.com/a.png", "frame_position": "first", "strength": 1.0},
+                      {"image_url": "https://example.com/b.png", "frame_position": "last", "strength": 0.8}],
+        "audio_url": "https://example.com/line.mp3",
+        "prompt_positive": "Jane Doe waves",
+        "quality_preset": "high", "seed": 42, "two_stage": True, "num_variants": 2,
+        "lora_camera": "https://example.com/lora.safetensors",
+        "tenant": "acme", "user_email": "jane@acme.test", "webhook_id": 7,
+    })
+    expected = {
+        "keyframes": [{"image_url": "media:image:0", "frame_position": "first", "strength": 1.0},
+                      {"image_url": "media:image:1", "frame_position": "last", "strength": 0.8}],
+        "audio_url": "media:audio:0",
+        "prompt_positive": "[scrubbed 3 words]",
+        "quality_preset": "high", "seed": 42, "two_stage": True, "num_variants": 2,
+        "lora_camera": "[scrubbed url]",
+        "user_email": "[scrubbed]", "webhook_id": "[scrubbed]",
+    }
+    tenant = keyframes.pop("tenant", None)
+    expect(keyframes == expected, f"keyframes input {keyframes}")
+    expect(isinstance(tenant, str) and len(tenant) == 12 and tenant != "acme", f"tenant {tenant}")
+
+    for record in (legacy, keyframes):
+        text = json.dumps(record)
+        leaked = [value for value in PRIVATE if value in text]
+        expect(not leaked, f"{leaked} left in {text}")
+    print(f"Scrubbed: {json.dumps(legacy)}")
+
+    for failure in failures:
+        print(f"FAIL {failure}")
+    if failures:
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+"""
+Check the crash-safe job journal (job_journal.py) and the handler's
+reattach of a prompt left by a restarted handler.
+
+1. Journal: a child process runs two concurrent jobs of the same input,
+   records their prompts and exits without finishing them (the handler
+   restart). The parent then checks that:
+     - each job kept its own entry (seed, prompt_id, instance URL)
+     - scheduling keys (priority / tenant) do not change the input hash
+     - a re-delivered job id does not overwrite its unfinished entry, and
+       claims it before the other one
+     - each entry is claimed by one job only, and a claimed entry no
+       longer offers itself to other jobs
+     - finishing the claiming job closes the entry it reattached
+     - cleanup() removes entries past the retention period
+2. Handler (needs the handler's dependencies: runpod, requests, Pillow):
+   a child handler process is killed while its prompt runs on an
+   in-process fake ComfyUI (fake_comfyui.py); two jobs of the same input
+   then both finish from that prompt (attempt "reattached", its seed),
+   each with its own video file, without a new prompt.
+
+Usage:
+    python test/check_job_journal.py
+"""
+import functools
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+TEST_DIR = os.path.dirname(os.path.abspath(__file__))
+DOCKER_DIR = os.path.join(TEST_DIR, "..", "docker")
+POD_FILES = os.path.join(DOCKER_DIR, "pod_files")
+sys.path.insert(0, POD_FILES)
+sys.path.insert(0, TEST_DIR)
+
+from job_journal import JobJournal, job_input_hash
+
+JOB_INPUT = {"image_url": "https://example.com/face.png", "audio_url": "https://example.com/line.mp3",
+             "quality_preset": "high"}
+
+CRASHED_HANDLER = """
+import sys
+sys.path.insert(0, {pod_files!r})
+from job_journal import JobJournal, job_input_hash
+journal = JobJournal({path!r})
+input_hash = job_input_hash({job_input!r})
+journal.start(input_hash, "job-1", 424242)
+journal.start(input_hash, "job-2", 434343)
+journal.update(input_hash, "job-1", prompt_id="prompt-abc", comfyui_url="http://127.0.0.1:8188", stage="submitted")
+journal.update(input_hash, "job-2", prompt_id="prompt-def", comfyui_url="http://127.0.0.1:8189", stage="submitted")
+"""
+
+# Handler process killed while its prompt runs
+KILLED_HANDLER = """
+import functools, sys
+sys.path.insert(0, {pod_files!r})
+sys.path.insert(0, {test_dir!r})
+import rp_handler
+from load_test import local_upload
+rp_handler.upload_video_to_gcs = functools.partial(local_upload, {uploads!r})
+rp_handler.wait_for_comfyui(timeout=30)
+rp_handler.unified_handler({{"id": "killed", "input": {job_input!r}}})
+"""
+
+
+def check_journal(expect) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "journal.sqlite3")
+        subprocess.run([sys.executable, "-c", CRASHED_HANDLER.format(
+            pod_files=POD_FILES, path=path, job_input=JOB_INPUT)], check=True)
+
+        journal = JobJournal(path)
+        input_hash = job_input_hash(JOB_INPUT)
+        expect(job_input_hash({**JOB_INPUT, "priority": "batch", "tenant": "a"}) == input_hash,
+               "scheduling keys changed the input hash")
+        expect(job_input_hash({**JOB_INPUT, "seed": 1}) != input_hash, "seed did not change the input hash")
+
+        rows = journal._db.execute("SELECT job_id, seed, prompt_id FROM jobs ORDER BY job_id").fetchall()
+        expect([tuple(row) for row in rows] == [("job-1", 424242, "prompt-abc"), ("job-2", 434343, "prompt-def")],
+               f"concurrent jobs of one input did not keep their own entries: {[tuple(row) for row in rows]}")
+        entry = journal.find_unfinished(input_hash)
+        expect(entry is not None and entry["stage"] == "submitted", f"unfinished entry not found: {entry}")
+
+        # RunPod re-delivers job-2: its unfinished entry survives start() and is claimed first
+        journal.start(input_hash, "job-2", 1)
+        entry = journal.claim_unfinished(input_hash, "job-2")
+        expect(entry is not None and (entry["job_id"], entry["seed"], entry["prompt_id"], entry["comfyui_url"])
+               == ("job-2", 434343, "prompt-def", "http://127.0.0.1:8189"), f"re-delivered job claimed {entry}")
+        entry = journal.claim_unfinished(input_hash, "job-3")
+        expect(entry is not None and entry["job_id"] == "job-1", f"second claim {entry}")
+        expect(journal.claim_unfinished(input_hash, "job-4") is None, "an entry was claimed twice")
+        if entry:
+            print(f"Claimed: prompt {entry['prompt_id']} (seed {entry['seed']}) by {entry['reattached_by']}")
+
+        # job-3's own entry is separate from the one it reattached
+        journal.start(input_hash, "job-3", entry["seed"] if entry else None)
+        journal.update(input_hash, "job-3", stage="generated", output={"filename": "ltx2_output_00001_job-3.mp4"})
+        job_1 = journal._db.execute("SELECT stage, output FROM jobs WHERE job_id = 'job-1'").fetchone()
+        expect(tuple(job_1) == ("submitted", None), f"job-3's update changed job-1's entry: {tuple(job_1)}")
+        journal.finish(input_hash, "job-3", "done")
+        journal.finish(input_hash, "job-2", "done")
+        stages = dict(journal._db.execute("SELECT job_id, stage FROM jobs").fetchall())
+        expect(stages == {"job-1": "done", "job-2": "done", "job-3": "done"}, f"stages after finish {stages}")
+        expect(journal.find_unfinished(input_hash) is None, "finished entry still offered for reattaching")
+
+        # Retention: age the entries past the cutoff
+        journal._db.execute("UPDATE jobs SET updated = ?", (time.time() - 3 * 3600,))
+        expect(journal.cleanup(retention_hours=4) == 0, "entry inside retention removed")
+        expect(journal.cleanup(retention_hours=2) == 3, "expired entries not removed")
+    print("Journal: one entry per job, each claimed once")
+
+
+def check_handler(expect) -> None:
+    from fake_comfyui import start_fake_comfyui
+    from load_test import TEMPLATES, local_upload, serve_media, write_png, write_wav
+
+    work = tempfile.mkdtemp(prefix="ltx2_journal_check_")
+    dirs = {name: os.path.join(work, name) for name in ("media", "output", "input", "workflows", "uploads")}
+    for path in dirs.values():
+        os.makedirs(path, exist_ok=True)
+    for name, template in TEMPLATES.items():
+        shutil.copyfile(os.path.join(DOCKER_DIR, template), os.path.join(dirs["workflows"], name))
+    write_png(os.path.join(dirs["media"], "face.png"), 768, 512)
+    write_wav(os.path.join(dirs["media"], "speech.wav"), 3)
+    media_url = serve_media(dirs["media"])
+    server, url = start_fake_comfyui(output_dir=dirs["output"], input_dir=dirs["input"], step_seconds=0.2)
+    os.environ.update({
+        "COMFYUI_HOST": "127.0.0.1",
+        "COMFYUI_BASE_PORT": url.rsplit(":", 1)[1],
+        "COMFYUI_INSTANCES": "1",
+        "COMFYUI_OUTPUT_DIRS": dirs["output"],
+        "COMFYUI_WORKFLOW_DIR": dirs["workflows"],
+        "JOB_JOURNAL_PATH": os.path.join(work, "job_journal.sqlite3"),
+        "LATENT_CACHE_DIR": os.path.join(work, "latents", "cache"),
+        "JOB_LATENT_DIR": os.path.join(work, "latents", "jobs"),
+    })
+    job_input = {"image_url": f"{media_url}/face.png", "audio_url": f"{media_url}/speech.wav",
+                 "quality_preset": "fast"}
+    try:
+        child = subprocess.Popen([sys.executable, "-c", KILLED_HANDLER.format(
+            pod_files=POD_FILES, test_dir=TEST_DIR, uploads=dirs["uploads"], job_input=job_input)],
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        journal = JobJournal(os.environ["JOB_JOURNAL_PATH"])
+        deadline = time.time() + 120
+        entry = None
+        while time.time() < deadline and child.poll() is None:
+            entry = journal.find_unfinished(job_input_hash(job_input))
+            if entry and entry["stage"] == "submitted":
+                break
+            time.sleep(0.2)
+        child.kill()
+        child.wait()
+        if not entry or entry["stage"] != "submitted":
+            expect(False, f"killed handler did not journal its prompt: {entry}")
+            return
+
+        import job_journal
+        import rp_handler
+
+        # JOB_JOURNAL_PATH was read when check_journal imported job_journal
+        job_journal._journal = JobJournal(os.environ["JOB_JOURNAL_PATH"])
+        rp_handler.upload_video_to_gcs = functools.partial(local_upload, dirs["uploads"])
+        if not rp_handler.wait_for_comfyui(timeout=30):
+            expect(False, "fake ComfyUI did not come up")
+            return
+        results = {}
+
+        def run(job_id):
+            results[job_id] = rp_handler.unified_handler({"id": job_id, "input": dict(job_input)})
+
+        threads = [threading.Thread(target=run, args=(f"retry-{index}",)) for index in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        videos = set()
+        for job_id, result in sorted(results.items()):
+            output = result.get("output") or {}
+            attempts = [attempt.get("result") for attempt in output.get("attempts") or []]
+            expect(result.get("status") == "success" and attempts == ["reattached"],
+                   f"{job_id}: {result.get('status')} {result.get('error')}, attempts {attempts}")
+            expect(output.get("seed") == entry["seed"], f"{job_id}: seed {output.get('seed')}, not {entry['seed']}")
+            path = (output.get("video_url") or "").replace("file://", "")
+            expect(os.path.exists(path), f"{job_id}: video not uploaded: {output.get('video_url')}")
+            videos.add(os.path.basename(path))
+        expect(len(videos) == 2, f"same-input jobs shared an output file: {sorted(videos)}")
+        expect(server.state.stats["prompts"] == 1, f"{server.state.stats['prompts']} prompts, expected 1")
+        print(f"Handler: 2 jobs reattached prompt {entry['prompt_id']}, videos {sorted(videos)}")
+    finally:
+        server.shutdown()
+        shutil.rmtree(work, ignore_errors=True)
+
+
+def main():
+    failures = []
+
+    def expect(condition, message):
+        if not condition:
+            failures.append(message)
+
+    check_journal(expect)
+    try:
+        import PIL  # noqa: F401
+        import requests  # noqa: F401
+        import runpod  # noqa: F401
+    except ImportError as e:
+        print(f"Handler: skipped ({e.name} not installed)")
+    else:
+        check_handler(expect)
+
+    for failure in failures:
+        print(f"FAIL {failure}")
+    if failures:
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Check cross-job pipelining (job_pipeline.py) with simulated jobs.
+
+Each fake job sleeps through a CPU prepare stage (download, normalize,
+stage, build), a GPU stage inside gpu_slot() and a CPU upload stage, and
+runs through make_async_handler like the worker does; no ComfyUI is needed,
+the pool's instances are marked ready. The jobs are fed at
+concurrency 1 (old behaviour) and at HANDLER_CONCURRENCY. The check
+verifies that the GPU never holds more than one job and that total GPU
+time does not change, then prints throughput.
+
+Usage:
+    python test/check_job_pipeline.py [--jobs 12]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "docker", "pod_files"))
+
+from comfyui_pool import POOL
+from job_pipeline import HANDLER_CONCURRENCY, gpu_slot, make_async_handler
+
+PREPARE_SECONDS = 0.6
+GPU_SECONDS = 1.0
+UPLOAD_SECONDS = 0.4
+
+
+class GpuMonitor:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.active = 0
+        self.max_active = 0
+        self.busy_seconds = 0.0
+
+    def enter(self):
+        with self.lock:
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+
+    def leave(self, seconds):
+        with self.lock:
+            self.active -= 1
+            self.busy_seconds += seconds
+
+
+def make_fake_handler(monitor):
+    def fake_handler(event):
+        time.sleep(PREPARE_SECONDS)
+        with gpu_slot():
+            monitor.enter()
+            start = time.time()
+            time.sleep(GPU_SECONDS)
+            monitor.leave(time.time() - start)
+        time.sleep(UPLOAD_SECONDS)
+        return {"status": "success", "id": event["id"]}
+
+    return fake_handler
+
+
+async def run_jobs(num_jobs, concurrency):
+    monitor = GpuMonitor()
+    handler = make_async_handler(make_fake_handler(monitor))
+    # RunPod keeps up to concurrency_modifier() jobs in flight
+    in_flight = asyncio.Semaphore(concurrency)
+
+    async def run_one(job_id):
+        async with in_flight:
+            return await handler({"id": job_id, "input": {}})
+
+    start = time.time()
+    results = await asyncio.gather(*(run_one(i) for i in range(num_jobs)))
+    elapsed = time.time() - start
+    assert all(r["status"] == "success" for r in results)
+    return elapsed, monitor
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--jobs", type=int, default=12)
+    args = parser.parse_args()
+
+    # Simulated GPU stage: route to the pool without probing ComfyUI
+    for instance in POOL.instances:
+        instance.ready = True
+
+    failures = 0
+    rows = []
+    for concurrency in (1, HANDLER_CONCURRENCY):
+        elapsed, monitor = asyncio.run(run_jobs(args.jobs, concurrency))
+        rows.append((concurrency, elapsed, monitor))
+        if monitor.max_active > 1:
+            print(f"FAIL concurrency {concurrency}: {monitor.max_active} jobs on the GPU at once")
+            failures += 1
+
+    print(f"{'concurrency':>11} {'wall s':>7} {'gpu s':>6} {'gpu util':>8} {'jobs/min':>8}")
+    for concurrency, elapsed, monitor in rows:
+        print(f"{concurrency:>11} {elapsed:>7.1f} {monitor.busy_seconds:>6.1f} "
+              f"{monitor.busy_seconds / elapsed:>8.0%} {args.jobs / elapsed * 60:>8.1f}")
+
+    serial, pipelined = rows[0][1], rows[-1][1]
+    if abs(rows[0][2].busy_seconds - rows[-1][2].busy_seconds) > 0.1 * rows[0][2].busy_seconds:
+        print("FAIL GPU time changed between runs")
+        failures += 1
+    if HANDLER_CONCURRENCY > 1 and pipelined >= serial:
+        print("FAIL pipelining did not raise throughput")
+        failures += 1
+    print(f"Throughput gain: {serial / pipelined:.2f}x at the same GPU time")
+
+    if failures:
+        print(f"{failures} failures")
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Check job progress events and ETAs (job_progress.py).
+
+Drives a JobProgress with a simulated job (no ComfyUI): stage transitions,
+ComfyUI websocket messages of a two-stage workflow fed to
+ComfyUIProgressListener.handle, and upload bytes. Checks that:
+  - stage transitions always reach the sink, step events are throttled
+  - sampler steps are weighted by the cost of their sampler
+    (WorkflowBuilder.estimate_workflow_cost on the two-stage template)
+  - the ETA shrinks as the job advances and is 0 at its end
+  - a finished job moves the stage rates toward its durations
+  - make_streaming_handler yields the events, then the result
+
+Usage:
+    python test/check_job_progress.py
+"""
+import asyncio
+import os
+import sys
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "docker")
+sys.path.insert(0, os.path.join(ROOT, "pod_files"))
+
+import job_progress
+from job_pipeline import make_streaming_handler
+from job_progress import ComfyUIProgressListener, JobProgress, current_progress
+from workflow_builder import WorkflowBuilder
+
+STEP_SECONDS = 0.01
+TWO_STAGE = {"mode": "latent", "stage1": [384, 256], "working": [768, 512], "output": [768, 512],
+             "refine_steps": 3, "refine_denoise": 0.4, "crop": [0, 0]}
+
+
+def build_workflow():
+    builder = WorkflowBuilder(*(os.path.join(ROOT, name) for name in (
+        "workflow_ltx2_enhanced.json", "workflow_ltx2_audio_gen.json", "workflow_ltx2_multiframe.json")))
+    workflow = builder.build_workflow(
+        image_name="face.png", audio_name="line.wav", audio_duration=5.0, prompt_positive="speaks",
+        prompt_negative="static", seed=1, width=768, height=512, steps=8, two_stage=TWO_STAGE,
+    )
+    return workflow, builder.estimate_workflow_cost(workflow)
+
+
+def simulate_job(progress, workflow):
+    """Run a two-stage job through progress, as the handler and ComfyUI would report it."""
+    listener = ComfyUIProgressListener("http://127.0.0.1:8188", "check", workflow, progress)
+    for stage in ("download", "prepare", "gpu_wait", "loading"):
+        progress.set_stage(stage)
+        time.sleep(STEP_SECONDS)
+    for node, steps in (("161", 8), (WorkflowBuilder.REFINE_SAMPLER_NODE_ID, 3)):
+        listener.handle({"type": "executing", "data": {"node": node}})
+        for value in range(1, steps + 1):
+            time.sleep(STEP_SECONDS)
+            listener.handle({"type": "progress", "data": {"node": node, "value": value, "max": steps}})
+    listener.handle({"type": "executing", "data": {"node": "234"}})
+    for value in range(1, 5):
+        time.sleep(STEP_SECONDS)
+        listener.handle({"type": "progress", "data": {"node": "234", "value": value, "max": 4}})
+    listener.handle({"type": "executing", "data": {"node": "190"}})
+    progress.set_stage("upload", units=20.0)
+    for sent in range(1, 5):
+        progress.set_step(sent * 5_000_000, 20_000_000)
+
+
+def main():
+    failures = []
+
+    def expect(condition, message):
+        if not condition:
+            failures.append(message)
+
+    workflow, cost = build_workflow()
+    samplers = cost["samplers"]
+    expect(list(samplers) == ["161", WorkflowBuilder.REFINE_SAMPLER_NODE_ID], f"samplers {samplers}")
+    print(f"Cost: sampling {cost['sampling_cost']} token-steps {samplers}, "
+          f"decode {cost['decode_cost'] / 1e6:.0f} megapixel-frames")
+
+    # Every event, then the throttled view a RunPod client gets
+    events = []
+    progress = JobProgress(events.append, interval=0)
+    progress.plan(cost)
+    simulate_job(progress, workflow)
+    stages = [event["stage"] for event in events if "step" not in event]
+    expect(stages == list(job_progress.STAGES), f"stage transitions {stages}")
+
+    # The stage 1 sampler's last step completes its share of the sampling cost, not 8 / 11 steps
+    weighted = JobProgress()
+    weighted.plan(cost)
+    weighted.set_stage("sampling")
+    weighted.set_step(8, 8, "161")
+    expected = samplers["161"] / cost["sampling_cost"]
+    expect(abs(weighted.fraction - expected) < 1e-9, f"stage 1 sampler done at {weighted.fraction}")
+    print(f"Stage 1 sampler done at {expected:.0%} of sampling (8 of 11 steps)")
+
+    etas = [event["eta_seconds"] for event in events]
+    sampling_etas = [event["eta_seconds"] for event in events if event["stage"] == "sampling" and "step" in event]
+    expect(sampling_etas == sorted(sampling_etas, reverse=True), f"sampling ETA not shrinking {sampling_etas}")
+    expect(events[-1]["eta_seconds"] == 0 and events[-1]["percent"] == 100.0, f"last event {events[-1]}")
+    print(f"{len(events)} events, ETA {etas[0]:.0f}s at start -> {sampling_etas[0]:.0f}s at the first sampler "
+          f"step -> {events[-1]['eta_seconds']}s")
+
+    throttled = []
+    progress = JobProgress(throttled.append, interval=60)
+    progress.plan(cost)
+    simulate_job(progress, workflow)
+    steps = [event for event in throttled if "step" in event]
+    expect(all(event["step"] == event["steps"] for event in steps), "throttled step event before a last step")
+    print(f"Throttled: {len(throttled)} of {len(events)} events sent")
+
+    # Calibration: this job's sampling rate pulls the rate toward it
+    before = job_progress.stage_rates()["sampling"]
+    durations = progress.finish(success=True)
+    observed = durations["sampling"] / (cost["sampling_cost"] / 1000)
+    after = job_progress.stage_rates()["sampling"]
+    expect(abs(after - observed) < abs(before - observed), f"sampling rate {before} -> {after}, job {observed}")
+    print(f"Sampling rate {before:.3f} -> {after:.3f} s per 1000 token-steps (job: {observed:.4f})")
+
+    # Generator handler: progress events, then the result
+    def handler(event):
+        current_progress().set_stage("download")
+        current_progress().set_stage("sampling")
+        return {"status": "success", "job_id": event["id"]}
+
+    async def collect():
+        return [item async for item in make_streaming_handler(handler)({"id": "job-1", "input": {}})]
+
+    items = asyncio.run(collect())
+    expect([item["progress"]["stage"] for item in items[:-1]] == ["download", "sampling"]
+           and items[-1] == {"status": "success", "job_id": "job-1"}, f"stream items {items}")
+
+    for failure in failures:
+        print(f"FAIL {failure}")
+    if failures:
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
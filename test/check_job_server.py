@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+Check the POD_MODE job API (job_server.py) with a fake handler.
+
+Serves JobServer on a local port and drives it over HTTP like a RunPod
+client: /run + /status, /runsync (finished, timed out and a bad ?wait=), /cancel of a
+queued job, /stream (with the handler's progress events), a failing job,
+/health and the /v2/{endpoint_id} prefix. Also checks that no more than the configured concurrency run at once,
+that a single worker takes queued jobs by lane, then rotating tenants, that POD_API_KEY rejects a wrong
+or missing key, and that serving beyond loopback without a key is refused.
+Needs aiohttp (installed with the runpod SDK).
+
+Usage:
+    python test/check_job_server.py
+"""
+import asyncio
+import json
+import os
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "docker", "pod_files"))
+
+from aiohttp import web
+
+from job_progress import current_progress
+from job_server import JobServer, check_bind
+
+JOB_SECONDS = 0.5
+CONCURRENCY = 2
+
+
+class FakeHandler:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.active = 0
+        self.max_active = 0
+        self.order = []
+
+    def handler(self, event):
+        job_input = event["input"]
+        with self.lock:
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+            self.order.append(job_input.get("value"))
+        current_progress().set_stage("sampling")
+        try:
+            time.sleep(job_input.get("seconds", JOB_SECONDS))
+            if job_input.get("fail"):
+                return {"status": "error", "error": "Missing image_url"}
+            return {"status": "success", "output": {"echo": job_input.get("value"), "job_id": event["id"]}}
+        finally:
+            with self.lock:
+                self.active -= 1
+
+
+def start_server(handler, concurrency=CONCURRENCY, api_key=""):
+    loop = asyncio.new_event_loop()
+    runner = web.AppRunner(JobServer(handler.handler, concurrency=concurrency, api_key=api_key).make_app())
+    loop.run_until_complete(runner.setup())
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    loop.run_until_complete(site.start())
+    port = site._server.sockets[0].getsockname()[1]
+    threading.Thread(target=loop.run_forever, daemon=True).start()
+    return f"http://127.0.0.1:{port}"
+
+
+def call(url, body=None, method=None, headers=None):
+    data = json.dumps(body).encode() if body is not None else None
+    request = urllib.request.Request(url, data=data, headers={"Content-Type": "application/json", **(headers or {})},
+                                     method=method or ("POST" if data is not None else "GET"))
+    with urllib.request.urlopen(request, timeout=30) as response:
+        return json.loads(response.read())
+
+
+def main():
+    handler = FakeHandler()
+    base = start_server(handler)
+    failures = []
+
+    def expect(condition, message):
+        if not condition:
+            failures.append(message)
+
+    # /run + /status
+    job = call(f"{base}/run", {"input": {"value": 1}})
+    expect(job["status"] == "IN_QUEUE", f"/run status {job['status']}")
+    time.sleep(JOB_SECONDS + 0.3)
+    status = call(f"{base}/status/{job['id']}")
+    expect(status["status"] == "COMPLETED" and status["output"]["output"]["echo"] == 1, f"/status {status}")
+    expect("delayTime" in status and "executionTime" in status, "missing delayTime / executionTime")
+
+    # /runsync, finished and timed out
+    status = call(f"{base}/runsync", {"input": {"value": 2}})
+    expect(status["status"] == "COMPLETED", f"/runsync {status['status']}")
+    status = call(f"{base}/runsync?wait=100", {"input": {"value": 3}})
+    expect(status["status"] in ("IN_QUEUE", "IN_PROGRESS"), f"/runsync?wait=100 {status['status']}")
+    for wait in ("soon", "nan", "-5"):
+        try:
+            call(f"{base}/runsync?wait={wait}", {"input": {"value": 4}})
+            expect(False, f"/runsync?wait={wait} served")
+        except urllib.error.HTTPError as e:
+            expect(e.code == 400 and "wait" in json.loads(e.read()).get("error", ""),
+                   f"/runsync?wait={wait}: HTTP {e.code}")
+
+    # Failing handler result -> FAILED with error
+    status = call(f"{base}/runsync", {"input": {"fail": True}})
+    expect(status["status"] == "FAILED" and status.get("error") == "Missing image_url", f"failed job {status}")
+
+    # Bounded concurrency; cancel the last queued job
+    start = time.time()
+    jobs = [call(f"{base}/run", {"input": {"value": i}}) for i in range(CONCURRENCY * 2 + 1)]
+    cancelled = call(f"{base}/cancel/{jobs[-1]['id']}", method="POST")
+    expect(cancelled["status"] == "CANCELLED", f"/cancel {cancelled}")
+
+    # /stream the last running job until it ends (prefixed route)
+    lines = []
+    stages = []
+    with urllib.request.urlopen(f"{base}/v2/local/stream/{jobs[-2]['id']}", timeout=30) as response:
+        for line in response:
+            status = json.loads(line)
+            lines.append(status["status"])
+            if status["status"] == "IN_PROGRESS" and status.get("output"):
+                stages.append(status["output"]["stage"])
+    expect(lines[-1] == "COMPLETED" and len(lines) >= 2, f"/stream statuses {lines}")
+    expect(stages and stages[-1] == "sampling", f"/stream progress stages {stages}")
+    elapsed = time.time() - start
+    expect(handler.max_active <= CONCURRENCY, f"{handler.max_active} jobs ran at once")
+    statuses = [call(f"{base}/status/{job['id']}")["status"] for job in jobs]
+    expect(statuses == ["COMPLETED"] * (len(jobs) - 1) + ["CANCELLED"], f"batch statuses {statuses}")
+
+    health = call(f"{base}/health")
+    expect(health["jobs"]["CANCELLED"] == 1 and health["jobs"]["FAILED"] == 1, f"/health {health['jobs']}")
+    expect(health["lanes"]["normal"]["queue_wait"]["count"] == 8, f"/health lanes {health['lanes']}")
+
+    # Lanes: behind a running job, the preview goes first, then batch tenants take turns
+    lanes_handler = FakeHandler()
+    lanes_base = start_server(lanes_handler, concurrency=1)
+    call(f"{lanes_base}/run", {"input": {"value": "running"}})
+    time.sleep(0.1)
+    for value, job_input in (("batch-a1", {"quality_preset": "ultra", "tenant": "a"}),
+                             ("batch-a2", {"quality_preset": "ultra", "tenant": "a"}),
+                             ("batch-b1", {"priority": "batch", "tenant": "b"}),
+                             ("preview", {"quality_preset": "fast"})):
+        call(f"{lanes_base}/run", {"input": {**job_input, "value": value}})
+    call(f"{lanes_base}/runsync?wait=10000", {"input": {"priority": "batch", "tenant": "b", "value": "batch-b2"}})
+    expected = ["running", "preview", "batch-a1", "batch-b1", "batch-a2", "batch-b2"]
+    expect(lanes_handler.order == expected, f"lane order {lanes_handler.order}")
+    lanes = call(f"{lanes_base}/health")["lanes"]
+    print("Lane order: " + " -> ".join(map(str, lanes_handler.order)))
+    print("Queue wait p50: " + ", ".join(f"{lane} {stats['queue_wait'].get('p50', '-')}s"
+                                        for lane, stats in lanes.items()))
+
+    # POD_API_KEY: wrong or missing key -> 401, "Bearer <key>" or the bare key -> served
+    auth_base = start_server(FakeHandler(), api_key="secret")
+    for headers in ({}, {"Authorization": "Bearer wrong"}, {"Authorization": "Bearer secret-and-more"}):
+        try:
+            call(f"{auth_base}/health", headers=headers)
+            expect(False, f"unauthorized request served: {headers}")
+        except urllib.error.HTTPError as e:
+            expect(e.code == 401, f"unauthorized request {headers}: HTTP {e.code}")
+    for header in ("Bearer secret", "secret"):
+        expect("jobs" in call(f"{auth_base}/health", headers={"Authorization": header}), f"key {header!r} refused")
+    for host, api_key, allowed in (("127.0.0.1", "", True), ("localhost", "", True), ("::1", "", True),
+                                   ("0.0.0.0", "", False), ("10.0.0.5", "", False), ("0.0.0.0", "secret", True)):
+        try:
+            check_bind(host, api_key)
+            refused = False
+        except ValueError:
+            refused = True
+        expect(refused != allowed, f"bind {host} with key {api_key!r}: refused={refused}")
+    print("Auth: wrong / missing key -> 401; no key only on loopback")
+
+    print(f"{len(jobs) - 1} jobs at concurrency {CONCURRENCY} in {elapsed:.1f}s "
+          f"(max {handler.max_active} running), stream: {' -> '.join(lines)}")
+    for failure in failures:
+        print(f"FAIL {failure}")
+    if failures:
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+Check that repeated keyframe images (loop-back, bookends) share one
+download, one upload and one preprocess chain (Mode 3).
+
+1. Graphs (pure Python): with keyframes a, b, a, build_multiframe_workflow
+   and build_multiframe_chained_workflow emit exactly one LoadImage ->
+   ImageResizeKJv2 -> LTXVPreprocess chain per image name (one LoadImage
+   -> LTXVPreprocess with image_prenormalized), and every guide input
+   (LTXVAddGuide / LTXVAddGuideMulti) reads the chain of its own image.
+2. Handler (needs the handler's dependencies: runpod, requests, Pillow):
+   multi_keyframe_handler runs keyframes a, b, a, a' (a' is a copy of a
+   under another URL) against an in-process fake ComfyUI (fake_comfyui.py).
+   Each distinct URL is downloaded once (3 downloads), each distinct
+   content is uploaded once (2 uploads), the response reports
+   unique_images 2, and the submitted graph has 2 LoadImage nodes.
+
+Usage:
+    python test/check_keyframe_dedup.py
+"""
+import functools
+import os
+import shutil
+import sys
+import tempfile
+
+TEST_DIR = os.path.dirname(os.path.abspath(__file__))
+DOCKER_DIR = os.path.join(TEST_DIR, "..", "docker")
+sys.path.insert(0, os.path.join(DOCKER_DIR, "pod_files"))
+sys.path.insert(0, TEST_DIR)
+
+from workflow_builder import WorkflowBuilder
+
+COMMON = {"prompt_positive": "A person waves", "prompt_negative": "static", "seed": 42, "duration": 3.0}
+KEYFRAMES = [{"image_name": "a.png", "frame_position": "first", "strength": 1.0},
+             {"image_name": "b.png", "frame_position": 0.5, "strength": 0.8},
+             {"image_name": "a.png", "frame_position": "last", "strength": 1.0}]
+FAKE_OPTIONS = {"step_seconds": 0.01, "load_seconds": 0.05, "decode_seconds": 0.05}
+
+
+def source_image(workflow: dict, node_id: str):
+    """Follow image inputs from a node up to its LoadImage; returns (image name, classes on the way)."""
+    classes = []
+    while workflow[node_id]["class_type"] != "LoadImage":
+        classes.append(workflow[node_id]["class_type"])
+        node_id = workflow[node_id]["inputs"]["image"][0]
+    return workflow[node_id]["inputs"]["image"], classes
+
+
+def guide_sources(workflow: dict) -> list:
+    """Preprocess node of each keyframe guide, in guide order."""
+    sources = []
+    for node_id in sorted(workflow, key=int):
+        node = workflow[node_id]
+        if node["class_type"] == "LTXVAddGuide":
+            sources.append(node["inputs"]["image"][0])
+        elif node["class_type"] == "LTXVAddGuideMulti":
+            count = int(node["inputs"]["num_guides"])
+            sources += [node["inputs"][f"num_guides.image_{index}"][0] for index in range(1, count + 1)]
+    return sources
+
+
+def check_graphs(expect) -> None:
+    builder = WorkflowBuilder(*(os.path.join(DOCKER_DIR, name) for name in (
+        "workflow_ltx2_enhanced.json", "workflow_ltx2_audio_gen.json", "workflow_ltx2_multiframe.json")))
+    for name in ("build_multiframe_workflow", "build_multiframe_chained_workflow"):
+        for prenormalized in (False, True):
+            label = f"{name}{' (prenormalized)' if prenormalized else ''}"
+            workflow = getattr(builder, name)(KEYFRAMES, image_prenormalized=prenormalized, **COMMON)
+            classes = [node["class_type"] for node in workflow.values()]
+            loads = sorted(node["inputs"]["image"] for node in workflow.values()
+                           if node["class_type"] == "LoadImage")
+            expect(loads == ["a.png", "b.png"], f"{label}: LoadImage nodes for {loads}")
+            expect(classes.count("LTXVPreprocess") == 2, f"{label}: {classes.count('LTXVPreprocess')} preprocess")
+            expect(classes.count("ImageResizeKJv2") == (0 if prenormalized else 2),
+                   f"{label}: {classes.count('ImageResizeKJv2')} resizes")
+
+            sources = guide_sources(workflow)
+            images = []
+            for node_id in sources:
+                image, chain = source_image(workflow, node_id)
+                images.append(image)
+                expected_chain = ["LTXVPreprocess"] + ([] if prenormalized else ["ImageResizeKJv2"])
+                expect(chain == expected_chain, f"{label}: guide image chain {chain}")
+            expect(images[:3] == ["a.png", "b.png", "a.png"], f"{label}: guides read {images}")
+            shared = {node_id for node_id, image in zip(sources, images) if image == "a.png"}
+            expect(len(shared) == 1, f"{label}: guides of a.png read {len(shared)} preprocess nodes")
+    print("Graphs: one chain per image name, shared by every guide of that image")
+
+
+def check_handler(expect) -> None:
+    from fake_comfyui import start_fake_comfyui
+    from load_test import TEMPLATES, local_upload, serve_media, write_png
+    from url_downloader import URLDownloader
+
+    work = tempfile.mkdtemp(prefix="ltx2_keyframe_dedup_check_")
+    dirs = {name: os.path.join(work, name) for name in ("media", "output", "input", "workflows", "uploads")}
+    for path in dirs.values():
+        os.makedirs(path, exist_ok=True)
+    for name, template in TEMPLATES.items():
+        shutil.copyfile(os.path.join(DOCKER_DIR, template), os.path.join(dirs["workflows"], name))
+    write_png(os.path.join(dirs["media"], "a.png"), 768, 512)
+    write_png(os.path.join(dirs["media"], "b.png"), 512, 768)
+    shutil.copyfile(os.path.join(dirs["media"], "a.png"), os.path.join(dirs["media"], "a_copy.png"))
+    media_url = serve_media(dirs["media"])
+    server, url = start_fake_comfyui(output_dir=dirs["output"], input_dir=dirs["input"], **FAKE_OPTIONS)
+
+    os.environ.update({
+        "COMFYUI_HOST": "127.0.0.1",
+        "COMFYUI_BASE_PORT": url.rsplit(":", 1)[1],
+        "COMFYUI_INSTANCES": "1",
+        "COMFYUI_OUTPUT_DIRS": dirs["output"],
+        "COMFYUI_WORKFLOW_DIR": dirs["workflows"],
+        "JOB_JOURNAL_PATH": os.path.join(work, "job_journal.sqlite3"),
+        "LATENT_CACHE_DIR": os.path.join(work, "latents", "cache"),
+        "JOB_LATENT_DIR": os.path.join(work, "latents", "jobs"),
+    })
+    import rp_handler
+
+    downloads, uploads, submitted = [], [], []
+    download_image, upload_file, submit_workflow = (URLDownloader.download_image, rp_handler.upload_file_to_comfyui,
+                                                    rp_handler.submit_workflow)
+
+    def counting_download(image_url):
+        downloads.append(image_url)
+        return download_image(image_url)
+
+    def counting_upload(file_bytes, filename, *args, **kwargs):
+        uploads.append(filename)
+        return upload_file(file_bytes, filename, *args, **kwargs)
+
+    def capturing_submit(workflow, *args, **kwargs):
+        submitted.append(workflow)
+        return submit_workflow(workflow, *args, **kwargs)
+
+    URLDownloader.download_image = staticmethod(counting_download)
+    rp_handler.upload_file_to_comfyui = counting_upload
+    rp_handler.submit_workflow = capturing_submit
+    rp_handler.upload_video_to_gcs = functools.partial(local_upload, dirs["uploads"])
+    try:
+        if not rp_handler.wait_for_comfyui(timeout=30):
+            expect(False, "fake ComfyUI did not come up")
+            return
+        keyframes = [{"image_url": f"{media_url}/{name}", "frame_position": position}
+                     for name, position in (("a.png", "first"), ("b.png", 0.5), ("a.png", 0.75),
+                                            ("a_copy.png", "last"))]
+        result = rp_handler.multi_keyframe_handler({"id": "dedup", "input": {
+            "keyframes": keyframes, "duration": 3.0, "quality_preset": "fast", "seed": 7}})
+        if result.get("status") != "success":
+            expect(False, f"handler: {result.get('error')}")
+            return
+        output = result["output"]
+        loads = [node for node in submitted[-1].values() if node["class_type"] == "LoadImage"] if submitted else []
+        print(f"Handler: {len(keyframes)} keyframes, {len(downloads)} downloads, {len(uploads)} uploads, "
+              f"unique_images {output.get('unique_images')}, {len(loads)} LoadImage nodes")
+        expect(len(downloads) == 3, f"{len(downloads)} downloads for 3 distinct URLs: {downloads}")
+        expect(len(uploads) == 2, f"{len(uploads)} uploads for 2 distinct images: {uploads}")
+        expect(output.get("unique_images") == 2, f"unique_images {output.get('unique_images')}")
+        expect(len(loads) == 2, f"{len(loads)} LoadImage nodes in the submitted graph")
+    finally:
+        URLDownloader.download_image = staticmethod(download_image)
+        server.shutdown()
+        shutil.rmtree(work, ignore_errors=True)
+
+
+def main():
+    failures = []
+
+    def expect(condition, message):
+        if not condition:
+            failures.append(message)
+
+    check_graphs(expect)
+    try:
+        import PIL  # noqa: F401
+        import requests  # noqa: F401
+        import runpod  # noqa: F401
+    except ImportError as e:
+        print(f"Handler: skipped ({e.name} not installed)")
+    else:
+        check_handler(expect)
+
+    for failure in failures:
+        print(f"FAIL {failure}")
+    if failures:
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
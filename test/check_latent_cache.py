@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Check latent cache leases (latent_cache.py) against eviction.
+
+  - a hit pinned by a job survives eviction even as the least recently
+    used entry; unpinned entries go first
+  - after release the entry is evictable again
+  - a lease older than lease_seconds no longer protects its entry
+  - pinning a missing entry is a miss and leaves no lease
+
+Entries are written as plain files of known size (no torch needed).
+
+Usage:
+    python test/check_latent_cache.py
+"""
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "docker", "pod_files"))
+
+from latent_cache import LEASE_DIR_NAME, LatentCache
+
+ENTRY_BYTES = 1000
+
+
+def write_entry(cache: LatentCache, key: str, age: float) -> None:
+    os.makedirs(cache.cache_dir, exist_ok=True)
+    path = cache.path(key)
+    with open(path, "wb") as f:
+        f.write(b"\0" * ENTRY_BYTES)
+    mtime = time.time() - age
+    os.utime(path, (mtime, mtime))
+
+
+def main():
+    failures = []
+
+    def expect(condition, message):
+        if not condition:
+            failures.append(message)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = LatentCache(tmp, max_bytes=2 * ENTRY_BYTES, lease_seconds=60)
+        for key, age in (("image_a", 300), ("image_b", 200), ("audio_c", 100)):
+            write_entry(cache, key, age)
+
+        # Job 1 finds image_a (oldest); a concurrent save pushes the cache over budget
+        expect(cache.pin("image_a", "job-1"), "pin of a present entry was a miss")
+        write_entry(cache, "audio_d", 0)
+        removed = cache.evict()
+        expect(os.path.exists(cache.path("image_a")), "leased entry evicted")
+        expect(removed == 2 and not os.path.exists(cache.path("image_b"))
+               and not os.path.exists(cache.path("audio_c")),
+               f"unleased LRU entries not evicted first (removed {removed})")
+        print("Lease: pinned LRU entry kept, unpinned entries evicted")
+
+        # Released: the oldest entry goes on the next eviction
+        expect(cache.release("job-1") == 1, "release did not drop the lease")
+        write_entry(cache, "audio_g", 0)
+        cache.evict()
+        expect(not os.path.exists(cache.path("image_a")), "released entry not evicted")
+
+        # Expired lease (job died without releasing)
+        write_entry(cache, "image_e", 500)
+        expect(cache.pin("image_e", "job-2"), "pin of image_e was a miss")
+        os.utime(cache.path("image_e"), (time.time() - 500,) * 2)
+        lease = os.path.join(tmp, LEASE_DIR_NAME, "image_e.job-2")
+        os.utime(lease, (time.time() - 120,) * 2)
+        write_entry(cache, "image_f", 0)
+        cache.evict()
+        expect(not os.path.exists(cache.path("image_e")), "expired lease still protects its entry")
+        expect(not os.path.exists(lease), "expired lease file left behind")
+        print("Release / expiry: entry evictable again")
+
+        # Miss: no lease created
+        expect(not cache.pin("image_missing", "job-3"), "pin of a missing entry was a hit")
+        expect(cache.release("job-3") == 0, "lease created for a missing entry")
+
+    for failure in failures:
+        print(f"FAIL {failure}")
+    if failures:
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
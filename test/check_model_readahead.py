@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+Check model readahead (model_readahead.py) with temporary model files.
+
+1. Templates: collect_template_models lists the model files of the
+   templates in template order, first use first, without duplicates,
+   non-model inputs, links or missing templates.
+2. Budget: readahead reads the files in that order until the memory
+   budget (explicit, or 80% of MemAvailable by default) is used up; later
+   files are skipped_memory_budget, missing files and a symlink to an
+   already listed file are reported as such.
+3. Report: every read file has bytes_read == size_bytes, seconds,
+   mb_per_s and finished_at, and files finish in model order with one
+   worker. The warm-up fields follow a fake ComfyUI (fake_comfyui.py)
+   /system_stats: answering only after the reads finish gives a positive
+   warmup_lead_seconds with every file warmed before ready; answering
+   from the start while the reads are slowed down gives a negative lead
+   with nothing warmed before ready (needs requests).
+
+Usage:
+    python test/check_model_readahead.py
+"""
+import json
+import os
+import socket
+import sys
+import tempfile
+import threading
+import time
+
+TEST_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(TEST_DIR, "..", "docker", "pod_files"))
+sys.path.insert(0, TEST_DIR)
+
+import model_readahead
+from model_readahead import collect_template_models, readahead
+
+MB = 1024 * 1024
+# (folder, filename, size): read in this order; the budget below covers the first two
+MODEL_FILES = [("checkpoints", "ltx.safetensors", 3 * MB), ("loras", "detailer.safetensors", 2 * MB),
+               ("text_encoders", "gemma.safetensors", 4 * MB)]
+BUDGET = 6 * MB
+
+
+def write_templates(root: str) -> list:
+    """Two templates sharing a LoRA, plus a path that does not exist."""
+    templates = {
+        "mode1.json": {
+            "1": {"class_type": "CheckpointLoaderSimple", "inputs": {"ckpt_name": "ltx.safetensors"}},
+            "2": {"class_type": "LoraLoaderModelOnly",
+                  "inputs": {"lora_name": "detailer.safetensors", "model": ["1", 0], "strength_model": 1.0}},
+            "3": {"class_type": "CLIPTextEncode", "inputs": {"text": "ckpt_name", "clip": ["4", 0]}},
+        },
+        "mode2.json": {
+            "4": {"class_type": "LTXAVTextEncoderLoader",
+                  "inputs": {"text_encoder": "gemma.safetensors", "ckpt_name": "ltx.safetensors"}},
+            "5": {"class_type": "LoraLoaderModelOnly", "inputs": {"lora_name": ["9", 0], "model": ["1", 0]}},
+            "6": {"class_type": "LoraLoaderModelOnly", "inputs": {"lora_name": "detailer.safetensors"}},
+        },
+    }
+    paths = []
+    for name, workflow in templates.items():
+        path = os.path.join(root, name)
+        with open(path, "w") as f:
+            json.dump(workflow, f)
+        paths.append(path)
+    return [paths[0], os.path.join(root, "missing.json"), paths[1]]
+
+
+def write_models(models_dir: str) -> None:
+    for folder, filename, size in MODEL_FILES:
+        os.makedirs(os.path.join(models_dir, folder), exist_ok=True)
+        with open(os.path.join(models_dir, folder, filename), "wb") as f:
+            f.write(os.urandom(size))
+    os.symlink(os.path.join(models_dir, "checkpoints", "ltx.safetensors"),
+               os.path.join(models_dir, "checkpoints", "ltx_alias.safetensors"))
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def check_report(expect, label: str, report: dict) -> None:
+    files = {item["filename"]: item for item in report["files"]}
+    statuses = {name: item["status"] for name, item in files.items()}
+    expect(statuses == {"ltx.safetensors": "done", "detailer.safetensors": "done",
+                        "gemma.safetensors": "skipped_memory_budget", "ltx_alias.safetensors": "duplicate",
+                        "absent.safetensors": "missing"}, f"{label}: statuses {statuses}")
+    done = [item for item in report["files"] if item["status"] == "done"]
+    for item in done:
+        expect(item["bytes_read"] == item["size_bytes"],
+               f"{label}: {item['filename']} read {item['bytes_read']} of {item['size_bytes']} bytes")
+        expect(item["seconds"] >= 0 and item["mb_per_s"] > 0 and 0 <= item["finished_at"] <= report["wall_seconds"],
+               f"{label}: {item['filename']} timing {item}")
+    expect([item["filename"] for item in sorted(done, key=lambda item: item["finished_at"])]
+           == ["ltx.safetensors", "detailer.safetensors"], f"{label}: finish order {done}")
+    expect(report["total_bytes"] == 5 * MB, f"{label}: total_bytes {report['total_bytes']}")
+
+
+def check_warmup(expect, models: list, models_dir: str) -> None:
+    from fake_comfyui import start_fake_comfyui
+
+    # ComfyUI answers only after the reads are done: every file warmed before ready
+    port = free_port()
+    servers = []
+    timer = threading.Timer(1.5, lambda: servers.append(start_fake_comfyui(port=port)[0]))
+    timer.start()
+    try:
+        report = readahead(models, models_dir=models_dir, workers=1, max_bytes=BUDGET,
+                           comfyui_url=f"http://127.0.0.1:{port}")
+    finally:
+        timer.join()
+        for server in servers:
+            server.shutdown()
+    print(f"Late ComfyUI: ready after {report['comfyui_ready_after']}s, lead {report['warmup_lead_seconds']}s, "
+          f"{report['files_warmed_before_ready']} files / {report['bytes_warmed_before_ready']} bytes warmed")
+    expect(report["comfyui_ready_after"] is not None and report["warmup_lead_seconds"] > 0,
+           f"late ComfyUI: ready after {report['comfyui_ready_after']}, lead {report['warmup_lead_seconds']}")
+    expect(report["files_warmed_before_ready"] == 2 and report["bytes_warmed_before_ready"] == 5 * MB,
+           f"late ComfyUI: {report['files_warmed_before_ready']} files / "
+           f"{report['bytes_warmed_before_ready']} bytes warmed before ready")
+
+    # ComfyUI answers at once while the disk is slow: nothing warmed before ready
+    server, url = start_fake_comfyui()
+    read_segment = model_readahead._read_segment
+
+    def slow_read_segment(*args):
+        time.sleep(0.3)
+        read_segment(*args)
+
+    model_readahead._read_segment = slow_read_segment
+    try:
+        report = readahead(models, models_dir=models_dir, workers=1, max_bytes=BUDGET, comfyui_url=url)
+    finally:
+        model_readahead._read_segment = read_segment
+        server.shutdown()
+    print(f"Early ComfyUI: ready after {report['comfyui_ready_after']}s, lead {report['warmup_lead_seconds']}s, "
+          f"{report['files_warmed_before_ready']} files warmed")
+    expect(report["warmup_lead_seconds"] is not None and report["warmup_lead_seconds"] < 0,
+           f"early ComfyUI: lead {report['warmup_lead_seconds']}")
+    expect(report["files_warmed_before_ready"] == 0 and report["bytes_warmed_before_ready"] == 0,
+           f"early ComfyUI: {report['files_warmed_before_ready']} files warmed before ready")
+
+
+def main():
+    failures = []
+
+    def expect(condition, message):
+        if not condition:
+            failures.append(message)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        models = collect_template_models(write_templates(tmp))
+        listed = [(model["folder"], model["filename"]) for model in models]
+        print(f"Templates: {listed}")
+        expect(listed == [(folder, filename) for folder, filename, _ in MODEL_FILES], f"template models {listed}")
+
+        models_dir = os.path.join(tmp, "models")
+        write_models(models_dir)
+        models += [{"folder": "checkpoints", "filename": "ltx_alias.safetensors"},
+                   {"folder": "loras", "filename": "absent.safetensors"}]
+        # Small segments so each file is read in several pieces
+        model_readahead.SEGMENT_SIZE = MB
+
+        report = readahead(models, models_dir=models_dir, workers=1, max_bytes=BUDGET, comfyui_url=None)
+        check_report(expect, "explicit budget", report)
+        expect(report["comfyui_ready_after"] is None and report["warmup_lead_seconds"] is None
+               and report["files_warmed_before_ready"] is None, f"no ComfyUI: warm-up fields {report}")
+        for item in report["files"]:
+            print(f"  {item['folder']}/{item['filename']}: {item['status']}"
+                  + (f", {item['mb_per_s']} MB/s, finished at {item['finished_at']}s" if "mb_per_s" in item else ""))
+
+        available_memory = model_readahead._available_memory_bytes
+        model_readahead._available_memory_bytes = lambda: int(BUDGET / 0.8)
+        try:
+            report = readahead(models, models_dir=models_dir, workers=1, comfyui_url=None)
+        finally:
+            model_readahead._available_memory_bytes = available_memory
+        check_report(expect, "MemAvailable budget", report)
+
+        if model_readahead.requests is None:
+            print("Warm-up: skipped (requests not installed)")
+        else:
+            check_warmup(expect, models, models_dir)
+
+    for failure in failures:
+        print(f"FAIL {failure}")
+    if failures:
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
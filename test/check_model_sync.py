@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+Check the model sync engine (model_sync.py) with fake local sources.
+
+  - resume: after a failed chunk, the next sync restarts from the .part
+    sidecar and only copies the missing chunk
+  - checksum: a source manifest sha256 mismatch fails the file and leaves
+    nothing behind; a changed mirror file is copied again
+  - copy (default, no eviction): a file that does not fit fails and no
+    other file is deleted
+  - mirror (--evict): least recently used mirror files are evicted, never
+    files the manifest names outside the mirror directory
+  - fetch / copy: a file copied (twice) into a model folder is verified
+    by size and leaves no mirror manifest next to it
+
+Free space is simulated per test with a disk budget instead of the real
+disk.
+
+Usage:
+    python test/check_model_sync.py
+"""
+import hashlib
+import json
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "docker", "pod_files"))
+
+import model_sync
+from model_sync import ModelSync, SOURCE_MANIFEST_NAME
+
+CHUNK = 64 * 1024
+
+
+def write_source(root: str, rel_path: str, size: int) -> bytes:
+    data = hashlib.sha256(rel_path.encode()).digest() * (size // 32 + 1)
+    data = data[:size]
+    path = os.path.join(root, rel_path)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(data)
+    return data
+
+
+def read(path: str) -> bytes:
+    with open(path, "rb") as f:
+        return f.read()
+
+
+class DiskBudget:
+    """shutil.disk_usage stand-in: a disk of capacity bytes holding the files under root."""
+
+    def __init__(self, root: str, capacity: int):
+        self.root = root
+        self.capacity = capacity
+
+    def __call__(self, path):
+        used = sum(os.path.getsize(os.path.join(dirpath, name))
+                   for dirpath, _, names in os.walk(self.root) for name in names)
+        return model_sync.shutil._ntuple_diskusage(self.capacity, used, self.capacity - used)
+
+
+def main():
+    failures = []
+
+    def expect(condition, message):
+        if not condition:
+            failures.append(message)
+
+    real_disk_usage = model_sync.shutil.disk_usage
+    with tempfile.TemporaryDirectory() as tmp:
+        source = os.path.join(tmp, "volume")
+        mirror = os.path.join(tmp, "mirror")
+
+        # Resume: fail the 4th chunk (the others finish), then sync again
+        data = write_source(source, "checkpoints/model.safetensors", 10 * CHUNK + 123)
+        engine = ModelSync(mirror, workers=1, chunk_size=CHUNK)
+        copied_chunks = []
+        real_copy_range = model_sync._LocalSource.copy_range
+
+        def flaky_copy_range(self, dst_fd, offset, length):
+            if offset == 3 * CHUNK and not copied_chunks.count("failed"):
+                copied_chunks.append("failed")
+                raise IOError("simulated network volume hiccup")
+            copied_chunks.append(offset // CHUNK)
+            return real_copy_range(self, dst_fd, offset, length)
+
+        model_sync._LocalSource.copy_range = flaky_copy_range
+        try:
+            try:
+                engine.sync_file(os.path.join(source, "checkpoints/model.safetensors"), "checkpoints/model.safetensors")
+                expect(False, "interrupted copy did not raise")
+            except IOError:
+                pass
+            expect(os.path.exists(os.path.join(mirror, "checkpoints/model.safetensors.part.json")),
+                   "no resume sidecar after the interrupted copy")
+            copied_chunks.clear()
+            copied_chunks.append("failed")
+            result = ModelSync(mirror, workers=1, chunk_size=CHUNK).sync_file(
+                os.path.join(source, "checkpoints/model.safetensors"), "checkpoints/model.safetensors")
+        finally:
+            model_sync._LocalSource.copy_range = real_copy_range
+        recopied = [chunk for chunk in copied_chunks if chunk != "failed"]
+        expect(result["status"] == "resumed", f"second sync: {result['status']}")
+        expect(recopied == [3], f"resumed copy re-read chunks {recopied}, expected only the failed one")
+        expect(read(os.path.join(mirror, "checkpoints/model.safetensors")) == data, "resumed file differs")
+        expect(not os.path.exists(os.path.join(mirror, "checkpoints/model.safetensors.part.json")),
+               "resume sidecar left behind")
+        print(f"Resume: {11 - len(recopied)} of 11 chunks kept, {len(recopied)} copied after the interruption")
+
+        # Checksum: source manifest with a wrong sha256, then the right one
+        lora = write_source(source, "loras/detailer.safetensors", 3 * CHUNK)
+        manifest = {"files": {"loras/detailer.safetensors": {"size": len(lora), "sha256": "0" * 64}}}
+        with open(os.path.join(source, SOURCE_MANIFEST_NAME), "w") as f:
+            json.dump(manifest, f)
+        report = ModelSync(mirror, chunk_size=CHUNK).sync(source, ["loras/detailer.safetensors"])
+        expect(report["failures"] == 1 and "sha256" in report["files"][0].get("error", ""),
+               f"sha256 mismatch not reported: {report}")
+        expect(not [name for name in os.listdir(os.path.join(mirror, "loras"))],
+               "files left behind by the failed copy")
+        manifest["files"]["loras/detailer.safetensors"]["sha256"] = hashlib.sha256(lora).hexdigest()
+        with open(os.path.join(source, SOURCE_MANIFEST_NAME), "w") as f:
+            json.dump(manifest, f)
+        report = ModelSync(mirror, chunk_size=CHUNK).sync(source, ["loras/detailer.safetensors"])
+        expect(report["files"][0]["status"] == "copied", f"verified copy: {report}")
+        report = ModelSync(mirror, chunk_size=CHUNK).sync(source, ["loras/detailer.safetensors"])
+        expect(report["files"][0]["status"] == "current", f"unchanged file: {report}")
+        mirrored = os.path.join(mirror, "loras/detailer.safetensors")
+        with open(mirrored, "r+b") as f:
+            f.write(b"corrupt")
+        os.utime(mirrored, (1, 1))
+        report = ModelSync(mirror, chunk_size=CHUNK).sync(source, ["loras/detailer.safetensors"])
+        expect(report["files"][0]["status"] in ("copied", "adopted") and read(mirrored) == lora,
+               f"changed mirror file not restored: {report}")
+        print("Checksum: mismatch rejected, changed mirror file restored")
+
+        # Copy (no eviction): the big file does not fit, nothing is deleted
+        big = write_source(source, "text_encoders/gemma.safetensors", 20 * CHUNK)
+        outside = os.path.join(tmp, "outside.safetensors")
+        with open(outside, "wb") as f:
+            f.write(b"x" * CHUNK)
+        before = sorted(os.listdir(os.path.join(mirror, "checkpoints")) + os.listdir(os.path.join(mirror, "loras")))
+        model_sync.shutil.disk_usage = DiskBudget(mirror, capacity=24 * CHUNK)
+        try:
+            try:
+                ModelSync(mirror, chunk_size=CHUNK).sync_file(
+                    os.path.join(source, "text_encoders/gemma.safetensors"), "text_encoders/gemma.safetensors")
+                expect(False, "copy that does not fit succeeded")
+            except OSError:
+                pass
+            after = sorted(os.listdir(os.path.join(mirror, "checkpoints")) + os.listdir(os.path.join(mirror, "loras")))
+            expect(before == after, f"copy without eviction deleted files: {before} -> {after}")
+
+            # Mirror (evict): a manifest entry pointing outside the mirror must survive
+            engine = ModelSync(mirror, chunk_size=CHUNK, evict=True)
+            engine.manifest["files"]["../outside.safetensors"] = {"size": CHUNK, "last_used": 0}
+            engine.manifest["files"]["loras/detailer.safetensors"]["last_used"] = 1
+            engine.manifest["files"]["checkpoints/model.safetensors"]["last_used"] = 2
+            result = engine.sync_file(os.path.join(source, "text_encoders/gemma.safetensors"),
+                                      "text_encoders/gemma.safetensors")
+        finally:
+            model_sync.shutil.disk_usage = real_disk_usage
+        expect(result["status"] == "copied" and read(os.path.join(mirror, "text_encoders/gemma.safetensors")) == big,
+               f"mirror copy: {result}")
+        expect(os.path.exists(outside), "eviction deleted a file outside the mirror directory")
+        expect(not os.path.exists(mirrored), "least recently used mirror file not evicted")
+        expect(not os.path.exists(os.path.join(mirror, "checkpoints/model.safetensors")),
+               "second least recently used mirror file not evicted")
+        print("Eviction: copy mode deleted nothing; mirror mode evicted LRU files inside the mirror only")
+
+        # fetch / copy into a model folder: size-verified, no mirror manifest left in the folder
+        loras = os.path.join(tmp, "models", "loras")
+        hashed = []
+        real_file_sha256, real_argv = model_sync.file_sha256, sys.argv
+        model_sync.file_sha256 = lambda path: hashed.append(path) or real_file_sha256(path)
+        try:
+            codes = []
+            for _ in range(2):
+                sys.argv = ["model_sync.py", "copy", os.path.join(source, "loras/detailer.safetensors"), loras]
+                codes.append(model_sync.main())
+        finally:
+            model_sync.file_sha256, sys.argv = real_file_sha256, real_argv
+        expect(codes == [0, 0] and read(os.path.join(loras, "detailer.safetensors")) == lora, f"copy: exit {codes}")
+        expect(sorted(os.listdir(loras)) == ["detailer.safetensors"], f"copy left {sorted(os.listdir(loras))}")
+        expect(not hashed, f"copy hashed {hashed} without --verify hash")
+        print("Copy: model folder holds only the file, verified by size")
+
+    for failure in failures:
+        print(f"FAIL {failure}")
+    if failures:
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+Check refine / re-dub (refine_from_job_id): the partial-denoise graph and
+the handler around it.
+
+1. Graphs (pure Python): build_refine_workflow feeds the sampler's video
+   latent (LTXVConcatAVLatent) from LTX2JobLatentLoad instead of
+   EmptyLTXVLatentVideo / LTXVImgToVideoInplace, and BasicScheduler runs
+   the requested steps and denoise. Without new audio the persisted audio
+   latent is kept (fixed) and decoded for the output; with new audio it
+   is loaded and re-encoded (LoadAudio -> LTXVAudioVAEEncode) and nothing
+   is read from the persisted audio latent.
+2. Handler (needs the handler's dependencies: runpod, requests, Pillow):
+   refine_handler runs against an in-process fake ComfyUI (fake_comfyui.py)
+   and a persisted source job written to a temporary JOB_LATENT_DIR. It
+   rejects a request without refine_from_job_id and new audio longer than
+   the source video plus one frame (half a frame over is a re-dub); a
+   refine reports the requested denoise / steps (and submits them), and
+   gpu_seconds_saved is the source's GPU time scaled to the preset's
+   steps, less this job's gpu_seconds.
+
+Usage:
+    python test/check_refine.py
+"""
+import functools
+import os
+import shutil
+import sys
+import tempfile
+
+TEST_DIR = os.path.dirname(os.path.abspath(__file__))
+DOCKER_DIR = os.path.join(TEST_DIR, "..", "docker")
+sys.path.insert(0, os.path.join(DOCKER_DIR, "pod_files"))
+sys.path.insert(0, TEST_DIR)
+
+from workflow_builder import WorkflowBuilder
+
+COMMON = {"job_latent_key": "job_source", "num_frames": 97, "prompt_positive": "A person speaking",
+          "prompt_negative": "static", "seed": 42, "fps": 24, "steps": 3, "denoise": 0.35}
+# Persisted source job: 97 frames at 24 fps (4.04 s), 16 steps in 30 GPU seconds
+SOURCE = {"mode": "lipsync", "width": 768, "height": 512, "fps": 24, "num_frames": 97, "audio_duration": 3.0,
+          "seed": 42, "prompt_positive": "A person speaking", "prompt_negative": "static",
+          "quality_preset": "high", "steps": 16, "img_strength": 1.0, "gpu_seconds": 30.0}
+FAKE_OPTIONS = {"step_seconds": 0.02, "load_seconds": 0.05, "decode_seconds": 0.05}
+
+
+def check_graphs(expect) -> None:
+    builder = WorkflowBuilder(*(os.path.join(DOCKER_DIR, name) for name in (
+        "workflow_ltx2_enhanced.json", "workflow_ltx2_audio_gen.json", "workflow_ltx2_multiframe.json")))
+    load_id, decode_id = builder.JOB_LATENT_LOAD_NODE_ID, builder.AUDIO_DECODE_NODE_ID
+    graphs = {
+        "refine": builder.build_refine_workflow(**COMMON),
+        "redub": builder.build_refine_workflow(audio_name="new.flac", audio_duration=3.0, **COMMON),
+    }
+    for name, workflow in graphs.items():
+        classes = {node["class_type"] for node in workflow.values()}
+        expect(workflow.get(load_id, {}).get("class_type") == "LTX2JobLatentLoad"
+               and workflow[load_id]["inputs"]["cache_key"] == COMMON["job_latent_key"],
+               f"{name}: no LTX2JobLatentLoad of the source key")
+        expect(workflow["166"]["inputs"]["video_latent"] == [load_id, 0],
+               f"{name}: video latent from {workflow['166']['inputs']['video_latent']}")
+        expect(not classes & {"EmptyLTXVLatentVideo", "LTXVImgToVideoInplace"},
+               f"{name}: fresh video latent nodes left: {classes & {'EmptyLTXVLatentVideo', 'LTXVImgToVideoInplace'}}")
+        scheduler = workflow["238"]["inputs"]
+        expect(scheduler["steps"] == COMMON["steps"] and scheduler["denoise"] == COMMON["denoise"],
+               f"{name}: scheduler steps {scheduler['steps']}, denoise {scheduler['denoise']}")
+
+    refine, redub = graphs["refine"], graphs["redub"]
+    expect(refine["248"]["inputs"]["samples"] == [load_id, 1], "refine: audio latent not the persisted one")
+    expect(refine["190"]["inputs"]["audio"] == [decode_id, 0], "refine: output audio not the decoded persisted latent")
+    expect(not any(node["class_type"] in ("LoadAudio", "LTXVAudioVAEEncode") for node in refine.values()),
+           "refine: audio re-encoded without new audio")
+
+    encodes = [node for node in redub.values() if node["class_type"] == "LTXVAudioVAEEncode"]
+    loads = [node["inputs"]["audio"] for node in redub.values() if node["class_type"] == "LoadAudio"]
+    expect(len(encodes) == 1 and loads == ["new.flac"], f"redub: {len(encodes)} audio encodes, loads {loads}")
+    expect(decode_id not in redub, "redub: persisted audio latent still decoded")
+    expect(not any(value == [load_id, 1] for node in redub.values() for value in node["inputs"].values()),
+           "redub: persisted audio latent still read")
+    print("Graphs: job latent replaces the fresh video latent; re-dub re-encodes the new audio")
+
+
+def check_handler(expect) -> None:
+    from fake_comfyui import start_fake_comfyui
+    from latent_cache import LatentCache, job_latent_key
+    from load_test import TEMPLATES, local_upload, serve_media, write_wav
+
+    work = tempfile.mkdtemp(prefix="ltx2_refine_check_")
+    dirs = {name: os.path.join(work, name) for name in ("media", "output", "input", "workflows", "uploads")}
+    for path in dirs.values():
+        os.makedirs(path, exist_ok=True)
+    for name, template in TEMPLATES.items():
+        shutil.copyfile(os.path.join(DOCKER_DIR, template), os.path.join(dirs["workflows"], name))
+    write_wav(os.path.join(dirs["media"], "long.wav"), 6)
+    video_seconds = SOURCE["num_frames"] / SOURCE["fps"]
+    write_wav(os.path.join(dirs["media"], "edge.wav"), video_seconds + 0.5 / SOURCE["fps"])
+    media_url = serve_media(dirs["media"])
+    server, url = start_fake_comfyui(output_dir=dirs["output"], input_dir=dirs["input"], **FAKE_OPTIONS)
+
+    os.environ.update({
+        "COMFYUI_HOST": "127.0.0.1",
+        "COMFYUI_BASE_PORT": url.rsplit(":", 1)[1],
+        "COMFYUI_INSTANCES": "1",
+        "COMFYUI_OUTPUT_DIRS": dirs["output"],
+        "COMFYUI_WORKFLOW_DIR": dirs["workflows"],
+        "JOB_JOURNAL_PATH": os.path.join(work, "job_journal.sqlite3"),
+        "LATENT_CACHE_DIR": os.path.join(work, "latents", "cache"),
+        "JOB_LATENT_DIR": os.path.join(work, "latents", "jobs"),
+    })
+    import rp_handler
+
+    # The persisted source job: latents (content unused by the fake) and their metadata
+    job_latents = LatentCache(rp_handler.JOB_LATENT_DIR)
+    os.makedirs(job_latents.cache_dir, exist_ok=True)
+    with open(job_latents.path(job_latent_key("source-job")), "wb") as f:
+        f.write(b"\0" * 1000)
+    job_latents.save_metadata(job_latent_key("source-job"), SOURCE)
+
+    submitted = []
+    submit_workflow = rp_handler.submit_workflow
+
+    def capturing_submit(workflow, *args, **kwargs):
+        submitted.append(workflow)
+        return submit_workflow(workflow, *args, **kwargs)
+
+    rp_handler.submit_workflow = capturing_submit
+    rp_handler.upload_video_to_gcs = functools.partial(local_upload, dirs["uploads"])
+    try:
+        if not rp_handler.wait_for_comfyui(timeout=30):
+            expect(False, "fake ComfyUI did not come up")
+            return
+
+        missing = rp_handler.refine_handler({"id": "missing", "input": {"refine_denoise": 0.3}})
+        expect(missing.get("status") == "error" and "refine_from_job_id" in missing.get("error", ""),
+               f"missing refine_from_job_id: {missing}")
+
+        long_audio = rp_handler.refine_handler({"id": "long", "input": {
+            "refine_from_job_id": "source-job", "audio_url": f"{media_url}/long.wav"}})
+        expect(long_audio.get("status") == "error" and "longer than the source video" in long_audio.get("error", ""),
+               f"6 s audio on a 4.04 s source: {long_audio.get('status')} {long_audio.get('error')}")
+        edge_audio = rp_handler.refine_handler({"id": "edge", "input": {
+            "refine_from_job_id": "source-job", "audio_url": f"{media_url}/edge.wav"}})
+        expect(edge_audio.get("status") == "success" and edge_audio["output"]["mode"] == "redub",
+               f"audio half a frame over the source: {edge_audio.get('status')} {edge_audio.get('error')}")
+        print(f"Rejected: missing source ({missing.get('error')}); long audio ({long_audio.get('error')})")
+
+        result = rp_handler.refine_handler({"id": "refine", "input": {
+            "refine_from_job_id": "source-job", "refine_denoise": 0.3, "steps": 3, "quality_preset": "high"}})
+        if result.get("status") != "success":
+            expect(False, f"refine: {result.get('error')}")
+            return
+        output = result["output"]
+        expect(output["denoise"] == 0.3 and output["steps"] == 3,
+               f"refine reports denoise {output['denoise']}, steps {output['steps']}")
+        scheduler = submitted[-1]["238"]["inputs"]
+        expect(scheduler["denoise"] == 0.3 and scheduler["steps"] == 3, f"submitted scheduler {scheduler}")
+
+        preset_steps = rp_handler.QUALITY_PRESETS["high"]["steps"]
+        estimated = round(SOURCE["gpu_seconds"] * preset_steps / SOURCE["steps"], 1)
+        saved = round(max(0.0, estimated - output["gpu_seconds"]), 1)
+        expect(output["estimated_full_gpu_seconds"] == estimated,
+               f"estimated_full_gpu_seconds {output['estimated_full_gpu_seconds']}, expected {estimated}")
+        expect(output["gpu_seconds_saved"] == saved, f"gpu_seconds_saved {output['gpu_seconds_saved']}, "
+                                                     f"expected {saved} ({estimated} - {output['gpu_seconds']})")
+        print(f"Refine: denoise {output['denoise']}, {output['steps']} steps; GPU {output['gpu_seconds']}s of an "
+              f"estimated {estimated}s full run, {output['gpu_seconds_saved']}s saved")
+    finally:
+        server.shutdown()
+        shutil.rmtree(work, ignore_errors=True)
+
+
+def main():
+    failures = []
+
+    def expect(condition, message):
+        if not condition:
+            failures.append(message)
+
+    check_graphs(expect)
+    try:
+        import PIL  # noqa: F401
+        import requests  # noqa: F401
+        import runpod  # noqa: F401
+    except ImportError as e:
+        print(f"Handler: skipped ({e.name} not installed)")
+    else:
+        check_handler(expect)
+
+    for failure in failures:
+        print(f"FAIL {failure}")
+    if failures:
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Check resolution bucketing (WorkflowBuilder.snap_resolution and
+rp_handler.plan_resolution).
+
+1. Buckets (pure Python): every bucket is divisible by 32, each tier's
+   areas stay within 15% of its 16:9 bucket, and snap_resolution picks
+   the hand-picked bucket for landscape, portrait and square sources in
+   each tier and with tier None (closest area); an unknown tier raises
+   ValueError.
+2. Requests (needs the handler's dependencies: runpod, requests, Pillow):
+   without width and height the image's aspect ratio picks a 720p bucket
+   (a portrait image gets a portrait frame); an explicit width or height
+   is used as given unless resolution_tier is also set; with a tier the
+   image's aspect ratio picks the bucket; "auto" takes the tier from
+   width x height; exact_resolution turns snapping off, with or without
+   a tier; an unknown tier is a ValueError.
+
+Usage:
+    python test/check_resolution_buckets.py
+"""
+import io
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "docker", "pod_files"))
+
+from workflow_builder import WorkflowBuilder
+
+DOCKER_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "docker")
+
+# (aspect ratio, requested size, tier) -> bucket
+SNAP_CASES = [
+    ((16 / 9, (1280, 736), "720p"), (1280, 736)),
+    ((9 / 16, (1280, 736), "720p"), (736, 1280)),
+    ((4 / 3, (1280, 736), "480p"), (736, 544)),
+    ((1.0, (1280, 736), "1080p"), (1440, 1440)),
+    ((2.4, (1920, 1080), None), (2208, 928)),
+    ((1.0, (640, 640), None), (640, 640)),
+    ((3 / 2, (1000, 700), None), (1184, 768)),
+]
+
+
+def check_buckets(builder: WorkflowBuilder, expect) -> None:
+    for tier, sizes in builder.RESOLUTION_BUCKETS.items():
+        reference = sizes[3][0] * sizes[3][1]
+        for width, height in sizes:
+            expect(width % 32 == 0 and height % 32 == 0, f"{tier} bucket {width}x{height} not divisible by 32")
+            expect(abs(width * height / reference - 1) <= 0.15,
+                   f"{tier} bucket {width}x{height} area off the tier by more than 15%")
+
+    for (aspect_ratio, (width, height), tier), expected in SNAP_CASES:
+        bucket = builder.snap_resolution(aspect_ratio, width, height, tier=tier)
+        actual = (bucket["width"], bucket["height"])
+        expect(actual == expected, f"snap {aspect_ratio:.3f} {width}x{height} tier {tier}: {actual}, "
+                                   f"expected {expected}")
+
+    for tier in ("4k", "720", "auto"):
+        try:
+            builder.snap_resolution(1.0, tier=tier)
+            expect(False, f"snap_resolution accepted tier {tier!r}")
+        except ValueError:
+            pass
+    print(f"Buckets: {len(SNAP_CASES)} snaps checked, unknown tiers rejected")
+
+
+def png(width: int, height: int) -> bytes:
+    from PIL import Image
+
+    buffer = io.BytesIO()
+    Image.new("RGB", (width, height)).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def check_requests(builder: WorkflowBuilder, expect) -> None:
+    import rp_handler
+
+    rp_handler.workflow_builder = builder
+    portrait = png(108, 192)
+    cases = [
+        ({}, (736, 1280, "720p")),
+        ({"exact_resolution": True}, (1280, 736, None)),
+        ({"width": 1000, "height": 700}, (1000, 700, None)),
+        ({"width": 864}, (864, 736, None)),
+        ({"width": 1000, "height": 700, "resolution_tier": ""}, (1000, 700, None)),
+        ({"resolution_tier": "720p"}, (736, 1280, "720p")),
+        ({"width": 864, "height": 480, "resolution_tier": "auto"}, (480, 864, "480p")),
+        ({"width": 1000, "height": 700, "resolution_tier": "1080p", "exact_resolution": True}, (1000, 700, None)),
+    ]
+    for input_data, expected in cases:
+        width, height, bucket = rp_handler.plan_resolution(input_data, portrait)
+        actual = (width, height, bucket and bucket["tier"])
+        expect(actual == expected, f"plan_resolution {input_data}: {actual}, expected {expected}")
+    try:
+        rp_handler.plan_resolution({"resolution_tier": "4k"}, portrait)
+        expect(False, "plan_resolution accepted resolution_tier 4k")
+    except ValueError:
+        pass
+    print(f"Requests: {len(cases)} requests checked, unknown tier rejected")
+
+
+def main():
+    failures = []
+
+    def expect(condition, message):
+        if not condition:
+            failures.append(message)
+
+    builder = WorkflowBuilder(os.path.join(DOCKER_DIR, "workflow_ltx2_enhanced.json"), None, None)
+    check_buckets(builder, expect)
+    try:
+        import PIL  # noqa: F401
+        import requests  # noqa: F401
+        import runpod  # noqa: F401
+    except ImportError as e:
+        print(f"Requests: skipped ({e.name} not installed)")
+    else:
+        check_requests(builder, expect)
+
+    for failure in failures:
+        print(f"FAIL {failure}")
+    if failures:
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
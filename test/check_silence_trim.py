@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Check silence trimming (trim_silence): the frame plan and the padding
+that restores the cut silence.
+
+1. Plan (WorkflowBuilder.plan_silence_trim, pure Python): the leading pad
+   equals the cut silence in frames, and the delivered video (leading pad
+   + generated frames + trailing pad - trimmed tail) is exactly
+   full_num_frames, also when the 30-frame minimum inflates a short
+   voiced span.
+2. Padding (needs ffmpeg): a generated clip of the voiced span with a
+   white flash is padded by pad_video_and_mux_audio with the full-length
+   audio, whose beep is at the flash's place in the original timeline.
+   The output has full_num_frames frames, the flash lands within one
+   frame of the beep, and the audio runs as long as the source audio.
+
+Usage:
+    python test/check_silence_trim.py
+"""
+import array
+import os
+import subprocess
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "docker", "pod_files"))
+
+from video_postprocess import find_ffmpeg, pad_video_and_mux_audio
+from workflow_builder import WorkflowBuilder
+
+DOCKER_DIR = os.path.join(os.path.dirname(__file__), "..", "docker")
+
+FPS = 24
+AUDIO_RATE = 16000
+# (full duration, leading silence, trailing silence): long clip, 30-frame minimum padded by the
+# tail, 30-frame minimum overrunning the full length (tail trimmed)
+CASES = [(6.0, 1.0, 0.5), (1.0, 0.6, 0.3), (0.5, 0.4, 0.0)]
+# Generated frame of the flash (the beep is at leading silence + FLASH_FRAME / FPS): inside the
+# shortest voiced span (0.1 s), and not frame 0, which the leading pad clones
+FLASH_FRAME = 1
+
+
+def check_plan(builder):
+    failures = 0
+    print(f"{'full':>5} {'lead':>5} {'trail':>5} {'generated':>9} {'pad start':>9} {'pad end':>7} {'trim':>4} "
+          f"{'full frames':>11}")
+    for full_duration, leading, trailing in CASES:
+        plan = builder.plan_silence_trim(full_duration, leading, trailing, fps=FPS)
+        delivered = plan["pad_start_frames"] + plan["num_frames"] + plan["pad_end_frames"] - plan["trim_end_frames"]
+        print(f"{full_duration:>5} {leading:>5} {trailing:>5} {plan['num_frames']:>9} {plan['pad_start_frames']:>9} "
+              f"{plan['pad_end_frames']:>7} {plan['trim_end_frames']:>4} {plan['full_num_frames']:>11}")
+        problems = []
+        if plan["pad_start_frames"] != round(leading * FPS):
+            problems.append(f"leading pad {plan['pad_start_frames']}, cut {leading * FPS} frames")
+        if delivered != plan["full_num_frames"]:
+            problems.append(f"delivers {delivered} frames, expected {plan['full_num_frames']}")
+        if problems:
+            print(f"  FAIL {', '.join(problems)}")
+            failures += 1
+    return failures
+
+
+def make_generated_clip(ffmpeg, path, frames):
+    """Black clip of the generated frame count with one white frame at FLASH_FRAME."""
+    video = (f"color=c=black:s=128x96:r={FPS},"
+             f"drawbox=c=white:t=fill:enable='eq(n\\,{FLASH_FRAME})'")
+    subprocess.run([
+        ffmpeg, "-y", "-loglevel", "error", "-f", "lavfi", "-i", video,
+        "-frames:v", str(frames), "-c:v", "libx264", "-pix_fmt", "yuv420p", path,
+    ], check=True)
+
+
+def make_source_audio(ffmpeg, path, duration, beep_seconds):
+    """Full-length source audio: silence with a beep at beep_seconds."""
+    audio = (f"aevalsrc='if(between(t\\,{beep_seconds}\\,{beep_seconds + 0.1})\\,0.8*sin(2*PI*1000*t)\\,0)'"
+             f":s={AUDIO_RATE}:d={duration}")
+    subprocess.run([ffmpeg, "-y", "-loglevel", "error", "-f", "lavfi", "-i", audio, path], check=True)
+
+
+def frame_brightness(ffmpeg, path):
+    raw = subprocess.run([
+        ffmpeg, "-loglevel", "error", "-i", path,
+        "-f", "rawvideo", "-pix_fmt", "gray", "-",
+    ], check=True, capture_output=True).stdout
+    size = 128 * 96
+    return [sum(raw[i:i + size]) / size for i in range(0, len(raw), size)]
+
+
+def beep_onset_seconds(ffmpeg, path):
+    raw = subprocess.run([
+        ffmpeg, "-loglevel", "error", "-i", path,
+        "-f", "s16le", "-ac", "1", "-ar", str(AUDIO_RATE), "-",
+    ], check=True, capture_output=True).stdout
+    samples = array.array("h", raw)
+    for index, value in enumerate(samples):
+        if abs(value) > 8000:
+            return index / AUDIO_RATE, len(samples) / AUDIO_RATE
+    return None, len(samples) / AUDIO_RATE
+
+
+def check_padding(ffmpeg, builder):
+    failures = 0
+    with tempfile.TemporaryDirectory() as tmp:
+        for full_duration, leading, trailing in CASES:
+            plan = builder.plan_silence_trim(full_duration, leading, trailing, fps=FPS)
+            video = os.path.join(tmp, "generated.mp4")
+            audio = os.path.join(tmp, "source.wav")
+            beep_seconds = leading + FLASH_FRAME / FPS
+            make_generated_clip(ffmpeg, video, plan["num_frames"])
+            make_source_audio(ffmpeg, audio, full_duration, beep_seconds)
+            pad_video_and_mux_audio(video, audio, plan["pad_start_frames"], plan["pad_end_frames"],
+                                    total_frames=plan["full_num_frames"])
+
+            brightness = frame_brightness(ffmpeg, video)
+            flash_seconds = max(range(len(brightness)), key=brightness.__getitem__) / FPS
+            beep, audio_seconds = beep_onset_seconds(ffmpeg, video)
+
+            problems = []
+            if len(brightness) != plan["full_num_frames"]:
+                problems.append(f"{len(brightness)} frames, expected {plan['full_num_frames']}")
+            if beep is None or abs(flash_seconds - beep) > 1.0 / FPS:
+                problems.append(f"flash at {flash_seconds:.3f}s, beep at {beep}s")
+            if abs(audio_seconds - full_duration) > 0.05:
+                problems.append(f"audio {audio_seconds:.3f}s, source {full_duration}s")
+
+            status = "FAIL " + ", ".join(problems) if problems else "ok"
+            print(f"  {full_duration}s (lead {leading}s): {len(brightness)} frames, flash {flash_seconds:.3f}s, "
+                  f"beep {beep}s: {status}")
+            failures += bool(problems)
+    return failures
+
+
+def main():
+    builder = WorkflowBuilder(os.path.join(DOCKER_DIR, "workflow_ltx2_enhanced.json"), None, None)
+    print(f"Plan ({FPS} fps):")
+    failures = check_plan(builder)
+
+    ffmpeg = find_ffmpeg()
+    if ffmpeg is None:
+        print("ffmpeg not found, skipping padding check")
+    else:
+        print("Padding:")
+        failures += check_padding(ffmpeg, builder)
+    if failures:
+        print(f"{failures} failures")
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
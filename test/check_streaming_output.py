@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+CPU check for the streaming decode/encode (LTX2StreamingVideoOutput).
+
+Uses tiny fake VAEs with the LTX-2 frame formula (n latent frames -> 8n-7
+pixel frames, first latent frame causal) that mix neighbouring latent
+frames, to check that chunked decoding matches one full decode when the
+receptive field fits in the context, stays close to it when it does not,
+and that the encoder writes every frame.
+
+Needs torch (and ffmpeg for the encode part); no GPU or ComfyUI.
+
+Usage:
+    python test/check_streaming_output.py
+"""
+import os
+import sys
+import tempfile
+
+import torch
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "docker", "pod_files"))
+
+from video_postprocess import decode_latent_chunks, find_ffmpeg, stream_latent_to_video
+
+
+class FakeVAE:
+    """
+    Decodes latent frames to flat colors from their channel means, 32x spatial.
+
+    Frame colors mix each latent frame with its neighbours up to radius
+    latent frames away (not causal, edges replicated inside the decoded
+    window), and vary across the 8 frames of a latent frame. The first
+    latent frame of a window decodes to one frame.
+    """
+
+    upscale_ratio = (lambda a: max(0, a * 8 - 7), 32, 32)
+
+    def __init__(self, radius: int = 0):
+        self.radius = radius
+
+    def temporal_compression_decode(self):
+        return 8
+
+    def spacial_compression_decode(self):
+        return 32
+
+    def decode_tiled(self, samples, tile_x=None, tile_y=None, overlap=None, tile_t=None, overlap_t=None):
+        batch, _, frames, height, width = samples.shape
+        colors = torch.sigmoid(samples[:, :3].mean(dim=(3, 4)))           # [B, 3, T]
+        padded = torch.cat([colors[:, :, :1]] * self.radius + [colors] + [colors[:, :, -1:]] * self.radius, dim=2)
+        mixed = sum(padded[:, :, k:k + frames] for k in range(2 * self.radius + 1)) / (2 * self.radius + 1)
+        ramp = padded[:, :, 2 * self.radius:] - padded[:, :, :frames]      # right minus left neighbour
+        phase = torch.arange(8, dtype=colors.dtype) / 8 - 0.5
+        images = mixed[..., None] + 0.25 * ramp[..., None] * phase         # [B, 3, T, 8]
+        images = torch.cat([images[:, :, :1, -1:].flatten(2), images[:, :, 1:].flatten(2)], dim=2)  # [B, 3, 8T-7]
+        images = images.permute(0, 2, 1)[:, :, None, None, :]
+        return images.expand(batch, images.shape[1], height * 32, width * 32, 3).contiguous()
+
+
+def check_chunks(samples, radius: int, temporal_overlap: int):
+    """Max |streamed - full| over all frames and the chunk sizes."""
+    vae = FakeVAE(radius)
+    full = vae.decode_tiled(samples).reshape(-1, 64, 96, 3)
+    chunks = list(decode_latent_chunks(vae, samples, temporal_size=64, temporal_overlap=temporal_overlap))
+    streamed = torch.cat(chunks)
+    assert streamed.shape == full.shape, f"frame count mismatch: {streamed.shape[0]} vs {full.shape[0]}"
+    error = (streamed - full).abs().amax(dim=(1, 2, 3))
+    print(f"Receptive field {radius}, temporal_overlap {temporal_overlap}: {streamed.shape[0]} frames in "
+          f"{len(chunks)} chunks (largest {max(c.shape[0] for c in chunks)}), max |diff| {error.max():.2e}")
+    assert max(c.shape[0] for c in chunks) <= 64, "chunk larger than temporal_size"
+    return error
+
+
+def main():
+    torch.manual_seed(0)
+    samples = torch.randn(1, 128, 20, 2, 3)                                # 153 frames, 96x64
+
+    # Receptive field within the context (1 latent frame at temporal_overlap 8, 2 at 16): matches a full decode
+    for radius, temporal_overlap in ((0, 8), (1, 8), (2, 16)):
+        error = check_chunks(samples, radius, temporal_overlap)
+        assert error.max() < 1e-6, f"chunked decode differs from full decode (radius {radius})"
+
+    # Receptive field beyond the context: differences only inside the crossfades (the last latent frame
+    # of each chunk, 8 frames), and no seam: no frame-to-frame jump larger than in the full decode
+    error = check_chunks(samples, 2, 8)
+    full = FakeVAE(2).decode_tiled(samples).reshape(-1, 64, 96, 3)
+    streamed = torch.cat(list(decode_latent_chunks(FakeVAE(2), samples, temporal_size=64, temporal_overlap=8)))
+    crossfades = set(range(49, 57)) | set(range(113, 121))
+    off = {frame for frame in range(error.shape[0]) if error[frame] >= 1e-6}
+    assert off <= crossfades, f"frames outside the crossfades differ: {sorted(off - crossfades)}"
+    jump = (streamed[1:] - streamed[:-1]).abs().max()
+    full_jump = (full[1:] - full[:-1]).abs().max()
+    print(f"  {len(off)} frames differ, all in crossfades; largest jump {jump:.3f} (full decode {full_jump:.3f})")
+    assert jump <= full_jump + 1e-6, "seam between chunks"
+
+    vae = FakeVAE()
+    full = vae.decode_tiled(samples).reshape(-1, 64, 96, 3)
+    if find_ffmpeg() is None:
+        print("ffmpeg not found, skipping encode check")
+        return
+
+    sample_rate = 16000
+    audio = {"waveform": torch.zeros(1, 1, sample_rate * 3), "sample_rate": sample_rate}
+    with tempfile.TemporaryDirectory() as tmp:
+        output_path = os.path.join(tmp, "stream.mp4")
+        info = stream_latent_to_video(vae, samples, output_path, 30, audio=audio)
+        assert info["frames"] == full.shape[0], info
+        assert os.path.getsize(output_path) > 0
+
+        trimmed = stream_latent_to_video(vae, samples, output_path, 30, audio=audio, trim_to_audio=True)
+        assert trimmed["frames"] == 90, trimmed
+
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Check the two-stage (two_stage) graphs of Mode 1 and Mode 2.
+
+Pure Python (no ComfyUI, no GPU). For latent and pixel mode over several
+output sizes: every node reference resolves, the graph has no cycles,
+sampling runs at the stage 1 size, the refine pass has its own noise seed,
+the decode / upscale / crop wiring ends at the requested size, streaming
+output is used exactly when the decoded frames are not post-processed
+(is_streaming_output reports a skip), and prints the estimated cost against one-stage.
+
+Usage:
+    python test/check_two_stage_graph.py
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "docker", "pod_files"))
+
+from workflow_builder import WorkflowBuilder
+
+DOCKER_DIR = os.path.join(os.path.dirname(__file__), "..", "docker")
+
+RESOLUTIONS = [(768, 512), (1280, 736), (736, 1280), (1280, 720), (1920, 1088)]
+DURATION = 10
+FPS = 30
+STEPS = 8
+
+
+def refs(node):
+    return [v for v in node["inputs"].values()
+            if isinstance(v, list) and len(v) == 2 and isinstance(v[0], str)]
+
+
+def check_graph(workflow):
+    problems = []
+    for node_id, node in workflow.items():
+        for ref in refs(node):
+            if ref[0] not in workflow:
+                problems.append(f"{node_id} -> missing {ref[0]}")
+
+    visiting, done = set(), set()
+
+    def visit(node_id):
+        if node_id in done or node_id not in workflow:
+            return
+        if node_id in visiting:
+            problems.append(f"cycle at {node_id}")
+            return
+        visiting.add(node_id)
+        for ref in refs(workflow[node_id]):
+            visit(ref[0])
+        visiting.discard(node_id)
+        done.add(node_id)
+
+    for node_id in workflow:
+        visit(node_id)
+    return problems
+
+
+def check_wiring(builder, workflow, plan, streaming_requested):
+    problems = []
+    latent = workflow["162"]["inputs"]
+    if [latent["width"], latent["height"]] != plan["stage1"]:
+        problems.append(f"162 at {latent['width']}x{latent['height']}")
+
+    # Streaming output replaces 234 -> 190 when the decoded frames go straight to the output
+    streaming = workflow["190"]["class_type"] == "LTX2StreamingVideoOutput"
+    decoder = workflow["190"] if streaming else workflow["234"]
+    if streaming != (streaming_requested and plan["mode"] == "latent" and plan["working"] == plan["output"]):
+        problems.append(f"streaming output {streaming} for mode {plan['mode']}, working {plan['working']}")
+    if streaming != builder.is_streaming_output(workflow):
+        problems.append("is_streaming_output disagrees with node 190")
+
+    if plan["mode"] == "latent":
+        if decoder["inputs"]["samples"] != [builder.REFINE_SEPARATE_NODE_ID, 0]:
+            problems.append(f"decoder samples {decoder['inputs']['samples']}")
+        scheduler = workflow[builder.REFINE_SCHEDULER_NODE_ID]["inputs"]
+        if scheduler["steps"] != plan["refine_steps"] or scheduler["denoise"] != plan["refine_denoise"]:
+            problems.append(f"refine scheduler {scheduler}")
+        noise = workflow[builder.REFINE_SAMPLER_NODE_ID]["inputs"]["noise"]
+        refine_seed = workflow[noise[0]]["inputs"]["noise_seed"]
+        stage1_seed = workflow["178"]["inputs"]["noise_seed"]
+        if noise[0] == "178" or refine_seed in (stage1_seed, None):
+            problems.append(f"refine noise {noise} seed {refine_seed} (stage 1 seed {stage1_seed})")
+        upscaled = ["234", 0]
+    else:
+        scale = workflow[builder.PIXEL_UPSCALE_NODE_ID]["inputs"]
+        if [scale["width"], scale["height"]] != plan["working"]:
+            problems.append(f"upscale to {scale['width']}x{scale['height']}")
+        upscaled = [builder.PIXEL_UPSCALE_NODE_ID, 0]
+
+    if streaming:
+        return problems
+    images = workflow["190"]["inputs"]["images"]
+    if plan["working"] == plan["output"]:
+        if images != upscaled:
+            problems.append(f"190 images {images}")
+    else:
+        crop = workflow.get(builder.OUTPUT_CROP_NODE_ID, {}).get("inputs", {})
+        if images != [builder.OUTPUT_CROP_NODE_ID, 0] or crop.get("image") != upscaled:
+            problems.append(f"190 images {images}, crop {crop}")
+        elif [crop["width"], crop["height"]] != plan["output"]:
+            problems.append(f"crop to {crop['width']}x{crop['height']}")
+        elif (crop["x"] + crop["width"] > plan["working"][0]
+              or crop["y"] + crop["height"] > plan["working"][1]):
+            problems.append(f"crop outside {plan['working']}")
+    return problems
+
+
+def main():
+    builder = WorkflowBuilder(
+        os.path.join(DOCKER_DIR, "workflow_ltx2_enhanced.json"),
+        os.path.join(DOCKER_DIR, "workflow_ltx2_audio_gen.json"),
+        None,
+    )
+    failures = 0
+
+    print(f"{'output':>11} {'mode':>6} {'stage 1':>10} {'working':>10} {'cost':>6}")
+    for width, height in RESOLUTIONS:
+        for mode in ("latent", "pixel"):
+            plan = builder.plan_two_stage(width, height, mode=mode)
+            workflows = {
+                "mode1": builder.build_workflow(
+                    "image.png", "audio.wav", DURATION, "prompt", "", 0,
+                    width=width, height=height, fps=FPS, steps=STEPS,
+                    two_stage=plan, decode_vram_bytes=int(24e9), streaming_output=True,
+                ),
+                "mode2": builder.build_audio_gen_workflow(
+                    "image.png", DURATION, "prompt", "", 0,
+                    width=width, height=height, fps=FPS, steps=STEPS,
+                    two_stage=plan, decode_vram_bytes=int(24e9),
+                ),
+            }
+            for name, workflow in workflows.items():
+                streaming_requested = name == "mode1"
+                for problem in check_graph(workflow) + check_wiring(builder, workflow, plan, streaming_requested):
+                    print(f"FAIL {name} {width}x{height} {mode}: {problem}")
+                    failures += 1
+
+            cost = builder.estimate_two_stage_cost(plan, workflows["mode1"]["162"]["inputs"]["length"], STEPS)
+            print(f"{width:>5}x{height:<5} {mode:>6} {plan['stage1'][0]:>5}x{plan['stage1'][1]:<4} "
+                  f"{plan['working'][0]:>5}x{plan['working'][1]:<4} {cost['estimated_cost_ratio']:>6.0%}")
+
+    if failures:
+        print(f"{failures} failures")
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+Check batched variants (num_variants) offline: the graph, the handler's
+split into one MP4 per variant, and the ComfyUI time against N
+sequential jobs.
+
+1. Graphs (pure Python): for Mode 1 and Mode 2 with num_variants=3, the
+   video latent (and Mode 2's audio latent) has batch_size 3, RandomNoise
+   is LTX2VariantNoise on the job seed, there is one sampler and one text
+   encode, and get_variant_output_ids names 3 output nodes, each fed by
+   its own LatentFromBatch slice.
+2. Handler (needs the handler's dependencies: runpod, requests, Pillow):
+   unified_handler runs one num_variants=3 Mode 1 job and 3 single jobs
+   with seeds seed .. seed + 2 against an in-process fake ComfyUI
+   (fake_comfyui.py; sampling time scales with the latent batch, model
+   load and text/image encode are paid once per prompt). The batched job
+   returns 3 uploaded videos with seeds seed + i, and its ComfyUI time
+   (execution_start to execution_success in the prompt's history, as
+   ComfyUI records it; the handler's attempts[].seconds include its
+   history poll interval) is below the sequential total by at least
+   (N - 1) x the load time, less TIMING_SLACK_SECONDS of scheduling jitter.
+
+The fake's timings are a model, not a GPU: the saving measured here is
+the shared per-prompt work. test/bench_variants.py measures the real
+GPU-time ratio against a deployed endpoint.
+
+Usage:
+    python test/check_variants.py
+"""
+import functools
+import os
+import shutil
+import sys
+import tempfile
+
+TEST_DIR = os.path.dirname(os.path.abspath(__file__))
+DOCKER_DIR = os.path.join(TEST_DIR, "..", "docker")
+sys.path.insert(0, os.path.join(DOCKER_DIR, "pod_files"))
+sys.path.insert(0, TEST_DIR)
+
+from workflow_builder import WorkflowBuilder
+
+VARIANTS = 3
+SEED = 1000
+LOAD_SECONDS = 1.0
+# The saving is exactly (N - 1) x LOAD_SECONDS in the fake; allow for thread wake-up jitter
+TIMING_SLACK_SECONDS = 0.1
+FAKE_OPTIONS = {"step_seconds": 0.02, "load_seconds": LOAD_SECONDS, "decode_seconds": 0.2, "decode_chunks": 2}
+
+
+def check_graphs(expect) -> None:
+    builder = WorkflowBuilder(*(os.path.join(DOCKER_DIR, name) for name in (
+        "workflow_ltx2_enhanced.json", "workflow_ltx2_audio_gen.json", "workflow_ltx2_multiframe.json")))
+    common = {"prompt_positive": "A person speaking", "prompt_negative": "static", "seed": SEED,
+              "num_variants": VARIANTS}
+    graphs = {
+        "mode1": builder.build_workflow(image_name="face.png", audio_name="line.wav", audio_duration=5.0, **common),
+        "mode2": builder.build_audio_gen_workflow("face.png", 5.0, **common),
+    }
+    for name, workflow in graphs.items():
+        classes = [node["class_type"] for node in workflow.values()]
+        latents = [node["inputs"].get("batch_size") for node in workflow.values()
+                   if node["class_type"] in ("EmptyLTXVLatentVideo", "LTXVEmptyLatentAudio")]
+        expect(latents and set(latents) == {VARIANTS}, f"{name}: latent batch sizes {latents}")
+        noise = workflow["178"]
+        expect(noise["class_type"] == "LTX2VariantNoise" and noise["inputs"]["noise_seed"] == SEED,
+               f"{name}: noise node {noise}")
+        samplers, text_encodes = classes.count("SamplerCustomAdvanced"), classes.count("CLIPTextEncode")
+        expect(samplers == 1, f"{name}: {samplers} samplers")
+        expect(text_encodes == 2, f"{name}: {text_encodes} text encodes (positive + negative)")
+
+        slices = []
+        for output_id in builder.get_variant_output_ids(VARIANTS):
+            node_id = output_id
+            while node_id in workflow and workflow[node_id]["class_type"] != "LatentFromBatch":
+                refs = [value for key, value in workflow[node_id]["inputs"].items()
+                        if key in ("images", "samples", "video_latent", "av_latent") and isinstance(value, list)]
+                node_id = refs[0][0] if refs else None
+            if node_id is None or node_id not in workflow:
+                expect(False, f"{name}: output {output_id} not fed by LatentFromBatch")
+                continue
+            inputs = workflow[node_id]["inputs"]
+            slices.append((inputs["batch_index"], inputs["length"]))
+        expect(sorted(slices) == [(index, 1) for index in range(VARIANTS)], f"{name}: variant slices {slices}")
+    print(f"Graphs: {VARIANTS} variants, one sampler, one slice per output")
+
+
+def prompt_seconds(state, prompt_id: str) -> float:
+    """Execution time of a finished prompt from its history timestamps (execution_start -> _success)."""
+    stamps = {name: data["timestamp"] for name, data in state.history[prompt_id]["status"]["messages"]}
+    return (stamps["execution_success"] - stamps["execution_start"]) / 1000
+
+
+def check_handler(expect) -> None:
+    from fake_comfyui import start_fake_comfyui
+    from load_test import TEMPLATES, local_upload, serve_media, write_png, write_wav
+
+    work = tempfile.mkdtemp(prefix="ltx2_variants_check_")
+    dirs = {name: os.path.join(work, name) for name in ("media", "output", "input", "workflows", "uploads")}
+    for path in dirs.values():
+        os.makedirs(path, exist_ok=True)
+    for name, template in TEMPLATES.items():
+        shutil.copyfile(os.path.join(DOCKER_DIR, template), os.path.join(dirs["workflows"], name))
+    write_png(os.path.join(dirs["media"], "face.png"), 768, 512)
+    write_wav(os.path.join(dirs["media"], "speech.wav"), 3)
+    media_url = serve_media(dirs["media"])
+    server, url = start_fake_comfyui(output_dir=dirs["output"], input_dir=dirs["input"], **FAKE_OPTIONS)
+
+    os.environ.update({
+        "COMFYUI_HOST": "127.0.0.1",
+        "COMFYUI_BASE_PORT": url.rsplit(":", 1)[1],
+        "COMFYUI_INSTANCES": "1",
+        "COMFYUI_OUTPUT_DIRS": dirs["output"],
+        "COMFYUI_WORKFLOW_DIR": dirs["workflows"],
+        "JOB_JOURNAL_PATH": os.path.join(work, "job_journal.sqlite3"),
+        "LATENT_CACHE_DIR": os.path.join(work, "latents", "cache"),
+        "JOB_LATENT_DIR": os.path.join(work, "latents", "jobs"),
+    })
+    import rp_handler
+
+    rp_handler.upload_video_to_gcs = functools.partial(local_upload, dirs["uploads"])
+    try:
+        if not rp_handler.wait_for_comfyui(timeout=30):
+            expect(False, "fake ComfyUI did not come up")
+            return
+        base_input = {"image_url": f"{media_url}/face.png", "audio_url": f"{media_url}/speech.wav",
+                      "quality_preset": "fast"}
+
+        def run(job_id, **options):
+            result = rp_handler.unified_handler({"id": job_id, "input": {**base_input, **options}})
+            if result.get("status") != "success":
+                expect(False, f"{job_id}: {result.get('error')}")
+                return None
+            return result["output"]
+
+        batched = run("batched", seed=SEED, num_variants=VARIANTS)
+        sequential = [run(f"single-{variant}", seed=SEED + variant) for variant in range(VARIANTS)]
+        if batched is None or None in sequential:
+            return
+
+        videos = batched.get("videos") or []
+        expect([video.get("seed") for video in videos] == [SEED + variant for variant in range(VARIANTS)],
+               f"videos seeds {[video.get('seed') for video in videos]}")
+        for video in videos:
+            path = (video.get("video_url") or "").replace("file://", "")
+            expect(os.path.exists(path), f"variant {video.get('variant')} not uploaded: {video.get('video_url')}")
+
+        batched_seconds = prompt_seconds(server.state, batched["prompt_id"])
+        sequential_seconds = sum(prompt_seconds(server.state, output["prompt_id"]) for output in sequential)
+        print(f"Handler: {len(videos)} videos; ComfyUI time batched {batched_seconds:.1f}s, "
+              f"{VARIANTS} sequential {sequential_seconds:.1f}s ({batched_seconds / sequential_seconds:.0%})")
+        expect(batched_seconds <= sequential_seconds - (VARIANTS - 1) * LOAD_SECONDS + TIMING_SLACK_SECONDS,
+               f"batched {batched_seconds}s does not save the per-prompt load over sequential {sequential_seconds}s")
+    finally:
+        server.shutdown()
+        shutil.rmtree(work, ignore_errors=True)
+
+
+def main():
+    failures = []
+
+    def expect(condition, message):
+        if not condition:
+            failures.append(message)
+
+    check_graphs(expect)
+    try:
+        import PIL  # noqa: F401
+        import requests  # noqa: F401
+        import runpod  # noqa: F401
+    except ImportError as e:
+        print(f"Handler: skipped ({e.name} not installed)")
+    else:
+        check_handler(expect)
+
+    for failure in failures:
+        print(f"FAIL {failure}")
+    if failures:
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,529 @@
+#!/usr/bin/env python3
+"""
+Fake ComfyUI server for running the handler without a GPU.
+
+Implements the parts of the ComfyUI API the handler uses:
+
+    GET  /system_stats        one device with vram_total / vram_free
+    POST /upload/image        multipart "image" (+ "subfolder"), saved to the input dir
+    POST /prompt              queue a workflow -> {"prompt_id", "number", "node_errors"}
+    GET  /history[/{id}]      finished prompts with status and outputs
+    GET  /queue               queue_running / queue_pending
+    POST /interrupt           interrupt the running prompt (execution_interrupted); a prompt_id
+                              in the body must match the running prompt
+    POST /free                no-op
+    GET  /ws?clientId=...     websocket: status, execution_start, executing, progress,
+                              executed, execution_success / _error / _interrupted
+
+One prompt runs at a time, like ComfyUI's prompt worker. A prompt
+"executes" its workflow: a load delay, then every sampler node for its
+scheduler's steps at --step-seconds per step and batch element (a
+num_variants graph samples its whole latent batch; progress per step), every
+decode node in --decode-chunks chunks over --decode-seconds, and every
+video output node (VHS_VideoCombine, LTX2StreamingVideoOutput) writes an
+MP4 at the workflow's size, frame count and fps to the output dir (with
+ffmpeg: a test pattern with a tone, cached per format; without it a
+placeholder file). --fail-rate and --oom-rate fail that share of prompts
+with a generic or a CUDA out-of-memory error in the sampler;
+--decode-oom-rate fails that share with an out-of-memory error in the
+decode node. execution_error names the node that failed.
+
+Usage:
+    python test/fake_comfyui.py [--port 8188] [--output-dir /tmp/fake_comfyui/output] [--step-seconds 0.5]
+
+Or in-process: server, url = start_fake_comfyui(port=0, step_seconds=0.1)
+"""
+import argparse
+import base64
+import collections
+import email.parser
+import email.policy
+import hashlib
+import json
+import os
+import queue
+import random
+import shutil
+import struct
+import subprocess
+import tempfile
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+WEBSOCKET_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+SAMPLER_CLASSES = ("SamplerCustomAdvanced", "SamplerCustom", "KSampler", "KSamplerAdvanced")
+DECODE_CLASSES = ("VAEDecode", "VAEDecodeTiled")
+VIDEO_OUTPUT_CLASSES = ("VHS_VideoCombine", "LTX2StreamingVideoOutput")
+DEFAULT_STEPS = 8
+VRAM_TOTAL = 85899345920
+
+# Smallest box sequence players recognise as MP4 (when ffmpeg is missing)
+PLACEHOLDER_MP4 = struct.pack(">I4s4sI4s4s", 24, b"ftyp", b"isom", 512, b"isom", b"mp41")
+
+
+class PromptInterrupted(Exception):
+    pass
+
+
+class NodeFailure(RuntimeError):
+    """A simulated node error (execution_error names the node)."""
+
+    def __init__(self, message: str, node_id: str, node_type: str):
+        super().__init__(message)
+        self.node_id = node_id
+        self.node_type = node_type
+
+
+class FakeComfyUIState:
+    """Queue, history, websocket clients and the prompt worker of one fake instance."""
+
+    def __init__(self, output_dir: str, input_dir: str, step_seconds: float = 0.5, load_seconds: float = 1.0,
+                 decode_seconds: float = 2.0, decode_chunks: int = 4, fail_rate: float = 0.0,
+                 oom_rate: float = 0.0, decode_oom_rate: float = 0.0, seed: int = None):
+        self.output_dir = output_dir
+        self.input_dir = input_dir
+        self.step_seconds = step_seconds
+        self.load_seconds = load_seconds
+        self.decode_seconds = decode_seconds
+        self.decode_chunks = decode_chunks
+        self.fail_rate = fail_rate
+        self.oom_rate = oom_rate
+        self.decode_oom_rate = decode_oom_rate
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.pending = collections.OrderedDict()
+        self.running = None
+        self.history = {}
+        self.clients = collections.defaultdict(list)
+        self.interrupted = threading.Event()
+        self.counters = collections.Counter()
+        self.number = 0
+        self.video_cache = tempfile.mkdtemp(prefix="fake_comfyui_videos_")
+        self.ffmpeg = shutil.which("ffmpeg")
+        self.stats = collections.Counter()
+        self._work = queue.Queue()
+        os.makedirs(output_dir, exist_ok=True)
+        os.makedirs(input_dir, exist_ok=True)
+        threading.Thread(target=self._worker, daemon=True).start()
+
+    # Queue
+
+    def queue_prompt(self, workflow: dict, client_id: str) -> dict:
+        prompt_id = str(uuid.uuid4())
+        with self.lock:
+            self.number += 1
+            item = [self.number, prompt_id, workflow, {"client_id": client_id}, []]
+            self.pending[prompt_id] = item
+        self._work.put(prompt_id)
+        self.stats["prompts"] += 1
+        return {"prompt_id": prompt_id, "number": item[0], "node_errors": {}}
+
+    def queue_state(self) -> dict:
+        with self.lock:
+            return {"queue_running": [self.running] if self.running else [],
+                    "queue_pending": list(self.pending.values())}
+
+    def interrupt(self, prompt_id=None) -> None:
+        """Interrupt the running prompt; with prompt_id, only if that prompt is the one running (as ComfyUI)."""
+        with self.lock:
+            if self.running and prompt_id in (None, self.running[1]):
+                self.interrupted.set()
+
+    # Websocket
+
+    def send(self, client_id: str, message_type: str, data: dict) -> None:
+        payload = json.dumps({"type": message_type, "data": data}).encode()
+        with self.lock:
+            sockets = list(self.clients.get(client_id, ()))
+        for sock in sockets:
+            try:
+                send_ws_frame(sock, payload)
+            except OSError:
+                self.remove_client(client_id, sock)
+
+    def remove_client(self, client_id: str, sock) -> None:
+        with self.lock:
+            if sock in self.clients.get(client_id, ()):
+                self.clients[client_id].remove(sock)
+
+    # Execution
+
+    def _worker(self) -> None:
+        while True:
+            prompt_id = self._work.get()
+            with self.lock:
+                item = self.pending.pop(prompt_id, None)
+                self.running = item
+                self.interrupted.clear()
+            if item is None:
+                continue
+            _, _, workflow, extra, _ = item
+            client_id = extra["client_id"]
+            messages = [["execution_start", {"prompt_id": prompt_id, "timestamp": int(time.time() * 1000)}]]
+            outputs = {}
+            status = "success"
+            self.send(client_id, "execution_start", {"prompt_id": prompt_id})
+            try:
+                self._execute(prompt_id, workflow, client_id, outputs)
+                messages.append(["execution_success", {"prompt_id": prompt_id,
+                                                       "timestamp": int(time.time() * 1000)}])
+                self.send(client_id, "execution_success", {"prompt_id": prompt_id})
+                self.stats["success"] += 1
+            except PromptInterrupted:
+                status = "error"
+                data = {"prompt_id": prompt_id, "node_id": None, "node_type": None, "executed": []}
+                messages.append(["execution_interrupted", data])
+                self.send(client_id, "execution_interrupted", data)
+                self.stats["interrupted"] += 1
+            except NodeFailure as e:
+                status = "error"
+                oom = "out of memory" in str(e)
+                data = {"prompt_id": prompt_id, "node_id": e.node_id, "node_type": e.node_type,
+                        "exception_message": str(e),
+                        "exception_type": "torch.OutOfMemoryError" if oom else "RuntimeError"}
+                messages.append(["execution_error", data])
+                self.send(client_id, "execution_error", data)
+                self.stats["oom" if oom else "failed"] += 1
+            self.send(client_id, "executing", {"node": None, "prompt_id": prompt_id})
+            with self.lock:
+                self.history[prompt_id] = {
+                    "prompt": item[:4],
+                    "outputs": outputs,
+                    "status": {"status_str": status, "completed": status == "success", "messages": messages},
+                }
+                self.running = None
+
+    def _sleep(self, seconds: float) -> None:
+        if self.interrupted.wait(seconds):
+            raise PromptInterrupted()
+
+    def _execute(self, prompt_id: str, workflow: dict, client_id: str, outputs: dict) -> None:
+        def executing(node_id):
+            self.send(client_id, "executing", {"node": node_id, "display_node": node_id, "prompt_id": prompt_id})
+
+        def progress(node_id, value, maximum):
+            self.send(client_id, "progress", {"value": value, "max": maximum, "prompt_id": prompt_id,
+                                              "node": node_id})
+
+        nodes = sorted(workflow.items(), key=lambda item: int(item[0]) if item[0].isdigit() else 0)
+        batch = latent_batch(workflow)
+        failure = self.random.random()
+        decode_failure = self.random.random()
+        self._sleep(self.load_seconds)
+        for node_id, node in nodes:
+            class_type = node.get("class_type")
+            if class_type in SAMPLER_CLASSES:
+                executing(node_id)
+                steps = sampler_steps(workflow, node)
+                for step in range(1, steps + 1):
+                    self._sleep(self.step_seconds * batch)
+                    if step == max(1, steps // 2) and failure < self.oom_rate:
+                        raise NodeFailure("CUDA out of memory. Tried to allocate 2.00 GiB "
+                                          "(Allocation on device)", node_id, class_type)
+                    if step == max(1, steps // 2) and failure < self.oom_rate + self.fail_rate:
+                        raise NodeFailure("Simulated sampling failure", node_id, class_type)
+                    progress(node_id, step, steps)
+        for node_id, node in nodes:
+            if node.get("class_type") in DECODE_CLASSES + ("LTX2StreamingVideoOutput",):
+                executing(node_id)
+                for chunk in range(1, self.decode_chunks + 1):
+                    self._sleep(self.decode_seconds / self.decode_chunks)
+                    if chunk == 1 and decode_failure < self.decode_oom_rate:
+                        raise NodeFailure("CUDA out of memory. Tried to allocate 8.00 GiB "
+                                          "(Allocation on device)", node_id, node["class_type"])
+                    progress(node_id, chunk, self.decode_chunks)
+        for node_id, node in nodes:
+            if node.get("class_type") in VIDEO_OUTPUT_CLASSES:
+                if node["class_type"] != "LTX2StreamingVideoOutput":
+                    executing(node_id)
+                video = self._write_video(workflow, node)
+                outputs[node_id] = {"gifs": [video]}
+                self.send(client_id, "executed", {"node": node_id, "output": outputs[node_id],
+                                                  "prompt_id": prompt_id})
+
+    def _write_video(self, workflow: dict, node: dict) -> dict:
+        inputs = node["inputs"]
+        prefix = str(inputs.get("filename_prefix", "ComfyUI"))
+        fps = float(inputs.get("frame_rate", 24) if not isinstance(inputs.get("frame_rate"), list) else 24)
+        width, height, frames = video_format(workflow)
+        with self.lock:
+            self.counters[prefix] += 1
+            counter = self.counters[prefix]
+        subfolder, name = os.path.split(prefix)
+        filename = f"{name}_{counter:05}.mp4"
+        path = os.path.join(self.output_dir, subfolder, filename)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        shutil.copyfile(self._cached_video(width, height, frames, fps), path)
+        return {"filename": filename, "subfolder": subfolder, "type": "output", "format": "video/h264-mp4",
+                "frame_rate": fps, "fullpath": path}
+
+    def _cached_video(self, width: int, height: int, frames: int, fps: float) -> str:
+        path = os.path.join(self.video_cache, f"{width}x{height}_{frames}_{fps:g}.mp4")
+        if os.path.exists(path):
+            return path
+        if self.ffmpeg:
+            seconds = frames / fps
+            result = subprocess.run(
+                [self.ffmpeg, "-y", "-loglevel", "error",
+                 "-f", "lavfi", "-i", f"testsrc2=size={width}x{height}:rate={fps:g}",
+                 "-f", "lavfi", "-i", "sine=frequency=220:sample_rate=48000",
+                 "-t", f"{seconds:.3f}", "-frames:v", str(frames),
+                 "-c:v", "libx264", "-preset", "ultrafast", "-pix_fmt", "yuv420p", "-c:a", "aac",
+                 f"{path}.tmp.mp4"],
+                capture_output=True,
+            )
+            if result.returncode == 0:
+                os.replace(f"{path}.tmp.mp4", path)
+                return path
+            print(f"[fake_comfyui] ffmpeg failed, writing a placeholder: {result.stderr.decode()[-200:]}")
+        with open(path, "wb") as f:
+            f.write(PLACEHOLDER_MP4)
+        return path
+
+
+def sampler_steps(workflow: dict, node: dict) -> int:
+    """Steps of a sampler node from its scheduler (sigmas input), else its own "steps"."""
+    inputs = node.get("inputs", {})
+    if isinstance(inputs.get("steps"), int):
+        return inputs["steps"]
+    sigmas = inputs.get("sigmas")
+    if isinstance(sigmas, list):
+        steps = workflow.get(str(sigmas[0]), {}).get("inputs", {}).get("steps")
+        if isinstance(steps, int):
+            return steps
+    return DEFAULT_STEPS
+
+
+def video_format(workflow: dict) -> tuple:
+    """(width, height, frames) of the video a workflow renders."""
+    width, height, frames = 768, 512, 121
+    for node in workflow.values():
+        inputs = node.get("inputs", {})
+        if node.get("class_type") == "EmptyLTXVLatentVideo":
+            width, height = inputs.get("width", width), inputs.get("height", height)
+            frames = inputs.get("length", frames)
+    for node in workflow.values():
+        # Two-stage graphs sample small and crop / upscale to the output size
+        if node.get("class_type") in ("ImageScale", "ImageCrop"):
+            width, height = node["inputs"].get("width", width), node["inputs"].get("height", height)
+    return int(width), int(height), int(frames)
+
+
+def latent_batch(workflow: dict) -> int:
+    """batch_size of the video latent (num_variants), 1 if unset."""
+    return max([int(node["inputs"].get("batch_size", 1)) for node in workflow.values()
+                if node.get("class_type") == "EmptyLTXVLatentVideo"] or [1])
+
+
+def send_ws_frame(sock, payload: bytes, opcode: int = 0x1) -> None:
+    """Send one unmasked websocket frame (server to client)."""
+    header = bytes([0x80 | opcode])
+    if len(payload) < 126:
+        header += bytes([len(payload)])
+    elif len(payload) < 1 << 16:
+        header += bytes([126]) + struct.pack(">H", len(payload))
+    else:
+        header += bytes([127]) + struct.pack(">Q", len(payload))
+    sock.sendall(header + payload)
+
+
+def read_ws_frame(rfile):
+    """Read one (masked) client frame; returns (opcode, payload), opcode None at EOF."""
+    head = rfile.read(2)
+    if len(head) < 2:
+        return None, b""
+    opcode, length = head[0] & 0x0F, head[1] & 0x7F
+    if length == 126:
+        length = struct.unpack(">H", rfile.read(2))[0]
+    elif length == 127:
+        length = struct.unpack(">Q", rfile.read(8))[0]
+    mask = rfile.read(4) if head[1] & 0x80 else b"\0\0\0\0"
+    data = rfile.read(length)
+    return opcode, bytes(byte ^ mask[i % 4] for i, byte in enumerate(data))
+
+
+class FakeComfyUIHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    state = None
+
+    def _json(self, body, status: int = 200) -> None:
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _body(self) -> bytes:
+        return self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path == "/system_stats":
+            self._json({"system": {"comfyui_version": "fake", "python_version": "", "embedded_python": False},
+                        "devices": [{"name": "cuda:0 Fake GPU", "type": "cuda", "index": 0,
+                                     "vram_total": VRAM_TOTAL, "vram_free": VRAM_TOTAL - int(2e10),
+                                     "torch_vram_total": 0, "torch_vram_free": 0}]})
+        elif url.path == "/queue":
+            self._json(self.state.queue_state())
+        elif url.path == "/history":
+            with self.state.lock:
+                self._json(dict(self.state.history))
+        elif url.path.startswith("/history/"):
+            prompt_id = url.path[len("/history/"):]
+            with self.state.lock:
+                entry = self.state.history.get(prompt_id)
+            self._json({prompt_id: entry} if entry else {})
+        elif url.path == "/ws":
+            self._websocket(parse_qs(url.query).get("clientId", [uuid.uuid4().hex])[0])
+        else:
+            self.send_error(404)
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        if url.path == "/prompt":
+            try:
+                body = json.loads(self._body())
+            except ValueError:
+                return self._json({"error": {"type": "invalid_prompt", "message": "Invalid JSON"}}, 400)
+            if not isinstance(body.get("prompt"), dict):
+                return self._json({"error": {"type": "invalid_prompt", "message": "No prompt"}}, 400)
+            self._json(self.state.queue_prompt(body["prompt"], body.get("client_id", "")))
+        elif url.path == "/upload/image":
+            self._upload()
+        elif url.path == "/interrupt":
+            try:
+                body = json.loads(self._body() or "{}")
+            except ValueError:
+                body = {}
+            self.state.interrupt(body.get("prompt_id") if isinstance(body, dict) else None)
+            self._json({})
+        elif url.path == "/free":
+            self._body()
+            self._json({})
+        else:
+            self.send_error(404)
+
+    def _upload(self) -> None:
+        body = self._body()
+        message = email.parser.BytesParser(policy=email.policy.HTTP).parsebytes(
+            f"Content-Type: {self.headers['Content-Type']}\r\n\r\n".encode() + body
+        )
+        fields = {part.get_param("name", header="content-disposition"): part for part in message.iter_parts()}
+        image = fields.get("image")
+        if image is None:
+            return self._json({"error": "No image"}, 400)
+        subfolder = fields["subfolder"].get_content().strip() if "subfolder" in fields else ""
+        name = os.path.basename(image.get_filename() or f"upload_{uuid.uuid4().hex[:8]}")
+        directory = os.path.join(self.state.input_dir, subfolder)
+        os.makedirs(directory, exist_ok=True)
+        with open(os.path.join(directory, name), "wb") as f:
+            f.write(image.get_payload(decode=True))
+        self.state.stats["uploads"] += 1
+        self._json({"name": name, "subfolder": subfolder, "type": "input"})
+
+    def _websocket(self, client_id: str) -> None:
+        key = self.headers.get("Sec-WebSocket-Key")
+        if not key:
+            return self.send_error(400)
+        accept = base64.b64encode(hashlib.sha1((key + WEBSOCKET_GUID).encode()).digest()).decode()
+        self.send_response(101)
+        self.send_header("Upgrade", "websocket")
+        self.send_header("Connection", "Upgrade")
+        self.send_header("Sec-WebSocket-Accept", accept)
+        self.end_headers()
+        self.wfile.flush()
+        sock = self.connection
+        with self.state.lock:
+            self.state.clients[client_id].append(sock)
+        queue_remaining = len(self.state.queue_state()["queue_pending"])
+        send_ws_frame(sock, json.dumps({"type": "status", "data": {
+            "status": {"exec_info": {"queue_remaining": queue_remaining}}, "sid": client_id}}).encode())
+        try:
+            while True:
+                opcode, payload = read_ws_frame(self.rfile)
+                if opcode is None or opcode == 0x8:
+                    break
+                if opcode == 0x9:
+                    send_ws_frame(sock, payload, opcode=0xA)
+        except (OSError, struct.error):
+            pass
+        finally:
+            self.state.remove_client(client_id, sock)
+            self.close_connection = True
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_fake_comfyui(host: str = "127.0.0.1", port: int = 0, output_dir: str = None, input_dir: str = None,
+                       **options):
+    """
+    Serve a fake ComfyUI in background threads.
+
+    Args:
+        host, port: Address (port 0 picks a free one)
+        output_dir, input_dir: Directories for videos / uploads (default: a temp dir)
+        **options: FakeComfyUIState options (step_seconds, load_seconds, decode_seconds,
+            decode_chunks, fail_rate, oom_rate, decode_oom_rate, seed)
+
+    Returns:
+        Tuple of (server, base URL); server.state is the FakeComfyUIState
+    """
+    root = tempfile.mkdtemp(prefix="fake_comfyui_") if not (output_dir and input_dir) else None
+    state = FakeComfyUIState(output_dir or os.path.join(root, "output"), input_dir or os.path.join(root, "input"),
+                             **options)
+    handler = type("BoundFakeComfyUIHandler", (FakeComfyUIHandler,), {"state": state})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    server.state = state
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+def add_options(parser: argparse.ArgumentParser) -> None:
+    """Simulation options shared with load_test.py."""
+    parser.add_argument("--step-seconds", type=float, default=0.5, help="Seconds per sampler step (default: 0.5)")
+    parser.add_argument("--load-seconds", type=float, default=1.0,
+                        help="Seconds before the first sampler, per prompt (default: 1)")
+    parser.add_argument("--decode-seconds", type=float, default=2.0, help="Seconds per decode node (default: 2)")
+    parser.add_argument("--decode-chunks", type=int, default=4, help="Progress events per decode (default: 4)")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="Share of prompts failing (default: 0)")
+    parser.add_argument("--oom-rate", type=float, default=0.0,
+                        help="Share of prompts failing with OOM in the sampler (default: 0)")
+    parser.add_argument("--decode-oom-rate", type=float, default=0.0,
+                        help="Share of prompts failing with OOM in the decode (default: 0)")
+    parser.add_argument("--seed", type=int, default=None, help="Seed for the failure draws")
+
+
+def simulation_options(args) -> dict:
+    return {name: getattr(args, name) for name in
+            ("step_seconds", "load_seconds", "decode_seconds", "decode_chunks", "fail_rate", "oom_rate",
+             "decode_oom_rate", "seed")}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8188)
+    parser.add_argument("--output-dir", default=os.path.join(tempfile.gettempdir(), "fake_comfyui", "output"))
+    parser.add_argument("--input-dir", default=os.path.join(tempfile.gettempdir(), "fake_comfyui", "input"))
+    add_options(parser)
+    args = parser.parse_args()
+
+    server, url = start_fake_comfyui(args.host, args.port, args.output_dir, args.input_dir,
+                                     **simulation_options(args))
+    print(f"Fake ComfyUI on {url} (outputs: {args.output_dir}, ffmpeg: {'yes' if server.state.ffmpeg else 'no'})")
+    try:
+        while True:
+            time.sleep(60)
+            print(f"[fake_comfyui] {dict(server.state.stats)}")
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+Fake RunPod endpoint for batch client tests (scripts/batch_client.py).
+
+Serves the RunPod job API through job_server.JobServer (/run, /runsync,
+/status, /cancel, /stream, /health, also under /v2/{endpoint_id}) with a
+fake video handler instead of the LTX-2 one, plus the videos it
+"generates":
+
+    GET /files/{name}    deterministic video bytes, with Range support
+    GET /fake/stats      request counters: run (jobs accepted), status (per job),
+                         files, ranges, dropped downloads, injected errors
+
+The handler reports progress like the real one (download, sampling steps,
+upload; job_progress.py), so /status of a running job carries eta_seconds.
+Inputs can steer a job: "fail": true fails it, "base64": true returns the
+video inline (GCS fallback), "num_variants": n returns a "videos" list,
+"seconds" overrides the job length. Options add random failures,
+downloads cut mid-body (to exercise resume) and 503 responses.
+
+Usage:
+    python test/fake_runpod_api.py [--port 8000] [--job-seconds 2] [--drop-rate 0.2] [--error-rate 0.05]
+"""
+import argparse
+import asyncio
+import base64
+import collections
+import hashlib
+import os
+import random
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "docker", "pod_files"))
+
+from aiohttp import web
+
+from job_progress import current_progress
+from job_server import JobServer
+
+SAMPLING_STEPS = 8
+
+
+def video_bytes(name: str, size: int) -> bytes:
+    """Deterministic content of a fake video (same name and size, same bytes)."""
+    seed = hashlib.sha256(name.encode()).digest()
+    return (seed * (size // len(seed) + 1))[:size]
+
+
+class FakeRunPodAPI:
+    """
+    Fake handler, file routes and fault injection around a JobServer.
+
+    Args:
+        job_seconds: Mean seconds per job (+-25%)
+        video_bytes: Size of each video
+        fail_rate: Share of jobs failing
+        drop_rate: Share of file downloads cut halfway
+        error_rate: Share of API requests answered 503
+        concurrency: Jobs running at once
+        seed: Seed of the random draws
+    """
+
+    def __init__(self, job_seconds: float = 1.0, video_bytes: int = 256 * 1024, fail_rate: float = 0.0,
+                 drop_rate: float = 0.0, error_rate: float = 0.0, concurrency: int = 4, seed: int = None):
+        self.job_seconds = job_seconds
+        self.video_size = video_bytes
+        self.fail_rate = fail_rate
+        self.drop_rate = drop_rate
+        self.error_rate = error_rate
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.base_url = None
+        self.server = JobServer(self.handler, concurrency=concurrency)
+        self.stats = collections.Counter()
+        self.status_polls = collections.Counter()
+
+    def handler(self, event):
+        job_input = event["input"]
+        progress = current_progress()
+        with self.lock:
+            seconds = job_input.get("seconds", self.job_seconds * self.random.uniform(0.75, 1.25))
+            fail = job_input.get("fail") or self.random.random() < self.fail_rate
+        progress.set_stage("download")
+        time.sleep(seconds * 0.1)
+        progress.set_stage("sampling")
+        for step in range(1, SAMPLING_STEPS + 1):
+            time.sleep(seconds * 0.7 / SAMPLING_STEPS)
+            progress.set_step(step, SAMPLING_STEPS, "161")
+        if fail:
+            return {"status": "error", "error": "CUDA error: an illegal memory access was encountered"}
+        progress.set_stage("upload", units=self.video_size / 1e6)
+        time.sleep(seconds * 0.2)
+
+        name = event["id"]
+        output = {"seed": job_input.get("seed", 42), "generation_time": round(seconds, 1),
+                  "quality_preset": job_input.get("quality_preset", "high")}
+        if job_input.get("base64"):
+            output.update(video_base64=base64.b64encode(video_bytes(f"{name}.mp4", self.video_size)).decode(),
+                          video_url=None, video_filename=f"{name}.mp4")
+        else:
+            output.update(video_url=f"{self.base_url}/files/{name}.mp4", video_filename=f"{name}.mp4")
+        variants = int(job_input.get("num_variants", 1))
+        if variants > 1:
+            output["videos"] = [{"variant": 0, "seed": output["seed"], "video_url": output["video_url"]}] + [
+                {"variant": variant, "seed": output["seed"] + variant,
+                 "video_url": f"{self.base_url}/files/{name}_v{variant}.mp4"} for variant in range(1, variants)]
+        return {"status": "success", "output": output}
+
+    async def files(self, request):
+        name = request.match_info["name"]
+        data = video_bytes(name, self.video_size)
+        start = 0
+        if request.http_range.start is not None:
+            start = request.http_range.start
+            self.stats["ranges"] += 1
+        self.stats["files"] += 1
+        body = data[start:]
+        response = web.StreamResponse(status=206 if start else 200, headers={
+            "Content-Type": "video/mp4", "Content-Length": str(len(body)), "Accept-Ranges": "bytes"})
+        if start:
+            response.headers["Content-Range"] = f"bytes {start}-{len(data) - 1}/{len(data)}"
+        await response.prepare(request)
+        with self.lock:
+            drop = self.random.random() < self.drop_rate
+        if drop and len(body) > 1:
+            # Send half, then cut the connection
+            self.stats["dropped"] += 1
+            await response.write(body[:len(body) // 2])
+            request.transport.close()
+            return response
+        await response.write(body)
+        await response.write_eof()
+        return response
+
+    async def fake_stats(self, request):
+        return web.json_response({**self.stats, "status_polls": dict(self.status_polls)})
+
+    @web.middleware
+    async def _count(self, request, handler):
+        path = request.path
+        if not path.startswith(("/files", "/fake")):
+            with self.lock:
+                inject = self.random.random() < self.error_rate
+            if inject:
+                self.stats["errors"] += 1
+                raise web.HTTPServiceUnavailable(text='{"error": "injected"}', content_type="application/json")
+        if path.endswith("/run") and request.method == "POST":
+            self.stats["run"] += 1
+        elif "/status/" in path:
+            self.status_polls[path.rsplit("/", 1)[-1]] += 1
+        return await handler(request)
+
+    def make_app(self) -> web.Application:
+        app = self.server.make_app()
+        app.middlewares.insert(0, self._count)
+        app.router.add_get("/files/{name}", self.files)
+        app.router.add_get("/fake/stats", self.fake_stats)
+        return app
+
+
+def start_fake_runpod_api(host: str = "127.0.0.1", port: int = 0, **options):
+    """Serve a FakeRunPodAPI on a background thread; returns (api, base URL)."""
+    api = FakeRunPodAPI(**options)
+    loop = asyncio.new_event_loop()
+    runner = web.AppRunner(api.make_app())
+    loop.run_until_complete(runner.setup())
+    site = web.TCPSite(runner, host, port)
+    loop.run_until_complete(site.start())
+    api.base_url = f"http://{host}:{site._server.sockets[0].getsockname()[1]}"
+    threading.Thread(target=loop.run_forever, daemon=True).start()
+    return api, api.base_url
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--job-seconds", type=float, default=2.0, help="Mean seconds per job (default: 2)")
+    parser.add_argument("--video-kb", type=int, default=1024, help="Video size in KB (default: 1024)")
+    parser.add_argument("--concurrency", type=int, default=4, help="Jobs running at once (default: 4)")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="Share of jobs failing (default: 0)")
+    parser.add_argument("--drop-rate", type=float, default=0.0, help="Share of downloads cut (default: 0)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of API requests -> 503 (default: 0)")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    api, url = start_fake_runpod_api(args.host, args.port, job_seconds=args.job_seconds,
+                                     video_bytes=args.video_kb * 1024, fail_rate=args.fail_rate,
+                                     drop_rate=args.drop_rate, error_rate=args.error_rate,
+                                     concurrency=args.concurrency, seed=args.seed)
+    print(f"Fake RunPod API on {url} (batch client: --endpoint-url {url})")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,404 @@
+#!/usr/bin/env python3
+"""
+End-to-end load test of the handler against fake ComfyUI instances.
+
+Starts --instances fake ComfyUI servers (fake_comfyui.py, one process
+each, on consecutive ports from --base-port) and a local HTTP server with
+generated input media, points the handler at them (COMFYUI_BASE_PORT /
+COMFYUI_INSTANCES, COMFYUI_OUTPUT_DIRS, COMFYUI_WORKFLOW_DIR and temp
+journal / latent dirs), imports rp_handler and drives unified_handler
+through job_pipeline.make_async_handler, as the serverless worker does.
+
+--jobs jobs are drawn from a weighted mix of modes (--mix) and quality
+presets (--presets) with 3-10 s of audio / duration. They arrive all at
+once, or at --arrival-rate jobs/s, and at most --concurrency run at once
+(default HANDLER_CONCURRENCY).
+
+Reports throughput, queue wait, end-to-end latency, handler overhead
+(end-to-end minus GPU wait and ComfyUI time) and per-stage latency
+percentiles from each job's progress events (job_progress.py), outcomes,
+and the handler process's CPU time and RSS (sampled from /proc). GCS
+uploads are replaced by a copy into a temp dir unless --gcs is given.
+
+Needs the handler's dependencies (runpod, requests, Pillow, ffmpeg; e.g.
+inside the image with ComfyUI stopped), not a GPU.
+
+Usage:
+    python test/load_test.py [--jobs 40] [--instances 2] [--mix lipsync=6,audio_gen=2,keyframes=2]
+        [--presets fast=3,high=6,ultra=1] [--step-seconds 0.2] [--json report.json]
+"""
+import argparse
+import asyncio
+import collections
+import functools
+import json
+import math
+import os
+import random
+import resource
+import shutil
+import socket
+import struct
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import wave
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+TEST_DIR = os.path.dirname(os.path.abspath(__file__))
+DOCKER_DIR = os.path.join(TEST_DIR, "..", "docker")
+sys.path.insert(0, os.path.join(DOCKER_DIR, "pod_files"))
+sys.path.insert(0, TEST_DIR)
+
+from fake_comfyui import add_options, simulation_options
+
+TEMPLATES = {
+    "ltx2_enhanced.json": "workflow_ltx2_enhanced.json",
+    "ltx2_audio_gen.json": "workflow_ltx2_audio_gen.json",
+    "ltx2_multiframe.json": "workflow_ltx2_multiframe.json",
+}
+MODES = ("lipsync", "audio_gen", "keyframes_lipsync", "keyframes")
+# Stages that run inside ComfyUI (fake GPU time)
+COMFYUI_STAGES = ("loading", "sampling", "decode")
+RSS_SAMPLE_SECONDS = 0.5
+
+
+def parse_weights(spec: str, choices) -> dict:
+    """"a=3,b=1" -> {"a": 3.0, "b": 1.0}, names checked against choices."""
+    weights = {}
+    for part in filter(None, spec.split(",")):
+        name, _, weight = part.partition("=")
+        if name not in choices:
+            raise SystemExit(f"Unknown '{name}', choose from {', '.join(choices)}")
+        weights[name] = float(weight or 1)
+    return weights
+
+
+def write_png(path: str, width: int, height: int) -> None:
+    """Gradient RGB PNG (stdlib only)."""
+    rows = b"".join(b"\0" + b"".join(bytes((x * 255 // width, y * 255 // height, 160)) for x in range(width))
+                    for y in range(height))
+
+    def chunk(kind, data):
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data) & 0xFFFFFFFF)
+
+    with open(path, "wb") as f:
+        f.write(b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0))
+                + chunk(b"IDAT", zlib.compress(rows, 6)) + chunk(b"IEND", b""))
+
+
+def write_wav(path: str, seconds: float, sample_rate: int = 16000) -> None:
+    """Mono 16-bit speech-like tone (amplitude-modulated sine)."""
+    frames = bytearray()
+    for i in range(int(seconds * sample_rate)):
+        t = i / sample_rate
+        envelope = 0.5 + 0.5 * math.sin(2 * math.pi * 3 * t)
+        frames += struct.pack("<h", int(12000 * envelope * math.sin(2 * math.pi * 180 * t)))
+    with wave.open(path, "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(sample_rate)
+        f.writeframes(bytes(frames))
+
+
+def port_in_use(port: int, host: str = "127.0.0.1") -> bool:
+    with socket.socket() as sock:
+        return sock.connect_ex((host, port)) == 0
+
+
+def serve_media(directory: str):
+    """Serve directory over HTTP; returns the base URL."""
+    handler = functools.partial(type("QuietHandler", (SimpleHTTPRequestHandler,), {
+        "log_message": lambda self, format, *args: None}), directory=directory)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def make_jobs(count: int, mix: dict, presets: dict, media_url: str, durations: list, seed: int) -> list:
+    """Job inputs drawn from the weighted mode and preset mixes."""
+    rng = random.Random(seed)
+    jobs = []
+    for index in range(count):
+        mode = rng.choices(list(mix), weights=list(mix.values()))[0]
+        duration = rng.choice(durations)
+        job_input = {
+            "quality_preset": rng.choices(list(presets), weights=list(presets.values()))[0],
+            "seed": rng.randrange(2 ** 32),
+        }
+        keyframes = [{"image_url": f"{media_url}/face.png", "frame_position": "first"},
+                     {"image_url": f"{media_url}/face_alt.png", "frame_position": "last"}]
+        if mode == "lipsync":
+            job_input.update(image_url=f"{media_url}/face.png", audio_url=f"{media_url}/speech_{duration}s.wav")
+        elif mode == "audio_gen":
+            job_input.update(image_url=f"{media_url}/face.png", duration=float(duration))
+        elif mode == "keyframes_lipsync":
+            job_input.update(keyframes=keyframes, audio_url=f"{media_url}/speech_{duration}s.wav")
+        else:
+            job_input.update(keyframes=keyframes, duration=float(duration))
+        jobs.append({"id": f"load-{index:04d}", "mode": mode, "input": job_input})
+    return jobs
+
+
+def local_upload(upload_dir: str, video_path: str, job_id: str = None, subfolder: str = "videos",
+                 on_progress=None) -> dict:
+    """Stand-in for gcs_uploader.upload_video_to_gcs: copy into upload_dir."""
+    target = os.path.join(upload_dir, job_id or "no_job", subfolder, os.path.basename(video_path))
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    shutil.copyfile(video_path, target)
+    size = os.path.getsize(target)
+    if on_progress:
+        on_progress(size, size)
+    return {"success": True, "gcs_url": f"file://{target}", "public_url": f"file://{target}",
+            "filename": os.path.basename(target), "size_bytes": size, "error": None}
+
+
+class ResourceSampler:
+    """Samples this process's RSS from /proc while running."""
+
+    def __init__(self, interval: float = RSS_SAMPLE_SECONDS):
+        self.interval = interval
+        self.samples = []
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    @staticmethod
+    def rss_bytes():
+        try:
+            with open("/proc/self/status") as f:
+                for line in f:
+                    if line.startswith("VmRSS:"):
+                        return int(line.split()[1]) * 1024
+        except OSError:
+            pass
+        return None
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            rss = self.rss_bytes()
+            if rss is not None:
+                self.samples.append(rss)
+
+    def __enter__(self):
+        self.start_usage = resource.getrusage(resource.RUSAGE_SELF)
+        self.start_children = resource.getrusage(resource.RUSAGE_CHILDREN)
+        self.start_time = time.time()
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stopped.set()
+        self._thread.join()
+        usage = resource.getrusage(resource.RUSAGE_SELF)
+        children = resource.getrusage(resource.RUSAGE_CHILDREN)
+        wall = time.time() - self.start_time
+        cpu = usage.ru_utime + usage.ru_stime - self.start_usage.ru_utime - self.start_usage.ru_stime
+        self.report = {
+            "wall_seconds": round(wall, 1),
+            "cpu_seconds": round(cpu, 1),
+            "cpu_cores_used": round(cpu / wall, 2) if wall else None,
+            # Handler subprocesses (ffmpeg); the fake ComfyUI processes are reaped later
+            "children_cpu_seconds": round(children.ru_utime + children.ru_stime
+                                          - self.start_children.ru_utime - self.start_children.ru_stime, 1),
+            "rss_peak_mb": round(max(self.samples) / 1e6) if self.samples else None,
+            "rss_mean_mb": round(sum(self.samples) / len(self.samples) / 1e6) if self.samples else None,
+            "max_rss_mb": round(usage.ru_maxrss * 1024 / 1e6),
+        }
+
+
+def stage_durations(transitions: list, end: float) -> dict:
+    """Seconds per stage from (time, stage) transitions; a stage entered twice adds up."""
+    durations = collections.defaultdict(float)
+    for (start, stage), following in zip(transitions, transitions[1:] + [(end, None)]):
+        durations[stage] += following[0] - start
+    return dict(durations)
+
+
+async def run_jobs(handler, jobs: list, concurrency: int, arrival_rate: float, transitions: dict) -> list:
+    """Submit jobs on schedule, at most concurrency at once; returns per-job records."""
+    slots = asyncio.Semaphore(concurrency)
+    start = time.time()
+
+    async def run(index, job):
+        if arrival_rate:
+            await asyncio.sleep(max(0.0, start + index / arrival_rate - time.time()))
+        arrived = time.time()
+        async with slots:
+            began = time.time()
+            try:
+                result = await handler({"id": job["id"], "input": job["input"]})
+            except Exception as e:
+                result = {"status": "error", "error": f"{type(e).__name__}: {e}"}
+            ended = time.time()
+        ok = isinstance(result, dict) and result.get("status") == "success"
+        stages = stage_durations(transitions.get(job["id"], []), ended)
+        comfyui_seconds = sum(stages.get(stage, 0.0) for stage in COMFYUI_STAGES)
+        return {
+            "id": job["id"],
+            "mode": job["mode"],
+            "preset": job["input"]["quality_preset"],
+            "ok": ok,
+            "error": None if ok else str(result.get("error") if isinstance(result, dict) else result)[:120],
+            "queue_wait": began - arrived,
+            "latency": ended - began,
+            "overhead": ended - began - stages.get("gpu_wait", 0.0) - comfyui_seconds,
+            "stages": stages,
+            "ended": ended - start,
+        }
+
+    return await asyncio.gather(*(run(index, job) for index, job in enumerate(jobs)))
+
+
+def summarize(records: list, wall: float, resources: dict, percentiles) -> dict:
+    done = [record for record in records if record["ok"]]
+    stages = collections.defaultdict(list)
+    for record in done:
+        for stage, seconds in record["stages"].items():
+            stages[stage].append(seconds)
+    from job_progress import STAGES
+    return {
+        "jobs": len(records),
+        "succeeded": len(done),
+        "errors": dict(collections.Counter(record["error"] for record in records if not record["ok"])),
+        "wall_seconds": round(wall, 1),
+        "throughput_jobs_per_minute": round(len(done) / wall * 60, 2) if wall else None,
+        "queue_wait": percentiles([record["queue_wait"] for record in records]),
+        "latency": percentiles([record["latency"] for record in done]),
+        "handler_overhead": percentiles([record["overhead"] for record in done]),
+        "stages": {stage: percentiles(stages[stage]) for stage in STAGES if stage in stages},
+        "by_mode": {mode: percentiles([record["latency"] for record in done if record["mode"] == mode])
+                    for mode in sorted({record["mode"] for record in done})},
+        "resources": resources,
+    }
+
+
+def print_report(report: dict) -> None:
+    def row(name, stats):
+        if not stats.get("count"):
+            return f"  {name:<18} {0:>5}"
+        return f"  {name:<18} {stats['count']:>5} {stats['p50']:>8.2f} {stats['p90']:>8.2f} {stats['p99']:>8.2f}"
+
+    print(f"\n{report['succeeded']}/{report['jobs']} jobs succeeded in {report['wall_seconds']}s: "
+          f"{report['throughput_jobs_per_minute']} jobs/min")
+    for error, count in report["errors"].items():
+        print(f"  {count} x {error}")
+    print(f"\n  {'seconds':<18} {'count':>5} {'p50':>8} {'p90':>8} {'p99':>8}")
+    for name in ("queue_wait", "latency", "handler_overhead"):
+        print(row(name, report[name]))
+    print("  stages:")
+    for stage, stats in report["stages"].items():
+        print(row(f"  {stage}", stats))
+    print("  latency by mode:")
+    for mode, stats in report["by_mode"].items():
+        print(row(f"  {mode}", stats))
+    res = report["resources"]
+    print(f"\nHandler process: {res['cpu_seconds']}s CPU ({res['cpu_cores_used']} cores), "
+          f"subprocesses {res['children_cpu_seconds']}s CPU; RSS peak {res['rss_peak_mb']} MB, "
+          f"mean {res['rss_mean_mb']} MB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--jobs", type=int, default=40, help="Jobs to run (default: 40)")
+    parser.add_argument("--instances", type=int, default=1, help="Fake ComfyUI instances (default: 1)")
+    parser.add_argument("--base-port", type=int, default=18188, help="Port of fake instance 0 (default: 18188)")
+    parser.add_argument("--concurrency", type=int, default=None,
+                        help="Jobs run at once (default: HANDLER_CONCURRENCY, instances + 2)")
+    parser.add_argument("--arrival-rate", type=float, default=0.0,
+                        help="Jobs arriving per second (default: 0 = all at once)")
+    parser.add_argument("--mix", default="lipsync=6,audio_gen=2,keyframes_lipsync=1,keyframes=1",
+                        help=f"Mode weights, from {', '.join(MODES)}")
+    parser.add_argument("--presets", default="fast=3,high=6,ultra=1", help="Quality preset weights")
+    parser.add_argument("--durations", default="3,5,8,10", help="Audio / duration seconds to draw from")
+    parser.add_argument("--gcs", action="store_true", help="Upload to GCS (default: copy to a temp dir)")
+    parser.add_argument("--json", help="Write the report (and per-job records) to this file")
+    add_options(parser)
+    args = parser.parse_args()
+    mix = parse_weights(args.mix, MODES)
+    presets = parse_weights(args.presets, ("fast", "high", "ultra"))
+    durations = [int(value) for value in args.durations.split(",")]
+
+    work = tempfile.mkdtemp(prefix="ltx2_load_test_")
+    dirs = {name: os.path.join(work, name) for name in ("media", "output", "input", "workflows", "uploads",
+                                                        "latents")}
+    for path in dirs.values():
+        os.makedirs(path, exist_ok=True)
+    for name, template in TEMPLATES.items():
+        shutil.copyfile(os.path.join(DOCKER_DIR, template), os.path.join(dirs["workflows"], name))
+    write_png(os.path.join(dirs["media"], "face.png"), 768, 512)
+    write_png(os.path.join(dirs["media"], "face_alt.png"), 512, 768)
+    for seconds in durations:
+        write_wav(os.path.join(dirs["media"], f"speech_{seconds}s.wav"), seconds)
+    media_url = serve_media(dirs["media"])
+
+    fake_args = [f"--{name.replace('_', '-')}={value}" for name, value in simulation_options(args).items()
+                 if value is not None]
+    busy = [port for port in range(args.base_port, args.base_port + args.instances) if port_in_use(port)]
+    if busy:
+        # A fake left over from an interrupted run would serve its own output dir
+        raise SystemExit(f"Port(s) {', '.join(map(str, busy))} already in use (stale fake_comfyui.py?); "
+                         f"stop it or pass --base-port")
+    fakes = [subprocess.Popen([sys.executable, os.path.join(TEST_DIR, "fake_comfyui.py"),
+                               "--port", str(args.base_port + index), "--output-dir", dirs["output"],
+                               "--input-dir", dirs["input"], *fake_args])
+             for index in range(args.instances)]
+    try:
+        os.environ.update({
+            "COMFYUI_HOST": "127.0.0.1",
+            "COMFYUI_BASE_PORT": str(args.base_port),
+            "COMFYUI_INSTANCES": str(args.instances),
+            "COMFYUI_OUTPUT_DIRS": dirs["output"],
+            "COMFYUI_WORKFLOW_DIR": dirs["workflows"],
+            "JOB_JOURNAL_PATH": os.path.join(work, "job_journal.sqlite3"),
+            "LATENT_CACHE_DIR": os.path.join(dirs["latents"], "cache"),
+            "JOB_LATENT_DIR": os.path.join(dirs["latents"], "jobs"),
+        })
+        if args.concurrency:
+            os.environ["HANDLER_CONCURRENCY"] = str(args.concurrency)
+
+        import rp_handler
+        from job_pipeline import HANDLER_CONCURRENCY, make_async_handler, percentiles
+
+        if not args.gcs:
+            rp_handler.upload_video_to_gcs = functools.partial(local_upload, dirs["uploads"])
+        if not rp_handler.wait_for_comfyui(timeout=60):
+            raise SystemExit("Fake ComfyUI instances did not come up")
+
+        transitions = collections.defaultdict(list)
+
+        def progress_sink(event, progress):
+            job_transitions = transitions[event["id"]]
+            if not job_transitions or job_transitions[-1][1] != progress["stage"]:
+                job_transitions.append((time.time(), progress["stage"]))
+
+        handler = make_async_handler(rp_handler.unified_handler, progress_sink=progress_sink)
+        jobs = make_jobs(args.jobs, mix, presets, media_url, durations, args.seed or 0)
+        concurrency = args.concurrency or HANDLER_CONCURRENCY
+        print(f"{args.jobs} jobs, concurrency {concurrency}, {args.instances} fake ComfyUI instance(s), "
+              f"{args.step_seconds}s/step; work dir {work}")
+
+        loop = asyncio.new_event_loop()
+        loop.set_default_executor(ThreadPoolExecutor(max_workers=concurrency))
+        start = time.time()
+        with ResourceSampler() as sampler:
+            records = loop.run_until_complete(run_jobs(handler, jobs, concurrency, args.arrival_rate, transitions))
+        report = summarize(records, time.time() - start, sampler.report, percentiles)
+        print_report(report)
+        if args.json:
+            with open(args.json, "w") as f:
+                json.dump({**report, "args": vars(args), "records": records}, f, indent=2, default=str)
+            print(f"Report written to {args.json}")
+        shutil.rmtree(work, ignore_errors=True)
+    finally:
+        # Also on errors, so no fake keeps its port for the next run
+        for fake in fakes:
+            fake.terminate()
+
+
+if __name__ == "__main__":
+    main()
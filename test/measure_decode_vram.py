@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Measure VAE decode peak VRAM per tile and fit the decode VRAM model.
+
+WorkflowBuilder.plan_decode_tiling estimates the peak of one
+VAEDecodeTiled tile as DECODE_BASE_BYTES + DECODE_BYTES_PER_VOXEL x
+(tile pixels x tile frames). This loads the LTX-2 VAE in-process
+(ComfyUI's comfy package, no server; stop ComfyUI first so the GPU is
+free), decodes random latents of one tile for each --tiles x --frames
+point, and records torch.cuda.max_memory_reserved() (VAE weights
+included, as in a real decode with the diffusion model offloaded).
+
+The points are appended to test/decode_vram_points.json (one entry per
+GPU) and a least-squares line is fitted over all points of the GPU, with
+the base raised by the largest residual so that every measured point is
+at or under the model. Copy the printed constants into workflow_builder.py
+and commit both.
+
+Needs a GPU, torch and ComfyUI (COMFYUI_DIR, default /comfyui).
+
+Usage:
+    python test/measure_decode_vram.py [--tiles 256,384,512,640,768] [--frames 17,33,65,129]
+        [--ckpt ltx-2-19b-dev-fp8.safetensors]
+"""
+import argparse
+import datetime
+import json
+import os
+import sys
+
+TEST_DIR = os.path.dirname(os.path.abspath(__file__))
+POINTS_PATH = os.path.join(TEST_DIR, "decode_vram_points.json")
+sys.path.insert(0, os.path.join(TEST_DIR, "..", "docker", "pod_files"))
+
+
+def fit(points: list) -> dict:
+    """Least-squares peak = base + per_voxel x voxels, base raised so no point is above the line."""
+    n = len(points)
+    xs = [p["voxels"] for p in points]
+    ys = [p["peak_bytes"] for p in points]
+    mean_x, mean_y = sum(xs) / n, sum(ys) / n
+    var_x = sum((x - mean_x) ** 2 for x in xs)
+    per_voxel = sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys)) / var_x
+    base = mean_y - per_voxel * mean_x
+    base += max(0.0, max(y - (base + per_voxel * x) for x, y in zip(xs, ys)))
+    return {"base_bytes": int(base), "bytes_per_voxel": round(per_voxel, 2), "points": n}
+
+
+def load_vae(ckpt: str):
+    comfyui_dir = os.environ.get("COMFYUI_DIR", "/comfyui")
+    sys.path.insert(0, comfyui_dir)
+    import comfy.sd
+    import folder_paths
+
+    path = folder_paths.get_full_path("checkpoints", ckpt)
+    if path is None:
+        raise SystemExit(f"Checkpoint not found: {ckpt}")
+    _, _, vae = comfy.sd.load_checkpoint_guess_config(path, output_vae=True, output_clip=False,
+                                                      output_model=False)[:3]
+    return vae
+
+
+def measure(vae, tile: int, frames: int) -> dict:
+    """Peak reserved bytes decoding one tile x tile x frames tile."""
+    import torch
+
+    latent_frames = (frames - 1) // vae.temporal_compression_decode() + 1
+    scale = vae.spacial_compression_decode()
+    samples = torch.randn(1, 128, latent_frames, tile // scale, tile // scale)
+    torch.cuda.empty_cache()
+    torch.cuda.reset_peak_memory_stats()
+    point = {"tile": tile, "frames": frames, "voxels": tile * tile * frames}
+    try:
+        images = vae.decode_tiled(samples, tile_x=tile // scale, tile_y=tile // scale, overlap=tile // scale // 8,
+                                  tile_t=latent_frames, overlap_t=0)
+        point["peak_bytes"] = torch.cuda.max_memory_reserved()
+        del images
+    except torch.cuda.OutOfMemoryError:
+        point["oom"] = True
+    torch.cuda.empty_cache()
+    return point
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--tiles", default="256,384,512,640,768", help="Tile sizes in pixels")
+    parser.add_argument("--frames", default="17,33,65,129", help="Frames per tile (8n+1)")
+    parser.add_argument("--ckpt", default=None, help="Checkpoint with the VAE (default: template node 184)")
+    args = parser.parse_args()
+
+    import torch
+    from workflow_builder import WorkflowBuilder
+
+    ckpt = args.ckpt
+    if ckpt is None:
+        template = os.path.join(TEST_DIR, "..", "docker", "workflow_ltx2_enhanced.json")
+        ckpt = WorkflowBuilder(template, None, None).get_vae_ids()["image"]
+    vae = load_vae(ckpt)
+    gpu = torch.cuda.get_device_name(0)
+    total = torch.cuda.get_device_properties(0).total_memory
+
+    new_points = []
+    for tile in (int(t) for t in args.tiles.split(",")):
+        for frames in (int(f) for f in args.frames.split(",")):
+            point = measure(vae, tile, frames)
+            new_points.append(point)
+            peak = f"{point['peak_bytes'] / 1e9:.2f} GB" if "peak_bytes" in point else "OOM"
+            print(f"  {tile:>5}px x {frames:>4}f ({point['voxels'] / 1e6:>7.1f}M voxels): {peak}")
+
+    data = {"gpus": {}}
+    if os.path.exists(POINTS_PATH):
+        with open(POINTS_PATH) as f:
+            data = json.load(f)
+    entry = data["gpus"].setdefault(gpu, {"total_bytes": total, "ckpt": ckpt, "points": []})
+    entry["points"] += new_points
+    entry["measured"] = datetime.date.today().isoformat()
+    measured = [p for p in entry["points"] if "peak_bytes" in p]
+    if len({p["voxels"] for p in measured}) < 2:
+        raise SystemExit("Need at least two tile sizes that fit to fit the model")
+    entry["fit"] = fit(measured)
+    with open(POINTS_PATH, "w") as f:
+        json.dump(data, f, indent=2)
+
+    print(f"\n{gpu}: {len(measured)} points -> {POINTS_PATH}")
+    print(f"    DECODE_BASE_BYTES = int({entry['fit']['base_bytes'] / 1e9:.2f}e9)")
+    print(f"    DECODE_BYTES_PER_VOXEL = {entry['fit']['bytes_per_voxel']}")
+
+
+if __name__ == "__main__":
+    main()
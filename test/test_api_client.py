@@ -7,6 +7,8 @@ Usage:
     python test_api_client.py --image-url URL --audio-url URL [--api-key KEY]
 
 API Endpoint: https://api.runpod.ai/v2/42qdgmzjc9ldy5/runsync
+
+For many jobs, use scripts/batch_client.py (async /run, checkpointed resume).
 """
 import argparse
 import requests